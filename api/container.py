@@ -209,6 +209,7 @@ class ServiceContainer:
             Instance de UnityDialogueOrchestrator.
         """
         from services.unity_dialogue_orchestrator import UnityDialogueOrchestrator
+        from api.dependencies import get_generation_budget_guard
         
         return UnityDialogueOrchestrator(
             dialogue_service=self.get_dialogue_generation_service(),
@@ -217,7 +218,8 @@ class ServiceContainer:
             trait_service=self.get_trait_catalog_service(),
             config_service=self.get_config_service(),
             usage_service=self.get_llm_usage_service(),
-            request_id=request_id
+            request_id=request_id,
+            budget_guard=get_generation_budget_guard()
         )
     
     def reset(self) -> None:
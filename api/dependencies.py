@@ -8,7 +8,7 @@ import os
 import sys
 import json
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Dict, Optional, Tuple
 from fastapi import Depends
 from starlette.requests import Request
 from core.context.context_builder import ContextBuilder
@@ -19,11 +19,13 @@ from services.configuration_service import ConfigurationService
 from services.dialogue_generation_service import DialogueGenerationService
 from services.linked_selector import LinkedSelectorService
 # FileInteractionRepository supprimé - système obsolète
-from services.repositories.llm_usage_repository import FileLLMUsageRepository
+from services.repositories.llm_usage_repository import ILLMUsageRepository, create_llm_usage_repository
+from services.repositories.llm_usage_rollup_repository import FileUsageRollupRepository
 from services.repositories.cost_budget_repository import FileCostBudgetRepository
 from services.llm_usage_service import LLMUsageService
 from services.llm_pricing_service import LLMPricingService
 from services.cost_governance_service import CostGovernanceService
+from services.budget_ledger import GenerationBudgetGuard, get_budget_ledger
 from factories.llm_factory import LLMClientFactory
 from services.vocabulary_service import VocabularyService
 from services.narrative_guides_service import NarrativeGuidesService
@@ -178,24 +180,64 @@ def get_linked_selector_service(
     return LinkedSelectorService(context_builder=context_builder)
 
 
-def get_llm_usage_repository() -> FileLLMUsageRepository:
-    """Crée un repository d'utilisation LLM basé sur fichiers.
+# Repositories d'usage par (backend, chemin) : la connexion SQLite (et l'import initial
+# des fichiers) ne sont pas refaits à chaque requête
+_llm_usage_repositories: Dict[Tuple[str, str, str], ILLMUsageRepository] = {}
+
+
+def get_llm_usage_repository() -> ILLMUsageRepository:
+    """Retourne le repository d'utilisation LLM configuré (LLM_USAGE_STORE=file|sqlite).
     
     Returns:
-        Instance de FileLLMUsageRepository.
+        Instance de FileLLMUsageRepository ou SQLiteLLMUsageRepository.
     """
     storage_dir = str(DIALOGUE_GENERATOR_DIR / FilePaths.LLM_USAGE_DIR)
     os.makedirs(storage_dir, exist_ok=True)
-    return FileLLMUsageRepository(storage_dir=storage_dir)
+    backend = os.getenv("LLM_USAGE_STORE", "file").strip().lower()
+    db_path = os.getenv("LLM_USAGE_DB_PATH") or str(DIALOGUE_GENERATOR_DIR / FilePaths.LLM_USAGE_DB_FILE)
+    key = (backend, storage_dir, db_path)
+    repository = _llm_usage_repositories.get(key)
+    if repository is None:
+        repository = create_llm_usage_repository(backend, storage_dir, db_path)
+        _llm_usage_repositories[key] = repository
+    return repository
+
+
+# Agrégats d'usage par dossier (totaux par jour gardés en mémoire entre les requêtes)
+_llm_usage_rollup_repositories: Dict[str, FileUsageRollupRepository] = {}
+
+
+def get_llm_usage_rollup_repository(
+    repository: Annotated[ILLMUsageRepository, Depends(get_llm_usage_repository)]
+) -> Optional[FileUsageRollupRepository]:
+    """Retourne les agrégats d'usage LLM (None si LLM_USAGE_ROLLUPS_ENABLED=false).
+    
+    Les agrégats sont construits depuis le journal brut à leur première utilisation
+    (lecture ou ajout), pas à la création.
+    
+    Args:
+        repository: Repository d'usage injecté (source de la construction initiale).
+        
+    Returns:
+        Instance de FileUsageRollupRepository, ou None.
+    """
+    if os.getenv("LLM_USAGE_ROLLUPS_ENABLED", "true").lower() != "true":
+        return None
+    storage_dir = str(DIALOGUE_GENERATOR_DIR / FilePaths.LLM_USAGE_DIR)
+    rollups = _llm_usage_rollup_repositories.get(storage_dir)
+    if rollups is None:
+        rollups = FileUsageRollupRepository(storage_dir=storage_dir, source=repository)
+        _llm_usage_rollup_repositories[storage_dir] = rollups
+    return rollups
 
 
 def get_cost_budget_repository() -> FileCostBudgetRepository:
-    """Crée un repository de budgets LLM basé sur fichier JSON.
+    """Crée un repository de budgets LLM basé sur fichier JSON (COST_BUDGETS_FILE).
     
     Returns:
         Instance de FileCostBudgetRepository.
     """
-    storage_file = str(DIALOGUE_GENERATOR_DIR / FilePaths.COST_BUDGETS_FILE)
+    storage_file = os.getenv("COST_BUDGETS_FILE") or str(DIALOGUE_GENERATOR_DIR / FilePaths.COST_BUDGETS_FILE)
     return FileCostBudgetRepository(storage_file=storage_file)
 
 
@@ -213,6 +255,25 @@ def get_cost_governance_service(
     return CostGovernanceService(repository=repository)
 
 
+# Gardes de budget par fichier de budgets (tarifs chargés une seule fois)
+_generation_budget_guards: Dict[str, GenerationBudgetGuard] = {}
+
+
+def get_generation_budget_guard() -> GenerationBudgetGuard:
+    """Retourne la garde de budget des générations (vérification après construction du prompt).
+    
+    Returns:
+        Instance de GenerationBudgetGuard partagée par les requêtes du processus.
+    """
+    repository = get_cost_budget_repository()
+    key = str(repository.storage_file)
+    guard = _generation_budget_guards.get(key)
+    if guard is None:
+        guard = GenerationBudgetGuard(get_budget_ledger(repository))
+        _generation_budget_guards[key] = guard
+    return guard
+
+
 def create_llm_usage_service() -> LLMUsageService:
     """Crée un service de tracking d'utilisation LLM (sans dépendances FastAPI).
     
@@ -232,26 +293,30 @@ def create_llm_usage_service() -> LLMUsageService:
     cost_service = CostGovernanceService(repository=cost_repository)
     return LLMUsageService(
         repository=repository,
-        cost_governance_service=cost_service
+        cost_governance_service=cost_service,
+        rollup_repository=get_llm_usage_rollup_repository(repository)
     )
 
 
 def get_llm_usage_service(
-    repository: Annotated[FileLLMUsageRepository, Depends(get_llm_usage_repository)],
-    cost_service: Annotated[CostGovernanceService, Depends(get_cost_governance_service)]
+    repository: Annotated[ILLMUsageRepository, Depends(get_llm_usage_repository)],
+    cost_service: Annotated[CostGovernanceService, Depends(get_cost_governance_service)],
+    rollup_repository: Annotated[Optional[FileUsageRollupRepository], Depends(get_llm_usage_rollup_repository)]
 ) -> LLMUsageService:
     """Retourne le service de tracking d'utilisation LLM.
     
     Args:
         repository: Repository injecté via dépendance.
         cost_service: Service de cost governance injecté.
+        rollup_repository: Agrégats d'usage injectés (None si désactivés).
         
     Returns:
         Instance de LLMUsageService avec cost governance intégré.
     """
     return LLMUsageService(
         repository=repository,
-        cost_governance_service=cost_service
+        cost_governance_service=cost_service,
+        rollup_repository=rollup_repository
     )
 
 
@@ -144,6 +144,31 @@ class NotFoundException(APIException):
         )
 
 
+class QuotaExceededException(APIException):
+    """Exception levée lorsqu'une génération dépasserait le budget LLM mensuel."""
+
+    def __init__(
+        self,
+        message: str = "Monthly quota reached",
+        details: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None
+    ):
+        """Initialise une exception de quota dépassé.
+
+        Args:
+            message: Message d'erreur (avertissement de la vérification du budget).
+            details: Pourcentage du budget et coût estimé de la génération.
+            request_id: ID de la requête.
+        """
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            code="QUOTA_EXCEEDED",
+            message=message,
+            details=details,
+            request_id=request_id
+        )
+
+
 class InternalServerException(APIException):
     """Exception levée lors d'erreurs internes du serveur."""
     
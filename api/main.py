@@ -185,6 +185,19 @@ async def lifespan(app: FastAPI):
             print("AUCUNE ROUTE estimate-tokens trouvée!", file=sys.stderr, flush=True)
         log_routes.warning("=== FIN LISTE ROUTES ===")
     
+    # Persister l'usage LLM et les budgets en arrière-plan, par lots
+    if os.getenv("LLM_USAGE_WRITER_ENABLED", "true").lower() in ("true", "1", "yes"):
+        try:
+            from services.usage_writer import (
+                DEFAULT_FLUSH_INTERVAL_MS, DEFAULT_MAX_ATTEMPTS, UsageWriter, set_usage_writer
+            )
+            flush_interval_ms = int(os.getenv("LLM_USAGE_FLUSH_INTERVAL_MS", str(DEFAULT_FLUSH_INTERVAL_MS)))
+            max_attempts = int(os.getenv("LLM_USAGE_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS)))
+            set_usage_writer(UsageWriter(flush_interval_ms=flush_interval_ms, max_attempts=max_attempts))
+            logger.info(f"Writer d'usage LLM démarré (lots toutes les {flush_interval_ms} ms)")
+        except Exception as e:
+            logger.warning(f"Erreur lors du démarrage du writer d'usage LLM (persistance synchrone): {e}")
+    
     # Démarrer la tâche de cleanup des jobs de génération (Story 0.2)
     try:
         from api.services.generation_job_manager import get_job_manager
@@ -198,12 +211,24 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Arrêt de l'API DialogueGenerator...")
     
-    # Arrêter la tâche de cleanup des jobs (Story 0.2)
+    # Arrêter la tâche de cleanup des jobs (Story 0.2) et les jobs encore en cours
     try:
+        await job_manager.shutdown()
         await job_manager.stop_cleanup_task()
         logger.info("Cleanup task des jobs de génération arrêtée")
     except Exception as e:
         logger.warning(f"Erreur lors de l'arrêt de la cleanup task: {e}")
+    
+    # Persister l'usage LLM et les budgets encore en file (après l'arrêt des jobs)
+    try:
+        from services.usage_writer import set_usage_writer
+        set_usage_writer(None)
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'arrêt du writer d'usage LLM: {e}")
+    
+    # Écrire les logs encore en file avant l'arrêt
+    from api.utils.log_queue import flush_log_queue
+    flush_log_queue()
 
 
 # Création de l'application FastAPI
@@ -265,18 +290,29 @@ app.add_middleware(CostGovernanceMiddleware)  # Cost governance (Story 0.7)
 
 # Middleware anti-cache en développement (doit être avant le cache HTTP)
 if not is_production_env:
-    from starlette.middleware.base import BaseHTTPMiddleware
-    from starlette.responses import Response
-    
-    class DevNoCacheMiddleware(BaseHTTPMiddleware):
-        """Middleware qui désactive le cache en développement pour garantir le rafraîchissement."""
-        async def dispatch(self, request: Request, call_next):
-            response = await call_next(request)
-            # Ajouter des headers anti-cache pour toutes les réponses en développement
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, proxy-revalidate, max-age=0"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-            return response
+    from starlette.datastructures import MutableHeaders
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+    
+    class DevNoCacheMiddleware:
+        """Middleware ASGI qui désactive le cache en développement pour garantir le rafraîchissement."""
+        def __init__(self, app: ASGIApp):
+            self.app = app
+        
+        async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http":
+                await self.app(scope, receive, send)
+                return
+            
+            async def send_no_cache(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    # Ajouter des headers anti-cache pour toutes les réponses en développement
+                    headers = MutableHeaders(scope=message)
+                    headers["Cache-Control"] = "no-store, no-cache, must-revalidate, proxy-revalidate, max-age=0"
+                    headers["Pragma"] = "no-cache"
+                    headers["Expires"] = "0"
+                await send(message)
+            
+            await self.app(scope, receive, send_no_cache)
     
     app.add_middleware(DevNoCacheMiddleware)
     logger.info("Middleware anti-cache activé en développement")
@@ -3,69 +3,92 @@ import os
 import uuid
 import time
 import logging
-from typing import Callable
 from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Middleware pour générer et ajouter un ID de requête à chaque requête."""
+class RequestIDMiddleware:
+    """Middleware ASGI qui génère un ID de requête et l'ajoute aux headers de réponse.
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Ajoute un request_id à chaque requête.
+    Middleware ASGI pur (pas de BaseHTTPMiddleware) : le corps de la réponse, y compris
+    un flux SSE, est transmis tel quel.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        """Initialise le middleware.
         
         Args:
-            request: La requête HTTP.
-            call_next: La fonction suivante dans la chaîne middleware.
-            
-        Returns:
-            La réponse HTTP avec le request_id dans les headers.
+            app: L'application ASGI.
+        """
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Ajoute un request_id à chaque requête HTTP (request.state et header X-Request-ID).
+        
+        Args:
+            scope: Scope ASGI.
+            receive: Fonction receive ASGI.
+            send: Fonction send ASGI.
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
+        scope.setdefault("state", {})["request_id"] = request_id
         
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_request_id)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware pour logger les requêtes HTTP avec contexte structuré."""
+class LoggingMiddleware:
+    """Middleware ASGI pour logger les requêtes HTTP avec contexte structuré.
+    
+    La réponse est loguée à l'envoi de ses headers (statut et durée jusqu'au premier
+    octet) ; le corps est transmis sans être lu.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        """Initialise le middleware.
+        
+        Args:
+            app: L'application ASGI.
+        """
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Log les requêtes HTTP avec timing et contexte enrichi.
         
         Args:
-            request: La requête HTTP.
-            call_next: La fonction suivante dans la chaîne middleware.
-            
-        Returns:
-            La réponse HTTP.
+            scope: Scope ASGI.
+            receive: Fonction receive ASGI.
+            send: Fonction send ASGI.
         """
-        from api.middleware.logging_context import add_logging_context_to_record
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        request_id = getattr(request.state, "request_id", "unknown")
         start_time = time.time()
-        path = request.url.path
+        path = scope["path"]
+        method = scope["method"]
+        state = scope.setdefault("state", {})
         
         # Log de debug uniquement si DEBUG_MIDDLEWARE=true
         if os.getenv("DEBUG_MIDDLEWARE", "false").lower() in ("true", "1", "yes") and "/estimate-tokens" in path:
             import sys
             uvicorn_log = logging.getLogger("uvicorn.error")
-            uvicorn_log.warning(f"=== LoggingMiddleware HIT: {request.method} {path} request_id={request_id} ===")
-            print(f"=== LoggingMiddleware HIT: {request.method} {path} request_id={request_id} ===", file=sys.stderr, flush=True)
+            request_id = state.get("request_id", "unknown")
+            uvicorn_log.warning(f"=== LoggingMiddleware HIT: {method} {path} request_id={request_id} ===")
+            print(f"=== LoggingMiddleware HIT: {method} {path} request_id={request_id} ===", file=sys.stderr, flush=True)
         
         request_logger = logging.getLogger("api.middleware")
-        extra = {
-            "request_id": request_id,
-            "endpoint": path,
-            "method": request.method,
-            "client": request.client.host if request.client else "unknown"
-        }
         
         # Niveaux et filtres (réduction de bruit en dev)
         # - HTTP_LOG_LEVEL contrôle le niveau mini pour loguer les succès (2xx/3xx)
@@ -79,71 +102,56 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         # Exclure /health par défaut (sauf si erreur)
         is_health = path == "/health" or path.startswith("/health/")
         
+        async def send_with_logging(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+                duration_ms = int(process_time * 1000)
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Process-Time", str(process_time))
+                
+                # Skip total pour /health en succès (trop bruyant avec polling)
+                if not (is_health and status_code < 400):
+                    # Choisir le niveau selon statut / lenteur
+                    if status_code >= 500:
+                        log_fn = request_logger.error
+                    elif status_code >= 400:
+                        log_fn = request_logger.warning
+                    elif duration_ms >= slow_ms:
+                        log_fn = request_logger.info
+                    elif http_log_level == "INFO":
+                        log_fn = request_logger.info
+                    else:
+                        # Succès normal: DEBUG par défaut
+                        log_fn = request_logger.debug
+                    
+                    # Log de la réponse avec contexte
+                    log_fn(
+                        f"HTTP {method} {path} -> {status_code} ({duration_ms}ms)",
+                        extra={
+                            "request_id": state.get("request_id", "unknown"),
+                            "endpoint": path,
+                            "method": method,
+                            "status_code": status_code,
+                            "duration_ms": duration_ms
+                        }
+                    )
+            await send(message)
+        
         try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            duration_ms = int(process_time * 1000)
-            
-            # Log de la réponse avec contexte
-            response_extra = {
-                "request_id": request_id,
-                "endpoint": path,
-                "method": request.method,
-                "status_code": response.status_code,
-                "duration_ms": duration_ms
-            }
-            
-            status_code = response.status_code
-            
-            # Skip total pour /health en succès (trop bruyant avec polling)
-            if is_health and status_code < 400:
-                response.headers["X-Process-Time"] = str(process_time)
-                return response
-            
-            # Choisir le niveau selon statut / lenteur
-            if status_code >= 500:
-                log_fn = request_logger.error
-            elif status_code >= 400:
-                log_fn = request_logger.warning
-            elif duration_ms >= slow_ms:
-                log_fn = request_logger.info
-            else:
-                # Succès normal: DEBUG par défaut (ou selon HTTP_LOG_LEVEL)
-                if http_log_level == "DEBUG":
-                    log_fn = request_logger.debug
-                elif http_log_level == "INFO":
-                    log_fn = request_logger.info
-                elif http_log_level == "WARNING":
-                    log_fn = request_logger.debug
-                elif http_log_level == "ERROR":
-                    log_fn = request_logger.debug
-                elif http_log_level == "CRITICAL":
-                    log_fn = request_logger.debug
-                else:
-                    log_fn = request_logger.debug
-            
-            log_fn(
-                f"HTTP {request.method} {path} -> {status_code} ({duration_ms}ms)",
-                extra=response_extra
-            )
-            
-            response.headers["X-Process-Time"] = str(process_time)
-            return response
-            
+            await self.app(scope, receive, send_with_logging)
         except Exception as e:
-            process_time = time.time() - start_time
-            duration_ms = int(process_time * 1000)
+            duration_ms = int((time.time() - start_time) * 1000)
             
             # Log de l'erreur avec contexte
             error_extra = {
-                "request_id": request_id,
+                "request_id": state.get("request_id", "unknown"),
                 "endpoint": path,
-                "method": request.method,
+                "method": method,
                 "duration_ms": duration_ms,
                 "exception_type": type(e).__name__
             }
             request_logger.error(
-                f"Error: {request.method} {path} Exception: {type(e).__name__}: {str(e)}",
+                f"Error: {method} {path} Exception: {type(e).__name__}: {str(e)}",
                 extra=error_extra,
                 exc_info=True
             )
@@ -1,28 +1,24 @@
 """Middleware pour la gouvernance des coûts LLM."""
-import json
+import asyncio
 import logging
-from typing import Callable
+from typing import Optional, Tuple
 
-from fastapi import Request, Response, status
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from services.cost_governance_service import CostGovernanceService
+from services.budget_ledger import DEFAULT_USER_ID, BudgetLedger, BudgetReservation, get_budget_ledger
 from services.llm_pricing_service import LLMPricingService
-from api.dependencies import get_cost_governance_service, get_cost_budget_repository
+from api.dependencies import get_cost_budget_repository
 from constants import ModelNames, Defaults
 
 logger = logging.getLogger(__name__)
 
-# User ID par défaut (V1.0: pas d'authentification, utilisateur unique)
-DEFAULT_USER_ID = "default_user"
-
-# Endpoints à intercepter pour vérification budget
+# Endpoints à intercepter pour vérification budget. /generate/unity-dialogue et
+# /generate/jobs n'y figurent plus : UnityDialogueOrchestrator vérifie leur budget une
+# fois le prompt construit (GenerationBudgetGuard, coût réel du prompt).
 GENERATION_ENDPOINTS = [
-    "/api/v1/dialogues/generate/unity-dialogue",
-    "/api/v1/dialogues/generate/variants",
     "/api/v1/graph/generate-node",
-    "/api/v1/dialogues/generate/jobs",  # Streaming generation
 ]
 
 # Estimation par défaut des tokens (si non disponibles dans la requête)
@@ -30,52 +26,88 @@ DEFAULT_PROMPT_TOKENS = 5000  # Estimation conservatrice
 DEFAULT_COMPLETION_TOKENS = 1000  # Estimation conservatrice
 
 
-class CostGovernanceMiddleware(BaseHTTPMiddleware):
-    """Middleware pour vérifier le budget avant génération LLM.
+class CostGovernanceMiddleware:
+    """Middleware ASGI pour vérifier le budget avant génération LLM.
+    
+    Intercepte les requêtes POST vers les endpoints de génération sans prompt
+    construit en amont (le corps n'est pas lu : estimation forfaitaire),
+    estime le coût, vérifie le budget, et bloque si nécessaire. Les autres
+    requêtes, et le corps des réponses autorisées, sont transmis tels quels.
     
-    Intercepte les requêtes POST vers les endpoints de génération,
-    estime le coût, vérifie le budget, et bloque si nécessaire.
+    Le budget est lu depuis un registre en mémoire (services.budget_ledger) : le coût
+    estimé d'une génération autorisée y est réservé jusqu'à la fin de la requête.
     """
     
-    def __init__(self, app):
+    def __init__(self, app: ASGIApp):
         """Initialise le middleware.
         
         Args:
             app: L'application ASGI.
         """
-        super().__init__(app)
+        self.app = app
         self.pricing_service = LLMPricingService()
-        # Le service sera créé à chaque requête via dependency injection
-        # pour éviter les problèmes de cycle de vie
+        # Registre des budgets, créé à la première requête de génération
+        self._ledger: Optional[BudgetLedger] = None
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    def _get_ledger(self) -> BudgetLedger:
+        """Récupère le registre des budgets (partagé par les requêtes du processus)."""
+        if self._ledger is None:
+            self._ledger = get_budget_ledger(get_cost_budget_repository())
+        return self._ledger
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Vérifie le budget avant génération.
         
         Args:
-            request: La requête HTTP.
-            call_next: La fonction suivante dans la chaîne middleware.
-            
-        Returns:
-            La réponse HTTP (429 si budget dépassé, sinon réponse normale).
+            scope: Scope ASGI.
+            receive: Fonction receive ASGI.
+            send: Fonction send ASGI.
         """
         # Vérifier si c'est une requête POST vers un endpoint de génération
-        if request.method != "POST":
-            return await call_next(request)
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
         
-        path = request.url.path
+        path = scope["path"]
         if not any(path.startswith(endpoint) for endpoint in GENERATION_ENDPOINTS):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
+        # 429/500 si la génération est bloquée, sinon la requête continue
+        blocked_response, reservation = await self._check_budget(Request(scope), path)
+        if blocked_response is not None:
+            await blocked_response(scope, receive, send)
+            return
         try:
-            # Créer le service de cost governance
-            repository = get_cost_budget_repository()
-            cost_service = CostGovernanceService(repository=repository)
+            await self.app(scope, receive, send)
+        finally:
+            # Fin de la requête : le coût réel a été compté par LLMUsageService
+            if reservation is not None:
+                # Verrou fcntl et réécriture des réservations partagées : hors de la boucle d'événements
+                await asyncio.to_thread(self._get_ledger().release, reservation)
+    
+    async def _check_budget(
+        self,
+        request: Request,
+        path: str
+    ) -> Tuple[Optional[JSONResponse], Optional[BudgetReservation]]:
+        """Vérifie le budget pour une requête de génération et réserve son coût estimé.
+        
+        Args:
+            request: La requête HTTP (le corps n'est pas lu).
+            path: Chemin de l'endpoint de génération.
             
+        Returns:
+            (réponse d'erreur si la génération est bloquée, réservation à libérer en fin de requête).
+        """
+        try:
             # Estimer le coût
             estimated_cost = await self._estimate_cost(request)
             
-            # Vérifier le budget
-            budget_check = cost_service.check_budget(
+            # Vérifier le budget (en mémoire) et réserver le coût estimé (verrou fcntl et
+            # écriture des réservations partagées entre workers : hors de la boucle d'événements)
+            budget_check, reservation = await asyncio.to_thread(
+                self._get_ledger().reserve,
                 user_id=DEFAULT_USER_ID,
                 estimated_cost=estimated_cost
             )
@@ -85,7 +117,7 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
                 logger.warning(
                     f"Génération bloquée pour {path}: budget dépassé ({budget_check['percentage']:.1f}%)"
                 )
-                return JSONResponse(
+                return (JSONResponse(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     content={
                         "error": {
@@ -97,7 +129,7 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
                             }
                         }
                     }
-                )
+                ), None)
             
             # Si warning (90%), logger mais continuer
             if budget_check.get("warning"):
@@ -107,18 +139,18 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
                 )
             
             # Continuer avec la requête
-            return await call_next(request)
+            return None, reservation
             
         except FileNotFoundError as e:
             # Fichier de budget n'existe pas encore (première utilisation)
             # Autoriser la génération et laisser le système créer le budget
             logger.debug(f"Fichier de budget non trouvé (première utilisation): {e}")
-            return await call_next(request)
+            return None, None
         except (ValueError, KeyError, TypeError) as e:
             # Erreurs de données (JSON invalide, clés manquantes, etc.)
             # Fail-safe: bloquer la génération pour protéger le budget
             logger.error(f"Erreur de données dans CostGovernanceMiddleware: {e}", exc_info=True)
-            return JSONResponse(
+            return (JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "error": {
@@ -127,11 +159,11 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
                         "details": {"error": str(e)}
                     }
                 }
-            )
+            ), None)
         except Exception as e:
             # Erreur inattendue: fail-safe en bloquant la génération
             logger.error(f"Erreur inattendue dans CostGovernanceMiddleware: {e}", exc_info=True)
-            return JSONResponse(
+            return (JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "error": {
@@ -140,7 +172,7 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
                         "details": {"error": str(e)}
                     }
                 }
-            )
+            ), None)
     
     async def _estimate_cost(self, request: Request) -> float:
         """Estime le coût d'une génération basé sur la requête.
@@ -148,8 +180,7 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
         NOTE: Le body de la requête FastAPI ne peut pas être lu en middleware
         car il est un stream consommable une seule fois. On utilise donc:
         1. Query parameters pour le modèle (si disponible)
-        2. Endpoint-specific defaults (plus précis selon le type de génération)
-        3. Valeurs par défaut conservatrices (fallback)
+        2. Valeurs par défaut conservatrices pour les tokens
         
         Args:
             request: La requête HTTP.
@@ -162,20 +193,9 @@ class CostGovernanceMiddleware(BaseHTTPMiddleware):
         if not model_name:
             model_name = Defaults.MODEL_ID
         
-        # Estimation selon le type d'endpoint
-        path = request.url.path
-        if "/generate/variants" in path:
-            # Génération de variantes: tokens plus élevés (multiples réponses)
-            prompt_tokens = DEFAULT_PROMPT_TOKENS
-            completion_tokens = DEFAULT_COMPLETION_TOKENS * 2  # Estimation conservatrice pour variantes
-        elif "/generate/jobs" in path:
-            # Streaming generation: tokens similaires mais traitement spécial
-            prompt_tokens = DEFAULT_PROMPT_TOKENS
-            completion_tokens = DEFAULT_COMPLETION_TOKENS * 1.5
-        else:
-            # Génération standard (unity-dialogue, generate-node)
-            prompt_tokens = DEFAULT_PROMPT_TOKENS
-            completion_tokens = DEFAULT_COMPLETION_TOKENS
+        # Génération de nœud (generate-node) : estimation forfaitaire
+        prompt_tokens = DEFAULT_PROMPT_TOKENS
+        completion_tokens = DEFAULT_COMPLETION_TOKENS
         
         return self.pricing_service.calculate_cost(
             model_name=model_name,
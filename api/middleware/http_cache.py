@@ -1,120 +1,182 @@
-"""Middleware de cache HTTP avec TTL pour les endpoints GET statiques."""
+"""Middleware de cache HTTP des endpoints GET (entrées et ETags indexés par version des données)."""
 import os
 import hashlib
-import json
 import logging
-import time
-from typing import Optional, Callable, Any
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response as StarletteResponse
-from cachetools import TTLCache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from cachetools import LRUCache, TTLCache
+
+from api.utils.data_versions import (
+    SOURCE_CONFIG,
+    SOURCE_GDD,
+    SOURCE_PRESETS,
+    DataVersionRegistry,
+    get_data_versions,
+)
 
 logger = logging.getLogger(__name__)
 
+# Préfixes des endpoints versionnés et sources de données dont dépendent leurs réponses.
+# Seules les routes dont les données sont suivies par DataVersionRegistry y figurent : les
+# autres routes de /api/v1/config/ (chemin Unity, prompt système par défaut, debug) restent
+# sur le cache à TTL.
+VERSIONED_PATHS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("/api/v1/context/", (SOURCE_GDD, SOURCE_CONFIG)),
+    ("/api/v1/config/llm", (SOURCE_CONFIG,)),
+    ("/api/v1/config/context", (SOURCE_CONFIG, SOURCE_GDD)),
+    ("/api/v1/config/scene-instruction-templates", (SOURCE_CONFIG,)),
+    ("/api/v1/config/author-profile-templates", (SOURCE_CONFIG,)),
+    ("/api/v1/presets", (SOURCE_PRESETS, SOURCE_GDD)),
+)
+
+# Taille maximale d'une réponse mise en cache (au-delà, transmise sans être retenue)
+DEFAULT_MAX_BODY_SIZE = 2 * 1024 * 1024
+
+# Headers propres à une requête, jamais resservis depuis le cache
+_PER_REQUEST_HEADERS = {b"x-request-id", b"x-process-time", b"etag", b"cache-control", b"x-cache"}
+
+RawHeaders = List[Tuple[bytes, bytes]]
 
-async def _read_response_body(response: Response) -> bytes:
-    """Lit le body d'une réponse Starlette/FastAPI de manière asynchrone.
-    
-    Args:
-        response: Réponse HTTP.
-        
-    Returns:
-        Contenu du body en bytes.
-    """
-    content = b""
-    if hasattr(response, "body_iterator"):
-        async for chunk in response.body_iterator:
-            if isinstance(chunk, bytes):
-                content += chunk
-            elif isinstance(chunk, str):
-                content += chunk.encode()
-    elif hasattr(response, "body"):
-        body = response.body
-        if isinstance(body, bytes):
-            content = body
-        elif isinstance(body, str):
-            content = body.encode()
-    return content
 
+def _is_storable(headers: Headers) -> bool:
+    """Indique si une réponse peut être mise en cache (ni compressée par la route, ni flux SSE)."""
+    if "content-encoding" in headers:
+        return False
+    return not headers.get("content-type", "").startswith("text/event-stream")
+
+
+def _stored_headers(raw_headers: RawHeaders) -> RawHeaders:
+    """Headers d'une réponse conservés dans le cache (sans les headers propres à la requête)."""
+    return [(name, value) for name, value in raw_headers if name.lower() not in _PER_REQUEST_HEADERS]
+
+
+async def _send_response(send: Send, status_code: int, headers: RawHeaders, body: bytes) -> None:
+    """Envoie une réponse complète (headers puis corps en un seul message)."""
+    if status_code != 304:
+        headers = [(n, v) for n, v in headers if n.lower() != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Indique si le header If-None-Match correspond à l'ETag (liste, "*" et ETags faibles)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
 
-class HTTPCacheMiddleware(BaseHTTPMiddleware):
-    """Middleware de cache HTTP avec TTL pour améliorer les performances."""
+
+class HTTPCacheMiddleware:
+    """Middleware ASGI de cache HTTP pour les endpoints GET.
+    
+    Les endpoints dont les données ont une version connue (GDD, configuration, presets :
+    voir VERSIONED_PATHS) sont mis en cache sans TTL : la clé et l'ETag dérivent des
+    versions des sources, une entrée est donc invalidée exactement quand ses données
+    changent. Un If-None-Match correspondant à la version courante reçoit un 304 avant
+    l'exécution de la route et la sérialisation de la réponse. Les autres endpoints GET
+    gardent un cache à TTL avec un ETag calculé sur le contenu.
+    
+    Middleware ASGI pur : le corps d'une réponse versionnée est transmis au fil de l'eau
+    et copié pour le cache ; seul le cache à TTL retient le corps (borné par
+    max_body_size) pour calculer son ETag. Les flux SSE (text/event-stream) et les
+    réponses compressées par la route ne sont jamais retenus.
+    """
     
     def __init__(
         self,
-        app: Any,
+        app: ASGIApp,
         enabled: bool = True,
-        ttl_gdd: int = 30,
         ttl_static: int = 300,
-        max_size: int = 1000
+        max_size: int = 1000,
+        versions: Optional[DataVersionRegistry] = None,
+        versioned_paths: Sequence[Tuple[str, Tuple[str, ...]]] = VERSIONED_PATHS,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
     ):
         """Initialise le middleware de cache HTTP.
         
         Args:
-            app: Application FastAPI.
+            app: Application ASGI.
             enabled: Si False, désactive le cache.
-            ttl_gdd: TTL en secondes pour les données GDD (défaut: 30).
-            ttl_static: TTL en secondes pour les données statiques (défaut: 300).
-            max_size: Taille maximale du cache (défaut: 1000 entrées).
+            ttl_static: TTL en secondes des endpoints sans version connue (défaut: 300).
+            max_size: Taille maximale de chaque cache (défaut: 1000 entrées).
+            versions: Registre des versions de données (défaut: singleton).
+            versioned_paths: Préfixes de chemin et sources de données dont ils dépendent.
+            max_body_size: Taille maximale (octets) d'une réponse mise en cache.
         """
-        super().__init__(app)
+        self.app = app
         self.enabled = enabled
-        self.ttl_gdd = ttl_gdd
         self.ttl_static = ttl_static
         self.max_size = max_size
-        
-        # Caches séparés pour différents types de données
-        if enabled:
-            self._cache_gdd = TTLCache(maxsize=max_size, ttl=ttl_gdd)
-            self._cache_static = TTLCache(maxsize=max_size, ttl=ttl_static)
-        else:
-            self._cache_gdd = None
-            self._cache_static = None
+        self.max_body_size = max_body_size
+        self.versioned_paths = tuple(versioned_paths)
+        self._versions = versions
         
         if enabled:
+            # (chemin, query) -> entrée rendue pour un jeton de version donné
+            self._cache_versioned: Optional[LRUCache] = LRUCache(maxsize=max_size)
+            self._cache_static: Optional[TTLCache] = TTLCache(maxsize=max_size, ttl=ttl_static)
             logger.info(
-                f"Cache HTTP activé: TTL GDD={ttl_gdd}s, TTL Static={ttl_static}s, max_size={max_size}"
+                f"Cache HTTP activé: entrées versionnées (GDD/config/presets), "
+                f"TTL Static={ttl_static}s, max_size={max_size}"
             )
         else:
+            self._cache_versioned = None
+            self._cache_static = None
             logger.info("Cache HTTP désactivé")
     
-    def _get_cache_key(self, request: Request) -> str:
+    @property
+    def versions(self) -> DataVersionRegistry:
+        """Registre des versions de données utilisé pour les clés et ETags."""
+        if self._versions is None:
+            self._versions = get_data_versions()
+        return self._versions
+    
+    def _get_cache_key(self, scope: Scope) -> str:
         """Génère une clé de cache unique pour la requête.
         
         Args:
-            request: Requête HTTP.
+            scope: Scope ASGI de la requête.
             
         Returns:
             Clé de cache.
         """
         # Inclure la méthode, le chemin et les paramètres de requête
-        path = str(request.url.path)
-        query_string = str(request.url.query)
-        key_data = f"{request.method}:{path}:{query_string}"
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        key_data = f"{scope['method']}:{scope['path']}:{query_string}"
         return hashlib.md5(key_data.encode()).hexdigest()
     
-    def _is_cacheable(self, request: Request) -> bool:
+    def _is_cacheable(self, scope: Scope) -> bool:
         """Détermine si une requête peut être mise en cache.
         
         Args:
-            request: Requête HTTP.
+            scope: Scope ASGI de la requête.
             
         Returns:
             True si la requête peut être mise en cache.
         """
         # Seulement les requêtes GET
-        if request.method != "GET":
+        if scope["method"] != "GET":
             return False
         
         # Ne pas mettre en cache les endpoints avec données dynamiques
-        path = request.url.path
+        path = scope["path"]
         non_cacheable_paths = [
             "/api/v1/interactions",
             "/api/v1/dialogues",
             "/api/v1/context/build",
             "/api/v1/context/estimate-tokens",
-            "/api/v1/context/linked-elements"
+            "/api/v1/context/linked-elements",
+            "/api/v1/logs"
         ]
         
         for non_cacheable in non_cacheable_paths:
@@ -123,140 +185,173 @@ class HTTPCacheMiddleware(BaseHTTPMiddleware):
         
         return True
     
-    def _get_cache_for_path(self, path: str) -> Optional[TTLCache]:
-        """Retourne le cache approprié selon le chemin.
+    def _get_sources(self, path: str) -> Optional[Tuple[str, ...]]:
+        """Retourne les sources de données dont dépend un chemin (None = pas de version connue)."""
+        for prefix, sources in self.versioned_paths:
+            if path.startswith(prefix):
+                return sources
+        return None
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Traite la requête avec cache HTTP.
         
         Args:
-            path: Chemin de la requête.
-            
-        Returns:
-            Cache approprié ou None.
+            scope: Scope ASGI.
+            receive: Fonction receive ASGI.
+            send: Fonction send ASGI.
         """
-        if not self.enabled:
-            return None
+        if scope["type"] != "http" or not self.enabled or not self._is_cacheable(scope):
+            await self.app(scope, receive, send)
+            return
         
-        # Endpoints GDD
-        if path.startswith("/api/v1/context/"):
-            return self._cache_gdd
+        sources = self._get_sources(scope["path"])
+        if sources is None:
+            await self._call_static(scope, receive, send)
+            return
         
-        # Autres endpoints statiques
-        return self._cache_static
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Traite la requête avec cache HTTP.
+        # Version lue avant d'exécuter la route : une réponse rendue pendant un rechargement
+        # est rangée sous l'ancienne version et ne sera jamais resservie
+        version_token = self.versions.token(sources)
+        cache_key = self._get_cache_key(scope)
+        etag = 'W/"' + hashlib.sha1(f"{cache_key}|{version_token}".encode()).hexdigest()[:20] + '"'
+        cache_headers = [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")]
         
-        Args:
-            request: Requête HTTP.
-            call_next: Fonction pour appeler le prochain middleware/handler.
-            
-        Returns:
-            Réponse HTTP.
-        """
-        # Vérifier si la requête peut être mise en cache
-        if not self._is_cacheable(request):
-            response = await call_next(request)
-            return response
+        if _etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+            await _send_response(send, 304, cache_headers, b"")
+            return
         
-        # Vérifier le header If-None-Match (ETag)
-        cache_key = self._get_cache_key(request)
-        cache = self._get_cache_for_path(request.url.path)
-        # Log seulement si le cache est activé et qu'il y a un problème
-        if self.enabled and cache is None:
-            logger.warning(f"Cache HTTP activé mais cache=None pour {request.url.path}")
+        cached = self._cache_versioned.get(cache_key)
+        if cached is not None and cached["version"] == version_token:
+            await _send_response(
+                send, cached["status_code"], cached["headers"] + cache_headers + [(b"x-cache", b"HIT")], cached["content"]
+            )
+            return
         
-        if cache is not None and cache_key in cache:
-            cached_response = cache[cache_key]
-            
+        # Cache miss : la réponse est transmise au fil de l'eau et copiée pour le cache
+        capture: Dict[str, Any] = {"store": False, "chunks": [], "size": 0}
+        
+        async def send_versioned(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if 200 <= message["status"] < 300:
+                    # Réponses compressées par la route (listes GDD pré-rendues) : ETag
+                    # transmis mais pas de mise en cache (encodage négocié par requête)
+                    capture["store"] = _is_storable(headers)
+                    for name, value in cache_headers:
+                        headers[name.decode("latin-1")] = value.decode("latin-1")
+                    if capture["store"]:
+                        capture["status_code"] = message["status"]
+                        capture["headers"] = _stored_headers(message["headers"])
+                        headers["X-Cache"] = "MISS"
+            elif message["type"] == "http.response.body" and capture["store"]:
+                body = message.get("body", b"")
+                capture["size"] += len(body)
+                if capture["size"] > self.max_body_size:
+                    capture["store"] = False
+                    capture["chunks"] = []
+                else:
+                    capture["chunks"].append(body)
+                    if not message.get("more_body", False):
+                        self._cache_versioned[cache_key] = {
+                            "version": version_token,
+                            "content": b"".join(capture["chunks"]),
+                            "status_code": capture["status_code"],
+                            "headers": capture["headers"],
+                        }
+            await send(message)
+        
+        await self.app(scope, receive, send_versioned)
+    
+    async def _call_static(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Cache à TTL des endpoints sans version connue (ETag calculé sur le contenu)."""
+        cache_key = self._get_cache_key(scope)
+        cache = self._cache_static
+        
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
             # Vérifier ETag si présent
-            if_none_match = request.headers.get("If-None-Match")
-            if if_none_match and cached_response.get("etag") == if_none_match:
-                return Response(
-                    status_code=304,
-                    headers={"ETag": cached_response["etag"]}
-                )
+            if _etag_matches(Headers(scope=scope).get("if-none-match"), cached_response["etag"]):
+                await _send_response(send, 304, [(b"etag", cached_response["etag"].encode("latin-1"))], b"")
+                return
             
             # Retourner la réponse en cache
-            return StarletteResponse(
-                content=cached_response["content"],
-                status_code=cached_response["status_code"],
-                headers={
-                    **cached_response["headers"],
-                    "X-Cache": "HIT",
-                    "Cache-Control": f"public, max-age={self.ttl_gdd if request.url.path.startswith('/api/v1/context/') else self.ttl_static}"
-                },
-                media_type=cached_response.get("media_type", "application/json")
+            await _send_response(
+                send,
+                cached_response["status_code"],
+                cached_response["headers"] + [
+                    (b"x-cache", b"HIT"),
+                    (b"cache-control", f"public, max-age={self.ttl_static}".encode("latin-1")),
+                ],
+                cached_response["content"]
             )
+            return
         
-        # Cache miss : exécuter la requête
-        response = await call_next(request)
+        # Cache miss : l'ETag dépend du contenu, le corps est retenu jusqu'à sa fin
+        # (réponses de succès non compressées et non SSE, dans la limite de max_body_size)
+        pending: Dict[str, Any] = {"start": None, "chunks": [], "size": 0}
         
-        # Mettre en cache si succès (2xx)
-        if cache is not None and 200 <= response.status_code < 300:
-            logger.debug(f"Tentative de mise en cache pour {request.url.path}")
-            # Lire le body de la réponse de manière asynchrone
-            try:
-                content = await _read_response_body(response)
-                if not content:
-                    # Si on n'a pas pu lire le body, ne pas mettre en cache
-                    return response
-            except Exception as e:
-                logger.warning(f"Impossible de lire le body de la réponse pour mise en cache: {e}")
-                return response
-            
-            media_type = getattr(response, "media_type", "application/json")
-            
-            etag = hashlib.md5(content).hexdigest()
-            
-            # Stocker dans le cache
-            cache[cache_key] = {
-                "content": content,
-                "status_code": response.status_code,
-                "headers": dict(response.headers),
-                "etag": etag,
-                "media_type": media_type
-            }
-            
-            # Créer une nouvelle réponse avec les headers de cache
-            ttl = self.ttl_gdd if request.url.path.startswith("/api/v1/context/") else self.ttl_static
-            headers = dict(response.headers)
-            headers["X-Cache"] = "MISS"
-            headers["ETag"] = etag
-            headers["Cache-Control"] = f"public, max-age={ttl}"
-            
-            return StarletteResponse(
-                content=content,
-                status_code=response.status_code,
-                headers=headers,
-                media_type=media_type
-            )
+        async def send_static(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                if 200 <= message["status"] < 300 and _is_storable(Headers(raw=message["headers"])):
+                    pending["start"] = message
+                    return
+            elif message["type"] == "http.response.body" and pending["start"] is not None:
+                body = message.get("body", b"")
+                pending["chunks"].append(body)
+                pending["size"] += len(body)
+                if pending["size"] > self.max_body_size:
+                    # Trop volumineux : transmettre ce qui a été retenu, sans mise en cache
+                    start_message, chunks = pending["start"], pending["chunks"]
+                    pending["start"], pending["chunks"] = None, []
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": b"".join(chunks),
+                                "more_body": message.get("more_body", False)})
+                    return
+                if message.get("more_body", False):
+                    return
+                start_message = pending["start"]
+                content = b"".join(pending["chunks"])
+                pending["start"], pending["chunks"] = None, []
+                etag = hashlib.md5(content).hexdigest()
+                
+                # Stocker dans le cache
+                cache[cache_key] = {
+                    "content": content,
+                    "status_code": start_message["status"],
+                    "headers": _stored_headers(start_message["headers"]),
+                    "etag": etag,
+                }
+                
+                # Ajouter les headers de cache à la réponse
+                headers = MutableHeaders(scope=start_message)
+                headers["X-Cache"] = "MISS"
+                headers["ETag"] = etag
+                headers["Cache-Control"] = f"public, max-age={self.ttl_static}"
+                await send(start_message)
+                await send({"type": "http.response.body", "body": content, "more_body": False})
+                return
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_static)
     
     def invalidate_path(self, path_pattern: str) -> None:
-        """Invalide toutes les entrées de cache correspondant à un pattern de chemin.
+        """Invalide les entrées de cache d'un préfixe de chemin.
+        
+        Les entrées versionnées sont invalidées automatiquement quand leurs données
+        changent ; cette méthode sert aux changements non suivis par le registre.
         
         Args:
-            path_pattern: Pattern de chemin à invalider (ex: "/api/v1/context/characters").
+            path_pattern: Préfixe de chemin à invalider (ex: "/api/v1/context/characters").
         """
         if not self.enabled:
             return
         
-        # Invalider dans les deux caches
-        for cache in [self._cache_gdd, self._cache_static]:
-            if cache:
-                keys_to_remove = [
-                    key for key in cache.keys()
-                    if isinstance(key, str)  # Les clés sont des hash MD5
-                ]
-                # Note: On ne peut pas facilement inverser le hash pour trouver les chemins
-                # Donc on invalide tout le cache si nécessaire
-                # Une meilleure implémentation utiliserait un index chemin -> clés
-                logger.info(f"Invalidation du cache HTTP pour pattern: {path_pattern}")
-        
-        # Pour simplifier, on vide tout le cache GDD si un endpoint GDD est invalidé
-        if path_pattern.startswith("/api/v1/context/") and self._cache_gdd:
-            self._cache_gdd.clear()
-            logger.info("Cache HTTP GDD vidé")
+        logger.info(f"Invalidation du cache HTTP pour pattern: {path_pattern}")
+        # Les clés sont des hash MD5 : on vide le cache concerné entièrement
+        if self._get_sources(path_pattern) is not None:
+            self._cache_versioned.clear()
+        else:
+            self._cache_static.clear()
 
 
 def setup_http_cache(app: Any) -> None:
@@ -277,15 +372,19 @@ def setup_http_cache(app: Any) -> None:
         cache_enabled_env = os.getenv("HTTP_CACHE_ENABLED", "true")
     
     enabled = cache_enabled_env.lower() in ("true", "1", "yes")
-    ttl_gdd = int(os.getenv("HTTP_CACHE_TTL_GDD", "30"))
     ttl_static = int(os.getenv("HTTP_CACHE_TTL_STATIC", "300"))
     max_size = int(os.getenv("HTTP_CACHE_MAX_SIZE", "1000"))
     
+    if os.getenv("HTTP_CACHE_TTL_GDD") is not None:
+        logger.warning(
+            "HTTP_CACHE_TTL_GDD est obsolète et ignorée : les endpoints GDD/config/presets "
+            "sont invalidés par version des données (voir HTTP_CACHE_VERSION_CHECK_INTERVAL)"
+        )
+    
     if enabled:
         app.add_middleware(
             HTTPCacheMiddleware,
             enabled=enabled,
-            ttl_gdd=ttl_gdd,
             ttl_static=ttl_static,
             max_size=max_size
         )
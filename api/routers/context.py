@@ -1,19 +1,22 @@
 """Router pour le contexte GDD."""
+import asyncio
 import logging
-from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, Request, status
+from typing import Annotated, Any, Dict, List, Optional, Type
+from fastapi import APIRouter, Depends, Request, Response, status
+from pydantic import BaseModel
 from api.schemas.context import (
     CharacterListResponse,
     CharacterResponse,
     LocationListResponse,
     LocationResponse,
     ItemListResponse,
-    ItemResponse,
     SpeciesListResponse,
     SpeciesResponse,
     CommunityListResponse,
     CommunityResponse,
     RegionListResponse,
+    SearchResponse,
+    SearchResultResponse,
     SubLocationListResponse,
     LinkedElementsRequest,
     LinkedElementsResponse,
@@ -30,9 +33,12 @@ from api.dependencies import (
     get_skill_catalog_service,
     get_trait_catalog_service
 )
+from api.utils.data_versions import get_data_versions
+from api.utils.prerendered_lists import ENCODING_IDENTITY, get_prerendered_lists, parse_fields, select_encoding
 from api.exceptions import NotFoundException, InternalServerException, ValidationException
 from core.context.context_builder import ContextBuilder
 from services.linked_selector import LinkedSelectorService
+from services.gdd_search_index import SEARCHABLE_CATEGORIES, get_gdd_search_index_cache
 from services.dialogue_generation_service import DialogueGenerationService
 from core.prompt.prompt_engine import PromptEngine
 from services.skill_catalog_service import SkillCatalogService
@@ -42,10 +48,102 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Les listes GDD sont servies pré-rendues (Response brute) : le modèle n'est déclaré que pour
+# la documentation OpenAPI, la réponse n'est pas revalidée par FastAPI.
+PRERENDERED_LIST_DESCRIPTION = (
+    "Liste pré-rendue. Avec `fields=a,b`, `data` de chaque élément ne contient que les clés "
+    "demandées (les clés inconnues sont ignorées). Avec `summary=true`, `data` ne contient "
+    "que les champs résumés de la catégorie."
+)
+
+
+async def _prerendered_list_response(
+    request: Request,
+    category: str,
+    elements: List[Dict[str, Any]],
+    list_model: Type[BaseModel],
+    field_name: str,
+    page: Optional[int],
+    page_size: Optional[int],
+    fields: Optional[str] = None,
+    summary: bool = False
+) -> Response:
+    """Sert une liste GDD depuis sa version pré-rendue (sérialisée une fois par génération GDD).
+    
+    Args:
+        request: La requête HTTP (négociation de l'encodage).
+        category: Catégorie GDD (clé du cache des listes pré-rendues).
+        elements: Éléments actuellement servis par le ContextBuilder.
+        list_model: Modèle de réponse de la liste (enveloppe : total, pagination).
+        field_name: Champ de la liste dans le modèle de réponse.
+        page: Numéro de page (1-indexed). Si None, retourne tous les éléments.
+        page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        fields: Clés de `data` à conserver, séparées par des virgules (projection).
+        summary: Si True, sert la version résumée des éléments.
+        
+    Returns:
+        Réponse JSON, compressée en brotli ou gzip si le client l'accepte.
+        
+    Raises:
+        ValidationException: Si fields et summary sont combinés.
+    """
+    from api.utils.pagination import get_pagination_params
+    
+    projection = parse_fields(fields)
+    if projection and summary:
+        raise ValidationException(
+            message="Les paramètres 'fields' et 'summary' ne peuvent pas être combinés",
+            details={"fields": fields, "summary": summary},
+            request_id=getattr(request.state, "request_id", "unknown")
+        )
+    cache = get_prerendered_lists()
+    generation = get_data_versions().gdd_generation
+    # Clés inconnues ignorées, ordre normalisé : une seule variante par projection effective
+    projection = cache.normalize_fields(category, elements, generation, projection)
+    prerendered = cache.peek(category, elements, generation, fields=projection, summary=summary)
+    if prerendered is None:
+        # Premier rendu de la génération : sérialisation hors de la boucle d'événements
+        prerendered = await asyncio.to_thread(
+            cache.get, category, elements, generation, fields=projection, summary=summary
+        )
+    total = prerendered.total
+    
+    # Appliquer la pagination si demandée (tranche des éléments pré-rendus)
+    pagination_params = get_pagination_params(page=page, page_size=page_size)
+    if pagination_params.is_enabled:
+        start = pagination_params.offset
+        end = start + pagination_params.limit
+        envelope = list_model(**{
+            field_name: [],
+            "total": total,
+            "page": pagination_params.page,
+            "page_size": pagination_params.page_size,
+            "total_pages": (total + pagination_params.page_size - 1) // pagination_params.page_size,
+        })
+    else:
+        # Rétrocompatibilité : pas de pagination
+        start, end = 0, total
+        envelope = list_model(**{field_name: [], "total": total})
+    
+    encoding = select_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != ENCODING_IDENTITY:
+        headers["Content-Encoding"] = encoding
+    content = prerendered.render_cached(envelope, field_name, start, end, encoding)
+    if content is None:
+        # Première demande de cette page compressée : compression hors de la boucle d'événements
+        content = await asyncio.to_thread(prerendered.render, envelope, field_name, start, end, encoding)
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers=headers
+    )
+
 
 @router.get(
     "/characters",
-    response_model=CharacterListResponse,
+    response_class=Response,
+    responses={200: {"model": CharacterListResponse, "description": PRERENDERED_LIST_DESCRIPTION}},
     status_code=status.HTTP_200_OK
 )
 async def list_characters(
@@ -53,8 +151,10 @@ async def list_characters(
     context_builder: Annotated[ContextBuilder, Depends(get_context_builder)],
     request_id: Annotated[str, Depends(get_request_id)],
     page: Optional[int] = None,
-    page_size: Optional[int] = None
-) -> CharacterListResponse:
+    page_size: Optional[int] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
+) -> Response:
     """Liste tous les personnages disponibles avec pagination optionnelle.
     
     Args:
@@ -63,42 +163,16 @@ async def list_characters(
         request_id: ID de la requête.
         page: Numéro de page (1-indexed). Si None, retourne tous les personnages.
         page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        fields: Clés de `data` à conserver, séparées par des virgules (ex: "Alias,Espèce").
+        summary: Si True, retourne la version résumée (détail complet via l'endpoint par nom).
         
     Returns:
         Liste des personnages (paginée si page fourni, sinon tous).
     """
-    from api.utils.pagination import get_pagination_params, paginate_list
-    
-    characters = context_builder.characters
-    character_responses = [
-        CharacterResponse(name=char.get("Nom", "Unknown"), data=char)
-        for char in characters
-    ]
-    total = len(character_responses)
-    
-    # Appliquer la pagination si demandée
-    pagination_params = get_pagination_params(page=page, page_size=page_size)
-    paginated_responses = paginate_list(character_responses, pagination_params)
-    
-    # Construire la réponse avec métadonnées de pagination
-    if pagination_params.is_enabled:
-        total_pages = (total + pagination_params.page_size - 1) // pagination_params.page_size
-        return CharacterListResponse(
-            characters=paginated_responses,
-            total=total,
-            page=pagination_params.page,
-            page_size=pagination_params.page_size,
-            total_pages=total_pages
-        )
-    else:
-        # Rétrocompatibilité : pas de pagination
-        return CharacterListResponse(
-            characters=paginated_responses,
-            total=total,
-            page=None,
-            page_size=None,
-            total_pages=None
-        )
+    return await _prerendered_list_response(
+        request, "characters", context_builder.characters, CharacterListResponse, "characters", page, page_size,
+        fields, summary
+    )
 
 
 @router.get(
@@ -139,7 +213,8 @@ async def get_character(
 
 @router.get(
     "/locations",
-    response_model=LocationListResponse,
+    response_class=Response,
+    responses={200: {"model": LocationListResponse, "description": PRERENDERED_LIST_DESCRIPTION}},
     status_code=status.HTTP_200_OK
 )
 async def list_locations(
@@ -147,8 +222,10 @@ async def list_locations(
     context_builder: Annotated[ContextBuilder, Depends(get_context_builder)],
     request_id: Annotated[str, Depends(get_request_id)],
     page: Optional[int] = None,
-    page_size: Optional[int] = None
-) -> LocationListResponse:
+    page_size: Optional[int] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
+) -> Response:
     """Liste tous les lieux disponibles avec pagination optionnelle.
     
     Args:
@@ -157,42 +234,16 @@ async def list_locations(
         request_id: ID de la requête.
         page: Numéro de page (1-indexed). Si None, retourne tous les lieux.
         page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        fields: Clés de `data` à conserver, séparées par des virgules (ex: "Alias,Espèce").
+        summary: Si True, retourne la version résumée (détail complet via l'endpoint par nom).
         
     Returns:
         Liste des lieux (paginée si page fourni, sinon tous).
     """
-    from api.utils.pagination import get_pagination_params, paginate_list
-    
-    locations = context_builder.locations
-    location_responses = [
-        LocationResponse(name=loc.get("Nom", "Unknown"), data=loc)
-        for loc in locations
-    ]
-    total = len(location_responses)
-    
-    # Appliquer la pagination si demandée
-    pagination_params = get_pagination_params(page=page, page_size=page_size)
-    paginated_responses = paginate_list(location_responses, pagination_params)
-    
-    # Construire la réponse avec métadonnées de pagination
-    if pagination_params.is_enabled:
-        total_pages = (total + pagination_params.page_size - 1) // pagination_params.page_size
-        return LocationListResponse(
-            locations=paginated_responses,
-            total=total,
-            page=pagination_params.page,
-            page_size=pagination_params.page_size,
-            total_pages=total_pages
-        )
-    else:
-        # Rétrocompatibilité : pas de pagination
-        return LocationListResponse(
-            locations=paginated_responses,
-            total=total,
-            page=None,
-            page_size=None,
-            total_pages=None
-        )
+    return await _prerendered_list_response(
+        request, "locations", context_builder.locations, LocationListResponse, "locations", page, page_size,
+        fields, summary
+    )
 
 
 @router.get(
@@ -304,7 +355,8 @@ async def get_location(
 
 @router.get(
     "/items",
-    response_model=ItemListResponse,
+    response_class=Response,
+    responses={200: {"model": ItemListResponse, "description": PRERENDERED_LIST_DESCRIPTION}},
     status_code=status.HTTP_200_OK
 )
 async def list_items(
@@ -312,8 +364,10 @@ async def list_items(
     context_builder: Annotated[ContextBuilder, Depends(get_context_builder)],
     request_id: Annotated[str, Depends(get_request_id)],
     page: Optional[int] = None,
-    page_size: Optional[int] = None
-) -> ItemListResponse:
+    page_size: Optional[int] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
+) -> Response:
     """Liste tous les objets disponibles avec pagination optionnelle.
     
     Args:
@@ -322,42 +376,89 @@ async def list_items(
         request_id: ID de la requête.
         page: Numéro de page (1-indexed). Si None, retourne tous les objets.
         page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        fields: Clés de `data` à conserver, séparées par des virgules (ex: "Alias,Espèce").
+        summary: Si True, retourne la version résumée (détail complet via l'endpoint par nom).
         
     Returns:
         Liste des objets (paginée si page fourni, sinon tous).
     """
-    from api.utils.pagination import get_pagination_params, paginate_list
-    
-    items = context_builder.items
-    item_responses = [
-        ItemResponse(name=item.get("Nom", "Unknown"), data=item)
-        for item in items
-    ]
-    total = len(item_responses)
+    return await _prerendered_list_response(
+        request, "items", context_builder.items, ItemListResponse, "items", page, page_size,
+        fields, summary
+    )
+
+
+@router.get(
+    "/search",
+    response_model=SearchResponse,
+    status_code=status.HTTP_200_OK
+)
+async def search_context(
+    request: Request,
+    context_builder: Annotated[ContextBuilder, Depends(get_context_builder)],
+    request_id: Annotated[str, Depends(get_request_id)],
+    q: str,
+    categories: Optional[str] = None,
+    fuzzy: bool = True,
+    page: Optional[int] = None,
+    page_size: Optional[int] = None
+) -> SearchResponse:
+    """Recherche plein texte sur les noms et les principaux champs texte du GDD.
     
-    # Appliquer la pagination si demandée
-    pagination_params = get_pagination_params(page=page, page_size=page_size)
-    paginated_responses = paginate_list(item_responses, pagination_params)
+    Correspondance insensible aux accents, par préfixe et approximative (une faute de
+    frappe par terme). L'index est construit une fois par génération du GDD.
     
-    # Construire la réponse avec métadonnées de pagination
-    if pagination_params.is_enabled:
-        total_pages = (total + pagination_params.page_size - 1) // pagination_params.page_size
-        return ItemListResponse(
-            items=paginated_responses,
-            total=total,
-            page=pagination_params.page,
-            page_size=pagination_params.page_size,
-            total_pages=total_pages
-        )
-    else:
-        # Rétrocompatibilité : pas de pagination
-        return ItemListResponse(
-            items=paginated_responses,
-            total=total,
-            page=None,
-            page_size=None,
-            total_pages=None
-        )
+    Args:
+        request: La requête HTTP.
+        context_builder: ContextBuilder injecté.
+        request_id: ID de la requête.
+        q: Texte recherché.
+        categories: Catégories à inclure, séparées par des virgules (toutes si None).
+        fuzzy: Si True, tolère une faute de frappe par terme.
+        page: Numéro de page (1-indexed, défaut 1).
+        page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        
+    Returns:
+        Éléments trouvés, classés par pertinence et paginés.
+        
+    Raises:
+        ValidationException: Si une catégorie inconnue est demandée.
+    """
+    from api.utils.pagination import get_pagination_params
+    
+    selected = None
+    if categories:
+        selected = [category.strip() for category in categories.split(",") if category.strip()]
+        unknown = sorted(set(selected) - set(SEARCHABLE_CATEGORIES))
+        if unknown:
+            raise ValidationException(
+                message=f"Catégories de recherche inconnues: {', '.join(unknown)}",
+                details={"categories": unknown, "available": list(SEARCHABLE_CATEGORIES)},
+                request_id=request_id
+            )
+    
+    categories_elements = {category: getattr(context_builder, category) for category in SEARCHABLE_CATEGORIES}
+    generation = get_data_versions().gdd_generation
+    search_cache = get_gdd_search_index_cache()
+    index = search_cache.peek(categories_elements, generation)
+    if index is None:
+        # Première recherche de la génération : construction de l'index hors de la boucle d'événements
+        index = await asyncio.to_thread(search_cache.get, categories_elements, generation)
+    hits = index.search(q, categories=selected, fuzzy=fuzzy)
+    
+    pagination_params = get_pagination_params(page=page or 1, page_size=page_size)
+    start = pagination_params.offset
+    return SearchResponse(
+        query=q,
+        results=[
+            SearchResultResponse(category=hit.category, name=hit.name, score=hit.score)
+            for hit in hits[start:start + pagination_params.limit]
+        ],
+        total=len(hits),
+        page=pagination_params.page,
+        page_size=pagination_params.page_size,
+        total_pages=(len(hits) + pagination_params.page_size - 1) // pagination_params.page_size
+    )
 
 
 @router.post(
@@ -499,33 +600,36 @@ async def estimate_context_tokens(
 
 @router.get(
     "/species",
-    response_model=SpeciesListResponse,
+    response_class=Response,
+    responses={200: {"model": SpeciesListResponse, "description": PRERENDERED_LIST_DESCRIPTION}},
     status_code=status.HTTP_200_OK
 )
 async def list_species(
     request: Request,
     context_builder: Annotated[ContextBuilder, Depends(get_context_builder)],
-    request_id: Annotated[str, Depends(get_request_id)]
-) -> SpeciesListResponse:
-    """Liste toutes les espèces disponibles.
+    request_id: Annotated[str, Depends(get_request_id)],
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
+) -> Response:
+    """Liste toutes les espèces disponibles avec pagination optionnelle.
     
     Args:
         request: La requête HTTP.
         context_builder: ContextBuilder injecté.
         request_id: ID de la requête.
+        page: Numéro de page (1-indexed). Si None, retourne toutes les espèces.
+        page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        fields: Clés de `data` à conserver, séparées par des virgules (ex: "Alias,Espèce").
+        summary: Si True, retourne la version résumée (détail complet via l'endpoint par nom).
         
     Returns:
-        Liste des espèces.
+        Liste des espèces (paginée si page fourni, sinon toutes).
     """
-    species = context_builder.species
-    species_responses = [
-        SpeciesResponse(name=spec.get("Nom", "Unknown"), data=spec)
-        for spec in species
-    ]
-    
-    return SpeciesListResponse(
-        species=species_responses,
-        total=len(species_responses)
+    return await _prerendered_list_response(
+        request, "species", context_builder.species, SpeciesListResponse, "species", page, page_size,
+        fields, summary
     )
 
 
@@ -567,7 +671,8 @@ async def get_species(
 
 @router.get(
     "/communities",
-    response_model=CommunityListResponse,
+    response_class=Response,
+    responses={200: {"model": CommunityListResponse, "description": PRERENDERED_LIST_DESCRIPTION}},
     status_code=status.HTTP_200_OK
 )
 async def list_communities(
@@ -575,8 +680,10 @@ async def list_communities(
     context_builder: Annotated[ContextBuilder, Depends(get_context_builder)],
     request_id: Annotated[str, Depends(get_request_id)],
     page: Optional[int] = None,
-    page_size: Optional[int] = None
-) -> CommunityListResponse:
+    page_size: Optional[int] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
+) -> Response:
     """Liste toutes les communautés disponibles avec pagination optionnelle.
     
     Args:
@@ -585,42 +692,16 @@ async def list_communities(
         request_id: ID de la requête.
         page: Numéro de page (1-indexed). Si None, retourne toutes les communautés.
         page_size: Taille de page. Si None, utilise la valeur par défaut (50).
+        fields: Clés de `data` à conserver, séparées par des virgules (ex: "Alias,Espèce").
+        summary: Si True, retourne la version résumée (détail complet via l'endpoint par nom).
         
     Returns:
         Liste des communautés (paginée si page fourni, sinon toutes).
     """
-    from api.utils.pagination import get_pagination_params, paginate_list
-    
-    communities = context_builder.communities
-    community_responses = [
-        CommunityResponse(name=comm.get("Nom", "Unknown"), data=comm)
-        for comm in communities
-    ]
-    total = len(community_responses)
-    
-    # Appliquer la pagination si demandée
-    pagination_params = get_pagination_params(page=page, page_size=page_size)
-    paginated_responses = paginate_list(community_responses, pagination_params)
-    
-    # Construire la réponse avec métadonnées de pagination
-    if pagination_params.is_enabled:
-        total_pages = (total + pagination_params.page_size - 1) // pagination_params.page_size
-        return CommunityListResponse(
-            communities=paginated_responses,
-            total=total,
-            page=pagination_params.page,
-            page_size=pagination_params.page_size,
-            total_pages=total_pages
-        )
-    else:
-        # Rétrocompatibilité : pas de pagination
-        return CommunityListResponse(
-            communities=paginated_responses,
-            total=total,
-            page=None,
-            page_size=None,
-            total_pages=None
-        )
+    return await _prerendered_list_response(
+        request, "communities", context_builder.communities, CommunityListResponse, "communities", page, page_size,
+        fields, summary
+    )
 
 
 @router.get(
@@ -1,7 +1,7 @@
 """Router pour les endpoints de cost governance."""
 import logging
 from datetime import date, datetime, timedelta
-from typing import Annotated, Dict
+from typing import Annotated
 
 from fastapi import APIRouter, Depends, Request, status
 
@@ -139,24 +139,12 @@ async def get_usage(
         start_date = date(current_month.year, current_month.month, 1)
         end_date = date.today()
         
-        records = usage_service.get_usage_history(
+        # Coûts quotidiens (agrégés par le repository)
+        daily_costs_dict = usage_service.get_daily_costs(
             start_date=start_date,
             end_date=end_date
         )
-        
-        # Calculer les coûts quotidiens
-        daily_costs_dict: Dict[str, float] = {}
-        total_cost = 0.0
-        
-        for record in records:
-            record_date = record.timestamp.date()
-            date_str = record_date.isoformat()
-            
-            if date_str not in daily_costs_dict:
-                daily_costs_dict[date_str] = 0.0
-            
-            daily_costs_dict[date_str] += record.estimated_cost
-            total_cost += record.estimated_cost
+        total_cost = sum(daily_costs_dict.values())
         
         # Convertir en liste triée par date
         daily_costs = [
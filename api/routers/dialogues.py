@@ -26,7 +26,7 @@ from api.dependencies import (
     get_trait_catalog_service
 )
 from core.prompt.prompt_engine import PromptEngine, PromptInput, BuiltPrompt
-from api.exceptions import InternalServerException, ValidationException, NotFoundException, OpenAIException
+from api.exceptions import InternalServerException, ValidationException, NotFoundException, OpenAIException, QuotaExceededException
 from services.dialogue_generation_service import DialogueGenerationService
 from services.configuration_service import ConfigurationService
 from services.skill_catalog_service import SkillCatalogService
@@ -397,12 +397,13 @@ async def generate_unity_dialogue(
     """Génère un nœud de dialogue au format Unity JSON.
     
     Utilise UnityDialogueOrchestrator pour factoriser la logique
-    avec le streaming SSE.
+    avec le streaming SSE. Le budget LLM est vérifié par l'orchestrateur une fois
+    le prompt construit (HTTP 429 si le quota mensuel serait dépassé).
     """
     try:
         # Créer orchestrateur avec toutes les dépendances
         from services.unity_dialogue_orchestrator import UnityDialogueOrchestrator
-        from api.dependencies import get_config_service, create_llm_usage_service
+        from api.dependencies import get_config_service, create_llm_usage_service, get_generation_budget_guard
         
         config_service = get_config_service(request)
         usage_service = create_llm_usage_service()
@@ -414,14 +415,15 @@ async def generate_unity_dialogue(
             trait_service=trait_service,
             config_service=config_service,
             usage_service=usage_service,
-            request_id=request_id
+            request_id=request_id,
+            budget_guard=get_generation_budget_guard()
         )
         
         # Appel simple sans streaming (usage REST)
         return await orchestrator.generate(request_data)
         
     except Exception as e:
-        if isinstance(e, ValidationException): raise
+        if isinstance(e, (ValidationException, QuotaExceededException)): raise
         logger.exception(f"Erreur lors de la génération Unity JSON (request_id: {request_id})")
         raise InternalServerException(message=str(e), request_id=request_id)
 
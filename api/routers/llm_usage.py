@@ -97,7 +97,8 @@ async def get_usage_history(
                 success=r.success,
                 endpoint=r.endpoint,
                 k_variants=r.k_variants,
-                error_message=r.error_message
+                error_message=r.error_message,
+                is_hedge=r.is_hedge
             )
             for r in paginated_records
         ]
@@ -182,6 +183,8 @@ async def get_usage_statistics(
             error_count=stats["error_count"],
             success_rate=stats["success_rate"],
             avg_duration_ms=stats["avg_duration_ms"],
+            hedge_calls_count=stats.get("hedge_calls_count", 0),
+            hedge_cost=stats.get("hedge_cost", 0.0),
             start_date=start_date,
             end_date=end_date,
             model_name=model
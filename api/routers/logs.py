@@ -1,19 +1,36 @@
-"""Router pour la consultation et gestion des logs."""
+"""Router pour la consultation et gestion des logs.
+
+Outre la recherche paginée, deux endpoints streament les logs :
+    - GET /tail : suivi en direct des nouveaux logs (SSE ou NDJSON), filtré côté serveur.
+      Chaque log porte un id `<fichier>:<offset>` ; une reconnexion avec le header
+      Last-Event-ID (ou le paramètre `cursor`) reprend au log suivant.
+    - GET /export : export NDJSON d'une plage de dates, en mémoire constante.
+"""
+import asyncio
+import json
 import logging
-from datetime import date
-from typing import Optional
+import os
+import time
+from datetime import date, timedelta
+from typing import AsyncGenerator, Optional
 
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from api.dependencies import get_request_id
-from api.services.log_service import LogService
+from api.services.log_service import LogService, LogTailCursor
 from constants import FilePaths
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/logs", tags=["Logs"])
 
+# Intervalle (s) entre deux lectures des fichiers par le suivi en direct
+DEFAULT_TAIL_POLL_INTERVAL = 0.5
+# Délai (s) sans log après lequel le suivi envoie un keep-alive
+TAIL_HEARTBEAT_SECONDS = 15.0
+
 
 # Schémas de requête/réponse
 class LogEntry(BaseModel):
@@ -27,6 +44,7 @@ class LogEntry(BaseModel):
     line: Optional[int] = None
     request_id: Optional[str] = None
     user_id: Optional[str] = None
+    job_id: Optional[str] = None
     endpoint: Optional[str] = None
     method: Optional[str] = None
     status_code: Optional[int] = None
@@ -82,6 +100,59 @@ def get_log_service() -> LogService:
     return LogService(log_dir=log_dir)
 
 
+def get_tail_poll_interval() -> float:
+    """Retourne l'intervalle de lecture du suivi en direct (LOG_TAIL_POLL_INTERVAL)."""
+    try:
+        return max(0.05, float(os.getenv("LOG_TAIL_POLL_INTERVAL", str(DEFAULT_TAIL_POLL_INTERVAL))))
+    except ValueError:
+        return DEFAULT_TAIL_POLL_INTERVAL
+
+
+async def tail_logs_stream(
+    cursor: LogTailCursor,
+    output_format: str = "sse",
+    poll_interval: float = DEFAULT_TAIL_POLL_INTERVAL,
+    max_events: Optional[int] = None
+) -> AsyncGenerator[str, None]:
+    """Streame les nouveaux logs lus par un curseur de suivi.
+    
+    La lecture des fichiers est faite dans un thread, pour ne pas bloquer la boucle
+    d'événements. Le flux s'arrête à la déconnexion du client.
+    
+    Args:
+        cursor: Curseur de suivi (filtres et positions de lecture).
+        output_format: "sse" (`id: <fichier>:<offset>\ndata: {...}\n\n`) ou
+            "ndjson" (une ligne `{"id": ..., "log": {...}}` par log).
+        poll_interval: Intervalle (s) entre deux lectures sans nouveau log.
+        max_events: Arrêter après ce nombre de logs (None = sans limite).
+        
+    Yields:
+        Frames SSE ou lignes NDJSON.
+    """
+    sent = 0
+    last_frame = time.monotonic()
+    while max_events is None or sent < max_events:
+        events = await asyncio.to_thread(cursor.poll)
+        for event_id, log in events:
+            payload = json.dumps(log, ensure_ascii=False)
+            if output_format == "ndjson":
+                yield f'{{"id": {json.dumps(event_id)}, "log": {payload}}}\n'
+            else:
+                yield f"id: {event_id}\ndata: {payload}\n\n"
+            sent += 1
+            if max_events is not None and sent >= max_events:
+                return
+        now = time.monotonic()
+        if events:
+            last_frame = now
+        elif now - last_frame >= TAIL_HEARTBEAT_SECONDS:
+            # Keep-alive : empêche les proxys de fermer une connexion inactive
+            yield ": keep-alive\n\n" if output_format == "sse" else "\n"
+            last_frame = now
+        if not events:
+            await asyncio.sleep(poll_interval)
+
+
 # Endpoints
 @router.get("", response_model=LogSearchResponse)
 async def search_logs(
@@ -113,6 +184,10 @@ async def search_logs(
         default=None,
         description="Endpoint API pour filtrer."
     ),
+    job_id: Optional[str] = Query(
+        default=None,
+        description="ID de job de génération pour filtrer."
+    ),
     limit: int = Query(
         default=100,
         ge=1,
@@ -137,6 +212,7 @@ async def search_logs(
         logger_name: Nom du logger.
         request_id_filter: ID de requête pour filtrer.
         endpoint: Endpoint API.
+        job_id: ID de job de génération.
         limit: Nombre maximum de résultats.
         offset: Offset pour pagination.
         
@@ -152,7 +228,8 @@ async def search_logs(
             request_id=request_id_filter,
             endpoint=endpoint,
             limit=limit,
-            offset=offset
+            offset=offset,
+            job_id=job_id
         )
         
         # Convertir les logs en modèles Pydantic
@@ -206,6 +283,138 @@ async def get_log_statistics(
         raise
 
 
+@router.get("/tail", response_class=StreamingResponse)
+async def tail_logs(
+    log_service: LogService = Depends(get_log_service),
+    level: Optional[str] = Query(
+        default=None,
+        description="Niveau de log (DEBUG, INFO, WARNING, ERROR, CRITICAL)."
+    ),
+    request_id_filter: Optional[str] = Query(
+        default=None,
+        alias="request_id",
+        description="ID de requête pour filtrer."
+    ),
+    job_id: Optional[str] = Query(
+        default=None,
+        description="ID de job de génération pour filtrer."
+    ),
+    output_format: str = Query(
+        default="sse",
+        alias="format",
+        pattern="^(sse|ndjson)$",
+        description="Format du flux: 'sse' (EventSource) ou 'ndjson'."
+    ),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Id du dernier log reçu (reprise, équivalent du header Last-Event-ID)."
+    ),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """Suit en direct les nouveaux logs écrits, filtrés côté serveur.
+    
+    Args:
+        log_service: Service de logs (injection de dépendance).
+        level: Niveau de log.
+        request_id_filter: ID de requête pour filtrer.
+        job_id: ID de job de génération pour filtrer.
+        output_format: Format du flux (sse ou ndjson).
+        cursor: Id du dernier log reçu (reprise).
+        last_event_id: Header envoyé par EventSource à la reconnexion (prioritaire sur cursor).
+        
+    Returns:
+        StreamingResponse des nouveaux logs.
+    """
+    tail_cursor = log_service.open_tail(
+        level=level,
+        request_id=request_id_filter,
+        job_id=job_id,
+        last_event_id=last_event_id or cursor
+    )
+    media_type = "text/event-stream" if output_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        tail_logs_stream(tail_cursor, output_format, get_tail_poll_interval()),
+        media_type=media_type,
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_logs(
+    log_service: LogService = Depends(get_log_service),
+    start_date: Optional[date] = Query(
+        default=None,
+        description="Date de début (incluse). Par défaut: 30 jours avant aujourd'hui."
+    ),
+    end_date: Optional[date] = Query(
+        default=None,
+        description="Date de fin (incluse). Par défaut: aujourd'hui."
+    ),
+    level: Optional[str] = Query(
+        default=None,
+        description="Niveau de log (DEBUG, INFO, WARNING, ERROR, CRITICAL)."
+    ),
+    logger_name: Optional[str] = Query(
+        default=None,
+        description="Nom du logger (ex: 'api.middleware')."
+    ),
+    request_id_filter: Optional[str] = Query(
+        default=None,
+        alias="request_id",
+        description="ID de requête pour filtrer."
+    ),
+    endpoint: Optional[str] = Query(
+        default=None,
+        description="Endpoint API pour filtrer."
+    ),
+    job_id: Optional[str] = Query(
+        default=None,
+        description="ID de job de génération pour filtrer."
+    )
+) -> StreamingResponse:
+    """Exporte les logs d'une plage de dates en NDJSON (ordre chronologique).
+    
+    Les fichiers sont lus et envoyés par blocs : la mémoire utilisée ne dépend pas
+    de la taille de la plage.
+    
+    Args:
+        log_service: Service de logs (injection de dépendance).
+        start_date: Date de début.
+        end_date: Date de fin.
+        level: Niveau de log.
+        logger_name: Nom du logger.
+        request_id_filter: ID de requête pour filtrer.
+        endpoint: Endpoint API.
+        job_id: ID de job de génération.
+        
+    Returns:
+        StreamingResponse NDJSON (pièce jointe).
+    """
+    end = end_date or date.today()
+    start = start_date or end - timedelta(days=30)
+    chunks = log_service.iter_export(
+        start_date=start,
+        end_date=end,
+        level=level,
+        logger_name=logger_name,
+        request_id=request_id_filter,
+        endpoint=endpoint,
+        job_id=job_id
+    )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="logs_{start.isoformat()}_{end.isoformat()}.ndjson"',
+            "Cache-Control": "no-cache",
+        }
+    )
+
+
 @router.get("/files", response_model=list[LogFileInfo])
 async def list_log_files(
     request: Request,
@@ -1,12 +1,20 @@
 """Router pour le streaming SSE des générations de dialogues avec job flow.
 
 Architecture :
-    1. POST /generate/jobs → crée un job, retourne job_id + stream_url
+    1. POST /generate/jobs → crée un job et le soumet au pool de workers, retourne job_id + stream_url
     2. GET /generate/jobs/{job_id}/stream → EventSource SSE pour suivre la progression
+       (abonnement au buffer d'événements du job : rejeu puis suivi en direct)
     3. POST /generate/jobs/{job_id}/cancel → annule le job en cours
 
 Format SSE strict :
-    data: {"type": "chunk", "content": "..."}\n\n
+    id: 12\ndata: {"type": "chunk", "content": "..."}\n\n
+
+Reprise : l'id de chaque événement est sa séquence dans le job ; une reconnexion avec
+le header Last-Event-ID reprend à l'événement suivant (rejeu depuis le buffer du job).
+
+Abonnés lents : au-delà d'un retard maximal sur le direct, la politique configurée
+(SSE_SLOW_CONSUMER_POLICY) fusionne ou abandonne les chunks en attente, ou ferme la
+connexion (voir api.utils.sse_backpressure).
 
 Types d'événements :
     - chunk : Texte streaming (caractère par caractère)
@@ -19,11 +27,13 @@ import logging
 import json
 import asyncio
 from typing import AsyncGenerator, Optional, Dict, Any
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, Header, Request, HTTPException
 from fastapi.responses import StreamingResponse
 from api.schemas.generation_jobs import GenerationJobCreate, GenerationJobResponse, GenerationJobStatus
 from api.services.generation_job_manager import get_job_manager
+from api.utils.sse_backpressure import SlowConsumerError, get_slow_consumer_policy, get_subscriber_registry
 from api.container import ServiceContainer
+from api.exceptions import QuotaExceededException
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +41,8 @@ router = APIRouter()
 
 # Constante pour timeout d'annulation (10 secondes) - Story 0.8
 CANCEL_TIMEOUT_SECONDS = 10
+# Délai de reconnexion suggéré à un abonné déconnecté pour lenteur
+SLOW_CONSUMER_RETRY_MS = 1000
 
 
 def _calculate_duration(job: Dict[str, Any]) -> float:
@@ -59,83 +71,64 @@ def _calculate_duration(job: Dict[str, Any]) -> float:
         return 0.0
 
 
-async def stream_generation(job_id: str, container: ServiceContainer) -> AsyncGenerator[str, None]:
-    """Générateur async pour streamer la génération Unity Dialogue.
+async def generate_job_events(
+    job_id: str,
+    params: Dict[str, Any],
+    container: ServiceContainer,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Exécute la génération Unity Dialogue d'un job et produit ses événements.
     
-    Pattern :
-        - Yield des chunks SSE au format strict : `data: {...}\n\n`
-        - Vérifie le flag cancelled à chaque étape
-        - Envoie des événements step, metadata, complete, error
+    Exécuté par le pool de workers du GenerationJobManager dès la création du job,
+    indépendamment des connexions SSE : les payloads produits sont publiés dans le
+    buffer du job puis diffusés à tous ses abonnés.
     
     Args:
-        job_id: ID du job à streamer.
+        job_id: ID du job à exécuter.
+        params: Paramètres de génération du job.
         container: Container de dépendances.
         
     Yields:
-        Chunks SSE au format `data: {...}\n\n`.
+        Payloads d'événements (step, chunk, partial, metadata, complete, error).
     """
     job_manager = get_job_manager()
-    job = job_manager.get_job(job_id)
-    
-    if not job:
-        yield f'data: {json.dumps({"type": "error", "message": "Job introuvable"})}\n\n'
-        return
+    job = job_manager.get_job(job_id) or {'job_id': job_id}
     
     from datetime import datetime, timezone
     
-    # FIX: Vérifier le statut AVANT de mettre à "running" pour éviter les générations multiples
-    if job.get("status") == "completed":
-        logger.warning(f"Job {job_id} déjà complété, arrêt du stream")
-        yield f'data: {json.dumps({"type": "error", "message": "Job déjà complété"})}\n\n'
-        return
+    # Stocker l'étape actuelle pour les logs (initialiser à "queued" pour logs plus précis)
+    current_step = "queued"
     
     try:
-        current_task = asyncio.current_task()
-        if current_task is not None:
-            job_manager.register_task(job_id, current_task)
-        job_manager.update_status(job_id, "running")
-        
         # Créer orchestrateur via le container (plus propre)
         orchestrator = container.get_unity_dialogue_orchestrator(job_id)
         
         # Construire request_data depuis job params
         from api.schemas.dialogue import GenerateUnityDialogueRequest
+        request_data = GenerateUnityDialogueRequest(**params)
         
-        # Construire request_data depuis job params
-        request_data = GenerateUnityDialogueRequest(**job['params'])
-        
-        # Stocker l'étape actuelle pour les logs (initialiser à "queued" pour logs plus précis)
-        current_step = "queued"
-        
-        # Streamer les événements
-        event_count = 0
-        complete_count = 0
         async for event in orchestrator.generate_with_events(
             request_data,
             check_cancelled=lambda: job_manager.is_cancelled(job_id)
         ):
-            event_count += 1
-            if event.type == 'complete':
-                complete_count += 1
-            # Convertir GenerationEvent en SSE
+            # Convertir GenerationEvent en payload SSE
             if event.type == 'chunk':
                 chunk_content = event.data.get("content", "")
                 chunk_sequence = event.data.get("sequence", None)
                 payload = {"type": "chunk", "content": chunk_content}
                 if chunk_sequence is not None:
                     payload["sequence"] = chunk_sequence
-                # Flush immédiat : yield avec format SSE strict
-                # Le yield dans un async generator FastAPI envoie immédiatement
-                yield f'data: {json.dumps(payload, ensure_ascii=False)}\n\n'
+                yield payload
+            elif event.type == 'partial':
+                yield {"type": "partial", "path": event.data["path"], "value": event.data["value"]}
             elif event.type == 'step':
                 current_step = event.data.get("step", "unknown")
-                yield f'data: {json.dumps({"type": "step", "step": current_step})}\n\n'
+                yield {"type": "step", "step": current_step}
             elif event.type == 'metadata':
-                yield f'data: {json.dumps({"type": "metadata", "tokens": event.data["tokens"], "cost": event.data["cost"]})}\n\n'
+                yield {"type": "metadata", "tokens": event.data["tokens"], "cost": event.data["cost"]}
             elif event.type == 'complete':
                 # Stocker résultat dans job
                 job_manager.update_status(job_id, "completed", result=event.data['result'])
-                yield f'data: {json.dumps({"type": "complete", "result": event.data["result"]})}\n\n'
+                yield {"type": "complete", "result": event.data["result"]}
                 
                 # Log cleanup automatique après génération normale
                 duration_seconds = _calculate_duration(job)
@@ -150,7 +143,7 @@ async def stream_generation(job_id: str, container: ServiceContainer) -> AsyncGe
                         'status': 'completed'
                     }
                 )
-                # IMPORTANT: Arrêter le stream après complete pour éviter les générations multiples
+                # IMPORTANT: Arrêter après complete pour éviter les générations multiples
                 # (Fonctionnalité de génération multiple désactivée - repoussée à la prochaine version)
                 return
             elif event.type == 'error':
@@ -159,7 +152,13 @@ async def stream_generation(job_id: str, container: ServiceContainer) -> AsyncGe
                     job_manager.update_status(job_id, "cancelled", error=event.data['message'])
                 else:
                     job_manager.update_status(job_id, "error", error=event.data['message'])
-                yield f'data: {json.dumps({"type": "error", "message": event.data["message"]})}\n\n'
+                # Transmettre le code (schema_violation, api_error, no_response...) et les détails
+                payload = {"type": "error", "message": event.data["message"]}
+                if error_code is not None:
+                    payload["code"] = error_code
+                if event.data.get("details") is not None:
+                    payload["details"] = event.data["details"]
+                yield payload
                 return
         
     except asyncio.CancelledError:
@@ -182,17 +181,80 @@ async def stream_generation(job_id: str, container: ServiceContainer) -> AsyncGe
             }
         )
         
-        yield f'data: {json.dumps({"type": "error", "message": "Génération annulée", "code": "cancelled"})}\n\n'
+        yield {"type": "error", "message": "Génération annulée", "code": "cancelled"}
+        return
+    except QuotaExceededException as e:
+        # Budget vérifié une fois le prompt construit : le job échoue sans appel LLM
+        job_manager.update_status(job_id, "error", error=e.detail)
+        yield {"type": "error", "message": e.detail, "code": "quota_exceeded", "details": e.details}
         return
     except Exception as e:
         logger.exception(f"Error streaming job {job_id}: {e}")
         job_manager.update_status(job_id, "error", error=str(e))
-        yield f'data: {json.dumps({"type": "error", "message": str(e)})}\n\n'
+        yield {"type": "error", "message": str(e)}
+
+
+async def stream_generation(job_id: str, last_event_id: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+    """Abonné SSE aux événements d'un job de génération.
+    
+    La génération est exécutée par le pool de workers : ce générateur se contente de
+    rejouer le buffer du job puis de suivre les nouveaux événements. Plusieurs clients
+    peuvent suivre le même job, et une déconnexion n'interrompt pas la génération.
+    
+    Chaque événement porte un `id:` SSE égal à sa séquence dans le job. Lors d'une
+    reconnexion, EventSource renvoie le dernier id reçu (header Last-Event-ID) et le
+    flux reprend à l'événement suivant, sans relancer l'appel LLM.
+    
+    Args:
+        job_id: ID du job à suivre.
+        last_event_id: Dernier id reçu par le client (None = depuis le début).
+        
+    Yields:
+        Frames SSE encodées en UTF-8, au format strict `id: N\ndata: {...}\n\n`.
+    """
+    job_manager = get_job_manager()
+    if not job_manager.get_job(job_id):
+        yield f'data: {json.dumps({"type": "error", "message": "Job introuvable"})}\n\n'.encode("utf-8")
+        return
+    
+    from_sequence = 0 if last_event_id is None else last_event_id + 1
+    registry = get_subscriber_registry()
+    stats = registry.register(job_id)
+    first = True
+    try:
+        async for sequence, frame in job_manager.subscribe_frames(
+            job_id, from_sequence, slow_consumer=get_slow_consumer_policy(), stats=stats
+        ):
+            if first and sequence > from_sequence:
+                # Événements déjà écrasés dans le buffer circulaire : le client a un trou
+                logger.warning(
+                    f"Reprise SSE incomplète pour le job {job_id}: événements {from_sequence}-{sequence - 1} "
+                    f"plus disponibles",
+                    extra={'job_id': job_id, 'last_event_id': last_event_id}
+                )
+            first = False
+            # Frame encodée une fois à la publication, partagée par tous les abonnés
+            registry.record_frame(stats, len(frame))
+            yield frame
+    except SlowConsumerError as e:
+        # Pas d'id : EventSource se reconnecte avec le dernier id reçu et reprend le rejeu
+        logger.warning(f"Abonné SSE du job {job_id} déconnecté: {e}", extra={'job_id': job_id})
+        payload = {"type": "error", "message": "Connexion trop lente, reconnexion", "code": "slow_consumer"}
+        yield f'retry: {SLOW_CONSUMER_RETRY_MS}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode("utf-8")
     finally:
-        # Vérifier que la tâche est enregistrée avant de la désenregistrer
-        # La tâche peut ne pas être enregistrée si une exception se produit avant register_task()
-        if job_id in job_manager._tasks:
-            job_manager.unregister_task(job_id)
+        registry.unregister(stats)
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """Convertit le header Last-Event-ID en séquence (None si absent ou invalide)."""
+    if value is None or not value.strip():
+        return None
+    try:
+        last_event_id = int(value)
+    except ValueError:
+        logger.warning(f"Header Last-Event-ID invalide ignoré: {value!r}")
+        return None
+    return last_event_id if last_event_id >= 0 else None
 
 
 @router.post("/generate/jobs", response_model=GenerationJobResponse)
@@ -210,9 +272,13 @@ async def create_generation_job(
         Job créé avec job_id et stream_url.
     """
     job_manager = get_job_manager()
+    container: ServiceContainer = request.app.state.container
     
-    # Créer le job avec les paramètres
-    job_id = job_manager.create_job(job_data.model_dump(mode='json'))
+    # Créer le job et le soumettre immédiatement au pool de workers
+    job_id = job_manager.create_job(
+        job_data.model_dump(mode='json'),
+        runner=lambda job_id, params: generate_job_events(job_id, params, container),
+    )
     
     # Construire l'URL de streaming
     base_url = str(request.base_url).rstrip('/')
@@ -231,12 +297,15 @@ async def create_generation_job(
 async def stream_job(
     job_id: str,
     request: Request,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
 ) -> StreamingResponse:
-    """Endpoint SSE pour streamer la génération d'un job.
+    """Endpoint SSE pour suivre la génération d'un job (plusieurs abonnés possibles).
     
     Args:
         job_id: ID du job à streamer.
-        request: Requête HTTP (pour accéder au container).
+        request: Requête HTTP.
+        last_event_id: Header envoyé par EventSource à la reconnexion, pour reprendre
+            après le dernier événement reçu.
         
     Returns:
         StreamingResponse avec chunks SSE.
@@ -247,11 +316,8 @@ async def stream_job(
     if not job:
         raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
     
-    # Récupérer le container depuis l'app state
-    container: ServiceContainer = request.app.state.container
-    
     return StreamingResponse(
-        stream_generation(job_id, container),
+        stream_generation(job_id, _parse_last_event_id(last_event_id)),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -171,6 +171,38 @@ class SubLocationListResponse(BaseModel):
     region_name: str = Field(..., description="Nom de la région")
 
 
+class SearchResultResponse(BaseModel):
+    """Élément GDD trouvé par la recherche plein texte.
+    
+    Attributes:
+        category: Catégorie de l'élément (characters, locations, items...).
+        name: Nom de l'élément (détail complet via l'endpoint de la catégorie).
+        score: Score de pertinence.
+    """
+    category: str = Field(..., description="Catégorie de l'élément")
+    name: str = Field(..., description="Nom de l'élément")
+    score: float = Field(..., description="Score de pertinence")
+
+
+class SearchResponse(BaseModel):
+    """Réponse de la recherche plein texte sur le GDD.
+    
+    Attributes:
+        query: Requête recherchée.
+        results: Éléments de la page, classés par pertinence.
+        total: Nombre total d'éléments trouvés.
+        page: Numéro de page actuelle (1-indexed).
+        page_size: Taille de la page.
+        total_pages: Nombre total de pages.
+    """
+    query: str = Field(..., description="Requête recherchée")
+    results: List[SearchResultResponse] = Field(..., description="Éléments trouvés (page courante)")
+    total: int = Field(..., description="Nombre total d'éléments trouvés")
+    page: int = Field(..., description="Numéro de page actuelle (1-indexed)")
+    page_size: int = Field(..., description="Taille de la page")
+    total_pages: int = Field(..., description="Nombre total de pages")
+
+
 class LinkedElementsRequest(BaseModel):
     """Requête pour obtenir les éléments liés.
     
@@ -18,6 +18,7 @@ class LLMUsageRecordResponse(BaseModel):
     endpoint: str = Field(..., description="Endpoint appelé")
     k_variants: int = Field(..., ge=1, description="Nombre de variantes générées")
     error_message: Optional[str] = Field(default=None, description="Message d'erreur si success=False")
+    is_hedge: bool = Field(default=False, description="Appel dupliqué perdant d'une requête hedgée")
     
     model_config = ConfigDict()
     
@@ -47,6 +48,8 @@ class LLMUsageStatisticsResponse(BaseModel):
     error_count: int = Field(..., ge=0, description="Nombre d'appels en erreur")
     success_rate: float = Field(..., ge=0.0, le=100.0, description="Taux de succès en pourcentage")
     avg_duration_ms: float = Field(..., ge=0.0, description="Durée moyenne en millisecondes")
+    hedge_calls_count: int = Field(default=0, ge=0, description="Appels dupliqués (hedging) perdants")
+    hedge_cost: float = Field(default=0.0, ge=0.0, description="Coût additionnel du hedging en USD (inclus dans total_cost)")
     start_date: Optional[date] = Field(default=None, description="Date de début de la période")
     end_date: Optional[date] = Field(default=None, description="Date de fin de la période")
     model_name: Optional[str] = Field(default=None, description="Modèle filtré (si applicable)")
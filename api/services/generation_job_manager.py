@@ -1,32 +1,261 @@
-"""Gestionnaire d'état des jobs de génération en cours."""
+"""Gestionnaire d'état des jobs de génération en cours.
+
+Les jobs sont exécutés par un pool borné de workers dès leur création, indépendamment
+des connexions SSE. Chaque job publie ses événements dans un buffer circulaire auquel
+un nombre quelconque de clients peut s'abonner (rejeu depuis le début du buffer ou
+depuis un numéro de séquence, pour la reprise via Last-Event-ID). Le buffer est libéré
+à l'expiration du TTL du job. Chaque événement est sérialisé une seule fois, à la
+publication : le buffer conserve sa frame SSE encodée, réutilisée par tous les abonnés.
+
+L'état des jobs est conservé dans un store (voir generation_job_store) : en mémoire par
+défaut, ou SQLite pour le partager entre workers uvicorn et le conserver au redémarrage.
+"""
+import itertools
+import json
+import os
+import socket
 import uuid
 import asyncio
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional, Literal
+from typing import AsyncIterator, Callable, Deque, Dict, Any, Optional, Literal, Set, Tuple
 import logging
 
+from api.services.generation_job_store import (
+    TERMINAL_STATUSES,
+    IGenerationJobStore,
+    InMemoryJobStore,
+    create_job_store,
+)
+from api.utils.sse_coalescing import (
+    DEFAULT_COALESCE_INTERVAL_MS,
+    DEFAULT_COALESCE_MAX_BYTES,
+    SSEChunkCoalescer,
+)
+from api.utils.sse_backpressure import SlowConsumerPolicy, SSESubscriberStats
+
 logger = logging.getLogger(__name__)
 
+# Nombre de jobs exécutés simultanément (les suivants restent en file "queued")
+DEFAULT_MAX_WORKERS = 4
+# Nombre d'événements conservés par job pour le rejeu aux abonnés tardifs
+DEFAULT_EVENT_BUFFER_SIZE = 8192
+
+# Exécuteur d'un job : reçoit job_id et params, produit les payloads d'événements
+JobRunner = Callable[[str, Dict[str, Any]], AsyncIterator[Dict[str, Any]]]
+
+
+def encode_sse_frame(sequence: int, payload: Dict[str, Any]) -> bytes:
+    """Encode un événement en frame SSE stricte (`id: N\ndata: {...}\n\n`, UTF-8)."""
+    return f'id: {sequence}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode("utf-8")
+
+
+class JobEventBuffer:
+    """Buffer circulaire des événements d'un job, partagé par ses abonnés.
+    
+    Chaque événement reçoit un numéro de séquence croissant. Quand le buffer est plein,
+    les événements les plus anciens sont écrasés : un abonné trop lent ou tardif reprend
+    au plus ancien événement encore disponible. La frame SSE de chaque événement est
+    encodée à la publication ; la taille cumulée des frames est suivie pour mesurer en
+    O(1) le retard (en octets) d'un abonné.
+    """
+    
+    def __init__(self, maxlen: int = DEFAULT_EVENT_BUFFER_SIZE):
+        """
+        Args:
+            maxlen: Nombre maximal d'événements conservés.
+        """
+        # (séquence, payload, frame SSE encodée, octets publiés avant l'événement)
+        self._events: Deque[Tuple[int, Dict[str, Any], bytes, int]] = deque(maxlen=maxlen)
+        self._next_sequence = 0
+        self._published_bytes = 0
+        self._closed = False
+        self._changed = asyncio.Event()
+    
+    @property
+    def closed(self) -> bool:
+        """Indique si le job a fini de publier."""
+        return self._closed
+    
+    def publish(self, payload: Dict[str, Any]) -> int:
+        """Ajoute un événement et réveille les abonnés.
+        
+        Returns:
+            Numéro de séquence de l'événement.
+        """
+        if self._closed:
+            raise RuntimeError("Buffer d'événements fermé")
+        sequence = self._next_sequence
+        frame = encode_sse_frame(sequence, payload)
+        self._events.append((sequence, payload, frame, self._published_bytes))
+        self._published_bytes += len(frame)
+        self._next_sequence += 1
+        self._notify()
+        return sequence
+    
+    def close(self) -> None:
+        """Marque la fin du flux ; les abonnés se terminent après le dernier événement."""
+        if not self._closed:
+            self._closed = True
+            self._notify()
+    
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+    
+    def backlog(self, from_sequence: int) -> Tuple[int, int]:
+        """Mesure les événements disponibles à partir d'une séquence.
+        
+        Returns:
+            Tuple (nombre d'événements, taille des frames SSE en octets).
+        """
+        if from_sequence >= self._next_sequence or not self._events:
+            return 0, 0
+        oldest = self._events[0][0]
+        sequence = max(from_sequence, oldest)
+        return self._next_sequence - sequence, self._published_bytes - self._events[sequence - oldest][3]
+    
+    async def subscribe(
+        self,
+        from_sequence: int = 0,
+        slow_consumer: Optional[SlowConsumerPolicy] = None,
+        stats: Optional[SSESubscriberStats] = None,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Itère sur les événements à partir d'une séquence, puis suit le flux en direct.
+        
+        Args:
+            from_sequence: Première séquence souhaitée.
+            slow_consumer: Politique appliquée quand le retard de l'abonné sur le direct
+                dépasse son plafond (None = aucun plafond).
+            stats: État de la connexion (retard, actions de la politique).
+        
+        Yields:
+            Tuples (séquence, payload).
+        
+        Raises:
+            SlowConsumerError: Abonné trop lent avec la politique disconnect.
+        """
+        async for sequence, payload, _ in self._follow(from_sequence, slow_consumer, stats):
+            yield sequence, payload
+    
+    async def subscribe_frames(
+        self,
+        from_sequence: int = 0,
+        slow_consumer: Optional[SlowConsumerPolicy] = None,
+        stats: Optional[SSESubscriberStats] = None,
+    ) -> AsyncIterator[Tuple[int, bytes]]:
+        """Comme subscribe, mais produit les frames SSE encodées à la publication.
+        
+        Seuls les événements produits par la politique slow_consumer (fusion de chunks)
+        sont encodés pour l'abonné.
+        
+        Yields:
+            Tuples (séquence, frame SSE).
+        
+        Raises:
+            SlowConsumerError: Abonné trop lent avec la politique disconnect.
+        """
+        async for sequence, payload, frame in self._follow(from_sequence, slow_consumer, stats):
+            yield sequence, frame if frame is not None else encode_sse_frame(sequence, payload)
+    
+    async def _follow(
+        self,
+        from_sequence: int,
+        slow_consumer: Optional[SlowConsumerPolicy],
+        stats: Optional[SSESubscriberStats],
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any], Optional[bytes]]]:
+        """Itère sur (séquence, payload, frame) ; frame est None pour un événement réduit."""
+        sequence = from_sequence
+        # Le rejeu des événements déjà publiés n'est pas compté comme du retard
+        live_from = self._next_sequence
+        while True:
+            while sequence < self._next_sequence:
+                oldest = self._events[0][0]
+                if sequence < oldest:
+                    sequence = oldest
+                if slow_consumer is not None:
+                    pending_events, pending_bytes = self.backlog(max(sequence, live_from))
+                    slow_consumer.record_backlog(stats, pending_events, pending_bytes)
+                    if slow_consumer.exceeded(pending_events, pending_bytes):
+                        pending = list(itertools.islice(self._events, sequence - oldest, None))
+                        published = {seq: (payload, frame) for seq, payload, frame, _ in pending}
+                        sequence = self._next_sequence
+                        for event_sequence, payload in slow_consumer.reduce(
+                            [(seq, payload) for seq, payload, _, _ in pending], pending_bytes, stats
+                        ):
+                            # Événement conservé tel quel par la politique : frame publiée réutilisée
+                            original, frame = published.get(event_sequence, (None, None))
+                            yield event_sequence, payload, frame if original is payload else None
+                        continue
+                event_sequence, payload, frame, _ = self._events[sequence - oldest]
+                sequence += 1
+                yield event_sequence, payload, frame
+            if slow_consumer is not None:
+                slow_consumer.record_backlog(stats, 0, 0)
+            if self._closed:
+                return
+            await self._changed.wait()
+
 
 class GenerationJobManager:
-    """Gestionnaire en mémoire des jobs de génération avec TTL et cleanup automatique."""
+    """Gestionnaire des jobs de génération avec TTL et cleanup automatique.
     
-    def __init__(self, ttl_seconds: int = 3600):
+    L'état des jobs (statut, paramètres, résultat, annulation) est délégué à un store
+    (en mémoire par défaut, SQLite pour le partager entre workers et le conserver au
+    redémarrage). La tâche d'exécution et le buffer d'événements SSE restent locaux au
+    processus qui exécute le job ; les autres processus peuvent consulter et annuler le job.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        event_buffer_size: int = DEFAULT_EVENT_BUFFER_SIZE,
+        coalesce_interval_ms: float = DEFAULT_COALESCE_INTERVAL_MS,
+        coalesce_max_bytes: int = DEFAULT_COALESCE_MAX_BYTES,
+        store: Optional[IGenerationJobStore] = None,
+        remote_poll_interval: float = 1.0,
+    ):
         """
         Args:
             ttl_seconds: Durée de vie d'un job en secondes (default: 1h)
+            max_workers: Nombre maximal de jobs exécutés simultanément
+            event_buffer_size: Nombre d'événements conservés par job
+            coalesce_interval_ms: Délai max de regroupement des chunks (0 = une frame par delta)
+            coalesce_max_bytes: Taille de texte en attente déclenchant l'envoi d'une frame
+            store: Store de l'état des jobs (default: en mémoire, local au processus)
+            remote_poll_interval: Intervalle (s) de suivi des jobs d'autres processus
+                (annulation distante, attente de fin)
         """
-        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._store: IGenerationJobStore = store if store is not None else InMemoryJobStore()
+        # État local des jobs exécutés par ce processus : done_event, buffer d'événements, annulation
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
         self._ttl_seconds = ttl_seconds
         self._cleanup_task: Optional[asyncio.Task] = None
+        self._cancel_watch_task: Optional[asyncio.Task] = None
         self._tasks: Dict[str, asyncio.Task] = {}
+        self._running: Set[str] = set()
+        self._max_workers = max(1, max_workers)
+        self._event_buffer_size = max(1, event_buffer_size)
+        self._worker_slots = asyncio.Semaphore(self._max_workers)
+        self._coalesce_interval_ms = coalesce_interval_ms
+        self._coalesce_max_bytes = coalesce_max_bytes
+        self._remote_poll_interval = remote_poll_interval
     
-    def create_job(self, params: dict) -> str:
+    @property
+    def is_shared_store(self) -> bool:
+        """Indique si l'état des jobs est partagé avec d'autres processus."""
+        return not isinstance(self._store, InMemoryJobStore)
+    
+    def create_job(self, params: dict, runner: Optional[JobRunner] = None) -> str:
         """
         Crée un nouveau job de génération.
         
         Args:
             params: Paramètres de génération (sera passé au service)
+            runner: Exécuteur du job. S'il est fourni, le job est soumis immédiatement
+                au pool de workers (nécessite une boucle asyncio active).
         
         Returns:
             job_id: UUID du job créé
@@ -34,28 +263,172 @@ class GenerationJobManager:
         job_id = str(uuid.uuid4())
         now = datetime.now(timezone.utc)
         
-        self._jobs[job_id] = {
+        self._store.create({
             'job_id': job_id,
             'status': 'queued',
             'params': params,
             'result': None,
             'error': None,
             'cancelled': False,
-            'done_event': asyncio.Event(),
+            'owner': self._owner,
             'created_at': now.isoformat(),
             'updated_at': now.isoformat(),
             'expires_at': (now + timedelta(seconds=self._ttl_seconds)).isoformat(),
+        })
+        self._local[job_id] = {
+            'done_event': asyncio.Event(),
+            'events': JobEventBuffer(self._event_buffer_size),
+            'cancelled': False,
         }
         
         logger.info(f"Job {job_id} created", extra={'job_id': job_id})
+        if runner is not None:
+            self.submit_job(job_id, runner)
         return job_id
     
+    def submit_job(self, job_id: str, runner: JobRunner) -> None:
+        """
+        Soumet un job au pool de workers.
+        
+        Le job reste "queued" tant qu'aucun worker n'est libre. Ses événements sont
+        publiés dans le buffer du job, quel que soit le nombre d'abonnés connectés.
+        
+        Args:
+            job_id: ID du job à exécuter.
+            runner: Exécuteur produisant les payloads d'événements.
+        """
+        if job_id not in self._local:
+            raise KeyError(f"Job {job_id} introuvable (ou créé par un autre processus)")
+        if job_id in self._tasks:
+            raise RuntimeError(f"Job {job_id} déjà soumis")
+        
+        task = asyncio.create_task(self._run_job(job_id, runner), name=f"generation-job-{job_id}")
+        self.register_task(job_id, task)
+    
+    async def _run_job(self, job_id: str, runner: JobRunner) -> None:
+        """Exécute un job dans un slot du pool et publie ses événements."""
+        events: JobEventBuffer = self._local[job_id]['events']
+        # Les chunks consécutifs sont regroupés ; les autres événements sont publiés immédiatement
+        coalescer = SSEChunkCoalescer(events.publish, self._coalesce_interval_ms, self._coalesce_max_bytes)
+        try:
+            async with self._worker_slots:
+                record = self._store.get(job_id)
+                if record is None or self.is_cancelled(job_id):
+                    coalescer.push({"type": "error", "message": "Génération annulée", "code": "cancelled"})
+                    return
+                self._running.add(job_id)
+                self.update_status(job_id, "running")
+                async for payload in runner(job_id, record['params']):
+                    coalescer.push(payload)
+        except asyncio.CancelledError:
+            # Annulation non gérée par l'exécuteur (job encore en file d'attente, par exemple)
+            self.update_status(job_id, "cancelled", error="Génération annulée")
+            coalescer.push({"type": "error", "message": "Génération annulée", "code": "cancelled"})
+        except Exception as e:
+            logger.exception(f"Error running job {job_id}: {e}", extra={'job_id': job_id})
+            self.update_status(job_id, "error", error=str(e))
+            coalescer.push({"type": "error", "message": str(e)})
+        finally:
+            self._running.discard(job_id)
+            if not events.closed:
+                coalescer.flush()
+            events.close()
+            if coalescer.received_chunks:
+                logger.debug(
+                    f"Job {job_id}: {coalescer.received_chunks} chunks publiés en "
+                    f"{coalescer.published_frames} frames",
+                    extra={'job_id': job_id}
+                )
+            record = self._store.get(job_id)
+            if record is not None and record['status'] in ('queued', 'running'):
+                # Exécuteur terminé sans événement final : ne pas laisser le job en suspens
+                self.update_status(job_id, "error", error="Génération interrompue")
+            if job_id in self._tasks:
+                self.unregister_task(job_id)
+    
+    async def subscribe(
+        self,
+        job_id: str,
+        from_sequence: int = 0,
+        slow_consumer: Optional[SlowConsumerPolicy] = None,
+        stats: Optional[SSESubscriberStats] = None,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        S'abonne aux événements d'un job (rejeu du buffer puis suivi en direct).
+        
+        Plusieurs abonnés peuvent suivre le même job ; se désabonner (fermer l'itérateur)
+        n'affecte pas l'exécution. Pour un job exécuté par un autre processus, le buffer
+        n'est pas disponible : seul l'événement final (complete ou error) est produit,
+        avec la séquence 0, une fois le job terminé.
+        
+        Args:
+            job_id: ID du job.
+            from_sequence: Première séquence souhaitée.
+            slow_consumer: Politique appliquée à un abonné en retard sur le direct.
+            stats: État de la connexion (retard, actions de la politique).
+        
+        Yields:
+            Tuples (séquence, payload).
+        """
+        job = self.get_job(job_id)
+        if not job:
+            return
+        if 'events' in job:
+            async for event in job['events'].subscribe(from_sequence, slow_consumer, stats):
+                yield event
+            return
+        
+        while job is not None and job['status'] not in TERMINAL_STATUSES:
+            await asyncio.sleep(self._remote_poll_interval)
+            job = self.get_job(job_id)
+        if job is None or from_sequence > 0:
+            return
+        if job['status'] == 'completed':
+            yield 0, {"type": "complete", "result": job['result']}
+        elif job['status'] == 'cancelled':
+            yield 0, {"type": "error", "message": job['error'] or "Génération annulée", "code": "cancelled"}
+        else:
+            yield 0, {"type": "error", "message": job['error'] or "Erreur de génération"}
+    
+    async def subscribe_frames(
+        self,
+        job_id: str,
+        from_sequence: int = 0,
+        slow_consumer: Optional[SlowConsumerPolicy] = None,
+        stats: Optional[SSESubscriberStats] = None,
+    ) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        Comme subscribe, mais produit les frames SSE encodées une fois à la publication.
+        
+        Yields:
+            Tuples (séquence, frame SSE `id: N\ndata: {...}\n\n`).
+        """
+        job = self.get_job(job_id)
+        if job and 'events' in job:
+            async for event in job['events'].subscribe_frames(from_sequence, slow_consumer, stats):
+                yield event
+            return
+        # Job d'un autre processus : seul l'événement final, encodé pour cet abonné
+        async for sequence, payload in self.subscribe(job_id, from_sequence, slow_consumer, stats):
+            yield sequence, encode_sse_frame(sequence, payload)
+    
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère les infos d'un job."""
-        job = self._jobs.get(job_id)
-        if job and self._is_expired(job):
+        """Récupère les infos d'un job (quel que soit le processus qui l'exécute).
+        
+        Pour un job exécuté par ce processus, le dictionnaire contient aussi 'done_event'
+        et 'events' (buffer d'événements SSE).
+        """
+        job = self._store.get(job_id)
+        if job is None:
+            self._release_local(job_id)
+            return None
+        if self._is_expired(job):
             self._remove_job(job_id)
             return None
+        local = self._local.get(job_id)
+        if local is not None:
+            job['done_event'] = local['done_event']
+            job['events'] = local['events']
         return job
     
     def update_status(
@@ -66,23 +439,20 @@ class GenerationJobManager:
         error: Optional[str] = None
     ) -> None:
         """Met à jour le statut d'un job."""
-        job = self._jobs.get(job_id)
-        if not job:
-            logger.warning(f"Attempted to update non-existent job {job_id}")
-            return
-        
-        job['status'] = status
-        job['updated_at'] = datetime.now(timezone.utc).isoformat()
-        
+        fields: Dict[str, Any] = {'status': status, 'updated_at': datetime.now(timezone.utc).isoformat()}
         if result is not None:
-            job['result'] = result
+            fields['result'] = result
         if error is not None:
-            job['error'] = error
+            fields['error'] = error
         
-        if status in ('completed', 'error', 'cancelled'):
-            done_event = job.get('done_event')
-            if isinstance(done_event, asyncio.Event):
-                done_event.set()
+        if not self._store.update(job_id, **fields):
+            logger.warning(f"Attempted to update non-existent job {job_id}")
+            return
+        
+        if status in TERMINAL_STATUSES:
+            local = self._local.get(job_id)
+            if local is not None:
+                local['done_event'].set()
         
         logger.info(f"Job {job_id} status updated to {status}", extra={'job_id': job_id, 'status': status})
     
@@ -90,15 +460,18 @@ class GenerationJobManager:
         """
         Marque un job comme annulé.
         
+        Si le job est exécuté par un autre processus (store partagé), l'annulation est
+        enregistrée dans le store et appliquée par ce processus au prochain contrôle.
+        
         Returns:
             True si le job a été annulé, False sinon (job inexistant ou déjà terminé)
         """
-        job = self._jobs.get(job_id)
+        job = self._store.get(job_id)
         if not job:
             logger.warning(f"Attempted to cancel non-existent job {job_id}")
             return False
         
-        if job['status'] in ('completed', 'error', 'cancelled'):
+        if job['status'] in TERMINAL_STATUSES:
             logger.info(f"Job {job_id} already finished, cannot cancel")
             return False
         
@@ -112,13 +485,25 @@ class GenerationJobManager:
         now = datetime.now(timezone.utc)
         duration_seconds = (now - created_at).total_seconds()
         
-        job['cancelled'] = True
-        job['status'] = 'cancelled'
-        job['updated_at'] = now.isoformat()
+        if not self._store.mark_cancelled(job_id, now.isoformat()):
+            # Terminé entre la lecture et l'annulation
+            logger.info(f"Job {job_id} already finished, cannot cancel")
+            return False
         
-        task = self._tasks.get(job_id)
-        if task and not task.done():
-            task.cancel()
+        local = self._local.get(job_id)
+        if local is not None:
+            local['cancelled'] = True
+            task = self._tasks.get(job_id)
+            if task and not task.done():
+                task.cancel()
+            else:
+                # Aucun worker ne signalera la fin : débloquer wait_for_completion immédiatement
+                local['done_event'].set()
+        else:
+            logger.info(
+                f"Annulation du job {job_id} transmise au processus {job.get('owner') or 'inconnu'}",
+                extra={'job_id': job_id}
+            )
         
         # Log détaillé avec timestamp, durée et métadonnées
         logger.info(
@@ -135,7 +520,11 @@ class GenerationJobManager:
     
     def is_cancelled(self, job_id: str) -> bool:
         """Vérifie si un job a été annulé."""
-        job = self._jobs.get(job_id)
+        local = self._local.get(job_id)
+        if local is not None:
+            # Les annulations distantes sont reportées localement par _watch_remote_cancellations
+            return local['cancelled']
+        job = self._store.get(job_id)
         return job['cancelled'] if job else False
     
     def _is_expired(self, job: Dict[str, Any]) -> bool:
@@ -148,11 +537,21 @@ class GenerationJobManager:
         return datetime.now(timezone.utc) > expires_at
     
     def _remove_job(self, job_id: str) -> None:
-        """Supprime un job (appelé par cleanup)."""
-        if job_id in self._jobs:
-            del self._jobs[job_id]
-        if job_id in self._tasks:
-            del self._tasks[job_id]
+        """Supprime un job (appelé par cleanup) et libère son buffer de rejeu."""
+        self._store.delete(job_id)
+        self._release_local(job_id)
+    
+    def _release_local(self, job_id: str) -> None:
+        """Libère l'état local d'un job supprimé du store (tâche, buffer de rejeu)."""
+        local = self._local.pop(job_id, None)
+        task = self._tasks.pop(job_id, None)
+        if task is not None and not task.done():
+            # Le worker publie l'annulation et ferme le buffer lui-même
+            task.cancel()
+        elif local is not None:
+            # Terminer les abonnés encore connectés : ils ne recevront plus rien
+            local['events'].close()
+        if local is not None or task is not None:
             logger.debug(f"Job {job_id} removed from memory")
     
     def register_task(self, job_id: str, task: asyncio.Task) -> None:
@@ -169,31 +568,72 @@ class GenerationJobManager:
     
     async def wait_for_completion(self, job_id: str, timeout_seconds: int = 10) -> bool:
         """Attend la fin d'un job (completed/error/cancelled) avec timeout."""
-        job = self._jobs.get(job_id)
-        if not job:
-            return False
-        
-        done_event = job.get('done_event')
-        if not isinstance(done_event, asyncio.Event):
-            return False
+        local = self._local.get(job_id)
+        if local is not None:
+            try:
+                await asyncio.wait_for(local['done_event'].wait(), timeout=timeout_seconds)
+                return True
+            except asyncio.TimeoutError:
+                return False
         
-        try:
-            await asyncio.wait_for(done_event.wait(), timeout=timeout_seconds)
-            return True
-        except asyncio.TimeoutError:
-            return False
+        # Job d'un autre processus : suivre son statut dans le store
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        while True:
+            job = self._store.get(job_id)
+            if job is None:
+                return False
+            if job['status'] in TERMINAL_STATUSES:
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(self._remote_poll_interval, remaining))
+    
+    def get_pool_state(self) -> Dict[str, int]:
+        """Retourne l'occupation du pool de workers de ce processus."""
+        return {
+            'max_workers': self._max_workers,
+            'running': len(self._running),
+            'queued': sum(
+                1 for job_id, task in self._tasks.items() if job_id not in self._running and not task.done()
+            ),
+        }
+    
+    async def shutdown(self) -> None:
+        """Annule les jobs encore en cours ou en file (arrêt de l'application)."""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"{len(tasks)} job(s) de génération annulé(s) à l'arrêt")
     
     async def start_cleanup_task(self) -> None:
-        """Démarre la tâche de nettoyage périodique des jobs expirés."""
+        """Démarre la tâche de nettoyage périodique des jobs expirés.
+        
+        Avec un store partagé, récupère aussi les jobs laissés en cours par un processus
+        arrêté et démarre le suivi des annulations demandées par d'autres processus.
+        """
         if self._cleanup_task is not None:
             logger.warning("Cleanup task already running")
             return
         
+        if self.is_shared_store:
+            self._recover_orphaned_jobs()
+            self._cancel_watch_task = asyncio.create_task(self._watch_remote_cancellations())
         self._cleanup_task = asyncio.create_task(self._cleanup_loop())
         logger.info("Cleanup task started")
     
     async def stop_cleanup_task(self) -> None:
         """Arrête la tâche de nettoyage."""
+        if self._cancel_watch_task is not None:
+            self._cancel_watch_task.cancel()
+            try:
+                await self._cancel_watch_task
+            except asyncio.CancelledError:
+                pass
+            self._cancel_watch_task = None
         if self._cleanup_task is not None:
             self._cleanup_task.cancel()
             try:
@@ -214,24 +654,68 @@ class GenerationJobManager:
             except Exception as e:
                 logger.error(f"Error in cleanup loop: {e}")
     
-    async def _cleanup_expired_jobs(self) -> None:
-        """Supprime les jobs expirés."""
-        now = datetime.now(timezone.utc)
-        expired_jobs = []
-        for job_id, job in self._jobs.items():
-            try:
-                expires_at = datetime.fromisoformat(job['expires_at'])
-                if expires_at < now:
-                    expired_jobs.append(job_id)
-            except (ValueError, TypeError):
-                # Format invalide, considérer comme expiré
-                expired_jobs.append(job_id)
+    async def _cleanup_expired_jobs(self, now: Optional[datetime] = None) -> None:
+        """Supprime les jobs expirés (suppression indexée par date d'expiration dans le store).
+        
+        Args:
+            now: Date de référence (default: maintenant).
+        """
+        now = now or datetime.now(timezone.utc)
+        expired_jobs = self._store.delete_expired(now.isoformat())
         
         for job_id in expired_jobs:
-            self._remove_job(job_id)
+            self._release_local(job_id)
         
         if expired_jobs:
             logger.info(f"Cleaned up {len(expired_jobs)} expired jobs")
+    
+    async def _watch_remote_cancellations(self) -> None:
+        """Applique aux jobs exécutés localement les annulations faites par d'autres processus."""
+        while True:
+            try:
+                await asyncio.sleep(self._remote_poll_interval)
+                self._apply_remote_cancellations()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in cancellation watch loop: {e}")
+    
+    def _apply_remote_cancellations(self) -> None:
+        """Annule les tâches locales dont le job a été annulé dans le store."""
+        candidates = [
+            job_id for job_id, task in self._tasks.items()
+            if not task.done() and not self._local.get(job_id, {}).get('cancelled', True)
+        ]
+        for job_id in self._store.cancelled_among(candidates):
+            self._local[job_id]['cancelled'] = True
+            self._tasks[job_id].cancel()
+            logger.info(f"Job {job_id} annulé par un autre processus", extra={'job_id': job_id})
+    
+    def _recover_orphaned_jobs(self) -> None:
+        """Passe en erreur les jobs en cours dont le processus propriétaire n'existe plus."""
+        recovered = 0
+        for job in self._store.list_active():
+            owner = job.get('owner')
+            if owner and owner != self._owner and _owner_is_gone(owner):
+                self.update_status(job['job_id'], "error", error="Génération interrompue (redémarrage du serveur)")
+                recovered += 1
+        if recovered:
+            logger.warning(f"{recovered} job(s) orphelin(s) d'un processus arrêté marqué(s) en erreur")
+
+
+def _owner_is_gone(owner: str) -> bool:
+    """Indique si le processus propriétaire d'un job ("hôte:pid") n'existe plus sur cette machine."""
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit() or os.name == 'nt':
+        # Autre machine, ou Windows (os.kill terminerait le processus) : impossible de vérifier
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
 
 
 # Instance globale (singleton)
@@ -242,5 +726,14 @@ def get_job_manager() -> GenerationJobManager:
     """Récupère l'instance singleton du job manager."""
     global _job_manager
     if _job_manager is None:
-        _job_manager = GenerationJobManager()
+        _job_manager = GenerationJobManager(
+            max_workers=int(os.getenv("GENERATION_JOB_MAX_WORKERS", str(DEFAULT_MAX_WORKERS))),
+            event_buffer_size=int(os.getenv("GENERATION_JOB_EVENT_BUFFER_SIZE", str(DEFAULT_EVENT_BUFFER_SIZE))),
+            coalesce_interval_ms=float(os.getenv("SSE_COALESCE_INTERVAL_MS", str(DEFAULT_COALESCE_INTERVAL_MS))),
+            coalesce_max_bytes=int(os.getenv("SSE_COALESCE_MAX_BYTES", str(DEFAULT_COALESCE_MAX_BYTES))),
+            store=create_job_store(
+                os.getenv("GENERATION_JOB_STORE", "memory"),
+                os.getenv("GENERATION_JOB_STORE_PATH") or None,
+            ),
+        )
     return _job_manager
@@ -0,0 +1,288 @@
+"""Stockage des jobs de génération (état sérialisable, partagé ou non entre processus).
+
+Le GenerationJobManager conserve en mémoire locale ce qui ne peut pas être partagé (tâche
+asyncio, buffer d'événements SSE) et délègue l'état du job (statut, paramètres, résultat,
+annulation, expiration) à un store :
+
+- InMemoryJobStore : dict local au processus (comportement historique, par défaut).
+- SQLiteJobStore : base SQLite en mode WAL, partagée par les workers uvicorn d'une même
+  machine et persistante au redémarrage. Statut et expiration sont indexés : l'expiration
+  est un DELETE indexé plutôt qu'un parcours de tous les jobs.
+
+Les dates sont des chaînes ISO 8601 UTC (datetime.isoformat()), comparables
+lexicographiquement.
+"""
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Statuts terminaux : un job dans l'un de ces statuts ne peut plus être annulé
+TERMINAL_STATUSES = ("completed", "error", "cancelled")
+
+# Champs modifiables après création
+_UPDATABLE_FIELDS = ("status", "result", "error", "cancelled", "updated_at", "owner")
+
+
+class IGenerationJobStore(Protocol):
+    """Interface pour le stockage de l'état des jobs de génération."""
+
+    def create(self, job: Dict[str, Any]) -> None:
+        """Enregistre un nouveau job.
+
+        Args:
+            job: Dictionnaire avec les clés job_id, status, params, result, error,
+                cancelled, owner, created_at, updated_at, expires_at.
+        """
+        ...
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère un job (copie), ou None s'il n'existe pas."""
+        ...
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        """Met à jour des champs d'un job.
+
+        Returns:
+            True si le job existe.
+        """
+        ...
+
+    def mark_cancelled(self, job_id: str, updated_at: str) -> bool:
+        """Annule atomiquement un job s'il n'est pas dans un statut terminal.
+
+        Returns:
+            True si le job a été annulé par cet appel.
+        """
+        ...
+
+    def cancelled_among(self, job_ids: Iterable[str]) -> List[str]:
+        """Retourne les jobs annulés parmi ceux fournis (détection d'une annulation distante)."""
+        ...
+
+    def list_active(self) -> List[Dict[str, Any]]:
+        """Liste les jobs en statut queued ou running."""
+        ...
+
+    def delete(self, job_id: str) -> None:
+        """Supprime un job."""
+        ...
+
+    def delete_expired(self, now: str) -> List[str]:
+        """Supprime les jobs expirés.
+
+        Args:
+            now: Date de référence (ISO 8601 UTC).
+
+        Returns:
+            Identifiants des jobs supprimés.
+        """
+        ...
+
+
+class InMemoryJobStore:
+    """Store de jobs local au processus.
+
+    L'expiration utilise un tas (expires_at, job_id) : seuls les jobs expirés sont visités.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._expiry_heap: List[Tuple[str, str]] = []
+
+    def create(self, job: Dict[str, Any]) -> None:
+        self._jobs[job['job_id']] = dict(job)
+        heapq.heappush(self._expiry_heap, (job['expires_at'], job['job_id']))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.update({key: value for key, value in fields.items() if key in _UPDATABLE_FIELDS})
+        return True
+
+    def mark_cancelled(self, job_id: str, updated_at: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job['status'] in TERMINAL_STATUSES:
+            return False
+        job.update(status='cancelled', cancelled=True, updated_at=updated_at)
+        return True
+
+    def cancelled_among(self, job_ids: Iterable[str]) -> List[str]:
+        return [job_id for job_id in job_ids if self._jobs.get(job_id, {}).get('cancelled')]
+
+    def list_active(self) -> List[Dict[str, Any]]:
+        return [dict(job) for job in self._jobs.values() if job['status'] in ('queued', 'running')]
+
+    def delete(self, job_id: str) -> None:
+        # L'entrée du tas devient orpheline et sera ignorée à l'expiration
+        self._jobs.pop(job_id, None)
+
+    def delete_expired(self, now: str) -> List[str]:
+        expired = []
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            expires_at, job_id = heapq.heappop(self._expiry_heap)
+            job = self._jobs.get(job_id)
+            if job is not None and job['expires_at'] == expires_at:
+                del self._jobs[job_id]
+                expired.append(job_id)
+        return expired
+
+
+class SQLiteJobStore:
+    """Store de jobs SQLite (WAL), partagé entre processus et persistant.
+
+    Une connexion par instance, protégée par un verrou (les appels proviennent de la
+    boucle asyncio et, ponctuellement, de threads du serveur de test).
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            params TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs(status);
+        CREATE INDEX IF NOT EXISTS idx_generation_jobs_expires_at ON generation_jobs(expires_at);
+    """
+
+    def __init__(self, db_path: str):
+        """Initialise le store et crée le schéma si nécessaire.
+
+        Args:
+            db_path: Chemin du fichier SQLite.
+        """
+        self.db_path = Path(db_path)
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self._SCHEMA)
+
+    def close(self) -> None:
+        """Ferme la connexion."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_row(fields: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(fields)
+        for key in ('params', 'result'):
+            if key in row:
+                row[key] = json.dumps(row[key], ensure_ascii=False) if row[key] is not None else None
+        if 'cancelled' in row:
+            row['cancelled'] = int(bool(row['cancelled']))
+        return row
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        job['cancelled'] = bool(job['cancelled'])
+        return job
+
+    def create(self, job: Dict[str, Any]) -> None:
+        row = self._to_row(job)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO generation_jobs (job_id, status, params, result, error, cancelled, owner, "
+                "created_at, updated_at, expires_at) VALUES (:job_id, :status, :params, :result, :error, "
+                ":cancelled, :owner, :created_at, :updated_at, :expires_at)",
+                {'owner': None, **row},
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM generation_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        row = self._to_row({key: value for key, value in fields.items() if key in _UPDATABLE_FIELDS})
+        if not row:
+            return self.get(job_id) is not None
+        assignments = ", ".join(f"{key} = :{key}" for key in row)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE generation_jobs SET {assignments} WHERE job_id = :job_id", {**row, 'job_id': job_id}
+            )
+        return cursor.rowcount > 0
+
+    def mark_cancelled(self, job_id: str, updated_at: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE generation_jobs SET status = 'cancelled', cancelled = 1, updated_at = ? "
+                f"WHERE job_id = ? AND status NOT IN ({', '.join('?' for _ in TERMINAL_STATUSES)})",
+                (updated_at, job_id, *TERMINAL_STATUSES),
+            )
+        return cursor.rowcount > 0
+
+    def cancelled_among(self, job_ids: Iterable[str]) -> List[str]:
+        job_ids = list(job_ids)
+        if not job_ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id FROM generation_jobs WHERE cancelled = 1 "
+                f"AND job_id IN ({', '.join('?' for _ in job_ids)})",
+                job_ids,
+            ).fetchall()
+        return [row['job_id'] for row in rows]
+
+    def list_active(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM generation_jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM generation_jobs WHERE job_id = ?", (job_id,))
+
+    def delete_expired(self, now: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "DELETE FROM generation_jobs WHERE expires_at < ? RETURNING job_id", (now,)
+            ).fetchall()
+        return [row['job_id'] for row in rows]
+
+
+def create_job_store(backend: str, db_path: Optional[str] = None) -> IGenerationJobStore:
+    """Crée le store de jobs configuré.
+
+    Args:
+        backend: "memory" ou "sqlite".
+        db_path: Chemin du fichier SQLite (backend "sqlite").
+
+    Returns:
+        Instance du store.
+    """
+    backend = (backend or "memory").strip().lower()
+    if backend == "sqlite":
+        path = db_path or str(Path(__file__).resolve().parent.parent.parent / "data" / "generation_jobs.db")
+        logger.info(f"Store des jobs de génération: SQLite ({path})")
+        return SQLiteJobStore(path)
+    if backend != "memory":
+        logger.warning(f"Store de jobs inconnu '{backend}', utilisation du store en mémoire")
+    return InMemoryJobStore()
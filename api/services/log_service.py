@@ -1,18 +1,97 @@
 """Service de gestion et consultation des logs."""
 import json
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from api.utils.log_file_handler import (
+    LEGACY_LOG_FILE_SUFFIX,
+    iter_log_files,
+    parse_log_file_date,
+    remove_log_file,
+)
+from api.utils.log_index import TIME_BUCKET_CHARS, LogFileIndex, get_log_index_cache
 from constants import FilePaths
 
 
 logger = logging.getLogger(__name__)
 
+# Taille (octets) des blocs NDJSON produits par l'export
+EXPORT_CHUNK_BYTES = 64 * 1024
+# Lecture maximale (octets) par fichier lors d'un poll du suivi en direct
+TAIL_POLL_MAX_BYTES = 1024 * 1024
+
+
+def _log_matches(
+    log: Dict[str, Any],
+    level: Optional[str] = None,
+    logger_name: Optional[str] = None,
+    request_id: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    job_id: Optional[str] = None
+) -> bool:
+    """Indique si un log correspond aux filtres (mêmes règles que LogFileIndex.match)."""
+    if level and (log.get("level") or "").upper() != level.upper():
+        return False
+    if logger_name and logger_name.lower() not in (log.get("logger") or "").lower():
+        return False
+    if request_id and log.get("request_id") != request_id:
+        return False
+    if endpoint and endpoint not in (log.get("endpoint") or ""):
+        return False
+    if job_id and log.get("job_id") != job_id:
+        return False
+    return True
+
+
+def _timestamp_day(timestamp: Optional[str]) -> Optional[str]:
+    """Extrait le jour (YYYY-MM-DD) d'un timestamp ISO, ou None s'il est invalide."""
+    if not timestamp or not isinstance(timestamp, str):
+        return None
+    try:
+        return date.fromisoformat(timestamp[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def _utc_bounds(start_date: date, end_date: date) -> Tuple[str, str]:
+    """Bornes UTC (début inclus, fin exclue, format ISO) des jours locaux d'une plage.
+
+    Les fichiers de logs sont datés en heure locale, les timestamps sont en UTC.
+    """
+    start = datetime.combine(start_date, time.min).astimezone(timezone.utc)
+    end = datetime.combine(end_date + timedelta(days=1), time.min).astimezone(timezone.utc)
+    return start.strftime("%Y-%m-%dT%H:%M:%S"), end.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _bucket_position(bucket: str, start: str, end: str) -> int:
+    """Position d'un bucket horaire par rapport aux bornes.
+
+    Returns:
+        -1 hors de la plage, 0 en bordure (timestamps à comparer un par un), 1 dans la
+        plage (ou timestamp invalide, conservé comme auparavant).
+    """
+    try:
+        datetime.strptime(bucket, "%Y-%m-%dT%H")
+    except ValueError:
+        return 1
+    if bucket < start[:TIME_BUCKET_CHARS] or bucket > end[:TIME_BUCKET_CHARS]:
+        return -1
+    if bucket == start[:TIME_BUCKET_CHARS] or bucket == end[:TIME_BUCKET_CHARS]:
+        return 0
+    return 1
+
 
 class LogService:
-    """Service pour la recherche, la consultation et la gestion des logs."""
+    """Service pour la recherche, la consultation et la gestion des logs.
+    
+    Lit les fichiers JSONL écrits par DateRotatingFileHandler (`logs_YYYY-MM-DD.jsonl`)
+    et, de façon transparente, les fichiers de l'ancien format (tableau JSON,
+    `logs_YYYY-MM-DD.json`). Les recherches et statistiques sur les fichiers JSONL
+    passent par leur index (api.utils.log_index) : seuls les logs de la page
+    demandée sont lus.
+    """
     
     def __init__(self, log_dir: Optional[str] = None):
         """Initialise le service.
@@ -33,10 +112,16 @@ class LogService:
         request_id: Optional[str] = None,
         endpoint: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        job_id: Optional[str] = None
     ) -> Tuple[List[Dict[str, Any]], int]:
         """Recherche des logs selon des critères.
         
+        Retient les logs dont le timestamp tombe dans les jours (locaux) de la plage, du
+        plus récent au plus ancien. Les buckets horaires de l'index sont parcourus en
+        ordre décroissant jusqu'à remplir la page : seules les heures nécessaires sont
+        triées, et le total provient des correspondances de l'index.
+        
         Args:
             start_date: Date de début (incluse). Par défaut: 30 jours avant aujourd'hui.
             end_date: Date de fin (incluse). Par défaut: aujourd'hui.
@@ -46,6 +131,7 @@ class LogService:
             endpoint: Endpoint API pour filtrer.
             limit: Nombre maximum de résultats à retourner.
             offset: Nombre de résultats à ignorer (pagination).
+            job_id: ID de job de génération pour filtrer.
             
         Returns:
             Tuple (liste de logs, nombre total de résultats).
@@ -56,34 +142,81 @@ class LogService:
         if start_date is None:
             start_date = end_date - timedelta(days=30)
         
-        all_logs: List[Dict[str, Any]] = []
-        
-        # Parcourir les fichiers de logs dans la plage de dates
-        current_date = start_date
-        while current_date <= end_date:
-            file_path = self._get_file_path(current_date)
-            if file_path.exists():
-                logs = self._load_logs_from_file(file_path)
-                all_logs.extend(logs)
-            current_date += timedelta(days=1)
-        
-        # Filtrer selon les critères
-        filtered_logs = self._filter_logs(
-            all_logs,
-            level=level,
-            logger_name=logger_name,
-            request_id=request_id,
-            endpoint=endpoint
-        )
+        # Parcours des heures les plus récentes d'abord, arrêté dès que la page est
+        # complète ; le total vient des comptages de l'index (sans trier les résultats)
+        start, end = _utc_bounds(start_date, end_date)
+        filters = {
+            "level": level, "logger_name": logger_name, "request_id": request_id,
+            "endpoint": endpoint, "job_id": job_id,
+        }
         
-        # Trier par timestamp décroissant (plus récents en premier)
-        filtered_logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        def in_range(timestamp: str, position: int) -> bool:
+            return position == 1 or start <= timestamp < end
         
-        # Pagination
-        total_count = len(filtered_logs)
-        paginated_logs = filtered_logs[offset:offset + limit]
+        total_count = 0
+        # heure -> sources : (index, entrées, correspondances, taille) pour un fichier JSONL,
+        # (None, logs, None, 0) pour l'ancien format
+        hours: Dict[str, List[Tuple[Any, ...]]] = {}
+        for file_path in self._get_files_in_range(start_date, end_date):
+            if file_path.suffix == LEGACY_LOG_FILE_SUFFIX:
+                by_hour: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+                for log in self._filter_logs(self._load_logs_from_file(file_path), **filters):
+                    timestamp = str(log.get("timestamp") or "")
+                    bucket = timestamp[:TIME_BUCKET_CHARS]
+                    position = _bucket_position(bucket, start, end)
+                    if position >= 0 and in_range(timestamp, position):
+                        by_hour.setdefault(bucket, []).append((timestamp, log))
+                        total_count += 1
+                for bucket, logs in by_hour.items():
+                    hours.setdefault(bucket, []).append((None, logs, None, 0))
+                continue
+            index = self._get_index(file_path)
+            if index is None:
+                continue
+            size = len(index)
+            matched = index.match(**filters) if any(filters.values()) else None
+            matched_ids = set(matched) if matched is not None else None
+            file_total = len(matched) if matched is not None else size
+            for bucket, entry_ids in index.bucket_items():
+                position = _bucket_position(bucket, start, end)
+                if position == 1:
+                    hours.setdefault(bucket, []).append((index, entry_ids, matched_ids, size))
+                    continue
+                # Bucket hors plage ou en bordure : correspondances exclues retirées du total
+                kept = [
+                    entry_id for entry_id in entry_ids
+                    if entry_id < size and (matched_ids is None or entry_id in matched_ids)
+                ]
+                if position == 0:
+                    kept_in_range = [entry_id for entry_id in kept if in_range(index.timestamps[entry_id], 0)]
+                    if kept_in_range:
+                        hours.setdefault(bucket, []).append((index, kept_in_range, None, size))
+                    file_total -= len(kept) - len(kept_in_range)
+                else:
+                    file_total -= len(kept)
+            total_count += file_total
+        
+        # Les buckets sont des préfixes des timestamps : trier les heures puis les entrées
+        # de chaque heure donne l'ordre d'un tri complet par timestamp décroissant
+        wanted = offset + limit
+        candidates: List[Tuple[str, Any]] = []
+        for bucket in sorted(hours, reverse=True):
+            hour_candidates: List[Tuple[str, Any]] = []
+            for index, entries, matched_ids, size in hours[bucket]:
+                if index is None:
+                    hour_candidates.extend(entries)
+                    continue
+                hour_candidates.extend(
+                    (index.timestamps[entry_id], (index, entry_id)) for entry_id in entries
+                    if entry_id < size and (matched_ids is None or entry_id in matched_ids)
+                )
+            hour_candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+            candidates.extend(hour_candidates)
+            if len(candidates) >= wanted:
+                break
         
-        return paginated_logs, total_count
+        # Pagination : lecture des seuls logs de la page
+        return self._materialize(candidates[offset:wanted]), total_count
     
     def get_statistics(
         self,
@@ -104,44 +237,39 @@ class LogService:
         if start_date is None:
             start_date = end_date - timedelta(days=30)
         
-        all_logs: List[Dict[str, Any]] = []
-        
-        # Charger tous les logs dans la plage
-        current_date = start_date
-        while current_date <= end_date:
-            file_path = self._get_file_path(current_date)
-            if file_path.exists():
-                logs = self._load_logs_from_file(file_path)
-                all_logs.extend(logs)
-            current_date += timedelta(days=1)
-        
-        # Statistiques par niveau
+        total_logs = 0
         level_counts: Dict[str, int] = {}
-        for log in all_logs:
-            level = log.get("level", "UNKNOWN")
-            level_counts[level] = level_counts.get(level, 0) + 1
-        
-        # Statistiques par jour
         daily_counts: Dict[str, int] = {}
-        for log in all_logs:
-            timestamp_str = log.get("timestamp", "")
-            if timestamp_str:
-                try:
-                    # Extraire la date du timestamp ISO
-                    log_date = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00")).date()
-                    date_str = log_date.isoformat()
-                    daily_counts[date_str] = daily_counts.get(date_str, 0) + 1
-                except (ValueError, AttributeError):
-                    pass
-        
-        # Statistiques par logger
         logger_counts: Dict[str, int] = {}
-        for log in all_logs:
-            logger_name = log.get("logger", "unknown")
-            logger_counts[logger_name] = logger_counts.get(logger_name, 0) + 1
+        
+        def add(counts: Dict[str, int], key: str, count: int = 1) -> None:
+            counts[key] = counts.get(key, 0) + count
+        
+        for file_path in self._get_files_in_range(start_date, end_date):
+            if file_path.suffix == LEGACY_LOG_FILE_SUFFIX:
+                for log in self._load_logs_from_file(file_path):
+                    total_logs += 1
+                    add(level_counts, log.get("level", "UNKNOWN"))
+                    add(logger_counts, log.get("logger", "unknown"))
+                    day = _timestamp_day(log.get("timestamp"))
+                    if day:
+                        add(daily_counts, day)
+                continue
+            # Fichiers JSONL : comptages depuis l'index (sans lire les logs)
+            index = self._get_index(file_path)
+            if index is None:
+                continue
+            total_logs += len(index)
+            for value, count in index.count_by("level").items():
+                add(level_counts, value if value is not None else "UNKNOWN", count)
+            for value, count in index.count_by("logger").items():
+                add(logger_counts, value if value is not None else "unknown", count)
+            for day, count in index.count_by_day().items():
+                if _timestamp_day(day):
+                    add(daily_counts, day, count)
         
         return {
-            "total_logs": len(all_logs),
+            "total_logs": total_logs,
             "date_range": {
                 "start": start_date.isoformat(),
                 "end": end_date.isoformat()
@@ -151,6 +279,98 @@ class LogService:
             "by_logger": logger_counts
         }
     
+    def iter_export(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        level: Optional[str] = None,
+        logger_name: Optional[str] = None,
+        request_id: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        job_id: Optional[str] = None,
+        chunk_bytes: int = EXPORT_CHUNK_BYTES
+    ) -> Iterator[bytes]:
+        """Exporte les logs d'une plage de dates en NDJSON, par blocs.
+        
+        Les fichiers JSONL sont lus ligne par ligne, dans l'ordre chronologique : la
+        mémoire utilisée ne dépend pas de la taille de la plage. Les lignes illisibles
+        sont ignorées ; les fichiers de l'ancien format sont convertis en lignes JSON.
+        
+        Args:
+            start_date: Date de début (incluse). Par défaut: 30 jours avant aujourd'hui.
+            end_date: Date de fin (incluse). Par défaut: aujourd'hui.
+            level: Niveau de log à filtrer.
+            logger_name: Nom du logger à filtrer.
+            request_id: ID de requête à filtrer.
+            endpoint: Endpoint à filtrer.
+            job_id: ID de job de génération à filtrer.
+            chunk_bytes: Taille approximative des blocs produits.
+            
+        Yields:
+            Blocs de lignes NDJSON (terminées par un saut de ligne).
+        """
+        if end_date is None:
+            end_date = date.today()
+        if start_date is None:
+            start_date = end_date - timedelta(days=30)
+        filters = {
+            "level": level, "logger_name": logger_name, "request_id": request_id,
+            "endpoint": endpoint, "job_id": job_id,
+        }
+        
+        buffer = bytearray()
+        for file_path in self._get_files_in_range(start_date, end_date):
+            for line in self._iter_export_lines(file_path, filters):
+                buffer += line
+                if len(buffer) >= chunk_bytes:
+                    yield bytes(buffer)
+                    buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    
+    def _iter_export_lines(self, file_path: Path, filters: Dict[str, Optional[str]]) -> Iterator[bytes]:
+        """Produit les lignes NDJSON d'un fichier qui correspondent aux filtres."""
+        if file_path.suffix == LEGACY_LOG_FILE_SUFFIX:
+            for log in self._filter_logs(self._load_logs_from_file(file_path), **filters):
+                yield (json.dumps(log, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+            return
+        try:
+            with open(file_path, "rb") as f:
+                for line in f:
+                    # Ligne incomplète : écriture en cours
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        log = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    if isinstance(log, dict) and _log_matches(log, **filters):
+                        yield line
+        except OSError as e:
+            logger.warning(f"Impossible d'exporter le fichier de log {file_path}: {e}")
+    
+    def open_tail(
+        self,
+        level: Optional[str] = None,
+        request_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+        last_event_id: Optional[str] = None
+    ) -> "LogTailCursor":
+        """Ouvre un suivi en direct des nouveaux logs.
+        
+        Args:
+            level: Niveau de log à filtrer.
+            request_id: ID de requête à filtrer.
+            job_id: ID de job de génération à filtrer.
+            last_event_id: Id du dernier log reçu (reprise) ; sinon, suivi à partir de maintenant.
+            
+        Returns:
+            Curseur à interroger avec poll().
+        """
+        return LogTailCursor(
+            self.log_dir, level=level, request_id=request_id, job_id=job_id, last_event_id=last_event_id
+        )
+    
     def list_log_files(self) -> List[Dict[str, Any]]:
         """Liste les fichiers de logs disponibles.
         
@@ -162,25 +382,25 @@ class LogService:
         
         files_info: List[Dict[str, Any]] = []
         
-        for file_path in sorted(self.log_dir.glob("logs_*.json"), reverse=True):
+        for file_path in reversed(iter_log_files(self.log_dir)):
             try:
                 # Extraire la date du nom de fichier
-                filename = file_path.stem  # logs_2024-12-15 ou logs_2024-12-15_123045
-                date_part = filename.split('_')[1]  # 2024-12-15 ou 2024-12-15_123045
-                if '_' in date_part:
-                    date_part = date_part.split('_')[0]  # 2024-12-15
-                file_date = datetime.strptime(date_part, "%Y-%m-%d").date()
+                file_date = parse_log_file_date(file_path)
                 
                 # Taille du fichier
                 file_size = file_path.stat().st_size
                 
-                # Compter les entrées (approximatif, on lit juste le début)
+                # Compter les entrées (JSONL : taille de l'index)
                 entry_count = 0
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            entry_count = len(data)
+                    if file_path.suffix == LEGACY_LOG_FILE_SUFFIX:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                            if isinstance(data, list):
+                                entry_count = len(data)
+                    else:
+                        index = self._get_index(file_path)
+                        entry_count = len(index) if index is not None else 0
                 except (json.JSONDecodeError, IOError):
                     pass
                 
@@ -212,17 +432,14 @@ class LogService:
         cutoff_date = date.today() - timedelta(days=retention_days)
         
         try:
-            for file_path in self.log_dir.glob("logs_*.json"):
+            for file_path in iter_log_files(self.log_dir):
                 try:
                     # Extraire la date du nom de fichier
-                    filename = file_path.stem
-                    date_part = filename.split('_')[1]
-                    if '_' in date_part:
-                        date_part = date_part.split('_')[0]
-                    file_date = datetime.strptime(date_part, "%Y-%m-%d").date()
+                    file_date = parse_log_file_date(file_path)
                     
                     if file_date < cutoff_date:
-                        file_path.unlink()
+                        remove_log_file(file_path)
+                        get_log_index_cache().discard(file_path)
                         deleted_count += 1
                         logger.info(f"Fichier de log supprimé: {file_path.name}")
                 except (ValueError, IndexError):
@@ -233,36 +450,110 @@ class LogService:
         
         return deleted_count
     
-    def _get_file_path(self, target_date: date) -> Path:
-        """Génère le chemin du fichier pour une date donnée.
+    def _get_files_in_range(self, start_date: date, end_date: date) -> List[Path]:
+        """Liste les fichiers de logs d'une plage de dates.
+        
+        Inclut les fichiers JSONL, ceux de l'ancien format JSON et les fichiers issus
+        d'une rotation intra-jour (`logs_YYYY-MM-DD_HHMMSS.jsonl`).
         
         Args:
-            target_date: Date pour laquelle générer le chemin.
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
             
         Returns:
-            Chemin du fichier JSON.
+            Chemins des fichiers, triés par nom.
         """
-        filename = f"logs_{target_date.isoformat()}.json"
-        return self.log_dir / filename
+        files: List[Path] = []
+        for file_path in iter_log_files(self.log_dir):
+            try:
+                file_date = parse_log_file_date(file_path)
+            except (ValueError, IndexError):
+                continue
+            if start_date <= file_date <= end_date:
+                files.append(file_path)
+        return files
+    
+    def _get_index(self, file_path: Path) -> Optional[LogFileIndex]:
+        """Retourne l'index à jour d'un fichier JSONL (None si illisible)."""
+        try:
+            return get_log_index_cache().get(file_path)
+        except OSError as e:
+            logger.warning(f"Impossible d'indexer le fichier de log {file_path}: {e}")
+            return None
+    
+    def _materialize(self, candidates: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """Charge les logs d'une page de candidats (lecture groupée par fichier JSONL).
+        
+        Args:
+            candidates: (timestamp, log) pour l'ancien format, (timestamp, (index, entrée)) sinon.
+            
+        Returns:
+            Logs, dans l'ordre des candidats.
+        """
+        wanted: Dict[int, Tuple[LogFileIndex, List[int]]] = {}
+        for _, source in candidates:
+            if isinstance(source, tuple):
+                index, entry_id = source
+                wanted.setdefault(id(index), (index, []))[1].append(entry_id)
+        loaded: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for index, entry_ids in wanted.values():
+            try:
+                for entry_id, log in zip(entry_ids, index.read(entry_ids)):
+                    loaded[(id(index), entry_id)] = log
+            except OSError as e:
+                logger.warning(f"Impossible de lire le fichier de log {index.log_path}: {e}")
+        logs: List[Dict[str, Any]] = []
+        for _, source in candidates:
+            if isinstance(source, tuple):
+                log = loaded.get((id(source[0]), source[1]))
+                if log is not None:
+                    logs.append(log)
+            else:
+                logs.append(source)
+        return logs
     
     def _load_logs_from_file(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Charge les logs depuis un fichier JSON.
+        """Charge les logs depuis un fichier JSONL ou JSON (ancien format).
+        
+        Dans un fichier JSONL, les lignes illisibles (ex: ligne tronquée par un arrêt
+        pendant une écriture) sont ignorées.
         
         Args:
-            file_path: Chemin du fichier JSON.
+            file_path: Chemin du fichier de logs.
             
         Returns:
             Liste de dictionnaires représentant les logs.
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
+        if file_path.suffix == LEGACY_LOG_FILE_SUFFIX:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    if isinstance(data, list):
+                        return data
+                    return []
+            except (json.JSONDecodeError, IOError, UnicodeDecodeError) as e:
+                logger.warning(f"Impossible de charger le fichier de log {file_path}: {e}")
                 return []
-        except (json.JSONDecodeError, IOError, UnicodeDecodeError) as e:
+        
+        logs: List[Dict[str, Any]] = []
+        skipped = 0
+        try:
+            with open(file_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        skipped += 1
+                        continue
+                    if isinstance(entry, dict):
+                        logs.append(entry)
+        except IOError as e:
             logger.warning(f"Impossible de charger le fichier de log {file_path}: {e}")
-            return []
+        if skipped:
+            logger.warning(f"{skipped} ligne(s) illisible(s) ignorée(s) dans {file_path.name}")
+        return logs
     
     def _filter_logs(
         self,
@@ -270,7 +561,8 @@ class LogService:
         level: Optional[str] = None,
         logger_name: Optional[str] = None,
         request_id: Optional[str] = None,
-        endpoint: Optional[str] = None
+        endpoint: Optional[str] = None,
+        job_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Filtre une liste de logs selon des critères.
         
@@ -280,24 +572,127 @@ class LogService:
             logger_name: Nom du logger à filtrer.
             request_id: ID de requête à filtrer.
             endpoint: Endpoint à filtrer.
+            job_id: ID de job de génération à filtrer.
             
         Returns:
             Liste filtrée de logs.
         """
-        filtered = logs
-        
-        if level:
-            filtered = [log for log in filtered if log.get("level", "").upper() == level.upper()]
-        
-        if logger_name:
-            filtered = [log for log in filtered if logger_name.lower() in log.get("logger", "").lower()]
-        
-        if request_id:
-            filtered = [log for log in filtered if log.get("request_id") == request_id]
+        return [
+            log for log in logs
+            if _log_matches(
+                log, level=level, logger_name=logger_name, request_id=request_id, endpoint=endpoint, job_id=job_id
+            )
+        ]
+
+
+class LogTailCursor:
+    """Suivi en direct des fichiers de logs JSONL (positions de lecture par fichier).
+    
+    Chaque log renvoyé est identifié par `<fichier>:<offset de fin de ligne>`. Cet id
+    permet de reprendre le suivi après une déconnexion : le fichier est relu à partir
+    de l'offset, et les fichiers ouverts ensuite (rotation quotidienne ou par taille,
+    dont les noms sont triés chronologiquement) depuis leur début.
+    """
+    
+    def __init__(
+        self,
+        log_dir: Path,
+        level: Optional[str] = None,
+        request_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+        last_event_id: Optional[str] = None
+    ):
+        """
+        Args:
+            log_dir: Dossier des fichiers de logs.
+            level: Niveau de log à filtrer.
+            request_id: ID de requête à filtrer.
+            job_id: ID de job de génération à filtrer.
+            last_event_id: Id du dernier log reçu (None : suivi à partir de maintenant).
+        """
+        self.log_dir = Path(log_dir)
+        self.filters = {"level": level, "request_id": request_id, "job_id": job_id}
+        self._positions: Dict[str, int] = {}
+        resume = self.parse_event_id(last_event_id)
+        if resume is not None:
+            # Fichiers de noms inférieurs : déjà lus par le client
+            name, position = resume
+            self._min_name = name
+            self._positions[name] = position
+            return
+        self._min_name = f"logs_{date.today().isoformat()}"
+        for file_path in self._watched_files():
+            try:
+                self._positions[file_path.name] = file_path.stat().st_size
+            except OSError:
+                continue
+    
+    @staticmethod
+    def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+        """Convertit un id de log (`<fichier>:<offset>`) en (nom de fichier, offset).
         
-        if endpoint:
-            filtered = [log for log in filtered if endpoint in log.get("endpoint", "")]
+        Returns:
+            None si l'id est absent ou invalide.
+        """
+        if not value or ":" not in value:
+            return None
+        name, _, offset = value.strip().rpartition(":")
+        if not name.startswith("logs_") or "/" in name or "\\" in name:
+            return None
+        try:
+            position = int(offset)
+        except ValueError:
+            return None
+        return (name, position) if position >= 0 else None
+    
+    def _watched_files(self) -> List[Path]:
+        """Fichiers JSONL suivis (noms supérieurs ou égaux au point de départ)."""
+        if not self.log_dir.exists():
+            return []
+        return [
+            file_path for file_path in iter_log_files(self.log_dir)
+            if file_path.suffix != LEGACY_LOG_FILE_SUFFIX and file_path.name >= self._min_name
+        ]
+    
+    def poll(self, max_bytes: int = TAIL_POLL_MAX_BYTES) -> List[Tuple[str, Dict[str, Any]]]:
+        """Lit les logs complets écrits depuis le dernier appel.
         
-        return filtered
+        Args:
+            max_bytes: Lecture maximale par fichier (le reste est lu au prochain appel).
+            
+        Returns:
+            Liste de (id, log) correspondant aux filtres, dans l'ordre d'écriture.
+        """
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        for file_path in self._watched_files():
+            name = file_path.name
+            position = self._positions.get(name, 0)
+            try:
+                with open(file_path, "rb") as f:
+                    size = f.seek(0, 2)
+                    if size < position:
+                        # Fichier remplacé ou tronqué : relire depuis le début
+                        position = 0
+                    if size == position:
+                        continue
+                    f.seek(position)
+                    data = f.read(max_bytes)
+                    if b"\n" not in data and len(data) == max_bytes:
+                        # Log plus long que max_bytes : lire jusqu'à la fin de la ligne
+                        data += f.readline()
+            except OSError as e:
+                logger.warning(f"Impossible de suivre le fichier de log {file_path}: {e}")
+                continue
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines(keepends=True):
+                position += len(line)
+                try:
+                    log = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if isinstance(log, dict) and _log_matches(log, **self.filters):
+                    events.append((f"{name}:{position}", log))
+            self._positions[name] = position
+        return events
 
 
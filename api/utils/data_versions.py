@@ -0,0 +1,163 @@
+"""Versions des sources de données servies par l'API (GDD, configuration, presets).
+
+Le cache HTTP indexe ses entrées et calcule ses ETags à partir de ces versions plutôt
+que du contenu rendu : une réponse reste valide tant que les données dont elle dépend
+n'ont pas changé, et un If-None-Match peut être comparé avant d'exécuter la route.
+
+- gdd : génération du GDD chargé en mémoire. Incrémentée à chaque chargement
+  (ContextBuilder.load_gdd_files) ; le jeton est l'empreinte des fichiers chargés,
+  identique d'un worker à l'autre pour les mêmes fichiers.
+- config, presets : empreinte (chemin, mtime, taille) des fichiers surveillés,
+  recalculée au plus une fois par intervalle de vérification, ou immédiatement après
+  une écriture faite par ce processus (invalidate).
+"""
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE_GDD = "gdd"
+SOURCE_CONFIG = "config"
+SOURCE_PRESETS = "presets"
+
+DEFAULT_VERSION_CHECK_INTERVAL = 1.0
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def fingerprint_paths(paths: Iterable[Path]) -> str:
+    """Calcule l'empreinte (chemin, mtime, taille) d'un ensemble de fichiers.
+
+    Les répertoires sont parcourus récursivement (fichiers .json, .txt, .md).
+
+    Args:
+        paths: Fichiers ou répertoires.
+
+    Returns:
+        Empreinte hexadécimale courte ("0" si aucun fichier).
+    """
+    entries: List[Tuple[str, int, int]] = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files = [p for p in path.rglob("*") if p.suffix in (".json", ".txt", ".md") and p.is_file()]
+        else:
+            files = [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            entries.append((str(file), stat.st_mtime_ns, stat.st_size))
+    if not entries:
+        return "0"
+    digest = hashlib.sha1()
+    for name, mtime_ns, size in sorted(entries):
+        digest.update(f"{name}\0{mtime_ns}\0{size}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class DataVersionRegistry:
+    """Registre des versions des sources de données (local au processus)."""
+
+    def __init__(self, check_interval: float = DEFAULT_VERSION_CHECK_INTERVAL):
+        """
+        Args:
+            check_interval: Intervalle minimal (s) entre deux recalculs d'empreinte d'une
+                source surveillée (détection des écritures d'autres processus).
+        """
+        self.check_interval = check_interval
+        self._gdd_generation = 0
+        self._gdd_token = "0"
+        self._watched: Dict[str, List[Path]] = {}
+        # source -> (date du calcul, empreinte)
+        self._fingerprints: Dict[str, Tuple[float, str]] = {}
+
+    @property
+    def gdd_generation(self) -> int:
+        """Numéro de génération du GDD chargé par ce processus (0 = pas encore chargé)."""
+        return self._gdd_generation
+
+    def bump_gdd_generation(self, source_paths: Sequence[Path]) -> int:
+        """Enregistre un (re)chargement du GDD.
+
+        Args:
+            source_paths: Fichiers ou répertoires dont le GDD a été chargé.
+
+        Returns:
+            Nouveau numéro de génération.
+        """
+        self._gdd_generation += 1
+        self._gdd_token = fingerprint_paths(source_paths)
+        logger.info(f"GDD chargé: génération {self._gdd_generation} (empreinte {self._gdd_token})")
+        return self._gdd_generation
+
+    def watch(self, source: str, paths: Sequence[Path]) -> None:
+        """Déclare les fichiers ou répertoires dont dépend une source.
+
+        Args:
+            source: Nom de la source (ex: SOURCE_CONFIG).
+            paths: Fichiers ou répertoires surveillés.
+        """
+        self._watched[source] = [Path(p) for p in paths]
+        self._fingerprints.pop(source, None)
+
+    def invalidate(self, source: str) -> None:
+        """Force le recalcul de l'empreinte d'une source (après une écriture locale)."""
+        self._fingerprints.pop(source, None)
+
+    def version(self, source: str) -> str:
+        """Retourne le jeton de version courant d'une source ("0" si inconnue)."""
+        if source == SOURCE_GDD:
+            return self._gdd_token
+        paths = self._watched.get(source)
+        if not paths:
+            return "0"
+        now = time.monotonic()
+        cached = self._fingerprints.get(source)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached[1]
+        token = fingerprint_paths(paths)
+        if cached is not None and cached[1] != token:
+            logger.info(f"Source de données '{source}' modifiée (version {token})")
+        self._fingerprints[source] = (now, token)
+        return token
+
+    def token(self, sources: Iterable[str]) -> str:
+        """Retourne un jeton combiné des versions de plusieurs sources."""
+        return "|".join(f"{source}={self.version(source)}" for source in sources)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Retourne la génération GDD et la version de chaque source surveillée."""
+        return {
+            "gdd_generation": self._gdd_generation,
+            "versions": {source: self.version(source) for source in (SOURCE_GDD, *self._watched)},
+        }
+
+
+# Instance globale (singleton)
+_data_versions: Optional[DataVersionRegistry] = None
+
+
+def get_data_versions() -> DataVersionRegistry:
+    """Récupère le registre singleton des versions de données.
+
+    Les fichiers de configuration (config/, app_config.json, context_config.json) et le
+    dossier des presets sont surveillés par défaut.
+    """
+    global _data_versions
+    if _data_versions is None:
+        _data_versions = DataVersionRegistry(
+            check_interval=float(os.getenv("HTTP_CACHE_VERSION_CHECK_INTERVAL", str(DEFAULT_VERSION_CHECK_INTERVAL)))
+        )
+        _data_versions.watch(SOURCE_CONFIG, [
+            _PROJECT_ROOT / "config",
+            _PROJECT_ROOT / "app_config.json",
+            _PROJECT_ROOT / "context_config.json",
+        ])
+        _data_versions.watch(SOURCE_PRESETS, [_PROJECT_ROOT / "data" / "presets"])
+    return _data_versions
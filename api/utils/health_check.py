@@ -324,6 +324,78 @@ def check_llm_connectivity() -> HealthCheckResult:
         )
 
 
+def check_llm_scheduler() -> HealthCheckResult:
+    """Rapporte l'état du scheduler LLM (files d'attente, concurrence, 429).
+    
+    Returns:
+        HealthCheckResult avec le statut du scheduler.
+    """
+    try:
+        from api.utils.llm_scheduler import get_llm_scheduler
+        from api.utils.llm_hedging import get_llm_hedging_policy
+        
+        hedging_policy = get_llm_hedging_policy()
+        hedging = {"enabled": True, **hedging_policy.get_state()} if hedging_policy else {"enabled": False}
+        scheduler = get_llm_scheduler()
+        if scheduler is None:
+            return HealthCheckResult(
+                name="llm_scheduler",
+                status="healthy",
+                message="Scheduler LLM désactivé",
+                details={"enabled": False, "hedging": hedging}
+            )
+        
+        state = scheduler.get_state()
+        paused = [model for model, lane in state["models"].items() if lane["paused_for_seconds"] > 0]
+        return HealthCheckResult(
+            name="llm_scheduler",
+            status="degraded" if paused else "healthy",
+            message=f"Modèles en pause après 429: {', '.join(paused)}" if paused else "Scheduler LLM actif",
+            details={"enabled": True, **state, "hedging": hedging}
+        )
+    
+    except Exception as e:
+        logger.exception("Erreur lors de la vérification du scheduler LLM")
+        return HealthCheckResult(
+            name="llm_scheduler",
+            status="degraded",
+            message=f"Erreur lors de la vérification: {str(e)}",
+            details={"error": str(e)}
+        )
+
+
+def check_log_queue() -> HealthCheckResult:
+    """Rapporte l'état de la file de logs (records en attente, abandonnés).
+    
+    Returns:
+        HealthCheckResult avec le statut de la file de logs.
+    """
+    from api.utils.log_queue import get_log_queue_handler
+    
+    handler = get_log_queue_handler()
+    if handler is None:
+        return HealthCheckResult(
+            name="log_queue",
+            status="healthy",
+            message="File de logs désactivée (écriture synchrone)",
+            details={"enabled": False}
+        )
+    
+    stats = handler.get_stats()
+    if not stats["running"]:
+        status, message = "degraded", "Thread d'écriture des logs arrêté"
+    elif stats["queued"] >= stats["max_queued"] * 0.9:
+        status, message = "degraded", "File de logs presque pleine"
+    else:
+        status, message = "healthy", f"{stats['dropped']} log(s) abandonné(s) depuis le démarrage"
+    return HealthCheckResult(
+        name="log_queue",
+        status=status,
+        message=message,
+        details={"enabled": True, **stats}
+    )
+
+
 def perform_health_checks(detailed: bool = False) -> Dict[str, Any]:
     """Effectue tous les health checks.
     
@@ -341,7 +413,9 @@ def perform_health_checks(detailed: bool = False) -> Dict[str, Any]:
     if detailed:
         checks.extend([
             check_gdd_files(),
-            check_llm_connectivity()
+            check_llm_connectivity(),
+            check_llm_scheduler(),
+            check_log_queue()
         ])
     
     # Déterminer le statut global
@@ -0,0 +1,391 @@
+"""Requêtes hedgées pour réduire la latence de queue des appels LLM (opt-in).
+
+Si un appel n'a pas produit son premier token (streaming) ou sa réponse (hors
+streaming) au-delà d'un percentile de latence suivi dynamiquement par modèle, un
+appel dupliqué est lancé ; le premier à aboutir est conservé et l'autre est
+annulé. Le nombre de duplications est plafonné à une part du trafic éligible
+(budget de crédits), et un hedge n'est lancé que si le scheduler LLM dispose
+d'un slot libre. Le coût de l'appel perdant est comptabilisé à part par les
+clients (LLMUsageService, is_hedge=True).
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from constants import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter
+
+    _HEDGES = Counter(
+        "llm_hedged_requests_total", "Appels LLM dupliqués (hedge) et appel gagnant", ["model", "winner"]
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - prometheus_client est une dépendance de l'instrumentator
+    PROMETHEUS_AVAILABLE = False
+
+# Latences suivies : premier token (streaming) ou réponse complète (hors streaming)
+LATENCY_FIRST_TOKEN = "first_token"
+LATENCY_RESPONSE = "response"
+
+# Nombre d'échantillons de latence conservés par (modèle, type de latence)
+_SAMPLE_WINDOW = 200
+
+T = TypeVar("T")
+
+
+@dataclass
+class HedgeTicket:
+    """Autorisation de lancer un appel dupliqué.
+
+    Attributes:
+        permit: Slot du scheduler réservé pour le hedge (None si scheduler désactivé).
+            L'appel dupliqué est responsable de sa libération.
+    """
+    permit: Optional[Any] = None
+
+
+@dataclass
+class HedgeOutcome(Generic[T]):
+    """Résultat d'une course primaire/hedge.
+
+    Attributes:
+        hedged: Un appel dupliqué a été lancé.
+        hedge_won: L'appel dupliqué a abouti en premier.
+        loser_seconds: Durée de l'appel perdant jusqu'à son annulation.
+        loser_result: Résultat de l'appel perdant s'il a abouti avant d'être écarté.
+    """
+    hedged: bool = False
+    hedge_won: bool = False
+    loser_seconds: float = 0.0
+    loser_result: Optional[T] = None
+
+
+class HedgingPolicy:
+    """Politique de hedging : délai par percentile de latence et budget de duplications."""
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_hedge_ratio: float = 0.05,
+        min_samples: int = 20,
+        min_delay: float = 0.25,
+        max_burst: float = 2.0,
+        priorities: Tuple[str, ...] = (LLMPriority.INTERACTIVE,),
+    ):
+        """Initialise la politique.
+
+        Args:
+            percentile: Percentile (0-1) de latence au-delà duquel un hedge est lancé.
+            max_hedge_ratio: Part maximale des appels éligibles pouvant être dupliqués.
+            min_samples: Échantillons requis avant d'activer le hedging pour un modèle.
+            min_delay: Délai minimal (s) avant un hedge.
+            max_burst: Nombre maximal de hedges accumulables en crédit.
+            priorities: Classes de priorité (LLMPriority) éligibles au hedging.
+        """
+        self.percentile = min(max(percentile, 0.0), 1.0)
+        self.max_hedge_ratio = max(0.0, max_hedge_ratio)
+        self.min_samples = max(1, min_samples)
+        self.min_delay = max(0.0, min_delay)
+        self.max_burst = max(1.0, max_burst)
+        self.priorities = tuple(priorities)
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._credits: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    # --- Délai et budget -----------------------------------------------------------
+
+    def record_latency(self, model: str, kind: str, seconds: float) -> None:
+        """Ajoute un échantillon de latence (premier token ou réponse complète)."""
+        samples = self._samples.setdefault((model, kind), deque(maxlen=_SAMPLE_WINDOW))
+        samples.append(max(0.0, seconds))
+
+    def hedge_delay(self, model: str, kind: str, priority: str = LLMPriority.INTERACTIVE) -> Optional[float]:
+        """Retourne le délai avant hedge, ou None si l'appel n'est pas éligible.
+
+        Args:
+            model: Identifiant du modèle appelé.
+            kind: LATENCY_FIRST_TOKEN ou LATENCY_RESPONSE.
+            priority: Classe de priorité de l'appel.
+
+        Returns:
+            Délai en secondes, ou None (priorité non éligible ou historique insuffisant).
+        """
+        if priority not in self.priorities or self.max_hedge_ratio <= 0:
+            return None
+        samples = self._samples.get((model, kind))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+        return max(self.min_delay, value)
+
+    def _credit(self, model: str) -> None:
+        self._credits[model] = min(self.max_burst, self._credits.get(model, 0.0) + self.max_hedge_ratio)
+        self._stat(model, "eligible_calls")
+
+    def try_start_hedge(
+        self,
+        model: str,
+        scheduler: Optional[Any] = None,
+        estimated_tokens: int = 0,
+        priority: str = LLMPriority.INTERACTIVE,
+    ) -> Optional[HedgeTicket]:
+        """Consomme un crédit de hedge si le budget et le scheduler le permettent.
+
+        Args:
+            model: Identifiant du modèle appelé.
+            scheduler: LLMScheduler (optionnel) ; un slot libre est requis.
+            estimated_tokens: Tokens estimés pour le budget TPM du scheduler.
+            priority: Classe de priorité de l'appel.
+
+        Returns:
+            HedgeTicket, ou None si le hedge est refusé.
+        """
+        if self._credits.get(model, 0.0) < 1.0:
+            self._stat(model, "skipped_budget")
+            return None
+        permit = None
+        if scheduler is not None:
+            permit = scheduler.try_acquire(model, estimated_tokens, priority)
+            if permit is None:
+                self._stat(model, "skipped_capacity")
+                return None
+        self._credits[model] -= 1.0
+        return HedgeTicket(permit=permit)
+
+    # --- Course primaire / hedge ---------------------------------------------------
+
+    async def run(
+        self,
+        model: str,
+        kind: str,
+        call: Callable[[Optional[HedgeTicket]], Awaitable[T]],
+        priority: str = LLMPriority.INTERACTIVE,
+        scheduler: Optional[Any] = None,
+        estimated_tokens: int = 0,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> Tuple[T, HedgeOutcome[T]]:
+        """Exécute `call`, en le dupliquant s'il dépasse le délai de hedge.
+
+        Args:
+            model: Identifiant du modèle appelé.
+            kind: Latence mesurée par `call` (LATENCY_FIRST_TOKEN ou LATENCY_RESPONSE).
+            call: Fabrique de l'appel ; reçoit None pour l'appel primaire et le
+                HedgeTicket pour l'appel dupliqué.
+            priority: Classe de priorité de l'appel.
+            scheduler: LLMScheduler (optionnel) auquel réserver le slot du hedge.
+            estimated_tokens: Tokens estimés pour le budget TPM du scheduler.
+            discard: Nettoyage du résultat d'un appel perdant ayant abouti (ex: fermer un stream).
+
+        Returns:
+            Tuple (résultat du gagnant, HedgeOutcome).
+        """
+        delay = self.hedge_delay(model, kind, priority)
+        if priority in self.priorities:
+            self._credit(model)
+
+        async def _timed(ticket: Optional[HedgeTicket]) -> T:
+            started = time.monotonic()
+            result = await call(ticket)
+            self.record_latency(model, kind, time.monotonic() - started)
+            return result
+
+        if delay is None:
+            return await _timed(None), HedgeOutcome()
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(_timed(None))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            await _cancel(primary, discard)
+            raise
+        ticket = None if done else self.try_start_hedge(model, scheduler, estimated_tokens, priority)
+        if ticket is None:
+            return await primary, HedgeOutcome()
+
+        hedge_started = time.monotonic()
+        hedge = asyncio.ensure_future(_timed(ticket))
+        logger.info(f"Hedging LLM '{model}': aucun {kind} après {delay:.2f}s, appel dupliqué lancé")
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # À égalité, l'appel primaire est conservé
+                finished = [task for task in (primary, hedge) if task in done and not task.cancelled()]
+                winners = [task for task in finished if task.exception() is None]
+                if not winners:
+                    error = finished[0].exception() if finished else asyncio.CancelledError()
+                    continue
+                winner = winners[0]
+                loser = hedge if winner is primary else primary
+                loser_result = None
+                if loser.done() and not loser.cancelled() and loser.exception() is None:
+                    loser_result = loser.result()
+                    if discard:
+                        await discard(loser_result)
+                else:
+                    loser_result = await _cancel(loser, discard)
+                outcome: HedgeOutcome[T] = HedgeOutcome(
+                    hedged=True,
+                    hedge_won=winner is hedge,
+                    loser_seconds=time.monotonic() - (started if winner is hedge else hedge_started),
+                    loser_result=loser_result,
+                )
+                self._record_outcome(model, outcome.hedge_won)
+                return winner.result(), outcome
+        except asyncio.CancelledError:
+            await _cancel(primary, discard)
+            await _cancel(hedge, discard)
+            raise
+        self._record_outcome(model, hedge_won=False)
+        raise error
+
+    # --- Observabilité -------------------------------------------------------------
+
+    def _stat(self, model: str, key: str) -> None:
+        stats = self._stats.setdefault(model, {})
+        stats[key] = stats.get(key, 0) + 1
+
+    def _record_outcome(self, model: str, hedge_won: bool) -> None:
+        self._stat(model, "hedged_calls")
+        if hedge_won:
+            self._stat(model, "hedge_wins")
+        if PROMETHEUS_AVAILABLE:
+            _HEDGES.labels(model=model, winner="hedge" if hedge_won else "primary").inc()
+
+    def get_state(self) -> Dict[str, Any]:
+        """Retourne la configuration et les compteurs de hedging par modèle."""
+        models: Dict[str, Any] = {}
+        for (model, kind), samples in self._samples.items():
+            entry = models.setdefault(model, {"delays_ms": {}})
+            delay = self.hedge_delay(model, kind, self.priorities[0]) if self.priorities else None
+            entry["delays_ms"][kind] = round(delay * 1000, 1) if delay is not None else None
+        for model, stats in self._stats.items():
+            models.setdefault(model, {"delays_ms": {}}).update(stats)
+        return {
+            "percentile": self.percentile,
+            "max_hedge_ratio": self.max_hedge_ratio,
+            "priorities": list(self.priorities),
+            "models": models,
+        }
+
+
+async def _cancel(task: "asyncio.Future[T]", discard: Optional[Callable[[T], Awaitable[None]]]) -> Optional[T]:
+    """Annule `task` ; si elle a abouti entre-temps, nettoie son résultat et le retourne."""
+    if not task.done():
+        task.cancel()
+    try:
+        result = await task
+    except BaseException:
+        return None
+    if discard:
+        await discard(result)
+    return result
+
+
+class PeekedStream:
+    """Stream dont les premiers événements ont été lus jusqu'au premier token.
+
+    Rejoue les événements déjà lus puis poursuit la lecture du stream d'origine.
+    """
+
+    def __init__(self, stream: Any, iterator: AsyncIterator[Any], buffered: List[Any]):
+        self.stream = stream
+        self._iterator = iterator
+        self._buffered = buffered
+        self.permit: Optional[Any] = None
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[Any]:
+        while self._buffered:
+            yield self._buffered.pop(0)
+        async for event in self._iterator:
+            yield event
+
+    async def close(self) -> None:
+        """Ferme le stream d'origine (connexion HTTP) s'il expose close()/aclose()."""
+        await close_stream(self.stream)
+
+
+async def peek_first_token(stream: Any, is_first_token: Callable[[Any], bool]) -> PeekedStream:
+    """Lit `stream` jusqu'au premier événement satisfaisant `is_first_token`.
+
+    Args:
+        stream: Stream async d'événements du provider.
+        is_first_token: Prédicat identifiant le premier token (ou un événement terminal).
+
+    Returns:
+        PeekedStream rejouant les événements lus.
+    """
+    iterator = stream.__aiter__()
+    buffered: List[Any] = []
+    try:
+        while True:
+            try:
+                event = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            buffered.append(event)
+            if is_first_token(event):
+                break
+    except BaseException:
+        await close_stream(stream)
+        raise
+    return PeekedStream(stream, iterator, buffered)
+
+
+async def close_stream(stream: Any) -> None:
+    """Ferme un stream du SDK (close() ou aclose()) sans propager d'erreur."""
+    closer = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if closer is None:
+        return
+    try:
+        result = closer()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        logger.debug(f"Erreur lors de la fermeture d'un stream LLM: {e}")
+
+
+# Instance globale de la politique de hedging
+_llm_hedging_policy: Optional[HedgingPolicy] = None
+
+
+def get_llm_hedging_policy() -> Optional[HedgingPolicy]:
+    """Retourne l'instance globale de la politique de hedging.
+
+    Returns:
+        Instance de HedgingPolicy ou None si désactivé (défaut).
+    """
+    global _llm_hedging_policy
+
+    enabled = os.getenv("LLM_HEDGING_ENABLED", "false").lower() in ("true", "1", "yes")
+
+    if not enabled:
+        return None
+
+    if _llm_hedging_policy is None:
+        _llm_hedging_policy = HedgingPolicy(
+            percentile=float(os.getenv("LLM_HEDGING_PERCENTILE", "0.95")),
+            max_hedge_ratio=float(os.getenv("LLM_HEDGING_MAX_RATIO", "0.05")),
+            min_samples=int(os.getenv("LLM_HEDGING_MIN_SAMPLES", "20")),
+            min_delay=float(os.getenv("LLM_HEDGING_MIN_DELAY", "0.25")),
+        )
+
+        logger.info(
+            f"Hedging LLM activé: p{_llm_hedging_policy.percentile * 100:.0f}, "
+            f"budget {_llm_hedging_policy.max_hedge_ratio:.0%} des appels éligibles"
+        )
+
+    return _llm_hedging_policy
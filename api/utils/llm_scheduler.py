@@ -0,0 +1,729 @@
+"""Scheduler asynchrone des appels LLM (concurrence adaptative + budgets RPM/TPM).
+
+Tous les appels sortants vers un provider LLM (OpenAI, Mistral) passent par un
+"slot" du scheduler. Pour chaque modèle, le scheduler :
+- applique un budget de requêtes par minute (RPM) et de tokens par minute (TPM)
+  via deux token buckets, les tokens étant estimés avant l'appel puis réconciliés
+  avec l'usage réel ;
+- borne le nombre d'appels simultanés avec une limite AIMD (augmentation additive
+  sur succès, diminution multiplicative sur 429 ou dégradation de latence). La latence
+  suivie est celle du premier token (appels en streaming), comparée à sa médiane récente
+  dans la même classe de priorité : la durée totale d'un appel dépend surtout de la
+  longueur de la complétion et ne signale pas une congestion ;
+- sert les appels en attente par classe de priorité (LLMPriority) avec un weighted
+  fair queuing : un appel interactif passe devant les appels batch déjà en file,
+  et la classe batch ne peut occuper qu'une part de la concurrence ;
+- expose la profondeur de file, le temps d'attente et la durée des appels par
+  classe (Prometheus + get_state()).
+"""
+import asyncio
+import logging
+import os
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from constants import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    _QUEUE_DEPTH = Gauge(
+        "llm_scheduler_queue_depth", "Appels LLM en attente d'un slot", ["model", "priority"]
+    )
+    _IN_FLIGHT = Gauge(
+        "llm_scheduler_in_flight", "Appels LLM en cours", ["model", "priority"]
+    )
+    _CONCURRENCY_LIMIT = Gauge(
+        "llm_scheduler_concurrency_limit", "Limite de concurrence adaptative (AIMD)", ["model"]
+    )
+    _WAIT_SECONDS = Histogram(
+        "llm_scheduler_wait_seconds", "Temps d'attente avant obtention d'un slot", ["model", "priority"],
+        buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+    )
+    _CALL_SECONDS = Histogram(
+        "llm_scheduler_call_seconds", "Durée d'un appel LLM (attente + exécution)", ["model", "priority"],
+        buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+    )
+    _RATE_LIMITED = Counter(
+        "llm_scheduler_rate_limited_total", "Réponses 429 observées par le scheduler", ["model"]
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - prometheus_client est une dépendance de l'instrumentator
+    PROMETHEUS_AVAILABLE = False
+
+# Nombre d'échantillons conservés pour les statistiques (attente, latence)
+_SAMPLE_WINDOW = 200
+# Nombre minimal d'échantillons de latence (premier token) avant d'utiliser la baseline
+_MIN_LATENCY_SAMPLES = 5
+
+# Poids du weighted fair queuing et part maximale de la concurrence par classe
+DEFAULT_PRIORITY_WEIGHTS = {LLMPriority.INTERACTIVE: 8.0, LLMPriority.BATCH: 1.0}
+DEFAULT_PRIORITY_MAX_SHARE = {LLMPriority.BATCH: 0.75}
+
+
+@dataclass
+class ModelRateLimits:
+    """Budgets d'un modèle (0 = illimité).
+
+    Attributes:
+        rpm: Requêtes par minute.
+        tpm: Tokens (entrée + sortie réservée) par minute.
+    """
+    rpm: int = 0
+    tpm: int = 0
+
+
+class _TokenBucket:
+    """Token bucket rechargé en continu (capacité = budget par minute)."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.level = self.capacity
+        self.last_refill = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+            self.last_refill = now
+
+    def time_until_available(self, amount: float, now: float) -> float:
+        """Retourne le délai (s) avant que `amount` soit disponible (0 si immédiat)."""
+        self._refill(now)
+        # Une demande plus grosse que la capacité passe quand le bucket est plein
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self.level -= amount
+
+    def credit(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+def is_rate_limit_error(error: Optional[BaseException]) -> bool:
+    """Indique si une exception correspond à un 429 du provider."""
+    if error is None:
+        return False
+    try:
+        from openai import RateLimitError
+        if isinstance(error, RateLimitError):
+            return True
+    except ImportError:
+        pass
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def _retry_after_seconds(error: Optional[BaseException]) -> Optional[float]:
+    """Extrait le header Retry-After d'une erreur 429 si présent."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentile_ms(samples: Deque[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))] * 1000, 1)
+
+
+class SchedulerPermit:
+    """Slot obtenu auprès du scheduler pour un appel LLM.
+
+    Le slot doit être libéré via release() (ou en sortant du context manager
+    `LLMScheduler.slot`). release() est idempotent.
+    """
+
+    def __init__(self, lane: "_ModelLane", reserved_tokens: int, priority: str, enqueued_at: float):
+        self._lane = lane
+        self.reserved_tokens = reserved_tokens
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.started_at = time.monotonic()
+        self.wait_seconds = self.started_at - enqueued_at
+        self.first_token_latency: Optional[float] = None
+        self.actual_tokens: Optional[int] = None
+        self.rate_limited = False
+        self._retry_after: Optional[float] = None
+        self._released = False
+
+    def mark_first_token(self) -> None:
+        """Enregistre l'arrivée du premier token (seule latence utilisée pour l'AIMD)."""
+        if self.first_token_latency is None:
+            self.first_token_latency = time.monotonic() - self.started_at
+
+    def set_actual_tokens(self, total_tokens: Optional[int]) -> None:
+        """Renseigne l'usage réel pour réconcilier le budget TPM."""
+        if total_tokens:
+            self.actual_tokens = int(total_tokens)
+
+    def mark_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Signale un rate limit non remonté sous forme d'exception (ex: response.failed)."""
+        self.rate_limited = True
+        self._retry_after = retry_after
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        """Libère le slot et alimente le contrôle de concurrence."""
+        if self._released:
+            return
+        self._released = True
+        retry_after = self._retry_after
+        if is_rate_limit_error(error):
+            self.rate_limited = True
+            retry_after = _retry_after_seconds(error)
+        self._lane.on_release(
+            self, latency=self.first_token_latency, success=error is None, retry_after=retry_after
+        )
+
+
+@dataclass
+class _Waiter:
+    """Appel en attente, étiqueté pour le weighted fair queuing (start-time fair queuing)."""
+    future: asyncio.Future
+    tokens: int
+    priority: str
+    enqueued_at: float
+    start_tag: float
+    finish_tag: float
+
+
+class _PriorityClass:
+    """File et statistiques d'une classe de priorité au sein d'un modèle."""
+
+    def __init__(self, weight: float, max_share: float):
+        self.weight = weight
+        self.max_share = max_share
+        self.queue: Deque[_Waiter] = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0
+        self.total_calls = 0
+        self.wait_samples: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.call_samples: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        # Latences du premier token (baseline de congestion propre à la classe)
+        self.latency_samples: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    def head(self) -> Optional[_Waiter]:
+        # Les appels annulés pendant l'attente sont purgés paresseusement
+        while self.queue and self.queue[0].future.done():
+            self.queue.popleft()
+        return self.queue[0] if self.queue else None
+
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self.queue if not waiter.future.done())
+
+
+class _ModelLane:
+    """Files d'attente par priorité, budgets et limite AIMD d'un modèle."""
+
+    def __init__(self, scheduler: "LLMScheduler", model: str, limits: ModelRateLimits):
+        self.scheduler = scheduler
+        self.model = model
+        self.limits = limits
+        self.rpm_bucket = _TokenBucket(limits.rpm) if limits.rpm > 0 else None
+        self.tpm_bucket = _TokenBucket(limits.tpm) if limits.tpm > 0 else None
+        self.concurrency_limit = float(scheduler.initial_concurrency)
+        self.in_flight = 0
+        self.classes: Dict[str, _PriorityClass] = {
+            priority: _PriorityClass(weight, scheduler.priority_max_share.get(priority, 1.0))
+            for priority, weight in scheduler.priority_weights.items()
+        }
+        self.virtual_time = 0.0
+        self.paused_until = 0.0
+        self.last_decrease = float("-inf")
+        self.wait_samples: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.total_calls = 0
+        self.rate_limited_count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._update_gauges()
+
+    def set_limits(self, limits: ModelRateLimits) -> None:
+        self.limits = limits
+        self.rpm_bucket = _TokenBucket(limits.rpm) if limits.rpm > 0 else None
+        self.tpm_bucket = _TokenBucket(limits.tpm) if limits.tpm > 0 else None
+
+    # --- Admission -----------------------------------------------------------------
+
+    def _limit(self) -> int:
+        return max(1, int(self.concurrency_limit))
+
+    def _class_has_capacity(self, cls: _PriorityClass) -> bool:
+        limit = self._limit()
+        if self.in_flight >= limit:
+            return False
+        if cls.max_share < 1.0:
+            # Réserver une part de la concurrence aux autres classes (interactif)
+            return cls.in_flight < max(1, int(limit * cls.max_share))
+        return True
+
+    def _admission_delay(self, tokens: int, now: float) -> float:
+        """Délai avant de pouvoir admettre un appel de `tokens` tokens (0 = maintenant)."""
+        delay = max(0.0, self.paused_until - now)
+        if self.rpm_bucket:
+            delay = max(delay, self.rpm_bucket.time_until_available(1, now))
+        if self.tpm_bucket:
+            delay = max(delay, self.tpm_bucket.time_until_available(tokens, now))
+        return delay
+
+    def _tag(self, cls: _PriorityClass) -> tuple:
+        start = max(self.virtual_time, cls.last_finish)
+        finish = start + 1.0 / cls.weight
+        cls.last_finish = finish
+        return start, finish
+
+    def _grant(self, tokens: int, priority: str, enqueued_at: float, start_tag: float) -> SchedulerPermit:
+        if self.rpm_bucket:
+            self.rpm_bucket.consume(1)
+        if self.tpm_bucket:
+            self.tpm_bucket.consume(tokens)
+        cls = self.classes[priority]
+        self.virtual_time = max(self.virtual_time, start_tag)
+        self.in_flight += 1
+        cls.in_flight += 1
+        self.total_calls += 1
+        cls.total_calls += 1
+        permit = SchedulerPermit(self, tokens, priority, enqueued_at)
+        self.wait_samples.append(permit.wait_seconds)
+        cls.wait_samples.append(permit.wait_seconds)
+        if PROMETHEUS_AVAILABLE:
+            _WAIT_SECONDS.labels(model=self.model, priority=priority).observe(permit.wait_seconds)
+        return permit
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Sélectionne l'appel de plus petit finish tag parmi les classes ayant de la capacité."""
+        best: Optional[_Waiter] = None
+        for cls in self.classes.values():
+            head = cls.head()
+            if head is None or not self._class_has_capacity(cls):
+                continue
+            if best is None or head.finish_tag < best.finish_tag:
+                best = head
+        return best
+
+    def dispatch(self) -> None:
+        """Accorde des slots aux appels en attente tant que la concurrence et les budgets le permettent."""
+        now = time.monotonic()
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            delay = self._admission_delay(waiter.tokens, now)
+            if delay > 0:
+                self._schedule_dispatch(waiter.future, delay)
+                break
+            self.classes[waiter.priority].queue.popleft()
+            waiter.future.set_result(
+                self._grant(waiter.tokens, waiter.priority, waiter.enqueued_at, waiter.start_tag)
+            )
+        self._update_gauges()
+
+    def _schedule_dispatch(self, future: asyncio.Future, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = future.get_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self.dispatch()
+
+    def _has_waiters(self) -> bool:
+        return any(cls.head() is not None for cls in self.classes.values())
+
+    async def acquire(self, tokens: int, priority: str) -> SchedulerPermit:
+        now = time.monotonic()
+        cls = self.classes[priority]
+        start_tag, finish_tag = self._tag(cls)
+        # Chemin rapide : personne en attente et budgets disponibles
+        if (
+            not self._has_waiters()
+            and self._class_has_capacity(cls)
+            and self._admission_delay(tokens, now) == 0
+        ):
+            permit = self._grant(tokens, priority, now, start_tag)
+            self._update_gauges()
+            return permit
+
+        future = asyncio.get_running_loop().create_future()
+        cls.queue.append(_Waiter(future, tokens, priority, now, start_tag, finish_tag))
+        self.dispatch()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot accordé mais l'appelant a été annulé entre-temps
+                future.result().release()
+            self._update_gauges()
+            raise
+
+    def try_acquire(self, tokens: int, priority: str) -> Optional[SchedulerPermit]:
+        now = time.monotonic()
+        cls = self.classes[priority]
+        if (
+            self._has_waiters()
+            or not self._class_has_capacity(cls)
+            or self._admission_delay(tokens, now) > 0
+        ):
+            return None
+        start_tag, _ = self._tag(cls)
+        permit = self._grant(tokens, priority, now, start_tag)
+        self._update_gauges()
+        return permit
+
+    # --- Rétroaction ---------------------------------------------------------------
+
+    def on_release(
+        self,
+        permit: SchedulerPermit,
+        latency: Optional[float],
+        success: bool,
+        retry_after: Optional[float],
+    ) -> None:
+        cls = self.classes[permit.priority]
+        self.in_flight = max(0, self.in_flight - 1)
+        cls.in_flight = max(0, cls.in_flight - 1)
+        now = time.monotonic()
+
+        call_seconds = now - permit.enqueued_at
+        cls.call_samples.append(call_seconds)
+        if PROMETHEUS_AVAILABLE:
+            _CALL_SECONDS.labels(model=self.model, priority=permit.priority).observe(call_seconds)
+
+        # Réconcilier le budget TPM avec l'usage réel
+        if self.tpm_bucket and permit.actual_tokens is not None:
+            self.tpm_bucket.credit(permit.reserved_tokens - permit.actual_tokens)
+
+        if permit.rate_limited:
+            self.rate_limited_count += 1
+            if PROMETHEUS_AVAILABLE:
+                _RATE_LIMITED.labels(model=self.model).inc()
+            self._decrease(self.scheduler.rate_limit_backoff, now, reason="429")
+            pause = retry_after if retry_after is not None else self.scheduler.default_retry_after
+            self.paused_until = max(self.paused_until, now + pause)
+        elif success:
+            # Pas de premier token (appel non streamé) : pas de signal de latence
+            congested = latency is not None and self._is_latency_congested(cls, latency)
+            if latency is not None:
+                cls.latency_samples.append(latency)
+            if congested:
+                self._decrease(self.scheduler.latency_backoff, now, reason="latence")
+            else:
+                # Augmentation additive : +1 slot par "fenêtre" de concurrence_limit succès
+                self.concurrency_limit = min(
+                    float(self.scheduler.max_concurrency),
+                    self.concurrency_limit + 1.0 / max(1.0, self.concurrency_limit),
+                )
+        self.dispatch()
+
+    def _is_latency_congested(self, cls: _PriorityClass, latency: float) -> bool:
+        """Compare la latence du premier token à sa médiane récente dans la classe."""
+        tolerance = self.scheduler.latency_tolerance
+        if tolerance <= 0 or len(cls.latency_samples) < _MIN_LATENCY_SAMPLES:
+            return False
+        baseline = statistics.median(cls.latency_samples)
+        return baseline > 0 and latency > baseline * tolerance
+
+    def _decrease(self, factor: float, now: float, reason: str) -> None:
+        # Une seule diminution par période : une rafale de 429 simultanés ne doit
+        # pas effondrer la limite plusieurs fois.
+        if now - self.last_decrease < self.scheduler.decrease_cooldown:
+            return
+        previous = self.concurrency_limit
+        self.concurrency_limit = max(float(self.scheduler.min_concurrency), self.concurrency_limit * factor)
+        self.last_decrease = now
+        if self.concurrency_limit == previous:
+            return
+        logger.info(
+            f"Scheduler LLM '{self.model}': limite de concurrence {previous:.2f} -> "
+            f"{self.concurrency_limit:.2f} ({reason})"
+        )
+
+    # --- Observabilité -------------------------------------------------------------
+
+    def queue_depth(self) -> int:
+        return sum(cls.queue_depth() for cls in self.classes.values())
+
+    def _update_gauges(self) -> None:
+        if PROMETHEUS_AVAILABLE:
+            for priority, cls in self.classes.items():
+                _QUEUE_DEPTH.labels(model=self.model, priority=priority).set(cls.queue_depth())
+                _IN_FLIGHT.labels(model=self.model, priority=priority).set(cls.in_flight)
+            _CONCURRENCY_LIMIT.labels(model=self.model).set(self.concurrency_limit)
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "rpm": self.limits.rpm,
+            "tpm": self.limits.tpm,
+            "concurrency_limit": round(self.concurrency_limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "total_calls": self.total_calls,
+            "rate_limited": self.rate_limited_count,
+            "wait_ms_p50": _percentile_ms(self.wait_samples, 0.50),
+            "wait_ms_p95": _percentile_ms(self.wait_samples, 0.95),
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "priorities": {
+                priority: {
+                    "weight": cls.weight,
+                    "max_share": cls.max_share,
+                    "in_flight": cls.in_flight,
+                    "queue_depth": cls.queue_depth(),
+                    "total_calls": cls.total_calls,
+                    "wait_ms_p50": _percentile_ms(cls.wait_samples, 0.50),
+                    "wait_ms_p95": _percentile_ms(cls.wait_samples, 0.95),
+                    "call_ms_p50": _percentile_ms(cls.call_samples, 0.50),
+                    "call_ms_p95": _percentile_ms(cls.call_samples, 0.95),
+                    "first_token_ms_p50": _percentile_ms(cls.latency_samples, 0.50),
+                }
+                for priority, cls in self.classes.items()
+            },
+        }
+
+
+class LLMScheduler:
+    """Point de passage unique des appels LLM sortants.
+
+    Usage:
+        async with scheduler.slot(model_name, estimated_tokens, LLMPriority.BATCH) as permit:
+            response = await client.responses.create(...)
+            permit.set_actual_tokens(response.usage.total_tokens)
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        default_limits: Optional[ModelRateLimits] = None,
+        rate_limit_backoff: float = 0.5,
+        latency_backoff: float = 0.9,
+        latency_tolerance: float = 2.0,
+        decrease_cooldown: float = 1.0,
+        default_retry_after: float = 1.0,
+        priority_weights: Optional[Dict[str, float]] = None,
+        priority_max_share: Optional[Dict[str, float]] = None,
+    ):
+        """Initialise le scheduler.
+
+        Args:
+            initial_concurrency: Limite de concurrence initiale par modèle.
+            min_concurrency: Plancher de la limite AIMD.
+            max_concurrency: Plafond de la limite AIMD.
+            default_limits: Budgets RPM/TPM appliqués aux modèles non configurés.
+            rate_limit_backoff: Facteur multiplicatif appliqué sur un 429.
+            latency_backoff: Facteur multiplicatif appliqué sur dégradation de latence.
+            latency_tolerance: Ratio latence du premier token / médiane de la classe au-delà
+                duquel on réduit (0 = désactivé).
+            decrease_cooldown: Délai minimal (s) entre deux diminutions.
+            default_retry_after: Pause (s) après un 429 sans header Retry-After.
+            priority_weights: Poids du weighted fair queuing par classe (LLMPriority).
+            priority_max_share: Part maximale (0-1] de la concurrence utilisable par classe.
+        """
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.initial_concurrency = min(max(initial_concurrency, self.min_concurrency), self.max_concurrency)
+        self.default_limits = default_limits or ModelRateLimits()
+        self.rate_limit_backoff = rate_limit_backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.decrease_cooldown = decrease_cooldown
+        self.default_retry_after = default_retry_after
+        self.priority_weights = dict(priority_weights or DEFAULT_PRIORITY_WEIGHTS)
+        self.priority_max_share = dict(
+            DEFAULT_PRIORITY_MAX_SHARE if priority_max_share is None else priority_max_share
+        )
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._configured_limits: Dict[str, ModelRateLimits] = {}
+
+    def configure_model(self, model: str, limits: ModelRateLimits) -> None:
+        """Définit les budgets RPM/TPM d'un modèle (issus de llm_config.json)."""
+        if self._configured_limits.get(model) == limits:
+            return
+        self._configured_limits[model] = limits
+        if model in self._lanes:
+            self._lanes[model].set_limits(limits)
+        logger.info(f"Scheduler LLM: budgets du modèle '{model}' -> rpm={limits.rpm}, tpm={limits.tpm}")
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            limits = self._configured_limits.get(model, self.default_limits)
+            lane = _ModelLane(self, model, limits)
+            self._lanes[model] = lane
+        return lane
+
+    async def acquire(
+        self,
+        model: str,
+        estimated_tokens: int = 0,
+        priority: str = LLMPriority.INTERACTIVE,
+    ) -> SchedulerPermit:
+        """Attend un slot pour `model` et le retourne.
+
+        Args:
+            model: Identifiant du modèle appelé.
+            estimated_tokens: Tokens estimés (prompt + sortie réservée) pour le budget TPM.
+            priority: Classe de priorité de l'appel (LLMPriority).
+
+        Returns:
+            SchedulerPermit à libérer après l'appel.
+
+        Raises:
+            ValueError: Si la classe de priorité est inconnue.
+        """
+        if priority not in self.priority_weights:
+            raise ValueError(
+                f"Priorité LLM inconnue: '{priority}' (attendu: {', '.join(self.priority_weights)})"
+            )
+        return await self._lane(model).acquire(max(0, int(estimated_tokens)), priority)
+
+    def try_acquire(
+        self,
+        model: str,
+        estimated_tokens: int = 0,
+        priority: str = LLMPriority.INTERACTIVE,
+    ) -> Optional[SchedulerPermit]:
+        """Obtient un slot immédiatement disponible, sans attendre ni doubler la file.
+
+        Utilisé pour les appels optionnels (ex: requêtes hedgées) qui ne doivent
+        consommer que de la capacité libre.
+
+        Args:
+            model: Identifiant du modèle appelé.
+            estimated_tokens: Tokens estimés (prompt + sortie réservée) pour le budget TPM.
+            priority: Classe de priorité de l'appel (LLMPriority).
+
+        Returns:
+            SchedulerPermit à libérer après l'appel, ou None si aucun slot n'est libre.
+
+        Raises:
+            ValueError: Si la classe de priorité est inconnue.
+        """
+        if priority not in self.priority_weights:
+            raise ValueError(
+                f"Priorité LLM inconnue: '{priority}' (attendu: {', '.join(self.priority_weights)})"
+            )
+        return self._lane(model).try_acquire(max(0, int(estimated_tokens)), priority)
+
+    def slot(
+        self,
+        model: str,
+        estimated_tokens: int = 0,
+        priority: str = LLMPriority.INTERACTIVE,
+    ) -> "_SlotContext":
+        """Context manager async acquérant puis libérant un slot."""
+        return _SlotContext(self, model, estimated_tokens, priority)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Retourne l'état du scheduler par modèle.
+
+        Returns:
+            Dictionnaire avec la configuration et l'état de chaque modèle.
+        """
+        return {
+            "min_concurrency": self.min_concurrency,
+            "max_concurrency": self.max_concurrency,
+            "models": {model: lane.get_state() for model, lane in self._lanes.items()},
+        }
+
+
+class _SlotContext:
+    def __init__(self, scheduler: LLMScheduler, model: str, estimated_tokens: int, priority: str):
+        self._scheduler = scheduler
+        self._model = model
+        self._estimated_tokens = estimated_tokens
+        self._priority = priority
+        self._permit: Optional[SchedulerPermit] = None
+
+    async def __aenter__(self) -> SchedulerPermit:
+        self._permit = await self._scheduler.acquire(self._model, self._estimated_tokens, self._priority)
+        return self._permit
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if self._permit is not None:
+            self._permit.release(exc)
+        return False
+
+
+def estimate_request_tokens(text: str, max_output_tokens: int = 0, prompt_tokens: Optional[int] = None) -> int:
+    """Estime les tokens à réserver dans le budget TPM pour un appel.
+
+    Args:
+        text: Texte envoyé (prompt + instructions), utilisé si prompt_tokens est absent.
+        max_output_tokens: Tokens de sortie réservés (comptés par le provider dans le TPM).
+        prompt_tokens: Estimation déjà calculée (ex: BuiltPrompt.token_count).
+
+    Returns:
+        Nombre de tokens à réserver.
+    """
+    if prompt_tokens is None:
+        # ~4 caractères par token : suffisant pour un budget, réconcilié après l'appel
+        prompt_tokens = len(text) // 4
+    return int(prompt_tokens) + int(max_output_tokens or 0)
+
+
+def rate_limits_from_config(raw: Optional[Dict[str, Any]]) -> Optional[ModelRateLimits]:
+    """Construit ModelRateLimits depuis l'entrée "rate_limits" d'un modèle de llm_config.json."""
+    if not raw:
+        return None
+    return ModelRateLimits(rpm=int(raw.get("rpm", 0) or 0), tpm=int(raw.get("tpm", 0) or 0))
+
+
+# Instance globale du scheduler LLM
+_llm_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> Optional[LLMScheduler]:
+    """Retourne l'instance globale du scheduler LLM.
+
+    Returns:
+        Instance de LLMScheduler ou None si désactivé.
+    """
+    global _llm_scheduler
+
+    enabled = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() in ("true", "1", "yes")
+
+    if not enabled:
+        return None
+
+    if _llm_scheduler is None:
+        _llm_scheduler = LLMScheduler(
+            initial_concurrency=int(os.getenv("LLM_SCHEDULER_INITIAL_CONCURRENCY", "4")),
+            min_concurrency=int(os.getenv("LLM_SCHEDULER_MIN_CONCURRENCY", "1")),
+            max_concurrency=int(os.getenv("LLM_SCHEDULER_MAX_CONCURRENCY", "16")),
+            default_limits=ModelRateLimits(
+                rpm=int(os.getenv("LLM_SCHEDULER_DEFAULT_RPM", "0")),
+                tpm=int(os.getenv("LLM_SCHEDULER_DEFAULT_TPM", "0")),
+            ),
+            latency_tolerance=float(os.getenv("LLM_SCHEDULER_LATENCY_TOLERANCE", "2.0")),
+            priority_weights={
+                LLMPriority.INTERACTIVE: float(os.getenv("LLM_SCHEDULER_INTERACTIVE_WEIGHT", "8")),
+                LLMPriority.BATCH: float(os.getenv("LLM_SCHEDULER_BATCH_WEIGHT", "1")),
+            },
+            priority_max_share={
+                LLMPriority.BATCH: float(os.getenv("LLM_SCHEDULER_BATCH_MAX_SHARE", "0.75")),
+            },
+        )
+
+        logger.info(
+            f"Scheduler LLM initialisé: concurrence {_llm_scheduler.initial_concurrency} "
+            f"(min={_llm_scheduler.min_concurrency}, max={_llm_scheduler.max_concurrency})"
+        )
+
+    return _llm_scheduler
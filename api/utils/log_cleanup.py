@@ -5,6 +5,7 @@ from datetime import date, timedelta
 from pathlib import Path
 from typing import Optional
 
+from api.utils.log_file_handler import iter_log_files, parse_log_file_date, remove_log_file
 from constants import FilePaths
 
 logger = logging.getLogger(__name__)
@@ -32,18 +33,14 @@ def cleanup_old_logs(retention_days: int = 30, log_dir: Optional[str] = None) ->
     cutoff_date = date.today() - timedelta(days=retention_days)
     
     try:
-        for file_path in log_path.glob("logs_*.json"):
+        for file_path in iter_log_files(log_path):
             try:
                 # Extraire la date du nom de fichier
-                # Format: logs_YYYY-MM-DD.json ou logs_YYYY-MM-DD_HHMMSS.json
-                filename = file_path.stem  # logs_2024-12-15 ou logs_2024-12-15_123045
-                date_part = filename.split('_')[1]  # 2024-12-15 ou 2024-12-15_123045
-                if '_' in date_part:
-                    date_part = date_part.split('_')[0]  # 2024-12-15
-                file_date = date.fromisoformat(date_part)
+                # Format: logs_YYYY-MM-DD.jsonl ou logs_YYYY-MM-DD_HHMMSS.jsonl (ou .json, ancien format)
+                file_date = parse_log_file_date(file_path)
                 
                 if file_date < cutoff_date:
-                    file_path.unlink()
+                    remove_log_file(file_path)
                     deleted_count += 1
                     logger.info(f"Fichier de log supprimé: {file_path.name} (date: {file_date.isoformat()})")
             except (ValueError, IndexError) as e:
@@ -2,18 +2,89 @@
 import os
 import json
 import logging
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from logging.handlers import BaseRotatingHandler
 
+from api.utils.log_index import index_path, make_index_entry
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # pragma: no cover - Windows
+    FCNTL_AVAILABLE = False
+
+# Extension des fichiers de logs : JSONL (un objet JSON par ligne, ajout seul)
+LOG_FILE_SUFFIX = ".jsonl"
+# Ancien format (tableau JSON réécrit à chaque log), toujours lu par LogService
+LEGACY_LOG_FILE_SUFFIX = ".json"
+
+DEFAULT_FLUSH_RECORDS = 64
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def parse_log_file_date(file_path: Path) -> date:
+    """Extrait la date d'un fichier de logs (logs_YYYY-MM-DD[_HHMMSS].json[l]).
+    
+    Args:
+        file_path: Chemin du fichier.
+        
+    Returns:
+        Date du fichier.
+        
+    Raises:
+        ValueError, IndexError: Si le nom du fichier n'a pas le format attendu.
+    """
+    date_part = file_path.name.split('.')[0].split('_')[1]
+    return datetime.strptime(date_part, "%Y-%m-%d").date()
+
+
+def iter_log_files(log_dir: Path) -> List[Path]:
+    """Liste les fichiers de logs d'un dossier (JSONL et ancien format JSON).
+    
+    Args:
+        log_dir: Dossier des logs.
+        
+    Returns:
+        Chemins des fichiers `logs_*.jsonl` et `logs_*.json`, triés par nom.
+    """
+    return sorted(
+        path for path in Path(log_dir).glob("logs_*.json*")
+        if path.suffix in (LOG_FILE_SUFFIX, LEGACY_LOG_FILE_SUFFIX)
+    )
+
+
+def remove_log_file(file_path: Path) -> None:
+    """Supprime un fichier de logs et son index (`.idx`) s'il existe.
+    
+    Args:
+        file_path: Chemin du fichier de logs.
+    """
+    file_path.unlink()
+    try:
+        index_path(file_path).unlink()
+    except FileNotFoundError:
+        pass
+
 
 class DateRotatingFileHandler(BaseRotatingHandler):
-    """Handler de logging qui écrit dans des fichiers JSON rotatifs par date.
+    """Handler de logging qui écrit dans des fichiers JSONL rotatifs par date.
+    
+    Les logs sont écrits dans des fichiers nommés `logs_YYYY-MM-DD.jsonl`, un objet
+    JSON par ligne, en ajout seul : le coût d'un log ne dépend pas de la taille du
+    fichier. Les écritures sont bufferisées et vidées sur disque tous les
+    `flush_records` logs, après `flush_interval` secondes, pour tout log WARNING ou
+    plus, et à la fermeture. La rotation se fait au changement de jour et au-delà de
+    `max_file_size_mb` (fichier `logs_YYYY-MM-DD_HHMMSS.jsonl`).
     
-    Les logs sont écrits dans des fichiers nommés `logs_YYYY-MM-DD.json`.
-    Chaque fichier contient un tableau JSON d'objets log.
-    La rotation se fait automatiquement au changement de jour.
+    Chaque fichier a un index (`logs_YYYY-MM-DD.jsonl.idx`, voir api.utils.log_index),
+    écrit après les logs qu'il référence à chaque vidage du buffer. Plusieurs workers
+    peuvent écrire dans le même fichier : chaque vidage est une seule écriture en ajout
+    (O_APPEND) sous un verrou fcntl du fichier, et les offsets de l'index sont déduits de
+    la taille du fichier (fstat) juste après cette écriture.
     """
     
     def __init__(
@@ -21,7 +92,9 @@ class DateRotatingFileHandler(BaseRotatingHandler):
         log_dir: str,
         retention_days: int = 30,
         max_file_size_mb: int = 100,
-        encoding: Optional[str] = "utf-8"
+        encoding: Optional[str] = "utf-8",
+        flush_records: int = DEFAULT_FLUSH_RECORDS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
     ):
         """Initialise le handler.
         
@@ -30,14 +103,25 @@ class DateRotatingFileHandler(BaseRotatingHandler):
             retention_days: Nombre de jours de rétention (défaut: 30).
             max_file_size_mb: Taille maximale d'un fichier en MB avant rotation intra-jour (défaut: 100).
             encoding: Encodage des fichiers (défaut: utf-8).
+            flush_records: Nombre de logs bufferisés avant écriture sur disque.
+            flush_interval: Délai maximal (s) entre deux écritures sur disque.
         """
         self.log_dir = Path(log_dir)
         self.retention_days = retention_days
         self.max_file_size_bytes = max_file_size_mb * 1024 * 1024
         self.encoding = encoding
+        self.flush_records = max(1, flush_records)
+        self.flush_interval = flush_interval
         self.current_date: Optional[date] = None
         self.current_file_path: Optional[Path] = None
         self._file_handle = None
+        self._index_handle = None
+        # Lignes en attente d'écriture et entrées d'index correspondantes (offset à 0)
+        self._pending_lines: List[bytes] = []
+        self._pending_index: List[List[Any]] = []
+        self._file_size = 0
+        self._pending_records = 0
+        self._last_flush = time.monotonic()
         
         # Créer le dossier s'il n'existe pas
         try:
@@ -50,8 +134,8 @@ class DateRotatingFileHandler(BaseRotatingHandler):
         # Initialiser avec la date actuelle
         self._rotate_if_needed()
         
-        # Appeler le constructeur parent (sans baseFilename car on gère nous-mêmes)
-        super().__init__(filename=str(self.current_file_path), mode='a', encoding=encoding, delay=False)
+        # Appeler le constructeur parent (delay=True : le fichier est géré par ce handler)
+        super().__init__(filename=str(self.current_file_path), mode='a', encoding=encoding, delay=True)
     
     def _get_file_path(self, target_date: date) -> Path:
         """Génère le chemin du fichier pour une date donnée.
@@ -60,9 +144,9 @@ class DateRotatingFileHandler(BaseRotatingHandler):
             target_date: Date pour laquelle générer le chemin.
             
         Returns:
-            Chemin du fichier JSON.
+            Chemin du fichier JSONL.
         """
-        filename = f"logs_{target_date.isoformat()}.json"
+        filename = f"logs_{target_date.isoformat()}{LOG_FILE_SUFFIX}"
         return self.log_dir / filename
     
     def _rotate_if_needed(self) -> None:
@@ -82,48 +166,49 @@ class DateRotatingFileHandler(BaseRotatingHandler):
             self._open_file()
             return
         
-        # Rotation si fichier trop volumineux
-        if self.current_file_path and self.current_file_path.exists():
-            file_size = self.current_file_path.stat().st_size
-            if file_size > self.max_file_size_bytes:
-                # Créer un nouveau fichier avec timestamp pour éviter les collisions
-                timestamp = datetime.now(timezone.utc).strftime("%H%M%S")
-                new_path = self.log_dir / f"logs_{today.isoformat()}_{timestamp}.json"
-                self._close_current_file()
-                self.current_file_path = new_path
-                self._open_file()
+        # Rotation si fichier trop volumineux (taille relevée à chaque écriture)
+        if self._file_size > self.max_file_size_bytes:
+            # Créer un nouveau fichier avec timestamp pour éviter les collisions
+            timestamp = datetime.now(timezone.utc).strftime("%H%M%S")
+            new_path = self.log_dir / f"logs_{today.isoformat()}_{timestamp}{LOG_FILE_SUFFIX}"
+            self._close_current_file()
+            self.current_file_path = new_path
+            self._open_file()
     
     def _open_file(self) -> None:
-        """Ouvre le fichier de log actuel.
+        """Ouvre le fichier de log actuel en ajout.
         
-        Si le fichier n'existe pas, crée un tableau JSON vide.
-        Si le fichier existe mais est corrompu, le recrée.
+        Si le fichier existe et se termine par une ligne incomplète (arrêt pendant une
+        écriture), un saut de ligne l'isole : les lecteurs ignorent cette seule ligne.
         """
         if not self.current_file_path:
             return
         
         try:
-            # Si le fichier existe, vérifier qu'il est valide
-            if self.current_file_path.exists():
-                try:
-                    with open(self.current_file_path, 'r', encoding=self.encoding) as f:
-                        json.load(f)  # Vérifier que c'est du JSON valide
-                except (json.JSONDecodeError, IOError):
-                    # Fichier corrompu, le recréer
-                    logging.getLogger(__name__).warning(
-                        f"Fichier de log corrompu, recréation: {self.current_file_path}"
-                    )
-                    self.current_file_path.unlink()
-            
-            # Ouvrir le fichier en mode append
-            self._file_handle = open(self.current_file_path, 'a', encoding=self.encoding)
+            # Ouvrir le fichier en mode append, sans buffer (le buffer est géré par le handler)
+            self._file_handle = open(self.current_file_path, 'ab', buffering=0)
+            with self._exclusive():
+                self._file_size = os.fstat(self._file_handle.fileno()).st_size
+                if self._file_size:
+                    with open(self.current_file_path, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            self._write_all(b"\n")
+                            self._file_size += 1
+            self._index_handle = open(index_path(self.current_file_path), 'a', encoding='utf-8')
+            self._pending_records = 0
+            self._last_flush = time.monotonic()
             
         except IOError as e:
             logging.getLogger(__name__).error(f"Impossible d'ouvrir le fichier de log {self.current_file_path}: {e}")
             self._file_handle = None
     
     def _close_current_file(self) -> None:
-        """Ferme le fichier de log actuel."""
+        """Ferme le fichier de log actuel (après écriture du buffer) et son index."""
+        try:
+            self._flush_file()
+        except IOError:
+            pass
         if self._file_handle:
             try:
                 self._file_handle.close()
@@ -131,6 +216,38 @@ class DateRotatingFileHandler(BaseRotatingHandler):
                 pass
             finally:
                 self._file_handle = None
+                self._pending_records = 0
+        if self._index_handle:
+            try:
+                self._index_handle.close()
+            except IOError:
+                pass
+            finally:
+                self._index_handle = None
+        self._pending_lines = []
+        self._pending_index = []
+    
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Verrou d'écriture du fichier de logs partagé avec les autres workers (fcntl).
+        
+        Les threads du processus sont déjà sérialisés par le verrou du handler.
+        """
+        if not FCNTL_AVAILABLE or not self._file_handle:
+            yield
+            return
+        fcntl.flock(self._file_handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file_handle.fileno(), fcntl.LOCK_UN)
+    
+    def _write_all(self, data: bytes) -> None:
+        """Écrit des octets en fin de fichier (écriture en ajout, reprise si partielle)."""
+        view = memoryview(data)
+        while view:
+            written = self._file_handle.write(view)
+            view = view[written:]
     
     def emit(self, record: logging.LogRecord) -> None:
         """Émet un log record vers le fichier.
@@ -153,11 +270,8 @@ class DateRotatingFileHandler(BaseRotatingHandler):
             # Formater le record en JSON
             log_entry = self._format_record(record)
             
-            # Écrire dans le fichier
-            # Format: un objet JSON par ligne (JSONL-like, mais on maintient un tableau)
-            # Pour simplifier la lecture, on lit tout, ajoute, et réécrit
-            # (peut être optimisé plus tard avec un buffer)
-            self._append_log_entry(log_entry)
+            # Écrire dans le fichier (une ligne JSON, bufferisée)
+            self._append_log_entry(log_entry, force_flush=record.levelno >= logging.WARNING)
             
         except Exception as e:
             # En cas d'erreur, ne pas bloquer l'application
@@ -178,7 +292,8 @@ class DateRotatingFileHandler(BaseRotatingHandler):
             Dictionnaire représentant le log.
         """
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
+            # Heure d'émission du record (pas celle de l'écriture par le thread de la file)
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat() + "Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -192,6 +307,8 @@ class DateRotatingFileHandler(BaseRotatingHandler):
             log_data["request_id"] = record.request_id
         if hasattr(record, "user_id"):
             log_data["user_id"] = record.user_id
+        if hasattr(record, "job_id"):
+            log_data["job_id"] = record.job_id
         if hasattr(record, "endpoint"):
             log_data["endpoint"] = record.endpoint
         if hasattr(record, "method"):
@@ -214,48 +331,74 @@ class DateRotatingFileHandler(BaseRotatingHandler):
         
         return log_data
     
-    def _append_log_entry(self, log_entry: Dict[str, Any]) -> None:
-        """Ajoute une entrée de log au fichier JSON.
+    def _append_log_entry(self, log_entry: Dict[str, Any], force_flush: bool = False) -> None:
+        """Ajoute une entrée de log au fichier JSONL.
         
         Args:
             log_entry: L'entrée de log à ajouter.
+            force_flush: Si True, écrit le buffer sur disque immédiatement.
         """
         if not self.current_file_path or not self._file_handle:
             return
         
         try:
-            # Fermer temporairement pour lire/écrire
-            self._file_handle.flush()
-            self._file_handle.close()
-            
-            # Lire le contenu existant
-            logs = []
-            if self.current_file_path.exists():
-                try:
-                    with open(self.current_file_path, 'r', encoding=self.encoding) as f:
-                        content = f.read().strip()
-                        if content:
-                            logs = json.loads(content)
-                            if not isinstance(logs, list):
-                                logs = []
-                except (json.JSONDecodeError, IOError):
-                    # Fichier corrompu, recommencer
-                    logs = []
-            
-            # Ajouter la nouvelle entrée
-            logs.append(log_entry)
-            
-            # Réécrire le fichier
-            with open(self.current_file_path, 'w', encoding=self.encoding) as f:
-                json.dump(logs, f, ensure_ascii=False, indent=None, separators=(',', ':'))
-            
-            # Rouvrir en mode append pour les prochaines écritures
-            self._file_handle = open(self.current_file_path, 'a', encoding=self.encoding)
-            
+            line = json.dumps(log_entry, ensure_ascii=False, separators=(',', ':'), default=str) + "\n"
+            data = line.encode(self.encoding or "utf-8")
+            self._pending_lines.append(data)
+            # Offset relatif au vidage : la position réelle n'est connue qu'après l'écriture
+            self._pending_index.append(make_index_entry(0, len(data), log_entry))
+            # Taille estimée pour la rotation, relevée exactement au prochain vidage
+            self._file_size += len(data)
+            self._pending_records += 1
+            if (
+                force_flush
+                or self._pending_records >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush_file()
         except IOError as e:
             # Erreur d'écriture, fallback vers console
             logging.getLogger(__name__).error(f"Erreur lors de l'écriture du log: {e}")
-            self._file_handle = None
+            self._close_current_file()
+    
+    def _flush_file(self) -> None:
+        """Écrit le buffer du fichier de log sur disque, puis les entrées d'index correspondantes.
+        
+        Les logs en attente sont écrits en une seule fois sous le verrou du fichier ; leur
+        position est déduite de la taille du fichier juste après l'écriture, les écritures
+        des autres workers pouvant précéder celle-ci.
+        """
+        lines, entries = self._pending_lines, self._pending_index
+        self._pending_lines, self._pending_index = [], []
+        self._pending_records = 0
+        self._last_flush = time.monotonic()
+        if not lines or not self._file_handle:
+            return
+        data = b"".join(lines)
+        with self._exclusive():
+            self._write_all(data)
+            self._file_size = os.fstat(self._file_handle.fileno()).st_size
+            if self._index_handle:
+                offset = self._file_size - len(data)
+                index_lines = []
+                for entry in entries:
+                    entry[0] = offset
+                    offset += entry[1]
+                    index_lines.append(
+                        json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str) + "\n"
+                    )
+                self._index_handle.write("".join(index_lines))
+                self._index_handle.flush()
+    
+    def flush(self) -> None:
+        """Écrit les logs bufferisés sur disque."""
+        self.acquire()
+        try:
+            self._flush_file()
+        except IOError:
+            pass
+        finally:
+            self.release()
     
     def close(self) -> None:
         """Ferme le handler et libère les ressources."""
@@ -282,18 +425,14 @@ class DateRotatingFileHandler(BaseRotatingHandler):
         cutoff_date = date.today() - timedelta(days=self.retention_days)
         
         try:
-            for file_path in self.log_dir.glob("logs_*.json"):
+            for file_path in iter_log_files(self.log_dir):
                 # Extraire la date du nom de fichier
                 try:
-                    # Format: logs_YYYY-MM-DD.json ou logs_YYYY-MM-DD_HHMMSS.json
-                    filename = file_path.stem  # logs_2024-12-15 ou logs_2024-12-15_123045
-                    date_part = filename.split('_')[1]  # 2024-12-15 ou 2024-12-15_123045
-                    if '_' in date_part:
-                        date_part = date_part.split('_')[0]  # 2024-12-15
-                    file_date = datetime.strptime(date_part, "%Y-%m-%d").date()
+                    # Format: logs_YYYY-MM-DD.jsonl ou logs_YYYY-MM-DD_HHMMSS.jsonl (ou .json, ancien format)
+                    file_date = parse_log_file_date(file_path)
                     
                     if file_date < cutoff_date:
-                        file_path.unlink()
+                        remove_log_file(file_path)
                         deleted_count += 1
                 except (ValueError, IndexError):
                     # Nom de fichier invalide, ignorer
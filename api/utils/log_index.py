@@ -0,0 +1,284 @@
+"""Index des fichiers de logs JSONL (fichier annexe `.idx`).
+
+Pour chaque log écrit, DateRotatingFileHandler ajoute une ligne au fichier annexe
+`logs_YYYY-MM-DD.jsonl.idx` : `[offset, longueur, timestamp, level, logger, request_id,
+endpoint, job_id]`. LogService charge cet index (beaucoup plus petit que les logs) en mémoire,
+regroupe les offsets par valeur de champ et par heure, puis lit uniquement les lignes
+de la page demandée (seek + read).
+
+L'index en mémoire est mis à jour incrémentalement : seules les nouvelles lignes du
+fichier annexe sont lues, et les logs pas encore indexés (écritures en cours, fichier
+écrit avant l'existence de l'index) sont indexés en lisant la fin du fichier de logs.
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".idx"
+# Champs indexés (dans l'ordre des entrées d'index, après offset, longueur et timestamp)
+INDEXED_FIELDS: Tuple[str, ...] = ("level", "logger", "request_id", "endpoint", "job_id")
+# Buckets temporels : préfixe du timestamp ISO (YYYY-MM-DDTHH, un bucket par heure)
+TIME_BUCKET_CHARS = 13
+
+
+def index_path(log_path: Path) -> Path:
+    """Retourne le chemin du fichier d'index d'un fichier de logs JSONL."""
+    return log_path.with_name(log_path.name + INDEX_SUFFIX)
+
+
+def make_index_entry(offset: int, length: int, log_entry: Dict[str, Any]) -> List[Any]:
+    """Construit l'entrée d'index d'un log.
+
+    Args:
+        offset: Position (octets) de la ligne dans le fichier de logs.
+        length: Longueur (octets) de la ligne, saut de ligne compris.
+        log_entry: Log écrit.
+
+    Returns:
+        [offset, longueur, timestamp, level, logger, request_id, endpoint, job_id].
+    """
+    return [offset, length, log_entry.get("timestamp") or ""] + [log_entry.get(field) for field in INDEXED_FIELDS]
+
+
+class LogFileIndex:
+    """Index en mémoire d'un fichier de logs JSONL."""
+
+    def __init__(self, log_path: Path):
+        """
+        Args:
+            log_path: Chemin du fichier de logs JSONL.
+        """
+        self.log_path = log_path
+        self.index_path = index_path(log_path)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offsets: List[int] = []
+        self.lengths: List[int] = []
+        self.timestamps: List[str] = []
+        # champ -> valeur -> numéros d'entrées
+        self.postings: Dict[str, Dict[Optional[str], List[int]]] = {field: {} for field in INDEXED_FIELDS}
+        # heure (YYYY-MM-DDTHH) -> numéros d'entrées
+        self.buckets: Dict[str, List[int]] = {}
+        # Fin (octets) de la dernière ligne indexée du fichier de logs
+        self._indexed_end = 0
+        # Position lue dans le fichier d'index
+        self._index_pos = 0
+        self._file_id: Optional[Tuple[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _add(self, entry: Sequence[Any]) -> None:
+        """Ajoute une entrée d'index (voir make_index_entry)."""
+        offset, length, timestamp = int(entry[0]), int(entry[1]), str(entry[2] or "")
+        entry_id = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.timestamps.append(timestamp)
+        for field, value in zip(INDEXED_FIELDS, entry[3:]):
+            self.postings[field].setdefault(value if value is None else str(value), []).append(entry_id)
+        self.buckets.setdefault(timestamp[:TIME_BUCKET_CHARS], []).append(entry_id)
+        self._indexed_end = offset + length
+
+    def refresh(self) -> None:
+        """Indexe les logs écrits depuis le dernier appel."""
+        with self._lock:
+            try:
+                stat = os.stat(self.log_path)
+            except OSError:
+                self._reset()
+                return
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id or stat.st_size < self._indexed_end:
+                # Fichier remplacé ou tronqué : réindexer
+                self._reset()
+                self._file_id = file_id
+            self._read_index_file()
+            if stat.st_size > self._indexed_end:
+                self._scan_log_file()
+
+    def _read_index_file(self) -> None:
+        """Lit les nouvelles lignes complètes du fichier d'index."""
+        try:
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_pos)
+                data = f.read()
+        except OSError:
+            return
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, list) and len(entry) >= 3 and entry[0] >= self._indexed_end:
+                self._add(entry)
+        self._index_pos += end
+
+    def _scan_log_file(self) -> None:
+        """Indexe les lignes complètes du fichier de logs absentes du fichier d'index."""
+        offset = self._indexed_end
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        log_entry = json.loads(line)
+                    except ValueError:
+                        log_entry = None
+                    if isinstance(log_entry, dict):
+                        self._add(make_index_entry(offset, len(line), log_entry))
+                    offset += len(line)
+                    self._indexed_end = offset
+        except OSError as e:
+            logger.warning(f"Impossible d'indexer le fichier de log {self.log_path}: {e}")
+
+    def match(
+        self,
+        level: Optional[str] = None,
+        logger_name: Optional[str] = None,
+        request_id: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        job_id: Optional[str] = None
+    ) -> List[int]:
+        """Retourne les numéros d'entrées correspondant aux filtres (mêmes règles que LogService).
+
+        Args:
+            level: Niveau (égalité, insensible à la casse).
+            logger_name: Nom du logger (sous-chaîne, insensible à la casse).
+            request_id: ID de requête (égalité).
+            endpoint: Endpoint (sous-chaîne).
+            job_id: ID de job de génération (égalité).
+
+        Returns:
+            Numéros d'entrées, dans l'ordre du fichier.
+        """
+        with self._lock:
+            selections: List[Iterable[int]] = []
+            if level:
+                selections.append(self._union("level", lambda v: v.upper() == level.upper()))
+            if logger_name:
+                selections.append(self._union("logger", lambda v: logger_name.lower() in v.lower()))
+            if request_id:
+                selections.append(self.postings["request_id"].get(request_id, []))
+            if endpoint:
+                selections.append(self._union("endpoint", lambda v: endpoint in v))
+            if job_id:
+                selections.append(self.postings["job_id"].get(job_id, []))
+            if not selections:
+                return list(range(len(self.offsets)))
+            selections.sort(key=len)
+            matched = set(selections[0])
+            for ids in selections[1:]:
+                matched.intersection_update(ids)
+                if not matched:
+                    break
+            return sorted(matched)
+
+    def _union(self, field: str, predicate) -> List[int]:
+        """Union des entrées dont la valeur du champ vérifie le prédicat."""
+        ids: List[int] = []
+        for value, entry_ids in self.postings[field].items():
+            if value is not None and predicate(value):
+                ids.extend(entry_ids)
+        return ids
+
+    def read(self, entry_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Lit les logs de certaines entrées (accès direct par offset).
+
+        Args:
+            entry_ids: Numéros d'entrées.
+
+        Returns:
+            Logs, dans l'ordre de entry_ids (entrées illisibles omises).
+        """
+        logs: Dict[int, Dict[str, Any]] = {}
+        with open(self.log_path, "rb") as f:
+            # Lecture dans l'ordre du fichier, puis remise dans l'ordre demandé
+            for entry_id in sorted(set(entry_ids)):
+                f.seek(self.offsets[entry_id])
+                try:
+                    logs[entry_id] = json.loads(f.read(self.lengths[entry_id]))
+                except ValueError:
+                    continue
+        return [logs[entry_id] for entry_id in entry_ids if entry_id in logs]
+
+    def count_by(self, field: str, entry_ids: Optional[Sequence[int]] = None) -> Dict[Optional[str], int]:
+        """Compte les entrées par valeur d'un champ indexé.
+
+        Args:
+            field: Champ indexé (INDEXED_FIELDS).
+            entry_ids: Restreindre à ces entrées (toutes si None).
+        """
+        with self._lock:
+            if entry_ids is None:
+                return {value: len(ids) for value, ids in self.postings[field].items()}
+            wanted = set(entry_ids)
+            return {
+                value: count for value, ids in self.postings[field].items()
+                if (count := sum(1 for entry_id in ids if entry_id in wanted))
+            }
+
+    def bucket_items(self) -> List[Tuple[str, List[int]]]:
+        """Retourne les buckets horaires (heure, numéros d'entrées dans l'ordre du fichier)."""
+        with self._lock:
+            return [(bucket, ids) for bucket, ids in self.buckets.items()]
+
+    def count_by_day(self) -> Dict[str, int]:
+        """Compte les entrées par jour (YYYY-MM-DD) à partir des buckets horaires."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for bucket, ids in self.buckets.items():
+                day = bucket[:10]
+                if day:
+                    counts[day] = counts.get(day, 0) + len(ids)
+            return counts
+
+
+class LogIndexCache:
+    """Index en mémoire des fichiers de logs, partagés entre les instances de LogService."""
+
+    def __init__(self):
+        self._indexes: Dict[Path, LogFileIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, log_path: Path) -> LogFileIndex:
+        """Retourne l'index à jour d'un fichier de logs JSONL.
+
+        Args:
+            log_path: Chemin du fichier de logs.
+        """
+        key = Path(log_path).resolve()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = LogFileIndex(key)
+                self._indexes[key] = index
+        index.refresh()
+        return index
+
+    def discard(self, log_path: Path) -> None:
+        """Oublie l'index d'un fichier (supprimé)."""
+        with self._lock:
+            self._indexes.pop(Path(log_path).resolve(), None)
+
+
+# Instance globale (singleton)
+_log_index_cache: Optional[LogIndexCache] = None
+
+
+def get_log_index_cache() -> LogIndexCache:
+    """Récupère le cache singleton des index de logs."""
+    global _log_index_cache
+    if _log_index_cache is None:
+        _log_index_cache = LogIndexCache()
+    return _log_index_cache
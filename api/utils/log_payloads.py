@@ -0,0 +1,175 @@
+"""Stockage annexe des gros payloads de log (réponses brutes des LLM...).
+
+Les réponses brutes ne passent plus par le flux de logs principal : elles sont
+émises sur le logger `PAYLOAD_LOGGER_NAME` avec l'objet dans `extra={"payload": ...}`.
+Ce logger ne se propage pas au root ; son handler échantillonne les records
+(`sample_rate`) avant de les mettre en file, et le thread d'écriture sérialise le
+payload (JSON, tronqué à `max_payload_bytes`) dans `<LOG_DIR>/payloads/`, dont la
+taille totale est plafonnée (les fichiers les plus anciens sont supprimés).
+
+Usage (sans dépendance vers api/) :
+    logging.getLogger("payloads.llm").info(
+        "Réponse brute OpenAI", extra={"payload": response, "extra_fields": {"model": model}}
+    )
+"""
+import json
+import logging
+import random
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from api.utils.log_file_handler import DateRotatingFileHandler, iter_log_files, remove_log_file
+from api.utils.log_queue import QueuedLogHandler
+
+PAYLOAD_LOGGER_NAME = "payloads"
+PAYLOAD_DIR_NAME = "payloads"
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_MAX_PAYLOAD_BYTES = 64 * 1024
+DEFAULT_MAX_TOTAL_MB = 200
+# File dédiée : les payloads en excès sont abandonnés plutôt que de retarder les logs
+PAYLOAD_QUEUE_SIZE = 64
+
+
+def serialize_payload(payload: Any) -> str:
+    """Sérialise un payload en JSON (modèle Pydantic, dict, liste ou texte).
+
+    Args:
+        payload: Objet à sérialiser.
+
+    Returns:
+        Texte JSON (ou représentation textuelle si l'objet n'est pas sérialisable).
+    """
+    if isinstance(payload, str):
+        return payload
+    if hasattr(payload, "model_dump_json"):
+        try:
+            return payload.model_dump_json()
+        except Exception:
+            pass
+    try:
+        return json.dumps(payload, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return repr(payload)
+
+
+class SamplingFilter(logging.Filter):
+    """Ne laisse passer qu'une fraction des records (tirage aléatoire)."""
+
+    def __init__(self, sample_rate: float):
+        """
+        Args:
+            sample_rate: Fraction conservée (0 = aucun, 1 = tous).
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+
+class PayloadFileHandler(DateRotatingFileHandler):
+    """Handler JSONL des payloads : sérialisation tronquée et taille totale plafonnée."""
+
+    def __init__(
+        self,
+        payload_dir: str,
+        max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+        max_total_mb: int = DEFAULT_MAX_TOTAL_MB,
+        retention_days: int = 30
+    ):
+        """
+        Args:
+            payload_dir: Dossier des fichiers de payloads.
+            max_payload_bytes: Taille maximale d'un payload sérialisé (au-delà : tronqué).
+            max_total_mb: Taille totale maximale du dossier.
+            retention_days: Nombre de jours de rétention.
+        """
+        self.max_payload_bytes = max_payload_bytes
+        self.max_total_bytes = max_total_mb * 1024 * 1024
+        # Rotation intra-jour fréquente pour que le plafond s'applique dans la journée
+        super().__init__(
+            log_dir=payload_dir,
+            retention_days=retention_days,
+            max_file_size_mb=max(1, max_total_mb // 10),
+        )
+
+    def _open_file(self) -> None:
+        """Applique le plafond de taille avant d'ouvrir un nouveau fichier."""
+        self._enforce_total_size()
+        super()._open_file()
+
+    def _enforce_total_size(self) -> None:
+        """Supprime les fichiers les plus anciens tant que le dossier dépasse le plafond."""
+        if not self.log_dir.exists():
+            return
+        files = iter_log_files(self.log_dir)
+        sizes = {path: path.stat().st_size for path in files}
+        total = sum(sizes.values())
+        for path in files:
+            if total <= self.max_total_bytes:
+                break
+            if path == self.current_file_path:
+                continue
+            try:
+                remove_log_file(path)
+                total -= sizes[path]
+            except OSError:
+                continue
+
+    def _format_record(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Ajoute le payload sérialisé (tronqué) à l'entrée de log."""
+        log_data = super()._format_record(record)
+        if not hasattr(record, "payload"):
+            # Ex: récapitulatif des payloads abandonnés (file pleine)
+            return log_data
+        text = serialize_payload(getattr(record, "payload", None))
+        encoded = text.encode("utf-8")
+        log_data["payload_bytes"] = len(encoded)
+        if len(encoded) > self.max_payload_bytes:
+            text = encoded[:self.max_payload_bytes].decode("utf-8", errors="ignore")
+            log_data["truncated"] = True
+        log_data["payload"] = text
+        return log_data
+
+
+def configure_payload_store(
+    log_dir: str,
+    sample_rate: float = DEFAULT_SAMPLE_RATE,
+    max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+    max_total_mb: int = DEFAULT_MAX_TOTAL_MB,
+    retention_days: int = 30
+) -> Optional[QueuedLogHandler]:
+    """Branche le logger des payloads sur le stockage annexe.
+
+    Args:
+        log_dir: Dossier des logs (les payloads vont dans son sous-dossier `payloads/`).
+        sample_rate: Fraction des payloads conservés (0 = stockage désactivé).
+        max_payload_bytes: Taille maximale d'un payload sérialisé.
+        max_total_mb: Taille totale maximale du stockage.
+        retention_days: Nombre de jours de rétention.
+
+    Returns:
+        Handler installé, ou None si le stockage est désactivé.
+    """
+    payload_logger = logging.getLogger(PAYLOAD_LOGGER_NAME)
+    for handler in payload_logger.handlers[:]:
+        payload_logger.removeHandler(handler)
+        handler.close()
+    # Les payloads ne rejoignent jamais le flux de logs principal
+    payload_logger.propagate = False
+    if sample_rate <= 0:
+        payload_logger.setLevel(logging.CRITICAL + 1)
+        return None
+
+    payload_logger.setLevel(logging.DEBUG)
+    file_handler = PayloadFileHandler(
+        str(Path(log_dir) / PAYLOAD_DIR_NAME),
+        max_payload_bytes=max_payload_bytes,
+        max_total_mb=max_total_mb,
+        retention_days=retention_days,
+    )
+    queued_handler = QueuedLogHandler([file_handler], queue_size=PAYLOAD_QUEUE_SIZE, block_timeout=0, name="payloads")
+    queued_handler.addFilter(SamplingFilter(sample_rate))
+    payload_logger.addHandler(queued_handler)
+    return queued_handler
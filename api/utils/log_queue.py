@@ -0,0 +1,264 @@
+"""Pipeline de logging non bloquant : file bornée vidée par un thread d'écriture.
+
+Les loggers n'écrivent plus directement dans les handlers (console, fichier JSONL) :
+`QueuedLogHandler` dépose le record dans une file bornée et un thread d'arrière-plan
+le transmet aux handlers. Le formatage (message, JSON, traceback) est fait dans ce
+thread ; seuls les arguments mutables d'un message `%` sont formatés à l'émission,
+pour figer leur valeur.
+
+- Écritures par lots : le thread vide jusqu'à `batch_size` records d'un coup, puis
+  appelle flush() une seule fois par handler.
+- File pleine : un record INFO/DEBUG est abandonné ; un WARNING ou plus attend une
+  place au plus `block_timeout` secondes. Les débordements et abandons sont comptés
+  (get_stats, métriques Prometheus) et signalés par un WARNING dès que la file se vide.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    from prometheus_client import Counter, Gauge
+
+    _DROPPED = Counter("log_queue_dropped_total", "Logs abandonnés car la file d'écriture était pleine", ["level"])
+    _QUEUE_DEPTH = Gauge("log_queue_depth", "Logs en attente d'écriture", ["queue"])
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - prometheus_client est une dépendance de l'instrumentator
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+# Attente maximale d'une place dans la file pour un WARNING ou plus
+DEFAULT_BLOCK_TIMEOUT = 0.05
+# Attente maximale de flush() (vidage de la file)
+DEFAULT_FLUSH_TIMEOUT = 5.0
+
+# Arguments de message figés : formatage différé au thread d'écriture
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+_STOP = object()
+
+
+def _freeze_record(record: logging.LogRecord) -> None:
+    """Prépare un record pour un formatage différé dans un autre thread.
+
+    Le message n'est formaté immédiatement que si ses arguments sont mutables
+    (leur valeur pourrait changer avant l'écriture).
+    """
+    args = record.args
+    if not args:
+        return
+    values = args.values() if isinstance(args, dict) else args
+    if not all(isinstance(value, _IMMUTABLE_ARG_TYPES) for value in values):
+        record.msg = record.getMessage()
+        record.args = None
+
+
+class QueuedLogHandler(logging.Handler):
+    """Handler qui transmet les records à d'autres handlers via un thread d'écriture."""
+
+    def __init__(
+        self,
+        handlers: Sequence[logging.Handler],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+        name: str = "logs"
+    ):
+        """Initialise le handler et démarre le thread d'écriture.
+
+        Args:
+            handlers: Handlers de destination (appelés uniquement par le thread d'écriture).
+            queue_size: Nombre maximal de records en attente.
+            batch_size: Nombre maximal de records écrits par lot.
+            block_timeout: Attente maximale (s) d'une place pour un WARNING ou plus.
+            name: Nom de la file (thread, métriques).
+        """
+        super().__init__()
+        self.handlers: List[logging.Handler] = list(handlers)
+        self.queue_name = name
+        self.batch_size = max(1, batch_size)
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._enqueued = 0
+        self._dropped = 0
+        self._overflows = 0
+        self._reported_dropped = 0
+        self._batches = 0
+        self._written = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{name}", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Dépose le record dans la file (appelé sous le verrou du handler)."""
+        try:
+            if self._stopped:
+                # Thread arrêté (arrêt du processus) : écriture directe
+                self._dispatch(record)
+                return
+            _freeze_record(record)
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self._overflows += 1
+                if record.levelno < logging.WARNING or self.block_timeout <= 0:
+                    self._drop(record)
+                    return
+                try:
+                    self._queue.put(record, timeout=self.block_timeout)
+                except queue.Full:
+                    self._drop(record)
+                    return
+            self._enqueued += 1
+        except Exception:
+            self.handleError(record)
+
+    def _drop(self, record: logging.LogRecord) -> None:
+        """Compte un record abandonné (file pleine)."""
+        self._dropped += 1
+        if PROMETHEUS_AVAILABLE:
+            _DROPPED.labels(level=record.levelname).inc()
+
+    def _dispatch(self, record: logging.LogRecord) -> None:
+        """Transmet un record aux handlers de destination (selon leur niveau)."""
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _run(self) -> None:
+        """Boucle du thread d'écriture : vide la file par lots."""
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            flush_markers: List[threading.Event] = []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    flush_markers.append(item)
+                else:
+                    try:
+                        self._dispatch(item)
+                    except Exception:
+                        self.handleError(item)
+                    self._written += 1
+            self._report_dropped()
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    pass
+            self._batches += 1
+            if PROMETHEUS_AVAILABLE:
+                _QUEUE_DEPTH.labels(queue=self.queue_name).set(self._queue.qsize())
+            for marker in flush_markers:
+                marker.set()
+
+    def _report_dropped(self) -> None:
+        """Écrit un WARNING récapitulant les records abandonnés depuis le dernier rapport."""
+        dropped = self._dropped - self._reported_dropped
+        if dropped <= 0:
+            return
+        self._reported_dropped += dropped
+        record = logging.LogRecord(
+            name=__name__, level=logging.WARNING, pathname=__file__, lineno=0,
+            msg=f"{dropped} log(s) abandonné(s): file d'écriture '{self.queue_name}' pleine",
+            args=None, exc_info=None,
+        )
+        try:
+            self._dispatch(record)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+        """Attend que les records déjà en file soient écrits.
+
+        Args:
+            timeout: Attente maximale (s).
+        """
+        if self._stopped or not self._thread.is_alive() or threading.current_thread() is self._thread:
+            return
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return
+        marker.wait(timeout)
+
+    def stop(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+        """Écrit les records en attente puis arrête le thread d'écriture.
+
+        Args:
+            timeout: Attente maximale (s).
+        """
+        if self._stopped:
+            return
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                pass
+        self._stopped = True
+
+    def close(self) -> None:
+        """Arrête le thread d'écriture et ferme les handlers de destination."""
+        self.stop()
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs de la file (records en file, écrits, abandonnés...)."""
+        return {
+            "queue": self.queue_name,
+            "running": not self._stopped and self._thread.is_alive(),
+            "queued": self._queue.qsize(),
+            "max_queued": self._queue.maxsize,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "batches": self._batches,
+            "overflows": self._overflows,
+            "dropped": self._dropped,
+        }
+
+
+# Handler de la file principale (installé par setup_logging)
+_log_queue_handler: Optional[QueuedLogHandler] = None
+
+
+def get_log_queue_handler() -> Optional[QueuedLogHandler]:
+    """Récupère le handler de la file de logs principale (None si logging synchrone)."""
+    return _log_queue_handler
+
+
+def set_log_queue_handler(handler: Optional[QueuedLogHandler]) -> None:
+    """Remplace le handler de la file principale (l'ancien est arrêté).
+
+    Args:
+        handler: Nouveau handler (None pour revenir au logging synchrone).
+    """
+    global _log_queue_handler
+    previous = _log_queue_handler
+    _log_queue_handler = handler
+    if previous is not None and previous is not handler:
+        previous.stop()
+
+
+def flush_log_queue(timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+    """Attend l'écriture des logs en file (arrêt de l'application, tests).
+
+    Args:
+        timeout: Attente maximale (s).
+    """
+    if _log_queue_handler is not None:
+        _log_queue_handler.flush(timeout)
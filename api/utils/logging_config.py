@@ -25,7 +25,8 @@ class JSONFormatter(logging.Formatter):
             Chaîne JSON formatée.
         """
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
+            # Heure d'émission du record (pas celle de l'écriture par le thread de la file)
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat() + "Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -39,6 +40,8 @@ class JSONFormatter(logging.Formatter):
             log_data["request_id"] = record.request_id
         if hasattr(record, "user_id"):
             log_data["user_id"] = record.user_id
+        if hasattr(record, "job_id"):
+            log_data["job_id"] = record.job_id
         if hasattr(record, "endpoint"):
             log_data["endpoint"] = record.endpoint
         if hasattr(record, "method"):
@@ -181,11 +184,21 @@ def _min_level(*levels: str) -> str:
     return "INFO"
 
 
+def _env_flag(name: str, default: bool) -> bool:
+    """Lit une variable d'environnement booléenne (false/0/no/off = désactivé)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() not in ("false", "0", "no", "off")
+
+
 def setup_logging() -> None:
     """Configure le logging structuré pour l'API.
     
     Configure le format (JSON ou text) selon l'environnement et les variables
-    d'environnement. Ajoute également un handler de fichier si activé.
+    d'environnement. Ajoute également un handler de fichier si activé. Les handlers
+    sont appelés par le thread d'écriture de la file de logs (LOG_QUEUE_ENABLED) et
+    les réponses brutes des LLM vont dans le stockage annexe des payloads.
     """
     log_format = get_log_format()
     log_level = get_log_level()
@@ -206,16 +219,19 @@ def setup_logging() -> None:
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     console_handler.setLevel(getattr(logging, console_level))
+    handlers = [console_handler]
     
     # Configurer le root logger
     root_logger = logging.getLogger()
     # Le root doit accepter au moins les niveaux nécessaires aux handlers
     root_logger.setLevel(getattr(logging, _min_level(console_level, file_level)))
-    root_logger.handlers = []  # Nettoyer les handlers existants
-    root_logger.addHandler(console_handler)
     
     # Ajouter le handler de fichier si activé
-    log_file_enabled = os.getenv("LOG_FILE_ENABLED", "true").lower() not in ("false", "0", "no", "off")
+    log_file_enabled = _env_flag("LOG_FILE_ENABLED", True)
+    file_error = None
+    log_dir = None
+    retention_days = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+    log_queue_enabled = _env_flag("LOG_QUEUE_ENABLED", True)
     if log_file_enabled:
         try:
             from api.utils.log_file_handler import DateRotatingFileHandler
@@ -223,33 +239,63 @@ def setup_logging() -> None:
             
             # Configuration du dossier de logs
             log_dir = os.getenv("LOG_DIR", str(FilePaths.LOGS_DIR))
-            retention_days = int(os.getenv("LOG_RETENTION_DAYS", "30"))
             
             # Créer le handler de fichier (toujours en format JSON pour faciliter l'analyse)
             file_handler = DateRotatingFileHandler(
                 log_dir=log_dir,
                 retention_days=retention_days,
-                max_file_size_mb=int(os.getenv("LOG_MAX_FILE_SIZE_MB", "100"))
+                max_file_size_mb=int(os.getenv("LOG_MAX_FILE_SIZE_MB", "100")),
+                # Sans file, aucun thread ne vide le buffer entre deux logs : écriture à chaque log
+                flush_records=int(os.getenv("LOG_FILE_FLUSH_RECORDS", "64")) if log_queue_enabled else 1,
+                flush_interval=float(os.getenv("LOG_FILE_FLUSH_INTERVAL", "1.0"))
             )
             file_handler.setLevel(getattr(logging, file_level))
             # Utiliser JSONFormatter pour les fichiers (même si console est en texte)
             file_formatter = JSONFormatter()
             file_handler.setFormatter(file_formatter)
-            
-            root_logger.addHandler(file_handler)
-            
-            logger = logging.getLogger(__name__)
-            logger.info(
-                f"Logging fichier activé: dossier={log_dir}, rétention={retention_days} jours",
-                extra={"environment": environment}
-            )
+            handlers.append(file_handler)
         except Exception as e:
-            # En cas d'erreur, continuer avec console uniquement
-            logger = logging.getLogger(__name__)
-            logger.warning(
-                f"Impossible d'activer le logging fichier: {e}. Continuation avec console uniquement.",
-                extra={"environment": environment}
-            )
+            file_error = e
+            log_dir = None
+    
+    # Les handlers sont appelés par un thread d'écriture (file bornée) si activé
+    from api.utils.log_queue import QueuedLogHandler, set_log_queue_handler
+    root_logger.handlers = []  # Nettoyer les handlers existants
+    if log_queue_enabled:
+        queue_handler = QueuedLogHandler(
+            handlers,
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("LOG_QUEUE_BATCH_SIZE", "256"))
+        )
+        set_log_queue_handler(queue_handler)
+        root_logger.addHandler(queue_handler)
+    else:
+        set_log_queue_handler(None)
+        for handler in handlers:
+            root_logger.addHandler(handler)
+    
+    if log_dir is not None:
+        # Réponses brutes des LLM : stockage annexe échantillonné
+        from api.utils.log_payloads import configure_payload_store
+        configure_payload_store(
+            log_dir,
+            sample_rate=float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1")),
+            max_payload_bytes=int(os.getenv("LOG_PAYLOAD_MAX_BYTES", "65536")),
+            max_total_mb=int(os.getenv("LOG_PAYLOAD_MAX_TOTAL_MB", "200")),
+            retention_days=retention_days
+        )
+        logger = logging.getLogger(__name__)
+        logger.info(
+            f"Logging fichier activé: dossier={log_dir}, rétention={retention_days} jours",
+            extra={"environment": environment}
+        )
+    elif file_error is not None:
+        # En cas d'erreur, continuer avec console uniquement
+        logger = logging.getLogger(__name__)
+        logger.warning(
+            f"Impossible d'activer le logging fichier: {file_error}. Continuation avec console uniquement.",
+            extra={"environment": environment}
+        )
     
     # Réduire la verbosité de certains loggers spécifiques
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -280,7 +326,7 @@ def setup_logging() -> None:
     # Logger la configuration
     logger = logging.getLogger(__name__)
     logger.info(
-        f"Logging configuré: format={log_format}, level={log_level}, console={console_level}, file={file_level}, environment={environment}, fichier={'activé' if log_file_enabled else 'désactivé'}",
+        f"Logging configuré: format={log_format}, level={log_level}, console={console_level}, file={file_level}, environment={environment}, fichier={'activé' if log_dir is not None else 'désactivé'}, queue={'activée' if log_queue_enabled else 'désactivée'}",
         extra={"environment": environment}
     )
 
@@ -0,0 +1,393 @@
+"""Listes GDD pré-rendues : sérialisées une fois par génération du GDD.
+
+Les endpoints de liste (/context/characters, /locations, /items, /species,
+/communities) renvoient chaque élément complet. Plutôt que de construire un modèle
+Pydantic par élément à chaque requête, les éléments sont sérialisés une fois en JSON
+compact, concaténés dans un seul buffer, et les offsets de début de chaque élément sont
+conservés : une page est une tranche du buffer entourée de l'enveloppe de la réponse
+(total, page...). Les variantes gzip et brotli sont compressées à la première demande
+puis conservées jusqu'à la génération suivante.
+
+Une liste pré-rendue est liée à l'objet liste source et à la génération GDD courante
+(api.utils.data_versions) : un rechargement du GDD la reconstruit.
+
+Deux variantes allégées sont pré-rendues de la même façon : le résumé d'une catégorie
+(SUMMARY_FIELDS, textes tronqués) et les projections demandées via `fields=` (clés de
+premier niveau de `data`). L'élément complet se récupère ensuite via l'endpoint de
+détail (/context/characters/{name}...). Les clés de projection inconnues de la catégorie
+sont ignorées ; les variantes complète et résumé ne sont jamais évincées par les
+projections (LRU séparé).
+
+Le rendu initial d'une liste et la compression d'une page coûtent plusieurs centaines de
+millisecondes sur un GDD complet : les routes consultent d'abord le cache (peek,
+render_cached) et n'exécutent le rendu que dans un thread (asyncio.to_thread).
+"""
+import gzip
+import json
+import logging
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+ENCODING_IDENTITY = "identity"
+ENCODING_GZIP = "gzip"
+ENCODING_BROTLI = "br"
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+# Pages compressées conservées par liste
+MAX_COMPRESSED_PAGES = 256
+# Projections `fields=` pré-rendues conservées (toutes catégories ; les variantes complète et
+# résumé sont conservées à part)
+MAX_PRERENDERED_VARIANTS = 64
+
+VARIANT_FULL = "full"
+VARIANT_SUMMARY = "summary"
+
+# Champs de `data` conservés par le mode résumé (en plus du nom)
+SUMMARY_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "characters": ("Alias", "Type", "Espèce", "Occupation", "État", "Résumé"),
+    "locations": ("Catégorie", "Taille", "État", "Résumé"),
+    "items": ("Rareté", "Appartient à", "État", "Résumé"),
+    "species": ("Type", "Règne", "État", "Résumé IA"),
+    "communities": ("État", "Lieux de vie", "Résumé"),
+}
+# Longueur maximale des textes dans le mode résumé
+SUMMARY_TEXT_MAX_CHARS = 200
+
+
+def select_encoding(accept_encoding: Optional[str]) -> str:
+    """Choisit l'encodage de la réponse selon le header Accept-Encoding (brotli > gzip > aucun).
+
+    Args:
+        accept_encoding: Valeur du header Accept-Encoding.
+
+    Returns:
+        ENCODING_BROTLI, ENCODING_GZIP ou ENCODING_IDENTITY.
+    """
+    if not accept_encoding:
+        return ENCODING_IDENTITY
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if BROTLI_AVAILABLE and (ENCODING_BROTLI in accepted or "*" in accepted):
+        return ENCODING_BROTLI
+    if ENCODING_GZIP in accepted or "*" in accepted:
+        return ENCODING_GZIP
+    return ENCODING_IDENTITY
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    """Compresse un contenu selon l'encodage choisi."""
+    if encoding == ENCODING_BROTLI:
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    if encoding == ENCODING_GZIP:
+        return gzip.compress(content, compresslevel=GZIP_LEVEL)
+    return content
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Analyse le paramètre `fields` (clés séparées par des virgules).
+
+    Args:
+        fields: Valeur du paramètre de requête.
+
+    Returns:
+        Clés demandées (ordre et doublons normalisés), ou None si aucune.
+    """
+    if not fields:
+        return None
+    keys = sorted({key.strip() for key in fields.split(",") if key.strip()})
+    return tuple(keys) or None
+
+
+def project_element(
+    element: Dict[str, Any],
+    fields: Tuple[str, ...],
+    name_key: str = "Nom",
+    max_text_chars: Optional[int] = None
+) -> Dict[str, Any]:
+    """Restreint un élément GDD à certaines clés de premier niveau.
+
+    Args:
+        element: Élément GDD complet.
+        fields: Clés conservées (la clé du nom est toujours conservée).
+        name_key: Clé du nom de l'élément.
+        max_text_chars: Si fourni, les textes plus longs sont tronqués ("…").
+
+    Returns:
+        Élément projeté, dans l'ordre des clés de l'élément d'origine.
+    """
+    projected = {}
+    for key, value in element.items():
+        if key != name_key and key not in fields:
+            continue
+        if max_text_chars is not None and isinstance(value, str) and len(value) > max_text_chars:
+            value = value[:max_text_chars].rstrip() + "…"
+        projected[key] = value
+    return projected
+
+
+class PrerenderedList:
+    """Éléments d'une liste sérialisés en JSON compact, avec offsets de début par élément."""
+
+    def __init__(
+        self,
+        source: List[Dict[str, Any]],
+        generation: int,
+        name_key: str = "Nom",
+        project: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    ):
+        """
+        Args:
+            source: Éléments GDD (dict) de la catégorie.
+            generation: Génération GDD à laquelle appartient la liste.
+            name_key: Clé du nom de l'élément.
+            project: Transformation appliquée à `data` (résumé, projection). Si None,
+                l'élément complet est servi.
+        """
+        self.source = source
+        self.generation = generation
+        parts = [
+            json.dumps({"name": element.get(name_key, "Unknown"), "data": project(element) if project else element},
+                       ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            for element in source
+        ]
+        self._body = b",".join(parts)
+        # offsets[i] = début de l'élément i ; offsets[n] = fin du buffer + 1 (virgule virtuelle)
+        self._offsets: List[int] = [0]
+        for part in parts:
+            self._offsets.append(self._offsets[-1] + len(part) + 1)
+        self._compressed: LRUCache = LRUCache(maxsize=MAX_COMPRESSED_PAGES)
+        # Les pages sont compressées dans des threads et lues depuis la boucle d'événements
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """Nombre d'éléments."""
+        return len(self._offsets) - 1
+
+    @property
+    def size(self) -> int:
+        """Taille du buffer sérialisé (octets)."""
+        return len(self._body)
+
+    def slice(self, start: int, end: int) -> bytes:
+        """Retourne les éléments [start, end) sous forme JSON (sans crochets)."""
+        start = max(0, min(start, self.total))
+        end = max(start, min(end, self.total))
+        if start == end:
+            return b""
+        return self._body[self._offsets[start]:self._offsets[end] - 1]
+
+    def _frame(self, envelope_json: bytes, field_name: str, start: int, end: int) -> bytes:
+        """Insère les éléments [start, end) dans la liste vide de l'enveloppe sérialisée."""
+        marker = f'"{field_name}":[]'.encode("utf-8")
+        prefix, _, suffix = envelope_json.partition(marker)
+        return b"".join((prefix, f'"{field_name}":['.encode("utf-8"), self.slice(start, end), b"]", suffix))
+
+    def render_cached(
+        self, envelope: BaseModel, field_name: str, start: int, end: int, encoding: str
+    ) -> Optional[bytes]:
+        """Rend une réponse sans compresser : en identité ou depuis une page déjà compressée.
+
+        Args:
+            envelope: Modèle de réponse avec une liste vide dans field_name (porte total, page...).
+            field_name: Champ de la liste dans l'enveloppe (ex: "characters").
+            start: Premier élément.
+            end: Fin (exclue).
+            encoding: Encodage de la réponse.
+
+        Returns:
+            Corps de la réponse, ou None si la page doit d'abord être compressée (voir render).
+        """
+        envelope_json = envelope.model_dump_json().encode("utf-8")
+        if encoding == ENCODING_IDENTITY:
+            return self._frame(envelope_json, field_name, start, end)
+        with self._lock:
+            return self._compressed.get((envelope_json, start, end, encoding))
+
+    def render(self, envelope: BaseModel, field_name: str, start: int, end: int, encoding: str) -> bytes:
+        """Rend une réponse de liste complète (enveloppe + éléments [start, end)).
+
+        Args:
+            envelope: Modèle de réponse avec une liste vide dans field_name (porte total, page...).
+            field_name: Champ de la liste dans l'enveloppe (ex: "characters").
+            start: Premier élément.
+            end: Fin (exclue).
+            encoding: Encodage de la réponse.
+
+        Returns:
+            Corps de la réponse, compressé selon l'encodage.
+        """
+        cached = self.render_cached(envelope, field_name, start, end, encoding)
+        if cached is not None:
+            return cached
+        envelope_json = envelope.model_dump_json().encode("utf-8")
+        compressed = compress(self._frame(envelope_json, field_name, start, end), encoding)
+        with self._lock:
+            self._compressed[(envelope_json, start, end, encoding)] = compressed
+        return compressed
+
+
+class PrerenderedListCache:
+    """Listes pré-rendues par catégorie et variante, reconstruites quand la génération GDD change."""
+
+    def __init__(self, max_variants: int = MAX_PRERENDERED_VARIANTS):
+        """
+        Args:
+            max_variants: Nombre maximal de projections `fields=` conservées (toutes catégories).
+        """
+        # Variantes complète et résumé : au plus deux par catégorie, jamais évincées
+        self._lists: Dict[Tuple[str, str], PrerenderedList] = {}
+        self._projections: LRUCache = LRUCache(maxsize=max_variants)
+        # catégorie -> (liste source, génération, clés de premier niveau connues)
+        self._known_fields: Dict[str, Tuple[List[Dict[str, Any]], int, frozenset]] = {}
+        # _lock protège les caches (lus depuis la boucle d'événements) ; _build_lock évite que
+        # plusieurs threads rendent la même liste en parallèle
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def normalize_fields(
+        self, category: str, source: List[Dict[str, Any]], generation: int, fields: Optional[Tuple[str, ...]]
+    ) -> Optional[Tuple[str, ...]]:
+        """Restreint une projection aux clés présentes dans les éléments de la catégorie.
+
+        Args:
+            category: Nom de la catégorie (ex: "characters").
+            source: Liste des éléments actuellement servis par le ContextBuilder.
+            generation: Génération GDD courante.
+            fields: Clés demandées (voir parse_fields).
+
+        Returns:
+            Clés connues, triées (tuple vide si aucune n'est connue), ou None sans projection.
+        """
+        if fields is None:
+            return None
+        with self._lock:
+            known = self._known_fields.get(category)
+        if known is None or known[0] is not source or known[1] != generation:
+            keys = frozenset(key for element in source for key in element)
+            known = (source, generation, keys)
+            with self._lock:
+                self._known_fields[category] = known
+        return tuple(sorted(key for key in fields if key in known[2]))
+
+    @staticmethod
+    def _variant(
+        category: str, fields: Optional[Tuple[str, ...]], summary: bool
+    ) -> Tuple[str, Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]]:
+        """Retourne le nom de la variante et la projection appliquée aux éléments."""
+        if fields is not None:
+            return "fields:" + ",".join(fields), partial(project_element, fields=fields)
+        if summary:
+            return VARIANT_SUMMARY, partial(
+                project_element, fields=SUMMARY_FIELDS.get(category, ()), max_text_chars=SUMMARY_TEXT_MAX_CHARS
+            )
+        return VARIANT_FULL, None
+
+    def peek(
+        self,
+        category: str,
+        source: List[Dict[str, Any]],
+        generation: int,
+        fields: Optional[Tuple[str, ...]] = None,
+        summary: bool = False
+    ) -> Optional[PrerenderedList]:
+        """Retourne la liste pré-rendue si elle est à jour, sans jamais la rendre.
+
+        Args:
+            category: Nom de la catégorie (ex: "characters").
+            source: Liste des éléments actuellement servis par le ContextBuilder.
+            generation: Génération GDD courante.
+            fields: Clés de `data` à conserver (projection, voir normalize_fields). Prioritaire
+                sur summary.
+            summary: Si True, cherche la table résumée de la catégorie.
+
+        Returns:
+            La liste pré-rendue, ou None si elle doit être (re)construite (voir get).
+        """
+        variant, _ = self._variant(category, fields, summary)
+        with self._lock:
+            lists = self._lists if fields is None else self._projections
+            prerendered = lists.get((category, variant))
+        # La référence à la liste source empêche la réutilisation de son identité
+        if prerendered is None or prerendered.source is not source or prerendered.generation != generation:
+            return None
+        return prerendered
+
+    def get(
+        self,
+        category: str,
+        source: List[Dict[str, Any]],
+        generation: int,
+        fields: Optional[Tuple[str, ...]] = None,
+        summary: bool = False
+    ) -> PrerenderedList:
+        """Retourne la liste pré-rendue d'une catégorie (rendue au premier appel de la génération).
+
+        Le rendu est synchrone : depuis une route async, l'appeler via asyncio.to_thread
+        lorsque peek retourne None.
+
+        Args:
+            category: Nom de la catégorie (ex: "characters").
+            source: Liste des éléments actuellement servis par le ContextBuilder.
+            generation: Génération GDD courante.
+            fields: Clés de `data` à conserver (projection, voir normalize_fields). Prioritaire
+                sur summary.
+            summary: Si True, sert la table résumée de la catégorie (SUMMARY_FIELDS).
+        """
+        prerendered = self.peek(category, source, generation, fields=fields, summary=summary)
+        if prerendered is not None:
+            return prerendered
+        with self._build_lock:
+            prerendered = self.peek(category, source, generation, fields=fields, summary=summary)
+            if prerendered is not None:
+                return prerendered
+            variant, project = self._variant(category, fields, summary)
+            prerendered = PrerenderedList(source, generation, project=project)
+            with self._lock:
+                lists = self._lists if fields is None else self._projections
+                lists[(category, variant)] = prerendered
+        logger.info(
+            f"Liste GDD '{category}' ({variant}) pré-rendue: {prerendered.total} éléments, "
+            f"{prerendered.size / 1024:.0f} Kio (génération {generation})"
+        )
+        return prerendered
+
+    def get_state(self) -> Dict[str, Tuple[int, int]]:
+        """Retourne (éléments, octets) par catégorie et variante pré-rendues."""
+        with self._lock:
+            items = list(self._lists.items()) + list(self._projections.items())
+        return {
+            category if variant == VARIANT_FULL else f"{category}:{variant}": (lst.total, lst.size)
+            for (category, variant), lst in items
+        }
+
+
+# Instance globale (singleton)
+_prerendered_lists: Optional[PrerenderedListCache] = None
+
+
+def get_prerendered_lists() -> PrerenderedListCache:
+    """Récupère le cache singleton des listes GDD pré-rendues."""
+    global _prerendered_lists
+    if _prerendered_lists is None:
+        _prerendered_lists = PrerenderedListCache()
+    return _prerendered_lists
@@ -0,0 +1,294 @@
+"""Contrôle du retard des abonnés SSE lents (backpressure par connexion).
+
+Le serveur n'empile pas les frames d'un client lent : StreamingResponse attend que le
+transport ait accepté chaque frame avant de demander la suivante. Le retard d'un abonné
+se mesure donc dans le buffer d'événements du job, entre son curseur et la tête du flux.
+Au-delà d'un plafond (nombre d'événements ou octets en attente), une politique explicite
+s'applique :
+
+- coalesce : les chunks en attente sont fusionnés en une seule frame (les autres
+  événements sont conservés) ; le client rattrape le direct sans perdre de texte.
+- drop_chunks : le contenu des chunks en attente est abandonné (un chunk vide couvre la
+  plage de séquences sautée), les événements step/metadata/partial et l'événement final
+  (complete/error) sont conservés.
+- disconnect : la connexion est fermée (SlowConsumerError) ; EventSource se reconnecte
+  avec Last-Event-ID et rejoue le buffer du job.
+
+Seul le retard accumulé pendant le suivi en direct compte : le rejeu initial d'un
+abonné tardif ou d'une reconnexion n'est pas un symptôme de lenteur.
+"""
+import itertools
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    _SUBSCRIBERS = Gauge("sse_subscribers", "Connexions SSE ouvertes sur des jobs de génération")
+    _PENDING_BYTES = Gauge(
+        "sse_subscriber_pending_bytes", "Octets en attente d'envoi, toutes connexions SSE confondues"
+    )
+    _CONNECTION_PENDING_BYTES = Histogram(
+        "sse_subscriber_max_pending_bytes",
+        "Retard maximal (octets en attente) atteint par connexion SSE",
+        buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    )
+    _POLICY_ACTIONS = Counter(
+        "sse_slow_consumer_actions_total", "Politiques appliquées aux abonnés SSE lents", ["policy"]
+    )
+    _DROPPED_EVENTS = Counter(
+        "sse_slow_consumer_dropped_events_total",
+        "Événements non envoyés individuellement à un abonné lent (fusionnés ou abandonnés)",
+        ["policy"],
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - prometheus_client est une dépendance de l'instrumentator
+    PROMETHEUS_AVAILABLE = False
+
+POLICY_COALESCE = "coalesce"
+POLICY_DROP_CHUNKS = "drop_chunks"
+POLICY_DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (POLICY_COALESCE, POLICY_DROP_CHUNKS, POLICY_DISCONNECT)
+
+DEFAULT_MAX_PENDING_EVENTS = 256
+DEFAULT_MAX_PENDING_BYTES = 256 * 1024
+
+Event = Tuple[int, Dict[str, Any]]
+
+
+class SlowConsumerError(Exception):
+    """Levée quand un abonné trop lent doit être déconnecté (politique disconnect)."""
+
+    def __init__(self, pending_events: int, pending_bytes: int):
+        super().__init__(f"Abonné SSE trop lent: {pending_events} événements ({pending_bytes} octets) en attente")
+        self.pending_events = pending_events
+        self.pending_bytes = pending_bytes
+
+
+@dataclass
+class SSESubscriberStats:
+    """État d'une connexion SSE (retard courant et cumul des actions de la politique)."""
+
+    connection_id: int
+    job_id: str
+    pending_events: int = 0
+    pending_bytes: int = 0
+    max_pending_bytes: int = 0
+    sent_frames: int = 0
+    sent_bytes: int = 0
+    policy_actions: int = 0
+    dropped_events: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retourne l'état de la connexion sous forme sérialisable."""
+        return {
+            'connection_id': self.connection_id,
+            'job_id': self.job_id,
+            'pending_events': self.pending_events,
+            'pending_bytes': self.pending_bytes,
+            'max_pending_bytes': self.max_pending_bytes,
+            'sent_frames': self.sent_frames,
+            'sent_bytes': self.sent_bytes,
+            'policy_actions': self.policy_actions,
+            'dropped_events': self.dropped_events,
+        }
+
+
+@dataclass
+class SlowConsumerPolicy:
+    """Plafond de retard d'un abonné et politique appliquée au dépassement."""
+
+    policy: str = POLICY_COALESCE
+    max_pending_events: int = DEFAULT_MAX_PENDING_EVENTS
+    max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES
+    registry: Optional["SSESubscriberRegistry"] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.policy not in SLOW_CONSUMER_POLICIES:
+            logger.warning(f"Politique d'abonné lent inconnue '{self.policy}', utilisation de '{POLICY_COALESCE}'")
+            self.policy = POLICY_COALESCE
+
+    def exceeded(self, pending_events: int, pending_bytes: int) -> bool:
+        """Indique si le retard dépasse l'un des plafonds (0 = plafond désactivé)."""
+        return (
+            (self.max_pending_events > 0 and pending_events > self.max_pending_events)
+            or (self.max_pending_bytes > 0 and pending_bytes > self.max_pending_bytes)
+        )
+
+    def record_backlog(self, stats: Optional[SSESubscriberStats], pending_events: int, pending_bytes: int) -> None:
+        """Enregistre le retard courant d'une connexion."""
+        if stats is None:
+            return
+        if self.registry is not None:
+            self.registry.record_backlog(stats, pending_events, pending_bytes)
+        else:
+            stats.pending_events = pending_events
+            stats.pending_bytes = pending_bytes
+            stats.max_pending_bytes = max(stats.max_pending_bytes, pending_bytes)
+
+    def reduce(
+        self,
+        backlog: List[Event],
+        pending_bytes: int,
+        stats: Optional[SSESubscriberStats] = None,
+    ) -> List[Event]:
+        """Applique la politique au retard d'un abonné.
+
+        Args:
+            backlog: Événements en attente (séquence, payload), dans l'ordre.
+            pending_bytes: Taille des frames SSE en attente (octets).
+            stats: État de la connexion à mettre à jour.
+
+        Returns:
+            Événements à envoyer à la place du retard.
+
+        Raises:
+            SlowConsumerError: Politique disconnect.
+        """
+        if self.policy == POLICY_DISCONNECT:
+            self._record_action(stats, 0)
+            raise SlowConsumerError(len(backlog), pending_bytes)
+        if self.policy == POLICY_DROP_CHUNKS:
+            reduced = drop_chunks(backlog)
+        else:
+            reduced = coalesce_chunks(backlog)
+        self._record_action(stats, len(backlog) - len(reduced))
+        return reduced
+
+    def _record_action(self, stats: Optional[SSESubscriberStats], dropped: int) -> None:
+        if stats is not None:
+            stats.policy_actions += 1
+            stats.dropped_events += dropped
+            logger.debug(
+                f"Abonné SSE lent (job {stats.job_id}): politique {self.policy}, "
+                f"{stats.pending_events} événements / {stats.pending_bytes} octets en attente",
+                extra={'job_id': stats.job_id}
+            )
+        if PROMETHEUS_AVAILABLE:
+            _POLICY_ACTIONS.labels(policy=self.policy).inc()
+            if dropped:
+                _DROPPED_EVENTS.labels(policy=self.policy).inc(dropped)
+
+
+def coalesce_chunks(backlog: List[Event]) -> List[Event]:
+    """Fusionne les chunks consécutifs du retard en une frame par suite de chunks.
+
+    La frame fusionnée prend la séquence SSE du dernier chunk fusionné (la reprise via
+    Last-Event-ID continue après lui). Si les chunks sont numérotés, `sequence` est celle
+    du premier et `sequence_end` celle du dernier : le frontend considère la plage comme reçue.
+    """
+    reduced: List[Event] = []
+    for is_chunk, group in itertools.groupby(backlog, key=lambda event: event[1].get("type") == "chunk"):
+        events = list(group)
+        if not is_chunk or len(events) == 1:
+            reduced.extend(events)
+            continue
+        payload: Dict[str, Any] = {"type": "chunk", "content": "".join(p.get("content", "") for _, p in events)}
+        first, last = events[0][1], events[-1][1]
+        if "sequence" in first and "sequence" in last:
+            payload["sequence"] = first["sequence"]
+            payload["sequence_end"] = last["sequence"]
+        reduced.append((events[-1][0], payload))
+    return reduced
+
+
+def drop_chunks(backlog: List[Event]) -> List[Event]:
+    """Abandonne le contenu des chunks du retard et conserve tous les autres événements.
+
+    Chaque suite de chunks numérotés est remplacée par un chunk vide dont `sequence` et
+    `sequence_end` couvrent la plage abandonnée : le frontend, qui attend à chaque trou de
+    séquence, continue d'afficher les chunks suivants.
+    """
+    reduced: List[Event] = []
+    for is_chunk, group in itertools.groupby(backlog, key=lambda event: event[1].get("type") == "chunk"):
+        events = list(group)
+        if not is_chunk:
+            reduced.extend(events)
+            continue
+        first, last = events[0][1], events[-1][1]
+        if "sequence" in first and "sequence" in last:
+            placeholder = {"type": "chunk", "content": "", "sequence": first["sequence"], "sequence_end": last["sequence"]}
+            reduced.append((events[-1][0], placeholder))
+    return reduced
+
+
+class SSESubscriberRegistry:
+    """Registre des connexions SSE ouvertes et de leur retard (métriques par connexion)."""
+
+    def __init__(self):
+        self._connections: Dict[int, SSESubscriberStats] = {}
+        self._next_id = itertools.count(1)
+        self._pending_bytes_total = 0
+
+    def register(self, job_id: str) -> SSESubscriberStats:
+        """Enregistre une nouvelle connexion sur un job."""
+        stats = SSESubscriberStats(connection_id=next(self._next_id), job_id=job_id)
+        self._connections[stats.connection_id] = stats
+        if PROMETHEUS_AVAILABLE:
+            _SUBSCRIBERS.inc()
+        return stats
+
+    def unregister(self, stats: SSESubscriberStats) -> None:
+        """Retire une connexion fermée."""
+        if self._connections.pop(stats.connection_id, None) is None:
+            return
+        self._add_pending_bytes(-stats.pending_bytes)
+        if PROMETHEUS_AVAILABLE:
+            _SUBSCRIBERS.dec()
+            _CONNECTION_PENDING_BYTES.observe(stats.max_pending_bytes)
+
+    def record_backlog(self, stats: SSESubscriberStats, pending_events: int, pending_bytes: int) -> None:
+        """Met à jour le retard d'une connexion."""
+        if stats.connection_id in self._connections:
+            self._add_pending_bytes(pending_bytes - stats.pending_bytes)
+        stats.pending_events = pending_events
+        stats.pending_bytes = pending_bytes
+        stats.max_pending_bytes = max(stats.max_pending_bytes, pending_bytes)
+
+    def record_frame(self, stats: SSESubscriberStats, size: int) -> None:
+        """Comptabilise une frame envoyée."""
+        stats.sent_frames += 1
+        stats.sent_bytes += size
+
+    def _add_pending_bytes(self, delta: int) -> None:
+        self._pending_bytes_total += delta
+        if PROMETHEUS_AVAILABLE:
+            _PENDING_BYTES.set(self._pending_bytes_total)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Retourne le nombre de connexions, le retard total et le détail par connexion."""
+        return {
+            'subscribers': len(self._connections),
+            'pending_bytes': self._pending_bytes_total,
+            'connections': [stats.to_dict() for stats in self._connections.values()],
+        }
+
+
+# Instance globale (singleton)
+_subscriber_registry: Optional[SSESubscriberRegistry] = None
+
+
+def get_subscriber_registry() -> SSESubscriberRegistry:
+    """Récupère le registre singleton des connexions SSE."""
+    global _subscriber_registry
+    if _subscriber_registry is None:
+        _subscriber_registry = SSESubscriberRegistry()
+    return _subscriber_registry
+
+
+def get_slow_consumer_policy() -> SlowConsumerPolicy:
+    """Construit la politique d'abonné lent depuis l'environnement.
+
+    Variables : SSE_SLOW_CONSUMER_POLICY (coalesce, drop_chunks, disconnect),
+    SSE_SUBSCRIBER_MAX_PENDING_EVENTS et SSE_SUBSCRIBER_MAX_PENDING_BYTES (0 = sans plafond).
+    """
+    return SlowConsumerPolicy(
+        policy=os.getenv("SSE_SLOW_CONSUMER_POLICY", POLICY_COALESCE).strip().lower(),
+        max_pending_events=int(os.getenv("SSE_SUBSCRIBER_MAX_PENDING_EVENTS", str(DEFAULT_MAX_PENDING_EVENTS))),
+        max_pending_bytes=int(os.getenv("SSE_SUBSCRIBER_MAX_PENDING_BYTES", str(DEFAULT_MAX_PENDING_BYTES))),
+        registry=get_subscriber_registry(),
+    )
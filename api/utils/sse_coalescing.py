@@ -0,0 +1,105 @@
+"""Regroupement adaptatif des chunks SSE de génération.
+
+Le streaming LLM produit souvent un delta par token : émettre une frame SSE par delta
+multiplie les sérialisations JSON et les écritures réseau. Le coalesceur accumule les
+payloads "chunk" consécutifs et les publie en une seule frame dès que le texte en
+attente dépasse une taille (octets UTF-8) ou qu'un délai s'est écoulé depuis le premier
+delta en attente. Tout autre événement (step, metadata, partial, complete, error) vide
+d'abord le tampon puis est publié immédiatement, ce qui préserve l'ordre du flux.
+
+Les frames regroupées sont renumérotées (`sequence` consécutif à partir de 0) : le
+frontend réordonne les chunks par séquence et attend des numéros contigus.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COALESCE_INTERVAL_MS = 16.0
+DEFAULT_COALESCE_MAX_BYTES = 512
+
+
+class SSEChunkCoalescer:
+    """Regroupe les payloads "chunk" avant publication (flush sur taille ou délai)."""
+
+    def __init__(
+        self,
+        publish: Callable[[Dict[str, Any]], Any],
+        interval_ms: float = DEFAULT_COALESCE_INTERVAL_MS,
+        max_bytes: int = DEFAULT_COALESCE_MAX_BYTES,
+    ):
+        """
+        Args:
+            publish: Fonction de publication d'un payload (ex: JobEventBuffer.publish).
+            interval_ms: Délai maximal de rétention d'un delta (0 = pas de regroupement).
+            max_bytes: Taille de texte en attente déclenchant un flush immédiat.
+        """
+        self._publish = publish
+        self._interval = max(0.0, interval_ms) / 1000.0
+        self._max_bytes = max(1, max_bytes)
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._sequenced = False
+        self._next_sequence = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.received_chunks = 0
+        self.published_frames = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indique si le regroupement est actif."""
+        return self._interval > 0
+
+    def push(self, payload: Dict[str, Any]) -> None:
+        """Ajoute un payload au flux.
+
+        Args:
+            payload: Payload SSE ({"type": ..., ...}).
+        """
+        if payload.get("type") != "chunk":
+            self.flush()
+            self._emit(payload)
+            return
+
+        self.received_chunks += 1
+        if not self.enabled:
+            self._emit(payload)
+            return
+
+        content = payload.get("content", "")
+        self._pending.append(content)
+        self._pending_bytes += len(content.encode("utf-8"))
+        self._sequenced = self._sequenced or "sequence" in payload
+        if self._pending_bytes >= self._max_bytes:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._interval, self._on_timer)
+
+    def flush(self) -> None:
+        """Publie le texte en attente en une seule frame "chunk"."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        payload: Dict[str, Any] = {"type": "chunk", "content": "".join(self._pending)}
+        if self._sequenced:
+            payload["sequence"] = self._next_sequence
+            self._next_sequence += 1
+        self._pending = []
+        self._pending_bytes = 0
+        self._sequenced = False
+        self._emit(payload)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            # Buffer fermé entre-temps (job expiré) : rien à publier
+            logger.debug("Flush différé des chunks SSE ignoré", exc_info=True)
+
+    def _emit(self, payload: Dict[str, Any]) -> None:
+        self.published_frames += 1
+        self._publish(payload)
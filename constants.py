@@ -25,6 +25,7 @@ class FilePaths:
     DATA_DIR = Path("data")
     INTERACTIONS_DIR = DATA_DIR / "interactions"
     LLM_USAGE_DIR = DATA_DIR / "llm_usage"
+    LLM_USAGE_DB_FILE = DATA_DIR / "llm_usage.db"
     COST_BUDGETS_FILE = DATA_DIR / "cost_budgets.json"
     LOGS_DIR = DATA_DIR / "logs"
     LLM_CONFIG = "llm_config.json"
@@ -78,5 +79,15 @@ class Defaults:
     # Valeur par défaut pour max_completion_tokens (quand None)
     DEFAULT_MAX_COMPLETION_TOKENS = 5000  # Valeur par défaut pour la génération de dialogues
 
+class LLMPriority:
+    """Classes de priorité des appels LLM (scheduler).
+    
+    INTERACTIVE: génération déclenchée par l'utilisateur dans l'éditeur (latence prioritaire).
+    BATCH: génération en masse (ex: generate_all_choices), servie avec le débit restant.
+    """
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+    ALL = [INTERACTIVE, BATCH]
+
 class ConfigFiles:
     pass  # Placeholder for future config file constants if needed 
\ No newline at end of file
@@ -223,6 +223,15 @@ class ContextBuilder:
         """Compte les tokens (délègue à ContextTruncator)."""
         return self._context_truncator.count_tokens(text)
 
+    def _record_gdd_generation(self) -> None:
+        """Signale un chargement du GDD au registre des versions (clés et ETags du cache HTTP)."""
+        try:
+            from api.utils.data_versions import get_data_versions
+        except ImportError:
+            return
+        loaded_files = getattr(self._gdd_loader, "loaded_files", None)
+        get_data_versions().bump_gdd_generation(loaded_files if isinstance(loaded_files, list) else [])
+    
     def load_gdd_files(self):
         """Charge les fichiers JSON du GDD depuis les chemins relatifs au projet.
         
@@ -231,6 +240,7 @@ class ContextBuilder:
         """
         # Charger via GDDLoader
         self._gdd_data = self._gdd_loader.load_all()
+        self._record_gdd_generation()
         
         # Initialiser ElementRepository si nécessaire
         if self._element_repository is None:
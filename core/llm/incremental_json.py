@@ -0,0 +1,376 @@
+"""Parsing JSON incrémental des sorties structurées streamées.
+
+En streaming, les arguments du function call (structured output) arrivent par
+fragments. `IncrementalJSONParser` consomme ces fragments et signale chaque
+valeur JSON dès qu'elle est complète, avec son chemin (ex: ("node", "choices", 0)).
+`PartialResponseParser` s'appuie dessus pour émettre les champs d'un modèle
+Pydantic (ex: UnityDialogueGenerationResponse) au fil de l'eau et détecter une
+violation de schéma sans attendre la fin de la génération.
+"""
+import json
+import logging
+import types
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
+
+JSONPath = Tuple[Union[str, int], ...]
+
+# États du parser
+_EXPECT_VALUE = "expect_value"
+_EXPECT_KEY_OR_END = "expect_key_or_end"
+_EXPECT_KEY = "expect_key"
+_EXPECT_COLON = "expect_colon"
+_EXPECT_COMMA_OR_END = "expect_comma_or_end"
+_IN_STRING = "in_string"
+_IN_SCALAR = "in_scalar"
+_DONE = "done"
+
+_WHITESPACE = " \t\n\r"
+# Tolère les caractères de contrôle bruts dans les chaînes (ex: retours à la ligne non échappés)
+_DECODER = json.JSONDecoder(strict=False)
+_SCALAR_CHARS = set("0123456789+-.eEtruefalsn")
+
+
+class JSONStreamError(ValueError):
+    """JSON invalide détecté pendant le parsing incrémental.
+
+    Attributes:
+        completed: Valeurs complétées par le fragment avant l'erreur.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.completed: List[Tuple[JSONPath, Any]] = []
+
+
+class StructuredOutputViolation(ValueError):
+    """Valeur complète ne respectant pas le schéma du modèle attendu.
+
+    Attributes:
+        path: Chemin JSON de la valeur fautive (format "node.choices[0]").
+    """
+
+    def __init__(self, path: str, message: str):
+        super().__init__(f"{path}: {message}" if path else message)
+        self.path = path
+
+
+def format_path(path: JSONPath) -> str:
+    """Formate un chemin JSON en notation pointée (ex: "node.choices[0].text")."""
+    formatted = ""
+    for part in path:
+        if isinstance(part, int):
+            formatted += f"[{part}]"
+        else:
+            formatted += f".{part}" if formatted else part
+    return formatted
+
+
+class _Frame:
+    __slots__ = ("container", "key")
+
+    def __init__(self, container: Union[Dict[str, Any], List[Any]]):
+        self.container = container
+        self.key: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """Parser JSON alimenté par fragments, signalant chaque valeur complète.
+
+    Chaque appel à feed() retourne la liste des (chemin, valeur) complétés par le
+    fragment, dans l'ordre de complétion (enfants avant parents).
+    """
+
+    def __init__(self):
+        """Initialise le parser."""
+        self._stack: List[_Frame] = []
+        self._state = _EXPECT_VALUE
+        self._buffer: List[str] = []
+        self._string_is_key = False
+        self._escaped = False
+        self._position = 0
+        self.root: Any = None
+
+    @property
+    def done(self) -> bool:
+        """Indique si la valeur racine est complète."""
+        return self._state == _DONE
+
+    def feed(self, fragment: str) -> List[Tuple[JSONPath, Any]]:
+        """Consomme un fragment de texte JSON.
+
+        Args:
+            fragment: Suite du document JSON.
+
+        Returns:
+            Liste des valeurs complétées par ce fragment, avec leur chemin.
+
+        Raises:
+            JSONStreamError: Si le fragment rend le document invalide.
+        """
+        completed: List[Tuple[JSONPath, Any]] = []
+        try:
+            for char in fragment:
+                self._consume(char, completed)
+                self._position += 1
+        except JSONStreamError as e:
+            e.completed = completed
+            raise
+        return completed
+
+    def _error(self, message: str) -> JSONStreamError:
+        return JSONStreamError(f"JSON invalide à la position {self._position}: {message}")
+
+    def _consume(self, char: str, completed: List[Tuple[JSONPath, Any]]) -> None:
+        state = self._state
+        if state == _IN_STRING:
+            if self._escaped:
+                self._escaped = False
+                self._buffer.append(char)
+            elif char == "\\":
+                self._escaped = True
+                self._buffer.append(char)
+            elif char == '"':
+                self._end_string(completed)
+            else:
+                self._buffer.append(char)
+            return
+
+        if state == _IN_SCALAR:
+            if char in _SCALAR_CHARS:
+                self._buffer.append(char)
+                return
+            self._end_scalar(completed)
+            state = self._state
+
+        if char in _WHITESPACE:
+            return
+
+        if state == _EXPECT_VALUE:
+            if char == "]" and self._stack and self._stack[-1].container == []:
+                # Tableau vide : "[" suivi directement de "]"
+                self._close_container(completed)
+            else:
+                self._start_value(char)
+        elif state in (_EXPECT_KEY_OR_END, _EXPECT_KEY):
+            if char == '"':
+                self._state = _IN_STRING
+                self._string_is_key = True
+                self._buffer = []
+            elif char == "}" and state == _EXPECT_KEY_OR_END:
+                self._close_container(completed)
+            else:
+                raise self._error(f"clé attendue, reçu {char!r}")
+        elif state == _EXPECT_COLON:
+            if char != ":":
+                raise self._error(f"':' attendu, reçu {char!r}")
+            self._state = _EXPECT_VALUE
+        elif state == _EXPECT_COMMA_OR_END:
+            frame = self._stack[-1]
+            is_object = isinstance(frame.container, dict)
+            if char == ",":
+                self._state = _EXPECT_KEY if is_object else _EXPECT_VALUE
+            elif (char == "}" and is_object) or (char == "]" and not is_object):
+                self._close_container(completed)
+            else:
+                raise self._error(f"',' ou fin de conteneur attendu, reçu {char!r}")
+        else:
+            raise self._error(f"contenu après la fin du document: {char!r}")
+
+    def _start_value(self, char: str) -> None:
+        if char == "{":
+            self._stack.append(_Frame({}))
+            self._state = _EXPECT_KEY_OR_END
+        elif char == "[":
+            self._stack.append(_Frame([]))
+            self._state = _EXPECT_VALUE
+        elif char == '"':
+            self._state = _IN_STRING
+            self._string_is_key = False
+            self._buffer = []
+        elif char in _SCALAR_CHARS:
+            self._state = _IN_SCALAR
+            self._buffer = [char]
+        else:
+            raise self._error(f"valeur attendue, reçu {char!r}")
+
+    def _end_string(self, completed: List[Tuple[JSONPath, Any]]) -> None:
+        raw = "".join(self._buffer)
+        try:
+            value = _DECODER.decode(f'"{raw}"')
+        except json.JSONDecodeError as e:
+            raise self._error(f"chaîne invalide ({e.msg})") from e
+        if self._string_is_key:
+            self._stack[-1].key = value
+            self._state = _EXPECT_COLON
+        else:
+            self._complete(value, completed)
+
+    def _end_scalar(self, completed: List[Tuple[JSONPath, Any]]) -> None:
+        raw = "".join(self._buffer)
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise self._error(f"valeur invalide {raw!r}") from e
+        self._complete(value, completed)
+
+    def _close_container(self, completed: List[Tuple[JSONPath, Any]]) -> None:
+        frame = self._stack.pop()
+        self._complete(frame.container, completed)
+
+    def _current_path(self) -> JSONPath:
+        path: List[Union[str, int]] = []
+        for frame in self._stack:
+            if isinstance(frame.container, dict):
+                path.append(frame.key)
+            else:
+                path.append(len(frame.container))
+        return tuple(path)
+
+    def _complete(self, value: Any, completed: List[Tuple[JSONPath, Any]]) -> None:
+        completed.append((self._current_path(), value))
+        if not self._stack:
+            self.root = value
+            self._state = _DONE
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+        self._state = _EXPECT_COMMA_OR_END
+
+
+@dataclass
+class PartialField:
+    """Champ de la sortie structurée complété pendant le streaming.
+
+    Attributes:
+        path: Chemin du champ en notation pointée (ex: "node.line", "node.choices[1]").
+        value: Valeur JSON validée contre le schéma.
+    """
+    path: str
+    value: Any
+
+
+class PartialResponseParser:
+    """Émet les champs d'un modèle Pydantic au fil d'une sortie structurée streamée.
+
+    Unité d'émission : chaque champ scalaire des sous-modèles (ex: "title",
+    "node.speaker", "node.line") et chaque élément d'une liste de sous-modèles
+    (ex: "node.choices[0]", validé comme un choix complet). Chaque valeur émise
+    est validée contre l'annotation du champ ; une incohérence lève
+    StructuredOutputViolation immédiatement.
+    """
+
+    def __init__(self, response_model: Type[BaseModel]):
+        """Initialise le parser pour un modèle de réponse.
+
+        Args:
+            response_model: Modèle Pydantic attendu (ex: UnityDialogueGenerationResponse).
+        """
+        self.response_model = response_model
+        self._json = IncrementalJSONParser()
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    def feed(self, fragment: str) -> List[PartialField]:
+        """Consomme un fragment des arguments du function call.
+
+        Args:
+            fragment: Delta de `response.function_call_arguments.delta`.
+
+        Returns:
+            Champs complétés et validés par ce fragment.
+
+        Raises:
+            StructuredOutputViolation: JSON invalide ou valeur hors schéma.
+        """
+        syntax_error: Optional[JSONStreamError] = None
+        try:
+            completed = self._json.feed(fragment)
+        except JSONStreamError as e:
+            # Les valeurs complétées avant l'erreur sont validées d'abord (erreur plus précise)
+            syntax_error, completed = e, e.completed
+        fields: List[PartialField] = []
+        for path, value in completed:
+            field = self._check(path, value)
+            if field is not None:
+                fields.append(field)
+        if syntax_error is not None:
+            raise StructuredOutputViolation("", str(syntax_error)) from syntax_error
+        return fields
+
+    def _adapter(self, annotation: Any) -> TypeAdapter:
+        adapter = self._adapters.get(annotation)
+        if adapter is None:
+            adapter = TypeAdapter(annotation)
+            self._adapters[annotation] = adapter
+        return adapter
+
+    def _check(self, path: JSONPath, value: Any) -> Optional[PartialField]:
+        """Valide une valeur complète et retourne le champ à émettre (ou None)."""
+        annotation: Any = self.response_model
+        for index, part in enumerate(path):
+            model = _model_type(annotation)
+            item_type = _list_item_type(annotation)
+            if model is not None and isinstance(part, str):
+                field_info = model.model_fields.get(part)
+                if field_info is None:
+                    # Champ inconnu : ignoré par le modèle (extra ignoré par défaut)
+                    return None
+                annotation = field_info.annotation
+            elif item_type is not None and isinstance(part, int):
+                annotation = item_type
+                if _model_type(item_type) is not None:
+                    # Un élément de liste de sous-modèles est émis en entier
+                    if index < len(path) - 1:
+                        return None
+            elif isinstance(part, int) and _model_type(annotation) is not None:
+                raise StructuredOutputViolation(
+                    format_path(path[:index]), "objet attendu, tableau reçu"
+                )
+            else:
+                # Intérieur d'une valeur libre (dict, liste de scalaires) : émise avec son parent
+                return None
+        if not path:
+            return None
+        # Sous-modèles et listes de sous-modèles : validés ici, mais déjà émis
+        # champ par champ (ou élément par élément)
+        emit = not (
+            (_model_type(annotation) is not None and not isinstance(path[-1], int))
+            or _model_type(_list_item_type(annotation)) is not None
+        )
+        try:
+            self._adapter(annotation).validate_python(value)
+        except ValidationError as e:
+            message = "; ".join(error["msg"] for error in e.errors()[:3])
+            raise StructuredOutputViolation(format_path(path), message) from e
+        return PartialField(path=format_path(path), value=value) if emit else None
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    origin = get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _model_type(annotation: Any) -> Optional[Type[BaseModel]]:
+    annotation = _unwrap_optional(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _list_item_type(annotation: Any) -> Optional[Any]:
+    annotation = _unwrap_optional(annotation)
+    if get_origin(annotation) in (list, List):
+        args = get_args(annotation)
+        return args[0] if args else Any
+    return None
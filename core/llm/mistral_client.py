@@ -1,5 +1,6 @@
 # DialogueGenerator/core/llm/mistral_client.py
 import asyncio
+import contextlib
 import json
 import logging
 import os
@@ -10,8 +11,20 @@ from mistralai import Mistral
 from mistralai.models import SDKError, ChatCompletionResponse
 
 from core.llm.llm_client import ILLMClient
+from constants import LLMPriority
 
 logger = logging.getLogger(__name__)
+# Réponses brutes (stockage annexe échantillonné, voir api.utils.log_payloads)
+payload_logger = logging.getLogger("payloads.llm")
+
+
+def _is_first_token_chunk(chunk: Any) -> bool:
+    """Indique si un chunk de stream Mistral porte du contenu (ou termine la réponse)."""
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return False
+    delta = getattr(choices[0], "delta", None)
+    return bool(getattr(delta, "content", None)) or getattr(choices[0], "finish_reason", None) is not None
 
 
 class MistralClient(ILLMClient):
@@ -66,6 +79,28 @@ class MistralClient(ILLMClient):
         self.reasoning_callback = reasoning_callback
         self.reasoning_trace: Optional[Dict[str, Any]] = None
 
+        # Estimation des tokens du prompt (BuiltPrompt.token_count), renseignée par l'orchestrateur
+        self.estimated_prompt_tokens: Optional[int] = None
+        # Classe de priorité des appels (LLMPriority), déclarée par l'orchestrateur ou le service de graphe
+        self.priority: str = LLMPriority.INTERACTIVE
+
+        # Scheduler et hedging des appels LLM (optionnels)
+        self._scheduler = None
+        self._estimate_request_tokens = None
+        self._hedging = None
+        try:
+            from api.utils.llm_scheduler import get_llm_scheduler, estimate_request_tokens, rate_limits_from_config
+            from api.utils.llm_hedging import get_llm_hedging_policy
+            self._scheduler = get_llm_scheduler()
+            self._estimate_request_tokens = estimate_request_tokens
+            self._hedging = get_llm_hedging_policy()
+            if self._scheduler:
+                limits = rate_limits_from_config(self.llm_config.get("rate_limits"))
+                if limits:
+                    self._scheduler.configure_model(self.model_name, limits)
+        except (ImportError, AttributeError):
+            logger.debug("Modules scheduler/hedging non disponibles. Continuation sans ordonnancement des appels.")
+
         logger.info(f"MistralClient initialisé avec le modèle: {self.model_name}, API Key présente: {'Oui' if api_key else 'Non'}.")
         logger.info(f"System prompt template utilisé: '{self.system_prompt_template}'")
 
@@ -154,21 +189,14 @@ class MistralClient(ILLMClient):
 
                 # Streaming
                 if stream:
-                    accumulated_content = ""
-                    response_stream = await self.client.chat.stream_async(**chat_params)
-                    
-                    async for chunk in response_stream:
-                        if chunk.choices and chunk.choices[0].delta:
-                            delta_content = getattr(chunk.choices[0].delta, "content", None)
-                            if delta_content:
-                                accumulated_content += delta_content
+                    accumulated_content = await self._stream_content(chat_params, messages)
                     
                     generated_results.append(accumulated_content)
                     logger.info(f"Variante {i+1} générée avec succès (streaming).")
                     success = True
                 else:
                     # Appel API sans streaming
-                    response: ChatCompletionResponse = await self.client.chat.complete_async(**chat_params)
+                    response: ChatCompletionResponse = await self._complete(chat_params, messages)
 
                     # Extraire les métriques d'utilisation
                     if hasattr(response, 'usage') and response.usage:
@@ -176,7 +204,12 @@ class MistralClient(ILLMClient):
                         completion_tokens = getattr(response.usage, "completion_tokens", 0) or 0
                         total_tokens = getattr(response.usage, "total_tokens", 0) or 0
 
-                    logger.debug(f"Réponse brute de l'API Mistral pour la variante {i+1}:\n{response}")
+                    payload_logger.info(
+                        "Réponse brute Mistral",
+                        extra={"payload": response, "extra_fields": {
+                            "kind": "mistral_response", "model": self.model_name, "variant": i + 1
+                        }}
+                    )
 
                     # Parsing de la réponse
                     if response_model and response.choices and response.choices[0].message.tool_calls:
@@ -287,6 +320,193 @@ class MistralClient(ILLMClient):
 
         return generated_results
 
+    async def _complete(self, chat_params: Dict[str, Any], messages: List[Dict[str, Any]]) -> ChatCompletionResponse:
+        """Appel sans streaming, dupliqué si la réponse dépasse le délai de hedge.
+
+        Args:
+            chat_params: Paramètres de chat.complete_async.
+            messages: Messages envoyés à Mistral (pour estimer les tokens si besoin).
+
+        Returns:
+            Réponse Mistral de l'appel ayant abouti en premier.
+        """
+        if not self._hedging:
+            return await self._complete_once(chat_params, messages)
+        from api.utils.llm_hedging import LATENCY_RESPONSE
+        response, outcome = await self._hedging.run(
+            self.model_name,
+            LATENCY_RESPONSE,
+            lambda ticket: self._complete_once(chat_params, messages, ticket.permit if ticket else None),
+            priority=self.priority,
+            scheduler=self._scheduler,
+            estimated_tokens=self._scheduler_tokens(messages),
+        )
+        self._track_hedge_usage(outcome, messages)
+        return response
+
+    async def _complete_once(
+        self,
+        chat_params: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+        permit: Optional[Any] = None,
+    ) -> ChatCompletionResponse:
+        """Appel sans streaming sous un slot du scheduler (ou sous `permit` pour un hedge)."""
+        if permit is not None:
+            try:
+                response = await self.client.chat.complete_async(**chat_params)
+            except BaseException as e:
+                permit.release(e)
+                raise
+            if getattr(response, "usage", None):
+                permit.set_actual_tokens(getattr(response.usage, "total_tokens", None))
+            permit.release()
+            return response
+        async with self._scheduler_slot(messages) as permit:
+            response = await self.client.chat.complete_async(**chat_params)
+            if permit and getattr(response, "usage", None):
+                permit.set_actual_tokens(getattr(response.usage, "total_tokens", None))
+        return response
+
+    async def _stream_content(self, chat_params: Dict[str, Any], messages: List[Dict[str, Any]]) -> str:
+        """Appel en streaming, dupliqué si le premier token dépasse le délai de hedge.
+
+        Args:
+            chat_params: Paramètres de chat.stream_async.
+            messages: Messages envoyés à Mistral (pour estimer les tokens si besoin).
+
+        Returns:
+            Contenu texte accumulé.
+        """
+        if not self._hedging:
+            async with self._scheduler_slot(messages) as permit:
+                response_stream = await self.client.chat.stream_async(**chat_params)
+                return await self._accumulate_stream(response_stream, permit)
+
+        from api.utils.llm_hedging import LATENCY_FIRST_TOKEN, PeekedStream, peek_first_token
+
+        async def _call(ticket: Optional[Any]) -> PeekedStream:
+            hedge_permit = ticket.permit if ticket else None
+            try:
+                response_stream = await self.client.chat.stream_async(**chat_params)
+                peeked = await peek_first_token(response_stream, _is_first_token_chunk)
+            except BaseException as e:
+                if hedge_permit:
+                    hedge_permit.release(e)
+                raise
+            peeked.permit = hedge_permit
+            return peeked
+
+        async def _discard(peeked: PeekedStream) -> None:
+            await peeked.close()
+            if peeked.permit:
+                peeked.permit.release(asyncio.CancelledError())
+
+        # Le slot est conservé pendant toute la consommation du stream
+        permit = None
+        error: Optional[BaseException] = None
+        try:
+            if self._scheduler:
+                permit = await self._scheduler.acquire(self.model_name, self._scheduler_tokens(messages), self.priority)
+            response_stream, outcome = await self._hedging.run(
+                self.model_name,
+                LATENCY_FIRST_TOKEN,
+                _call,
+                priority=self.priority,
+                scheduler=self._scheduler,
+                estimated_tokens=self._scheduler_tokens(messages),
+                discard=_discard,
+            )
+            self._track_hedge_usage(outcome, messages)
+            if outcome.hedge_won:
+                # Le stream du hedge continue sous son propre slot
+                if permit:
+                    permit.release(asyncio.CancelledError())
+                permit = response_stream.permit
+            return await self._accumulate_stream(response_stream, permit)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if permit:
+                permit.release(error)
+
+    async def _accumulate_stream(self, response_stream: Any, permit: Optional[Any]) -> str:
+        """Accumule le contenu texte d'un stream Mistral."""
+        accumulated_content = ""
+        async for chunk in response_stream:
+            if chunk.choices and chunk.choices[0].delta:
+                delta_content = getattr(chunk.choices[0].delta, "content", None)
+                if delta_content:
+                    if permit:
+                        permit.mark_first_token()
+                    accumulated_content += delta_content
+        return accumulated_content
+
+    def _track_hedge_usage(self, outcome: Any, messages: List[Dict[str, Any]]) -> None:
+        """Enregistre l'appel perdant d'un hedge, comptabilisé à part (is_hedge=True).
+
+        Un appel annulé en cours de route n'a pas d'usage connu : ses tokens de prompt
+        (facturés) sont estimés.
+
+        Args:
+            outcome: Résultat de la course primaire/hedge.
+            messages: Messages de l'appel dupliqué.
+        """
+        if not self.usage_service or not outcome.hedged:
+            return
+        loser = outcome.loser_result
+        usage = getattr(loser, "usage", None)
+        if usage:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            total_tokens = getattr(usage, "total_tokens", 0) or 0
+        else:
+            prompt_tokens = self._estimated_prompt_tokens(messages)
+            completion_tokens = 0
+            total_tokens = prompt_tokens
+        try:
+            self.usage_service.track_usage(
+                request_id=self.request_id,
+                model_name=self.model_name,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                duration_ms=int(outcome.loser_seconds * 1000),
+                success=loser is not None,
+                endpoint=self.endpoint,
+                k_variants=1,
+                error_message=None if loser is not None else "Appel annulé (hedge perdant)",
+                is_hedge=True,
+            )
+        except Exception as tracking_error:
+            logger.error(f"Erreur lors du tracking de l'usage LLM (hedge): {tracking_error}", exc_info=True)
+
+    def _estimated_prompt_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Estime les tokens de prompt d'un appel (BuiltPrompt.token_count si connu)."""
+        if self.estimated_prompt_tokens is not None:
+            return int(self.estimated_prompt_tokens)
+        return len("".join(str(message.get("content", "")) for message in messages)) // 4
+
+    def _scheduler_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Estime les tokens à réserver auprès du scheduler (prompt + sortie maximale)."""
+        text = "".join(str(message.get("content", "")) for message in messages)
+        return self._estimate_request_tokens(
+            text, max_output_tokens=self.max_tokens, prompt_tokens=self.estimated_prompt_tokens
+        )
+
+    def _scheduler_slot(self, messages: List[Dict[str, Any]]) -> Any:
+        """Retourne le context manager du slot scheduler (ou un contexte neutre si désactivé).
+
+        Args:
+            messages: Messages envoyés à Mistral (pour estimer les tokens si besoin).
+
+        Returns:
+            Context manager async produisant un SchedulerPermit ou None.
+        """
+        if not self._scheduler:
+            return contextlib.nullcontext()
+        return self._scheduler.slot(self.model_name, self._scheduler_tokens(messages), self.priority)
+
     def get_max_tokens(self) -> int:
         """
         Retourne le nombre maximum de tokens que le modèle peut gérer.
@@ -1,20 +1,34 @@
 """Client OpenAI refactorisé utilisant Responses API uniquement."""
 
+import asyncio
 import logging
 import os
 import time
-from typing import List, Optional, Type, Union, Dict, Any, Callable, Coroutine, AsyncIterator
+from typing import List, Optional, Type, Union, Dict, Any, Callable, Coroutine, AsyncIterator, Tuple
 from pydantic import BaseModel
 from openai import AsyncOpenAI, APIError
 
 from core.llm.llm_client import ILLMClient
+from constants import LLMPriority
 from core.llm.openai.parameter_builder import OpenAIParameterBuilder
 from core.llm.openai.response_parser import OpenAIResponseParser
 from core.llm.openai.reasoning_extractor import OpenAIReasoningExtractor
 from core.llm.openai.usage_tracker import OpenAIUsageTracker
-from core.llm.openai.stream_parser import OpenAIStreamParser, StreamChunk
+from core.llm.openai.stream_parser import OpenAIStreamParser, StreamChunk, StreamEventType
+from core.llm.incremental_json import PartialResponseParser, StructuredOutputViolation
 
 logger = logging.getLogger(__name__)
+# Réponses brutes (stockage annexe échantillonné, voir api.utils.log_payloads)
+payload_logger = logging.getLogger("payloads.llm")
+
+# Événements de fin de stream : le hedge n'a plus d'objet une fois l'un d'eux reçu
+_TERMINAL_EVENTS = ("response.completed", "response.failed", "response.incomplete", "error")
+
+
+def _is_first_token_event(event: Any) -> bool:
+    """Indique si un événement Responses API marque le premier token (ou la fin du stream)."""
+    event_type = getattr(event, "type", None) or ""
+    return event_type.endswith(".delta") or event_type in _TERMINAL_EVENTS
 
 
 class OpenAIClient(ILLMClient):
@@ -77,20 +91,39 @@ class OpenAIClient(ILLMClient):
         self.reasoning_callback = reasoning_callback
         self.reasoning_trace: Optional[Dict[str, Any]] = None
         
-        # Initialiser retry et circuit breaker (optionnel)
+        # Estimation des tokens du prompt (BuiltPrompt.token_count), renseignée par l'orchestrateur
+        self.estimated_prompt_tokens: Optional[int] = None
+        # Classe de priorité des appels (LLMPriority), déclarée par l'orchestrateur ou le service de graphe
+        self.priority: str = LLMPriority.INTERACTIVE
+        
+        # Initialiser retry, circuit breaker, scheduler et hedging (optionnel)
         self._retry_with_backoff = None
         self._circuit_breaker = None
+        self._scheduler = None
+        self._estimate_request_tokens = None
+        self._hedging = None
         try:
             from api.utils.retry import retry_with_backoff
             from api.utils.circuit_breaker import get_llm_circuit_breaker
+            from api.utils.llm_scheduler import (
+                get_llm_scheduler, estimate_request_tokens, rate_limits_from_config
+            )
+            from api.utils.llm_hedging import get_llm_hedging_policy
             self._retry_with_backoff = retry_with_backoff
             self._circuit_breaker = get_llm_circuit_breaker()
+            self._scheduler = get_llm_scheduler()
+            self._estimate_request_tokens = estimate_request_tokens
+            self._hedging = get_llm_hedging_policy()
             if self._circuit_breaker:
                 logger.info("Circuit breaker LLM activé")
             if self._retry_with_backoff:
                 logger.info("Retry avec exponential backoff activé pour les appels LLM")
+            if self._scheduler:
+                limits = rate_limits_from_config(self.llm_config.get("rate_limits"))
+                if limits:
+                    self._scheduler.configure_model(self.model_name, limits)
         except (ImportError, AttributeError):
-            logger.debug("Modules retry/circuit_breaker non disponibles. Continuation sans protection.")
+            logger.debug("Modules retry/circuit_breaker/scheduler/hedging non disponibles. Continuation sans protection.")
         
         logger.info(
             f"OpenAIClient initialisé avec le modèle: {self.model_name}, "
@@ -164,18 +197,17 @@ class OpenAIClient(ILLMClient):
                 # Appel API avec retry et circuit breaker
                 response = await self._make_api_call_with_protection(responses_params)
                 
-                # Logger la réponse brute
-                try:
-                    logger.info(
-                        f"Réponse BRUTE de l'API OpenAI reçue pour la variante {i+1} "
-                        f"(modèle: {self.model_name}, api=responses):\n"
-                        f"{response.model_dump_json(indent=2)}"
-                    )
-                except Exception:
-                    logger.info(
-                        f"Réponse reçue (non sérialisable) pour la variante {i+1} "
-                        f"(modèle: {self.model_name}, api=responses)."
-                    )
+                # Réponse brute : stockage annexe des payloads (sérialisée hors du chemin critique)
+                logger.info(
+                    f"Réponse de l'API OpenAI reçue pour la variante {i+1} "
+                    f"(modèle: {self.model_name}, api=responses, id={getattr(response, 'id', None)})."
+                )
+                payload_logger.info(
+                    "Réponse brute OpenAI",
+                    extra={"payload": response, "extra_fields": {
+                        "kind": "openai_response", "model": self.model_name, "variant": i + 1
+                    }}
+                )
                 
                 # Extraire les métriques d'utilisation
                 usage_metrics = OpenAIUsageTracker.extract_usage_metrics(response)
@@ -261,6 +293,8 @@ class OpenAIClient(ILLMClient):
             
         Yields:
             Chunks de streaming (StreamChunk) pendant la génération, puis les résultats finaux (BaseModel ou str).
+            Avec un response_model, des chunks `structured_output.field` signalent chaque champ
+            complété ; une violation de schéma (`structured_output.invalid`) interrompt le stream.
         """
         # Construire les instructions système (séparées de input)
         system_message_content = (
@@ -300,20 +334,41 @@ class OpenAIClient(ILLMClient):
             success = False
             error_message = None
             parsed_output: Optional[Union[BaseModel, str]] = None
+            # Le slot du scheduler est conservé pendant toute la consommation du stream
+            permit = None
+            call_error: Optional[BaseException] = None
+            completed_response: Optional[Any] = None
             
             try:
                 logger.info(f"Début de la génération streaming de la variante {i+1}/{k} pour le prompt.")
                 
-                # Appel API avec streaming
-                stream = await self._make_api_call_streaming(responses_params)
+                if self._scheduler:
+                    permit = await self._scheduler.acquire(
+                        self.model_name, self._scheduler_tokens(responses_params), self.priority
+                    )
+                
+                # Appel API avec streaming (dupliqué si le premier token tarde, cf. hedging)
+                stream, hedge_outcome = await self._open_stream(responses_params)
+                if hedge_outcome and hedge_outcome.hedged:
+                    self._track_hedge_usage(hedge_outcome, responses_params)
+                    if hedge_outcome.hedge_won:
+                        # Le stream du hedge continue sous son propre slot
+                        if permit:
+                            permit.release(asyncio.CancelledError())
+                        permit = stream.permit
                 
                 # Parser le stream
                 stream_parser = OpenAIStreamParser(reasoning_callback=self.reasoning_callback)
                 function_call_arguments: Optional[str] = None
                 item_id: Optional[str] = None
-                completed_response: Optional[Any] = None
+                # Parsing incrémental de la sortie structurée (un parser par function call)
+                partial_parsers: Dict[str, PartialResponseParser] = {}
+                chunks = stream_parser.parse_stream(stream)
                 
-                async for chunk in stream_parser.parse_stream(stream):
+                async for chunk in chunks:
+                    if permit and chunk.event_type.endswith(".delta"):
+                        permit.mark_first_token()
+                    
                     # Yielder le chunk pour feedback temps réel (priorité sur callback)
                     yield chunk
                     
@@ -329,6 +384,29 @@ class OpenAIClient(ILLMClient):
                         item_id = chunk.data.get("item_id")
                         if item_id:
                             function_call_arguments = stream_parser.get_completed_function_call_arguments(item_id)
+                        if item_id and response_model:
+                            partial_parser = partial_parsers.get(item_id)
+                            if partial_parser is None:
+                                partial_parser = partial_parsers[item_id] = PartialResponseParser(response_model)
+                            try:
+                                fields = partial_parser.feed(chunk.data.get("delta", ""))
+                            except StructuredOutputViolation as violation:
+                                # Interrompre la génération : inutile de payer la suite d'une sortie invalide
+                                error_message = f"Sortie structurée invalide ({violation})"
+                                logger.warning(f"Variante {i+1} interrompue en streaming: {error_message}")
+                                yield StreamChunk(
+                                    event_type=StreamEventType.STRUCTURED_OUTPUT_INVALID,
+                                    data={"path": violation.path, "error": str(violation)},
+                                )
+                                from api.utils.llm_hedging import close_stream
+                                await chunks.aclose()
+                                await close_stream(stream)
+                                break
+                            for field in fields:
+                                yield StreamChunk(
+                                    event_type=StreamEventType.STRUCTURED_OUTPUT_FIELD,
+                                    data={"path": field.path, "value": field.value},
+                                )
                     
                     elif chunk.event_type == "response.function_call_arguments.done":
                         item_id = chunk.data.get("item_id")
@@ -372,6 +450,8 @@ class OpenAIClient(ILLMClient):
                     elif chunk.event_type == "response.failed":
                         error_data = chunk.data.get("error", {})
                         error_message = str(error_data)
+                        if permit and isinstance(error_data, dict) and error_data.get("code") == "rate_limit_exceeded":
+                            permit.mark_rate_limited()
                         logger.error(f"Erreur API OpenAI (streaming) pour la variante {i+1}: {error_message}")
                 
                 # Yielder le résultat final
@@ -383,10 +463,12 @@ class OpenAIClient(ILLMClient):
                     yield error_str
                     
             except APIError as e:
+                call_error = e
                 logger.error(f"Erreur API OpenAI lors de la génération streaming de la variante {i+1}: {e}")
                 yield f"Erreur API: {e}"
                 error_message = str(e)
             except Exception as e:
+                call_error = e
                 logger.error(
                     f"Erreur inattendue lors de la génération streaming de la variante {i+1}: {e}",
                     exc_info=True
@@ -397,6 +479,13 @@ class OpenAIClient(ILLMClient):
                 # Calculer la durée
                 duration_ms = int((time.time() - start_time) * 1000)
                 
+                if permit:
+                    if completed_response:
+                        permit.set_actual_tokens(
+                            OpenAIUsageTracker.extract_usage_metrics(completed_response)["total_tokens"]
+                        )
+                    permit.release(call_error)
+                
                 # Enregistrer l'utilisation si le service est disponible
                 if self.usage_service:
                     try:
@@ -439,7 +528,19 @@ class OpenAIClient(ILLMClient):
             Réponse de l'API OpenAI.
         """
         async def _make_api_call():
-            return await self.client.responses.create(**responses_params)
+            if not self._hedging:
+                return await self._create_response(responses_params)
+            from api.utils.llm_hedging import LATENCY_RESPONSE
+            response, outcome = await self._hedging.run(
+                self.model_name,
+                LATENCY_RESPONSE,
+                lambda ticket: self._create_response(responses_params, ticket.permit if ticket else None),
+                priority=self.priority,
+                scheduler=self._scheduler,
+                estimated_tokens=self._scheduler_tokens(responses_params),
+            )
+            self._track_hedge_usage(outcome, responses_params)
+            return response
         
         # Appliquer retry et circuit breaker si disponibles
         if self._retry_with_backoff and self._circuit_breaker:
@@ -453,6 +554,112 @@ class OpenAIClient(ILLMClient):
         else:
             return await _make_api_call()
     
+    async def _create_response(self, responses_params: Dict[str, Any], permit: Optional[Any] = None) -> Any:
+        """Effectue un appel non streaming sous un slot du scheduler.
+        
+        Args:
+            responses_params: Paramètres pour Responses API.
+            permit: Slot déjà réservé (appel dupliqué) ; sinon un slot est attendu.
+            
+        Returns:
+            Réponse de l'API OpenAI.
+        """
+        if permit is not None:
+            try:
+                response = await self.client.responses.create(**responses_params)
+            except BaseException as e:
+                permit.release(e)
+                raise
+            permit.set_actual_tokens(OpenAIUsageTracker.extract_usage_metrics(response)["total_tokens"])
+            permit.release()
+            return response
+        if not self._scheduler:
+            return await self.client.responses.create(**responses_params)
+        # Chaque tentative (y compris les retries) repasse par le scheduler
+        async with self._scheduler.slot(
+            self.model_name, self._scheduler_tokens(responses_params), self.priority
+        ) as permit:
+            response = await self.client.responses.create(**responses_params)
+            permit.set_actual_tokens(OpenAIUsageTracker.extract_usage_metrics(response)["total_tokens"])
+            return response
+
+    async def _open_stream(self, responses_params: Dict[str, Any]) -> Tuple[Any, Optional[Any]]:
+        """Ouvre le stream, en le dupliquant si le premier token dépasse le délai de hedge.
+        
+        Args:
+            responses_params: Paramètres pour Responses API (avec stream=True).
+            
+        Returns:
+            Tuple (stream à consommer, HedgeOutcome ou None si le hedging est désactivé).
+            Si le hedge gagne, le stream porte son slot dans `stream.permit`.
+        """
+        if not self._hedging:
+            return await self._make_api_call_streaming(responses_params), None
+        from api.utils.llm_hedging import LATENCY_FIRST_TOKEN, PeekedStream, peek_first_token
+        
+        async def _call(ticket: Optional[Any]) -> PeekedStream:
+            permit = ticket.permit if ticket else None
+            try:
+                stream = await self._make_api_call_streaming(responses_params)
+                peeked = await peek_first_token(stream, _is_first_token_event)
+            except BaseException as e:
+                if permit:
+                    permit.release(e)
+                raise
+            peeked.permit = permit
+            return peeked
+        
+        async def _discard(peeked: PeekedStream) -> None:
+            await peeked.close()
+            if peeked.permit:
+                peeked.permit.release(asyncio.CancelledError())
+        
+        return await self._hedging.run(
+            self.model_name,
+            LATENCY_FIRST_TOKEN,
+            _call,
+            priority=self.priority,
+            scheduler=self._scheduler,
+            estimated_tokens=self._scheduler_tokens(responses_params),
+            discard=_discard,
+        )
+
+    def _track_hedge_usage(self, outcome: Any, responses_params: Dict[str, Any]) -> None:
+        """Enregistre l'appel perdant d'un hedge, comptabilisé à part (is_hedge=True).
+        
+        Un appel annulé en cours de route n'a pas d'usage connu : ses tokens de prompt
+        (facturés) sont estimés.
+        
+        Args:
+            outcome: Résultat de la course primaire/hedge.
+            responses_params: Paramètres de l'appel dupliqué.
+        """
+        if not self.usage_service or not outcome.hedged:
+            return
+        from api.utils.llm_hedging import PeekedStream
+        loser = outcome.loser_result
+        if loser is not None and not isinstance(loser, PeekedStream):
+            usage_metrics = OpenAIUsageTracker.extract_usage_metrics(loser)
+        else:
+            prompt_tokens = self._estimated_prompt_tokens(responses_params)
+            usage_metrics = {"prompt_tokens": prompt_tokens, "completion_tokens": 0, "total_tokens": prompt_tokens}
+        try:
+            self.usage_service.track_usage(
+                request_id=self.request_id,
+                model_name=self.model_name,
+                prompt_tokens=usage_metrics["prompt_tokens"],
+                completion_tokens=usage_metrics["completion_tokens"],
+                total_tokens=usage_metrics["total_tokens"],
+                duration_ms=int(outcome.loser_seconds * 1000),
+                success=loser is not None,
+                endpoint=self.endpoint,
+                k_variants=1,
+                error_message=None if loser is not None else "Appel annulé (hedge perdant)",
+                is_hedge=True,
+            )
+        except Exception as tracking_error:
+            logger.error(f"Erreur lors du tracking de l'usage LLM (hedge): {tracking_error}", exc_info=True)
+
     async def _make_api_call_streaming(self, responses_params: Dict[str, Any]) -> Any:
         """Effectue l'appel API avec streaming.
         
@@ -474,6 +681,29 @@ class OpenAIClient(ILLMClient):
         else:
             return await _make_streaming_call()
 
+    def _scheduler_tokens(self, responses_params: Dict[str, Any]) -> int:
+        """Estime les tokens à réserver auprès du scheduler (prompt + sortie maximale).
+        
+        Args:
+            responses_params: Paramètres pour Responses API.
+            
+        Returns:
+            Nombre de tokens estimé pour le budget TPM.
+        """
+        text = str(responses_params.get("instructions") or "") + str(responses_params.get("input") or "")
+        return self._estimate_request_tokens(
+            text,
+            max_output_tokens=responses_params.get("max_output_tokens") or 0,
+            prompt_tokens=self.estimated_prompt_tokens,
+        )
+
+    def _estimated_prompt_tokens(self, responses_params: Dict[str, Any]) -> int:
+        """Estime les tokens de prompt d'un appel (BuiltPrompt.token_count si connu)."""
+        if self.estimated_prompt_tokens is not None:
+            return int(self.estimated_prompt_tokens)
+        text = str(responses_params.get("instructions") or "") + str(responses_params.get("input") or "")
+        return len(text) // 4
+
     def get_max_tokens(self) -> int:
         """Retourne le nombre maximum de tokens que le modèle peut gérer pour un prompt.
         
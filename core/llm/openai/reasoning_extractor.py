@@ -5,6 +5,8 @@ import logging
 from typing import Dict, Any, List, Optional, Callable, Coroutine
 
 logger = logging.getLogger(__name__)
+# Payloads volumineux (stockage annexe échantillonné, voir api.utils.log_payloads)
+payload_logger = logging.getLogger("payloads.llm")
 
 
 class OpenAIReasoningExtractor:
@@ -113,16 +115,13 @@ class OpenAIReasoningExtractor:
                 if len(reasoning_items) > 10:
                     logger.info(f"... ({len(reasoning_items) - 10} étapes supplémentaires)")
             
-            # Afficher le reasoning complet en JSON si disponible
-            try:
-                reasoning_json = (
-                    reasoning_data.model_dump_json(indent=2)
-                    if hasattr(reasoning_data, 'model_dump_json')
-                    else json.dumps(reasoning_data, indent=2, ensure_ascii=False, default=str)
-                )
-                logger.debug(f"Reasoning trace complet (JSON):\n{reasoning_json}")
-            except Exception:
-                pass
+            # Reasoning complet : stockage annexe des payloads (sérialisé hors du chemin critique)
+            payload_logger.info(
+                "Reasoning trace complet",
+                extra={"payload": reasoning_data, "extra_fields": {
+                    "kind": "openai_reasoning", "variant": variant_index
+                }}
+            )
             
             logger.info(f"{'='*80}\n")
             
@@ -39,6 +39,11 @@ class StreamEventType(str, Enum):
     
     # Error events
     ERROR = "error"
+    
+    # Événements internes (non émis par l'API) : champs de la sortie structurée
+    # complétés pendant le streaming, et violation de schéma interrompant le stream
+    STRUCTURED_OUTPUT_FIELD = "structured_output.field"
+    STRUCTURED_OUTPUT_INVALID = "structured_output.invalid"
 
 
 class StreamChunk:
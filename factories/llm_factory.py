@@ -82,6 +82,9 @@ class LLMClientFactory:
                         client_config["temperature"] = model_config["parameters"]["default_temperature"]
                     if "max_tokens" in model_config["parameters"]:
                         client_config["max_tokens"] = model_config["parameters"]["max_tokens"]
+                # Budgets RPM/TPM du modèle pour le scheduler LLM
+                if "rate_limits" in model_config:
+                    client_config["rate_limits"] = model_config["rate_limits"]
                 logger.info(f"Création d'un OpenAIClient pour model_id: {model_id} (default_model: {model_identifier})")
                 return OpenAIClient(
                     api_key=api_key,
@@ -117,6 +120,9 @@ class LLMClientFactory:
                         client_config["temperature"] = model_config["parameters"]["default_temperature"]
                     if "max_tokens" in model_config["parameters"]:
                         client_config["max_tokens"] = model_config["parameters"]["max_tokens"]
+                # Budgets RPM/TPM du modèle pour le scheduler LLM
+                if "rate_limits" in model_config:
+                    client_config["rate_limits"] = model_config["rate_limits"]
                 logger.info(f"Création d'un MistralClient pour model_id: {model_id} (default_model: {model_identifier})")
                 return MistralClient(
                     api_key=api_key,
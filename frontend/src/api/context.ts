@@ -14,16 +14,37 @@ import type {
   CommunityResponse,
   CommunityListResponse,
   RegionListResponse,
+  SearchResponse,
   SubLocationListResponse,
   LinkedElementsRequest,
   LinkedElementsResponse,
 } from '../types/api'
 
+/**
+ * Paramètres optionnels des listes GDD.
+ * - fields : clés de `data` à conserver (projection)
+ * - summary : version résumée (l'élément complet s'obtient via l'endpoint de détail)
+ */
+export interface ListQueryParams {
+  page?: number
+  page_size?: number
+  fields?: string[]
+  summary?: boolean
+}
+
+function toQueryParams(params?: ListQueryParams): Record<string, string | number | boolean> | undefined {
+  if (!params) return undefined
+  const { fields, ...rest } = params
+  return fields && fields.length > 0 ? { ...rest, fields: fields.join(',') } : rest
+}
+
 /**
  * Liste tous les personnages disponibles.
  */
-export async function listCharacters(): Promise<CharacterListResponse> {
-  const response = await apiClient.get<CharacterListResponse>('/api/v1/context/characters')
+export async function listCharacters(params?: ListQueryParams): Promise<CharacterListResponse> {
+  const response = await apiClient.get<CharacterListResponse>('/api/v1/context/characters', {
+    params: toQueryParams(params),
+  })
   return response.data
 }
 
@@ -38,8 +59,10 @@ export async function getCharacter(name: string): Promise<CharacterResponse> {
 /**
  * Liste tous les lieux disponibles.
  */
-export async function listLocations(): Promise<LocationListResponse> {
-  const response = await apiClient.get<LocationListResponse>('/api/v1/context/locations')
+export async function listLocations(params?: ListQueryParams): Promise<LocationListResponse> {
+  const response = await apiClient.get<LocationListResponse>('/api/v1/context/locations', {
+    params: toQueryParams(params),
+  })
   return response.data
 }
 
@@ -54,8 +77,10 @@ export async function getLocation(name: string): Promise<LocationResponse> {
 /**
  * Liste tous les objets disponibles.
  */
-export async function listItems(): Promise<ItemListResponse> {
-  const response = await apiClient.get<ItemListResponse>('/api/v1/context/items')
+export async function listItems(params?: ListQueryParams): Promise<ItemListResponse> {
+  const response = await apiClient.get<ItemListResponse>('/api/v1/context/items', {
+    params: toQueryParams(params),
+  })
   return response.data
 }
 
@@ -75,8 +100,10 @@ export async function getItem(name: string): Promise<ItemResponse> {
 /**
  * Liste toutes les espèces disponibles.
  */
-export async function listSpecies(): Promise<SpeciesListResponse> {
-  const response = await apiClient.get<SpeciesListResponse>('/api/v1/context/species')
+export async function listSpecies(params?: ListQueryParams): Promise<SpeciesListResponse> {
+  const response = await apiClient.get<SpeciesListResponse>('/api/v1/context/species', {
+    params: toQueryParams(params),
+  })
   return response.data
 }
 
@@ -91,8 +118,10 @@ export async function getSpecies(name: string): Promise<SpeciesResponse> {
 /**
  * Liste toutes les communautés disponibles.
  */
-export async function listCommunities(): Promise<CommunityListResponse> {
-  const response = await apiClient.get<CommunityListResponse>('/api/v1/context/communities')
+export async function listCommunities(params?: ListQueryParams): Promise<CommunityListResponse> {
+  const response = await apiClient.get<CommunityListResponse>('/api/v1/context/communities', {
+    params: toQueryParams(params),
+  })
   return response.data
 }
 
@@ -104,6 +133,20 @@ export async function getCommunity(name: string): Promise<CommunityResponse> {
   return response.data
 }
 
+/**
+ * Recherche plein texte (insensible aux accents, préfixe et fautes de frappe) sur le GDD.
+ */
+export async function searchContext(
+  q: string,
+  params?: { categories?: string[]; fuzzy?: boolean; page?: number; page_size?: number }
+): Promise<SearchResponse> {
+  const { categories, ...rest } = params ?? {}
+  const response = await apiClient.get<SearchResponse>('/api/v1/context/search', {
+    params: { q, ...rest, ...(categories && categories.length > 0 ? { categories: categories.join(',') } : {}) },
+  })
+  return response.data
+}
+
 /**
  * Liste toutes les régions disponibles.
  */
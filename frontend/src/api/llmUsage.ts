@@ -16,6 +16,7 @@ export interface LLMUsageRecord {
   endpoint: string
   k_variants: number
   error_message?: string | null
+  is_hedge?: boolean
 }
 
 export interface LLMUsageHistoryResponse {
@@ -36,6 +37,8 @@ export interface LLMUsageStatistics {
   error_count: number
   success_rate: number
   avg_duration_ms: number
+  hedge_calls_count?: number
+  hedge_cost?: number
   start_date?: string | null
   end_date?: string | null
   model_name?: string | null
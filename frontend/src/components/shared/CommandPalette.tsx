@@ -43,9 +43,9 @@ export function CommandPalette({ isOpen, onClose }: CommandPaletteProps) {
       setIsLoading(true)
       try {
         const [charactersRes, locationsRes, itemsRes, dialoguesRes] = await Promise.all([
-          contextAPI.listCharacters().catch(() => ({ characters: [] })),
-          contextAPI.listLocations().catch(() => ({ locations: [] })),
-          contextAPI.listItems().catch(() => ({ items: [] })),
+          contextAPI.listCharacters({ summary: true }).catch(() => ({ characters: [] })),
+          contextAPI.listLocations({ summary: true }).catch(() => ({ locations: [] })),
+          contextAPI.listItems({ summary: true }).catch(() => ({ items: [] })),
           unityDialoguesAPI.listUnityDialogues().catch(() => ({ dialogues: [] })),
         ])
 
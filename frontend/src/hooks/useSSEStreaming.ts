@@ -88,6 +88,7 @@ export function useSSEStreaming(options: UseSSEStreamingOptions = {}): UseSSEStr
   // Actions du store
   const {
     appendChunk,
+    setPartialField,
     setStep,
     complete,
     setError: setStreamError,
@@ -103,9 +104,9 @@ export function useSSEStreaming(options: UseSSEStreamingOptions = {}): UseSSEStr
     }
     const streamUrl = `/api/v1/dialogues/generate/jobs/${jobId}/stream`
     const es = new EventSource(streamUrl)
-    // Désactiver la reconnexion automatique d'EventSource (fonctionnalité de génération multiple désactivée)
-    // EventSource se reconnecte automatiquement par défaut, ce qui peut causer des générations multiples
-    // On gère manuellement la fermeture après 'complete' pour éviter les reconnexions
+    // EventSource se reconnecte automatiquement (timeout proxy, mise en veille) : chaque événement
+    // porte un id et le navigateur renvoie Last-Event-ID, le serveur reprend alors à l'événement
+    // suivant sans relancer la génération. On ferme manuellement après 'complete'.
     eventSourceRef.current = es
     setEventSource(es)
     closedByClientRef.current = false
@@ -121,7 +122,14 @@ export function useSSEStreaming(options: UseSSEStreamingOptions = {}): UseSSEStr
         switch (data.type) {
           case 'chunk':
             if (data.content) {
-              appendChunk(data.content, data.sequence)
+              appendChunk(data.content, data.sequence, data.sequence_end)
+            }
+            break
+            
+          case 'partial':
+            // Champ du nœud complété (title, node.speaker, node.line, node.choices[i]...) : rendu progressif
+            if (data.path) {
+              setPartialField(data.path, data.value)
             }
             break
             
@@ -202,6 +210,12 @@ export function useSSEStreaming(options: UseSSEStreamingOptions = {}): UseSSEStr
             break
             
           case 'error':
+            if (data.code === 'slow_consumer') {
+              // Connexion fermée par le serveur (client trop lent) : EventSource se reconnecte
+              // avec Last-Event-ID et reprend au dernier événement reçu
+              console.debug('SSE: reconnexion après déconnexion pour lenteur')
+              break
+            }
             if (data.message) {
               setStreamError(data.message)
               if (toast) {
@@ -38,6 +38,7 @@ interface GenerationState {
   isInterrupting: boolean  // Task 4 - Story 0.8
   chunkBuffer: Map<number, string>  // Buffer pour réordonner les chunks avec séquence
   lastProcessedSequence: number  // Dernière séquence traitée (pour réordonnancement)
+  partialFields: Record<string, unknown>  // Champs du nœud déjà complétés (path -> valeur), ex: 'node.line', 'node.choices[0]'
   
   // Actions
   setSceneSelection: (selection: Partial<SceneSelection>) => void
@@ -52,7 +53,8 @@ interface GenerationState {
   
   // Actions streaming (Task 2 - Story 0.2)
   startGeneration: (jobId: string) => void
-  appendChunk: (chunk: string, sequence?: number) => void
+  appendChunk: (chunk: string, sequence?: number, sequenceEnd?: number) => void
+  setPartialField: (path: string, value: unknown) => void
   setStep: (step: 'Prompting' | 'Generating' | 'Validating' | 'Complete') => void
   interrupt: () => void
   minimize: () => void
@@ -95,6 +97,7 @@ export const useGenerationStore = create<GenerationState>((set) => ({
   isInterrupting: false,  // Task 4 - Story 0.8
   chunkBuffer: new Map<number, string>(),
   lastProcessedSequence: -1,  // Dernière séquence traitée
+  partialFields: {},
 
   setSceneSelection: (selection) =>
     set((state) => ({
@@ -138,9 +141,15 @@ export const useGenerationStore = create<GenerationState>((set) => ({
       currentJobId: jobId,
       chunkBuffer: new Map<number, string>(),
       lastProcessedSequence: -1,
+      partialFields: {},
     }),
 
-  appendChunk: (chunk, sequence) =>
+  setPartialField: (path, value) =>
+    set((state) => ({
+      partialFields: { ...state.partialFields, [path]: value },
+    })),
+
+  appendChunk: (chunk, sequence, sequenceEnd) =>
     set((state) => {
       // Si pas de séquence, comportement legacy (ajout direct) - pour compatibilité
       if (sequence === undefined) {
@@ -176,6 +185,12 @@ export const useGenerationStore = create<GenerationState>((set) => ({
       
       const newBuffer = new Map(state.chunkBuffer)
       newBuffer.set(sequence, chunk)
+      // Chunks fusionnés côté serveur (abonné en retard) : la plage sequence..sequenceEnd est reçue
+      if (sequenceEnd !== undefined) {
+        for (let seq = sequence + 1; seq <= sequenceEnd; seq++) {
+          newBuffer.set(seq, '')
+        }
+      }
       
       // Utiliser lastProcessedSequence au lieu de currentLength pour éviter les blocages
       // Si des chunks arrivent dans le désordre, on peut avoir currentLength < lastProcessedSequence
@@ -226,6 +241,7 @@ export const useGenerationStore = create<GenerationState>((set) => ({
       error: null,
       currentJobId: null,
       isInterrupting: false,  // Fix: Réinitialiser isInterrupting (Issue #4)
+      partialFields: {},
     }),
 
   minimize: () =>
@@ -258,6 +274,7 @@ export const useGenerationStore = create<GenerationState>((set) => ({
       isInterrupting: false,
       chunkBuffer: new Map<number, string>(),
       lastProcessedSequence: -1,
+      partialFields: {},
     }),
 
   setInterrupting: (isInterrupting) =>
@@ -155,6 +155,21 @@ export interface CommunityListResponse {
   total: number
 }
 
+export interface SearchResultResponse {
+  category: string
+  name: string
+  score: number
+}
+
+export interface SearchResponse {
+  query: string
+  results: SearchResultResponse[]
+  total: number
+  page: number
+  page_size: number
+  total_pages: number
+}
+
 export interface RegionListResponse {
   regions: string[]
   total: number
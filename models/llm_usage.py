@@ -21,6 +21,7 @@ class LLMUsageRecord(BaseModel):
     endpoint: str = Field(..., description="Endpoint appelé (ex: generate/variants, generate/interactions)")
     k_variants: int = Field(default=1, ge=1, description="Nombre de variantes générées")
     error_message: Optional[str] = Field(default=None, description="Message d'erreur si success=False")
+    is_hedge: bool = Field(default=False, description="Appel dupliqué perdant d'une requête hedgée (coût additionnel)")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -36,7 +37,8 @@ class LLMUsageRecord(BaseModel):
                 "success": True,
                 "endpoint": "generate/variants",
                 "k_variants": 3,
-                "error_message": None
+                "error_message": None,
+                "is_hedge": False
             }
         }
     )
@@ -0,0 +1,120 @@
+"""Micro-benchmark de la pile de middlewares HTTP (requêtes/s sur un GET en cache).
+
+Appelle l'application ASGI directement (sans serveur ni socket) pour mesurer le coût
+propre des middlewares sur un GET versionné servi depuis le cache HTTP :
+
+- bare : la route seule, sans middleware ;
+- asgi : la pile de l'API (RequestID, Logging, CostGovernance, cache HTTP), middlewares ASGI purs ;
+- base_http : la même pile entourée d'autant de couches BaseHTTPMiddleware transparentes,
+  pour estimer le surcoût par saut de l'ancienne implémentation.
+
+Usage:
+    python scripts/benchmark_middleware_stack.py --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from api.middleware import LoggingMiddleware, RequestIDMiddleware  # noqa: E402
+from api.middleware.cost_governance import CostGovernanceMiddleware  # noqa: E402
+from api.middleware.http_cache import HTTPCacheMiddleware  # noqa: E402
+from api.utils.data_versions import DataVersionRegistry  # noqa: E402
+
+PATH = "/api/v1/context/characters"
+PAYLOAD = {"characters": [{"name": f"Personnage {i}", "data": {"Nom": f"Personnage {i}"}} for i in range(50)],
+           "total": 50}
+
+
+class PassthroughMiddleware(BaseHTTPMiddleware):
+    """Couche BaseHTTPMiddleware sans traitement (coût d'un saut call_next)."""
+
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(PATH)
+    def characters():
+        return PAYLOAD
+
+    if variant == "bare":
+        return app
+    app.add_middleware(RequestIDMiddleware)
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(CostGovernanceMiddleware)
+    app.add_middleware(HTTPCacheMiddleware, enabled=True, versions=DataVersionRegistry())
+    if variant == "base_http":
+        for _ in range(4):
+            app.add_middleware(PassthroughMiddleware)
+    return app
+
+
+async def run(variant: str, requests: int) -> Dict[str, Any]:
+    app = build_app(variant)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": PATH, "raw_path": PATH.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+    counters = {"bytes": 0, "hits": 0}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            counters["hits"] += (b"x-cache", b"HIT") in message["headers"]
+        elif message["type"] == "http.response.body":
+            counters["bytes"] += len(message.get("body", b""))
+
+    # Première requête : remplit le cache
+    await app(dict(scope), receive, send)
+    counters.update(bytes=0, hits=0)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        "variant": variant,
+        "requests": requests,
+        "requests_per_s": round(requests / wall, 1),
+        "us_per_request": round(wall / requests * 1e6, 1),
+        "cpu_s": round(cpu, 3),
+        "cache_hits": counters["hits"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de la pile de middlewares HTTP")
+    parser.add_argument("--requests", type=int, default=20000, help="Requêtes par variante")
+    parser.add_argument("--json", dest="json_output", default=None, help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    report = {variant: asyncio.run(run(variant, args.requests)) for variant in ("bare", "asgi", "base_http")}
+
+    print(f"\n=== GET {PATH} en cache, {args.requests} requêtes ===")
+    for r in report.values():
+        print(f"{r['variant']:<10}: {r['requests_per_s']:>9} req/s, {r['us_per_request']:>7} µs/req, "
+              f"CPU {r['cpu_s']}s, hits {r['cache_hits']}")
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
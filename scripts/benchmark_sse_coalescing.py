@@ -0,0 +1,103 @@
+"""Micro-benchmark du regroupement des chunks SSE (frames/s et CPU, avant/après).
+
+Simule N jobs de génération concurrents dans un GenerationJobManager en mémoire : chaque
+job produit des deltas d'un token à intervalle fixe (rafales possibles, comme les paquets
+réseau d'un stream OpenAI), et chaque job a un ou plusieurs abonnés qui formatent les
+frames SSE exactement comme l'endpoint /generate/jobs/{job_id}/stream.
+
+Compare une frame par delta (SSE_COALESCE_INTERVAL_MS=0) au regroupement configuré.
+
+Usage:
+    python scripts/benchmark_sse_coalescing.py --jobs 200 --tokens 400
+    python scripts/benchmark_sse_coalescing.py --interval-ms 16 --max-bytes 512 --burst 3
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.services.generation_job_manager import GenerationJobManager  # noqa: E402
+
+TOKENS = ["Le", " vent", " se", " lève", ",", " voyageur", ".", " Que", " cherches", "-tu", " ici", " ?"]
+
+
+def make_runner(tokens: int, token_interval: float, burst: int):
+    async def runner(job_id: str, params: Dict[str, Any]):
+        yield {"type": "step", "step": "Generating"}
+        for i in range(tokens):
+            yield {"type": "chunk", "content": TOKENS[i % len(TOKENS)], "sequence": i}
+            if (i + 1) % burst == 0:
+                await asyncio.sleep(token_interval * burst)
+        yield {"type": "metadata", "tokens": tokens, "cost": 0.001}
+        yield {"type": "complete", "result": {"title": "Benchmark"}}
+    return runner
+
+
+async def run(args: argparse.Namespace, interval_ms: float) -> Dict[str, Any]:
+    manager = GenerationJobManager(
+        max_workers=args.jobs,
+        coalesce_interval_ms=interval_ms,
+        coalesce_max_bytes=args.max_bytes,
+    )
+    runner = make_runner(args.tokens, args.token_interval_ms / 1000.0, max(1, args.burst))
+    counters = {"frames": 0, "bytes": 0}
+
+    async def subscriber(job_id: str) -> None:
+        async for sequence, payload in manager.subscribe(job_id):
+            frame = f'id: {sequence}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'
+            counters["frames"] += 1
+            counters["bytes"] += len(frame.encode("utf-8"))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    job_ids = [manager.create_job({}, runner=runner) for _ in range(args.jobs)]
+    await asyncio.gather(*(subscriber(job_id) for job_id in job_ids for _ in range(args.subscribers)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        "interval_ms": interval_ms,
+        "frames": counters["frames"],
+        "frames_per_s": round(counters["frames"] / wall, 1),
+        "bytes": counters["bytes"],
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "cpu_per_job_ms": round(cpu / args.jobs * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du regroupement des chunks SSE")
+    parser.add_argument("--jobs", type=int, default=200, help="Jobs concurrents")
+    parser.add_argument("--subscribers", type=int, default=1, help="Abonnés SSE par job")
+    parser.add_argument("--tokens", type=int, default=400, help="Deltas par job")
+    parser.add_argument("--token-interval-ms", type=float, default=5.0, help="Intervalle moyen entre deltas")
+    parser.add_argument("--burst", type=int, default=1, help="Deltas reçus d'un coup (paquet réseau)")
+    parser.add_argument("--interval-ms", type=float, default=16.0, help="Délai de regroupement testé")
+    parser.add_argument("--max-bytes", type=int, default=512, help="Taille de flush testée")
+    parser.add_argument("--json", dest="json_output", default=None, help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    report = {
+        "config": vars(args),
+        "baseline": asyncio.run(run(args, 0.0)),
+        "coalesced": asyncio.run(run(args, args.interval_ms)),
+    }
+
+    print(f"\n=== {args.jobs} jobs x {args.tokens} deltas, {args.subscribers} abonné(s)/job ===")
+    for label in ("baseline", "coalesced"):
+        r = report[label]
+        print(f"{label:<10} ({r['interval_ms']:>4} ms): {r['frames']:>8} frames, {r['frames_per_s']:>9} frames/s, "
+              f"{r['bytes'] / 1024:>8.0f} Kio, CPU {r['cpu_s']}s ({r['cpu_per_job_ms']} ms/job), mur {r['wall_s']}s")
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
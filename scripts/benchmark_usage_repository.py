@@ -0,0 +1,128 @@
+"""Benchmark des repositories d'usage LLM (fichiers JSONL vs SQLite).
+
+Génère N enregistrements répartis sur `--days` jours (plusieurs modèles et endpoints),
+les insère par lots dans chaque backend (comme le UsageWriter), puis mesure les requêtes
+d'analyse de l'API : statistiques globales, statistiques d'un mois par modèle, coûts
+quotidiens du mois, historique d'une journée.
+
+Le backend fichier relit et décode tous les enregistrements de la plage à chaque requête :
+`--file-records` permet de le mesurer sur un volume plus petit.
+
+Usage:
+    python scripts/benchmark_usage_repository.py --records 1000000
+    python scripts/benchmark_usage_repository.py --records 1000000 --file-records 200000 --json report.json
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.llm_usage import LLMUsageRecord  # noqa: E402
+from services.repositories.llm_usage_repository import (  # noqa: E402
+    FileLLMUsageRepository,
+    SQLiteLLMUsageRepository,
+)
+
+MODELS = ["gpt-5.2", "gpt-5-mini", "gpt-5-nano", "gpt-5.2-pro"]
+ENDPOINTS = ["generate/variants", "generate/unity-dialogue", "generate/jobs"]
+BATCH_SIZE = 500
+
+
+def make_records(count: int, days: int, seed: int = 42) -> List[LLMUsageRecord]:
+    rng = random.Random(seed)
+    start = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+    span = days * 86400
+    records = []
+    for i in range(count):
+        prompt_tokens = rng.randint(500, 8000)
+        completion_tokens = rng.randint(100, 2000)
+        records.append(LLMUsageRecord(
+            request_id=f"req_{i}",
+            timestamp=start + timedelta(seconds=span * i / count),
+            model_name=rng.choice(MODELS),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            estimated_cost=round((prompt_tokens * 1.25 + completion_tokens * 10) / 1_000_000, 6),
+            duration_ms=rng.randint(300, 20000),
+            success=rng.random() > 0.03,
+            endpoint=rng.choice(ENDPOINTS),
+            k_variants=rng.randint(1, 4),
+            is_hedge=rng.random() < 0.02,
+        ))
+    return records
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Meilleur temps (ms) sur `repeat` exécutions."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def run(repository: Any, records: List[LLMUsageRecord], repeat: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    for i in range(0, len(records), BATCH_SIZE):
+        repository.save_many(records[i:i + BATCH_SIZE])
+    insert_s = time.perf_counter() - start
+
+    today = date.today()
+    month_start = today - timedelta(days=29)
+    return {
+        "records": len(records),
+        "insert_s": round(insert_s, 2),
+        "insert_per_s": round(len(records) / insert_s),
+        "stats_all_ms": timed(lambda: repository.get_statistics(), repeat),
+        "stats_month_model_ms": timed(
+            lambda: repository.get_statistics(start_date=month_start, end_date=today, model_name="gpt-5.2"), repeat
+        ),
+        "daily_costs_month_ms": timed(lambda: repository.get_daily_costs(month_start, today), repeat),
+        "history_day_ms": timed(lambda: repository.get_by_date_range(today, today), repeat),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark des repositories d'usage LLM")
+    parser.add_argument("--records", type=int, default=1_000_000, help="Enregistrements (SQLite)")
+    parser.add_argument("--file-records", type=int, default=None,
+                        help="Enregistrements pour le backend fichier (défaut: --records, 0 = ignoré)")
+    parser.add_argument("--days", type=int, default=365, help="Jours couverts par les enregistrements")
+    parser.add_argument("--repeat", type=int, default=3, help="Exécutions par requête (meilleur temps)")
+    parser.add_argument("--json", dest="json_output", default=None, help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+    file_records = args.records if args.file_records is None else args.file_records
+
+    report: Dict[str, Any] = {"config": vars(args)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_repository = SQLiteLLMUsageRepository(str(Path(tmp_dir) / "llm_usage.db"))
+        report["sqlite"] = run(sqlite_repository, make_records(args.records, args.days), args.repeat)
+        sqlite_repository.close()
+        if file_records:
+            file_repository = FileLLMUsageRepository(storage_dir=str(Path(tmp_dir) / "llm_usage"), fsync_policy="never")
+            report["file"] = run(file_repository, make_records(file_records, args.days), args.repeat)
+
+    print(f"\n=== Usage LLM sur {args.days} jours ===")
+    for label in ("file", "sqlite"):
+        r = report.get(label)
+        if r is None:
+            continue
+        print(f"{label:<7} {r['records']:>9} enr. | insertion {r['insert_s']:>7}s ({r['insert_per_s']}/s) | "
+              f"stats {r['stats_all_ms']:>9} ms | stats mois/modèle {r['stats_month_model_ms']:>9} ms | "
+              f"coûts/jour mois {r['daily_costs_month_ms']:>9} ms | historique jour {r['history_day_ms']:>8} ms")
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
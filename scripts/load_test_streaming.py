@@ -0,0 +1,308 @@
+"""Harness de charge pour le pipeline SSE de génération (jobs + stream).
+
+Pilote N jobs concurrents à travers l'API réelle :
+    POST /api/v1/dialogues/generate/jobs → GET /api/v1/dialogues/generate/jobs/{job_id}/stream
+et mesure le débit ainsi que les latences p50/p95/p99 (création du job, premier chunk, complétion).
+
+Destiné à être utilisé avec le serveur mock OpenAI (scripts/mock_openai_server.py) pour
+éviter tout appel réel à OpenAI. Avec --spawn, le harness démarre lui-même le mock et l'API
+(uvicorn, processus séparés) avec OPENAI_BASE_URL pointant vers le mock.
+
+Usage:
+    # API déjà démarrée avec OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+    python scripts/load_test_streaming.py --jobs 200 --concurrency 20
+
+    # Tout démarrer automatiquement (mock + API)
+    python scripts/load_test_streaming.py --spawn --jobs 200 --concurrency 50 --ttft lognormal:400:1500
+
+Note: les appels passent par le tracking d'usage et la cost governance de l'API : les
+fichiers data/llm_usage/ et data/cost_budgets.json sont donc mis à jour pendant le test.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.mock_openai_server import add_config_arguments  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).parent.parent
+JOBS_ENDPOINT = "/api/v1/dialogues/generate/jobs"
+DEFAULT_CHARACTER = "Akthar-Neth Amatru, l’Exégète"
+
+
+@dataclass
+class JobResult:
+    """Mesures d'un job piloté par le harness (durées en secondes depuis le POST)."""
+    status: str = "pending"  # complete, error, http_error, exception
+    create_latency: Optional[float] = None
+    first_chunk_latency: Optional[float] = None
+    total_latency: Optional[float] = None
+    frames: int = 0
+    chunks: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadTestReport:
+    """Résultat agrégé d'un run."""
+    jobs: int
+    concurrency: int
+    wall_time: float
+    results: List[JobResult] = field(default_factory=list)
+    mock_stats: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed = [r for r in self.results if r.status == "complete"]
+        statuses: Dict[str, int] = {}
+        for r in self.results:
+            statuses[r.status] = statuses.get(r.status, 0) + 1
+        total_frames = sum(r.frames for r in self.results)
+        return {
+            "jobs": self.jobs,
+            "concurrency": self.concurrency,
+            "wall_time_s": round(self.wall_time, 3),
+            "statuses": statuses,
+            "throughput_jobs_per_s": round(len(completed) / self.wall_time, 3) if self.wall_time > 0 else 0.0,
+            "frames_per_s": round(total_frames / self.wall_time, 1) if self.wall_time > 0 else 0.0,
+            "create_latency_ms": summarize([r.create_latency for r in self.results]),
+            "first_chunk_latency_ms": summarize([r.first_chunk_latency for r in completed]),
+            "total_latency_ms": summarize([r.total_latency for r in completed]),
+            "errors": sorted({r.error for r in self.results if r.error})[:10],
+            "mock_stats": self.mock_stats,
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile par interpolation linéaire (values non vide)."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (pct / 100.0) * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[Optional[float]]) -> Dict[str, float]:
+    """Résume une série de durées (secondes) en ms : count, mean, p50, p95, p99, max."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return {"count": 0}
+    return {
+        "count": len(present),
+        "mean": round(sum(present) / len(present) * 1000, 1),
+        "p50": round(percentile(present, 50) * 1000, 1),
+        "p95": round(percentile(present, 95) * 1000, 1),
+        "p99": round(percentile(present, 99) * 1000, 1),
+        "max": round(max(present) * 1000, 1),
+    }
+
+
+def build_job_payload(args: argparse.Namespace) -> Dict[str, Any]:
+    """Construit le body de création de job (identique à celui du frontend)."""
+    return {
+        "user_instructions": args.instructions,
+        "context_selections": {"characters_full": [args.character]},
+        "llm_model_identifier": args.model,
+        "max_context_tokens": args.max_context_tokens,
+    }
+
+
+async def run_job(client: httpx.AsyncClient, payload: Dict[str, Any]) -> JobResult:
+    """Crée un job puis consomme son stream SSE jusqu'à complete/error."""
+    result = JobResult()
+    start = time.perf_counter()
+    try:
+        response = await client.post(JOBS_ENDPOINT, json=payload)
+        result.create_latency = time.perf_counter() - start
+        if response.status_code != 200:
+            result.status = "http_error"
+            result.error = f"POST {response.status_code}: {response.text[:200]}"
+            return result
+        job_id = response.json()["job_id"]
+
+        async with client.stream("GET", f"{JOBS_ENDPOINT}/{job_id}/stream") as stream:
+            if stream.status_code != 200:
+                result.status = "http_error"
+                result.error = f"GET stream {stream.status_code}"
+                return result
+            async for line in stream.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                result.frames += 1
+                event = json.loads(line[len("data: "):])
+                event_type = event.get("type")
+                if event_type == "chunk":
+                    result.chunks += 1
+                    if result.first_chunk_latency is None:
+                        result.first_chunk_latency = time.perf_counter() - start
+                elif event_type == "complete":
+                    result.status = "complete"
+                    result.total_latency = time.perf_counter() - start
+                    break
+                elif event_type == "error":
+                    result.status = "error"
+                    result.error = str(event.get("message"))[:200]
+                    break
+        if result.status == "pending":
+            result.status = "error"
+            result.error = "Stream terminé sans événement complete"
+    except Exception as e:
+        result.status = "exception"
+        result.error = f"{type(e).__name__}: {e}"[:200]
+    return result
+
+
+async def run_load_test(args: argparse.Namespace) -> LoadTestReport:
+    """Exécute `args.jobs` jobs avec au plus `args.concurrency` en vol."""
+    payload = build_job_payload(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=timeout) as client:
+        async def bounded() -> JobResult:
+            async with semaphore:
+                return await run_job(client, payload)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded() for _ in range(args.jobs)))
+        wall_time = time.perf_counter() - start
+
+    report = LoadTestReport(jobs=args.jobs, concurrency=args.concurrency, wall_time=wall_time, results=list(results))
+    if args.mock_url:
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                report.mock_stats = (await client.get(f"{args.mock_url.rstrip('/')}/mock/stats")).json()
+        except Exception:
+            report.mock_stats = None
+    return report
+
+
+def _mock_cli_args(args: argparse.Namespace) -> List[str]:
+    """Retransmet les options de latence au processus du mock."""
+    cli = ["--ttft", args.ttft, "--tokens-per-sec", args.tokens_per_sec,
+           "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+           "--max-concurrency", str(args.max_concurrency)]
+    if args.completion_tokens:
+        cli += ["--completion-tokens", args.completion_tokens]
+    if args.no_reasoning:
+        cli.append("--no-reasoning")
+    if args.seed is not None:
+        cli += ["--seed", str(args.seed)]
+    return cli
+
+
+def _wait_for(url: str, timeout_seconds: float = 60.0) -> None:
+    deadline = time.time() + timeout_seconds
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Service non disponible: {url}")
+
+
+def spawn_servers(args: argparse.Namespace) -> List[subprocess.Popen]:
+    """Démarre le mock OpenAI et l'API (uvicorn) dans des processus séparés."""
+    mock_port = args.mock_port
+    api_port = args.api_port
+    processes = [subprocess.Popen(
+        [sys.executable, str(PROJECT_ROOT / "scripts" / "mock_openai_server.py"), "--port", str(mock_port)]
+        + _mock_cli_args(args),
+        cwd=str(PROJECT_ROOT),
+    )]
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{mock_port}/v1",
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "mock-key"),
+        "PROMETHEUS_ENABLED": env.get("PROMETHEUS_ENABLED", "false"),
+    })
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1",
+         "--port", str(api_port), "--log-level", "warning", "--workers", str(args.api_workers)],
+        cwd=str(PROJECT_ROOT),
+        env=env,
+    ))
+    args.mock_url = f"http://127.0.0.1:{mock_port}"
+    args.api_url = f"http://127.0.0.1:{api_port}"
+    _wait_for(f"{args.mock_url}/mock/stats")
+    _wait_for(f"{args.api_url}/health")
+    return processes
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n=== Load test: {report['jobs']} jobs, concurrence {report['concurrency']} ===")
+    print(f"Durée totale      : {report['wall_time_s']}s")
+    print(f"Statuts           : {report['statuses']}")
+    print(f"Débit             : {report['throughput_jobs_per_s']} jobs/s, {report['frames_per_s']} frames SSE/s")
+    for label, key in (("Création job", "create_latency_ms"),
+                       ("Premier chunk", "first_chunk_latency_ms"),
+                       ("Complétion", "total_latency_ms")):
+        stats = report[key]
+        if stats.get("count"):
+            print(f"{label:<18}: p50={stats['p50']}ms p95={stats['p95']}ms p99={stats['p99']}ms "
+                  f"max={stats['max']}ms (n={stats['count']})")
+        else:
+            print(f"{label:<18}: aucune mesure")
+    if report["errors"]:
+        print("Erreurs (échantillon):")
+        for error in report["errors"]:
+            print(f"  - {error}")
+    if report["mock_stats"]:
+        print(f"Mock OpenAI       : {report['mock_stats']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test de charge du pipeline SSE de génération")
+    parser.add_argument("--api-url", default="http://127.0.0.1:4242", help="URL de l'API (ignoré avec --spawn)")
+    parser.add_argument("--mock-url", default=None, help="URL du mock OpenAI (pour récupérer /mock/stats)")
+    parser.add_argument("--jobs", type=int, default=50, help="Nombre total de jobs")
+    parser.add_argument("--concurrency", type=int, default=10, help="Nombre de jobs simultanés")
+    parser.add_argument("--model", default="gpt-5-mini", help="llm_model_identifier (doit être de type openai)")
+    parser.add_argument("--character", default=DEFAULT_CHARACTER, help="Personnage sélectionné dans le contexte")
+    parser.add_argument("--instructions", default="Une rencontre brève dans l'atelier du cartographe.")
+    parser.add_argument("--max-context-tokens", type=int, default=8000)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout de lecture par job (s)")
+    parser.add_argument("--json", dest="json_output", default=None, help="Écrire le rapport JSON dans ce fichier")
+    parser.add_argument("--spawn", action="store_true", help="Démarrer le mock et l'API automatiquement")
+    parser.add_argument("--mock-port", type=int, default=8089)
+    parser.add_argument("--api-port", type=int, default=4343)
+    parser.add_argument("--api-workers", type=int, default=1)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    try:
+        if args.spawn:
+            processes = spawn_servers(args)
+        report = asyncio.run(run_load_test(args)).to_dict()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print_report(report)
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
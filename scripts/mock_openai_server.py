@@ -0,0 +1,497 @@
+"""Serveur local compatible OpenAI Responses API pour les tests de charge et de latence.
+
+Implémente le sous-ensemble de Responses API utilisé par `OpenAIClient` et
+`OpenAIStreamParser` :
+    - POST /v1/responses (stream=False) → objet Response complet
+    - POST /v1/responses (stream=True) → événements SSE (reasoning summary,
+      function_call_arguments.delta/done, output_text.delta/done, response.completed)
+    - Erreurs injectées (response.failed en streaming, HTTP 500 sinon) et HTTP 429
+
+La latence est configurable : TTFT (time to first token), débit en tokens/s et
+nombre de tokens générés suivent chacun une distribution (fixe, uniforme ou log-normale).
+
+Usage:
+    python scripts/mock_openai_server.py --port 8089 --ttft lognormal:400:1200 --tokens-per-sec uniform:40:120
+
+    # Puis pointer le SDK OpenAI (lu automatiquement par AsyncOpenAI) vers le mock :
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock-key npm run dev
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Nom du tool utilisé par OpenAIParameterBuilder pour le structured output
+STRUCTURED_OUTPUT_TOOL_NAME = "generate_interaction"
+
+# Approximation utilisée pour découper la sortie en "tokens" (~4 caractères par token)
+CHARS_PER_TOKEN = 4
+
+# z-score du 95e percentile d'une loi normale (conversion p95 → sigma log-normale)
+_Z_95 = 1.6449
+
+DEFAULT_STRUCTURED_PAYLOAD: Dict[str, Any] = {
+    "title": "Rencontre simulée",
+    "node": {
+        "speaker": "MOCK_NPC",
+        "line": (
+            "Tu arrives tard, voyageur. Les cartes se plient d'elles-mêmes quand la nuit tombe, "
+            "et personne ici ne sait plus où mènent les routes."
+        ),
+        "choices": [
+            {"text": "Je cherche le cartographe."},
+            {"text": "Quelles routes ont disparu ?"},
+            {"text": "Je ne fais que passer."},
+        ],
+    },
+}
+
+DEFAULT_TEXT_PAYLOAD = (
+    "Ceci est une réponse simulée par le serveur mock OpenAI. "
+    "Elle sert uniquement aux tests de charge et de latence du pipeline de génération."
+)
+
+DEFAULT_REASONING_SUMMARY = (
+    "Analyse du contexte fourni, choix du ton du PNJ et préparation de trois options de réponse."
+)
+
+
+@dataclass
+class LatencyDistribution:
+    """Distribution d'une grandeur aléatoire (durée en ms, débit, nombre de tokens).
+
+    Attributes:
+        kind: "fixed", "uniform" ou "lognormal".
+        a: Valeur fixe, borne basse (uniform) ou médiane (lognormal).
+        b: Borne haute (uniform) ou 95e percentile (lognormal). Ignoré pour "fixed".
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """Construit une distribution depuis une spécification texte.
+
+        Formats acceptés : "200" ou "fixed:200", "uniform:100:300", "lognormal:400:1200"
+        (médiane:p95).
+
+        Raises:
+            ValueError: Si la spécification est invalide.
+        """
+        parts = spec.strip().split(":")
+        try:
+            if len(parts) == 1:
+                return cls(kind="fixed", a=float(parts[0]))
+            kind = parts[0].lower()
+            if kind == "fixed" and len(parts) == 2:
+                return cls(kind="fixed", a=float(parts[1]))
+            if kind in ("uniform", "lognormal") and len(parts) == 3:
+                a, b = float(parts[1]), float(parts[2])
+                if b < a:
+                    raise ValueError(f"borne haute < borne basse dans '{spec}'")
+                if kind == "lognormal" and a <= 0:
+                    raise ValueError(f"la médiane doit être > 0 dans '{spec}'")
+                return cls(kind=kind, a=a, b=b)
+        except ValueError as e:
+            raise ValueError(f"Distribution invalide '{spec}': {e}") from e
+        raise ValueError(
+            f"Distribution invalide '{spec}' (attendu: N, fixed:N, uniform:MIN:MAX ou lognormal:MEDIAN:P95)"
+        )
+
+    def sample(self, rng: random.Random) -> float:
+        """Tire une valeur (toujours >= 0)."""
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            sigma = math.log(self.b / self.a) / _Z_95 if self.b > self.a else 0.0
+            return rng.lognormvariate(math.log(self.a), sigma)
+        return max(0.0, self.a)
+
+
+@dataclass
+class MockServerConfig:
+    """Configuration du serveur mock.
+
+    Attributes:
+        ttft_ms: Délai avant le premier token (ms).
+        tokens_per_sec: Débit de génération (tokens/s).
+        completion_tokens: Nombre de tokens de sortie annoncés dans l'usage
+            (la sortie réelle est le payload canned ; None = taille du payload).
+        error_rate: Probabilité (0-1) qu'une requête échoue (response.failed / HTTP 500).
+        rate_limit_rate: Probabilité (0-1) qu'une requête reçoive un HTTP 429.
+        max_concurrency: Au-delà de ce nombre de requêtes simultanées, renvoyer 429 (0 = illimité).
+        retry_after_seconds: Valeur du header Retry-After des réponses 429.
+        reasoning_summary: Émettre un résumé de reasoning avant la sortie.
+        seed: Graine du générateur aléatoire (reproductibilité).
+    """
+    ttft_ms: LatencyDistribution = field(default_factory=lambda: LatencyDistribution("fixed", 300.0))
+    tokens_per_sec: LatencyDistribution = field(default_factory=lambda: LatencyDistribution("fixed", 80.0))
+    completion_tokens: Optional[LatencyDistribution] = None
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    max_concurrency: int = 0
+    retry_after_seconds: float = 1.0
+    reasoning_summary: bool = True
+    seed: Optional[int] = None
+
+
+@dataclass
+class MockServerStats:
+    """Compteurs exposés sur GET /mock/stats."""
+    requests: int = 0
+    streamed: int = 0
+    completed: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def _split_tokens(text: str) -> List[str]:
+    """Découpe un texte en pseudo-tokens de CHARS_PER_TOKEN caractères."""
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+
+
+def _estimate_prompt_tokens(body: Dict[str, Any]) -> int:
+    """Estime les tokens d'entrée depuis `input` et `instructions`."""
+    total_chars = len(body.get("instructions") or "")
+    raw_input = body.get("input")
+    if isinstance(raw_input, str):
+        total_chars += len(raw_input)
+    elif isinstance(raw_input, list):
+        for message in raw_input:
+            content = message.get("content") if isinstance(message, dict) else None
+            if isinstance(content, str):
+                total_chars += len(content)
+            elif isinstance(content, list):
+                total_chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return max(1, total_chars // CHARS_PER_TOKEN)
+
+
+def _wants_structured_output(body: Dict[str, Any]) -> bool:
+    """Vrai si la requête déclare le tool de structured output."""
+    for tool in body.get("tools") or []:
+        if isinstance(tool, dict) and tool.get("name") == STRUCTURED_OUTPUT_TOOL_NAME:
+            return True
+    return False
+
+
+class MockResponsesBackend:
+    """Génère les réponses et les événements streaming simulés."""
+
+    def __init__(
+        self,
+        config: MockServerConfig,
+        structured_payload: Optional[Dict[str, Any]] = None,
+        text_payload: str = DEFAULT_TEXT_PAYLOAD,
+    ):
+        self.config = config
+        self.structured_arguments = json.dumps(
+            structured_payload or DEFAULT_STRUCTURED_PAYLOAD, ensure_ascii=False
+        )
+        self.text_payload = text_payload
+        self.rng = random.Random(config.seed)
+        self.stats = MockServerStats()
+
+    # --- Tirages -----------------------------------------------------------------
+
+    def should_rate_limit(self) -> bool:
+        if self.config.max_concurrency and self.stats.in_flight >= self.config.max_concurrency:
+            return True
+        return self.config.rate_limit_rate > 0 and self.rng.random() < self.config.rate_limit_rate
+
+    def should_fail(self) -> bool:
+        return self.config.error_rate > 0 and self.rng.random() < self.config.error_rate
+
+    def _token_delay(self) -> float:
+        rate = self.config.tokens_per_sec.sample(self.rng)
+        return 1.0 / rate if rate > 0 else 0.0
+
+    def _completion_tokens(self, output_text: str) -> int:
+        if self.config.completion_tokens is not None:
+            return max(1, int(self.config.completion_tokens.sample(self.rng)))
+        return max(1, len(output_text) // CHARS_PER_TOKEN)
+
+    # --- Construction des objets Response ---------------------------------------
+
+    def _output_items(self, structured: bool, call_id: str, item_id: str, reasoning_id: str) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        if self.config.reasoning_summary:
+            items.append({
+                "id": reasoning_id,
+                "type": "reasoning",
+                "summary": [{"type": "summary_text", "text": DEFAULT_REASONING_SUMMARY}],
+            })
+        if structured:
+            items.append({
+                "id": item_id,
+                "type": "function_call",
+                "status": "completed",
+                "call_id": call_id,
+                "name": STRUCTURED_OUTPUT_TOOL_NAME,
+                "arguments": self.structured_arguments,
+            })
+        else:
+            items.append({
+                "id": item_id,
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": self.text_payload, "annotations": []}],
+            })
+        return items
+
+    def build_response(
+        self,
+        body: Dict[str, Any],
+        response_id: str,
+        status: str,
+        output: List[Dict[str, Any]],
+        usage: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "mock-model"),
+            "status": status,
+            "output": output,
+            "usage": usage,
+            "error": error,
+            "parallel_tool_calls": False,
+            "tool_choice": body.get("tool_choice", "auto"),
+            "tools": body.get("tools") or [],
+        }
+
+    def _usage(self, body: Dict[str, Any], output_text: str) -> Dict[str, Any]:
+        prompt_tokens = _estimate_prompt_tokens(body)
+        completion_tokens = self._completion_tokens(output_text)
+        reasoning_tokens = len(DEFAULT_REASONING_SUMMARY) // CHARS_PER_TOKEN if self.config.reasoning_summary else 0
+        return {
+            "input_tokens": prompt_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": completion_tokens,
+            "output_tokens_details": {"reasoning_tokens": reasoning_tokens},
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    # --- Non-streaming ----------------------------------------------------------
+
+    async def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Simule un appel non streamé : TTFT + durée de génération, puis Response complète."""
+        structured = _wants_structured_output(body)
+        output_text = self.structured_arguments if structured else self.text_payload
+        ttft = self.config.ttft_ms.sample(self.rng) / 1000.0
+        generation = len(_split_tokens(output_text)) * self._token_delay()
+        await asyncio.sleep(ttft + generation)
+        response_id = f"resp_{uuid.uuid4().hex}"
+        output = self._output_items(structured, f"call_{uuid.uuid4().hex[:12]}", f"fc_{uuid.uuid4().hex[:12]}", f"rs_{uuid.uuid4().hex[:12]}")
+        return self.build_response(body, response_id, "completed", output, usage=self._usage(body, output_text))
+
+    # --- Streaming --------------------------------------------------------------
+
+    async def stream_events(self, body: Dict[str, Any], fail: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Produit la séquence d'événements Responses API d'une génération streamée."""
+        structured = _wants_structured_output(body)
+        output_text = self.structured_arguments if structured else self.text_payload
+        response_id = f"resp_{uuid.uuid4().hex}"
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+        item_id = f"fc_{uuid.uuid4().hex[:12]}" if structured else f"msg_{uuid.uuid4().hex[:12]}"
+        reasoning_id = f"rs_{uuid.uuid4().hex[:12]}"
+        token_delay = self._token_delay()
+        sequence = 0
+
+        def event(event_type: str, **payload: Any) -> Dict[str, Any]:
+            nonlocal sequence
+            sequence += 1
+            return {"type": event_type, "sequence_number": sequence, **payload}
+
+        in_progress = self.build_response(body, response_id, "in_progress", [])
+        yield event("response.created", response=in_progress)
+        yield event("response.in_progress", response=in_progress)
+
+        await asyncio.sleep(self.config.ttft_ms.sample(self.rng) / 1000.0)
+
+        output_index = 0
+        if self.config.reasoning_summary:
+            yield event("response.output_item.added", output_index=output_index,
+                        item={"id": reasoning_id, "type": "reasoning", "summary": []})
+            yield event("response.reasoning_summary_part.added", item_id=reasoning_id, output_index=output_index,
+                        summary_index=0, part={"type": "summary_text", "text": ""})
+            for token in _split_tokens(DEFAULT_REASONING_SUMMARY):
+                yield event("response.reasoning_summary_text.delta", item_id=reasoning_id,
+                            output_index=output_index, summary_index=0, delta=token)
+                await asyncio.sleep(token_delay)
+            yield event("response.reasoning_summary_text.done", item_id=reasoning_id, output_index=output_index,
+                        summary_index=0, text=DEFAULT_REASONING_SUMMARY)
+            output_index += 1
+
+        if fail:
+            error = {"code": "server_error", "message": "Erreur simulée par le serveur mock"}
+            yield event("response.failed",
+                        response=self.build_response(body, response_id, "failed", [], error=error))
+            return
+
+        if structured:
+            yield event("response.output_item.added", output_index=output_index, item={
+                "id": item_id, "type": "function_call", "status": "in_progress", "call_id": call_id,
+                "name": STRUCTURED_OUTPUT_TOOL_NAME, "arguments": "",
+            })
+            for token in _split_tokens(output_text):
+                yield event("response.function_call_arguments.delta", item_id=item_id,
+                            output_index=output_index, delta=token)
+                await asyncio.sleep(token_delay)
+            yield event("response.function_call_arguments.done", item_id=item_id, output_index=output_index,
+                        name=STRUCTURED_OUTPUT_TOOL_NAME, arguments=output_text)
+        else:
+            yield event("response.output_item.added", output_index=output_index, item={
+                "id": item_id, "type": "message", "role": "assistant", "status": "in_progress", "content": [],
+            })
+            yield event("response.content_part.added", item_id=item_id, output_index=output_index,
+                        content_index=0, part={"type": "output_text", "text": "", "annotations": []})
+            for token in _split_tokens(output_text):
+                yield event("response.output_text.delta", item_id=item_id, output_index=output_index,
+                            content_index=0, delta=token, logprobs=[])
+                await asyncio.sleep(token_delay)
+            yield event("response.output_text.done", item_id=item_id, output_index=output_index,
+                        content_index=0, text=output_text, logprobs=[])
+
+        output = self._output_items(structured, call_id, item_id, reasoning_id)
+        yield event("response.output_item.done", output_index=output_index, item=output[-1])
+        yield event("response.completed", response=self.build_response(
+            body, response_id, "completed", output, usage=self._usage(body, output_text)
+        ))
+
+
+def _error_body(message: str, error_type: str, code: str) -> Dict[str, Any]:
+    return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+
+def create_mock_app(config: Optional[MockServerConfig] = None, **backend_kwargs: Any) -> FastAPI:
+    """Crée l'application FastAPI du serveur mock.
+
+    Args:
+        config: Configuration de latence et d'erreurs (défaut: MockServerConfig()).
+        **backend_kwargs: Payloads personnalisés (structured_payload, text_payload).
+
+    Returns:
+        Application FastAPI exposant /v1/responses et /mock/stats.
+    """
+    backend = MockResponsesBackend(config or MockServerConfig(), **backend_kwargs)
+    app = FastAPI(title="Mock OpenAI Responses API")
+    app.state.backend = backend
+    stats = backend.stats
+
+    @app.post("/v1/responses")
+    async def create_response(request: Request):
+        body = await request.json()
+        stats.requests += 1
+
+        if backend.should_rate_limit():
+            stats.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                content=_error_body("Rate limit reached (mock)", "requests", "rate_limit_exceeded"),
+                headers={"retry-after": str(backend.config.retry_after_seconds)},
+            )
+
+        fail = backend.should_fail()
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+        if not body.get("stream"):
+            try:
+                if fail:
+                    await asyncio.sleep(backend.config.ttft_ms.sample(backend.rng) / 1000.0)
+                    stats.failed += 1
+                    return JSONResponse(
+                        status_code=500,
+                        content=_error_body("Erreur simulée par le serveur mock", "server_error", "server_error"),
+                    )
+                result = await backend.complete(body)
+                stats.completed += 1
+                return JSONResponse(content=result)
+            finally:
+                stats.in_flight -= 1
+
+        stats.streamed += 1
+
+        async def sse() -> AsyncIterator[str]:
+            try:
+                async for payload in backend.stream_events(body, fail=fail):
+                    yield f"event: {payload['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                if fail:
+                    stats.failed += 1
+                else:
+                    stats.completed += 1
+            finally:
+                stats.in_flight -= 1
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    @app.get("/mock/stats")
+    async def get_stats() -> Dict[str, int]:
+        return stats.to_dict()
+
+    return app
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Ajoute les options de configuration du mock à un parser (partagé avec le harness)."""
+    parser.add_argument("--ttft", default="fixed:300", help="Distribution du TTFT en ms (ex: lognormal:400:1200)")
+    parser.add_argument("--tokens-per-sec", default="fixed:80", help="Distribution du débit en tokens/s")
+    parser.add_argument("--completion-tokens", default=None, help="Distribution des tokens de sortie annoncés")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilité d'erreur (0-1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probabilité de 429 (0-1)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="Requêtes simultanées avant 429 (0 = illimité)")
+    parser.add_argument("--no-reasoning", action="store_true", help="Ne pas émettre de reasoning summary")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire")
+
+
+def config_from_args(args: argparse.Namespace) -> MockServerConfig:
+    """Construit un MockServerConfig depuis les arguments de add_config_arguments()."""
+    return MockServerConfig(
+        ttft_ms=LatencyDistribution.parse(args.ttft),
+        tokens_per_sec=LatencyDistribution.parse(args.tokens_per_sec),
+        completion_tokens=LatencyDistribution.parse(args.completion_tokens) if args.completion_tokens else None,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_concurrency=args.max_concurrency,
+        reasoning_summary=not args.no_reasoning,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serveur mock OpenAI Responses API (tests de charge)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_mock_app(config_from_args(args))
+    logger.info(f"Mock OpenAI prêt: OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
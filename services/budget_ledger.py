@@ -0,0 +1,293 @@
+"""Registre des budgets LLM en mémoire, avec réservations, pour la vérification avant génération.
+
+CostGovernanceMiddleware ne relit plus `cost_budgets.json` à chaque requête : le
+registre garde les budgets en mémoire et ne les recharge que si le fichier a changé
+(`os.stat`, par exemple après l'écriture d'un autre worker). La vérification n'écrit
+jamais (un nouveau mois repart de 0 en mémoire ; le reset est écrit avec le premier coût).
+
+Chaque génération autorisée réserve son coût estimé, atomiquement : les requêtes
+concurrentes voient les réservations les unes des autres et ne peuvent pas dépasser
+ensemble le quota. Avec un repository fichier, les réservations sont partagées par les
+workers (`<fichier>.reservations.json`, sous le verrou `fcntl` du fichier de budgets,
+relu à chaque réservation) ; sinon elles restent en mémoire du processus.
+
+À la fin de la génération, la réservation est libérée : le coût réel a alors été compté
+par LLMUsageService (écrit en arrière-plan par le UsageWriter, compté en mémoire d'ici là
+via get_pending_budget_cost, puis ajouté au fichier par `increment_budget`, atomique
+entre workers). Ce coût en attente n'est visible que du processus qui l'a produit : avec
+un UsageWriter actif, une réservation libérée reste donc comptée par les autres workers
+jusqu'à l'écriture du writer (flush_interval + RELEASED_GRACE_SECONDS). Une réservation
+jamais libérée (worker arrêté) expire après RESERVATION_TTL_SECONDS.
+
+GenerationBudgetGuard fait cette vérification dans l'orchestrateur de génération, une
+fois la requête validée et le prompt construit : le coût estimé utilise le nombre réel de
+tokens du prompt (BuiltPrompt.token_count), le tarif du modèle demandé et le nombre de
+variantes k, sans relire le corps de la requête ni reconstruire le prompt.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, ContextManager, Dict, Optional, Tuple
+
+from services.cost_governance_service import evaluate_budget
+from services.llm_pricing_service import LLMPricingService
+from services.usage_writer import budget_storage_key, get_pending_budget_cost, get_usage_writer
+
+logger = logging.getLogger(__name__)
+
+# User ID par défaut (V1.0: pas d'authentification, utilisateur unique)
+DEFAULT_USER_ID = "default_user"
+
+# Durée de vie maximale d'une réservation partagée (worker arrêté sans la libérer)
+RESERVATION_TTL_SECONDS = 15 * 60
+# Marge après le flush du UsageWriter pendant laquelle une réservation libérée reste comptée
+RELEASED_GRACE_SECONDS = 1.0
+
+
+@dataclass
+class BudgetReservation:
+    """Coût estimé réservé pour une génération en cours."""
+    user_id: str
+    amount: float
+    released: bool = False
+    reservation_id: str = ""
+
+
+class BudgetLedger:
+    """Budgets en mémoire et réservations des générations en cours (un registre par fichier)."""
+
+    def __init__(self, repository: Any):
+        """
+        Args:
+            repository: Repository de budgets (ICostBudgetRepository).
+        """
+        self.repository = repository
+        self._lock = threading.Lock()
+        # user_id -> dernier budget enregistré (tous mois confondus)
+        self._budgets: Dict[str, Optional[Dict]] = {}
+        self._file_stamp: Optional[Tuple[int, ...]] = None
+        # user_id -> coûts réservés par les générations en cours
+        self._reserved: Dict[str, float] = {}
+        self._reloads = 0
+
+    def _current_stamp(self) -> Optional[Tuple[int, ...]]:
+        """Identifie la version du fichier de budgets (None : stockage sans fichier)."""
+        storage_file = getattr(self.repository, "storage_file", None)
+        if storage_file is None:
+            return None
+        try:
+            stat = os.stat(storage_file)
+        except OSError:
+            return (0,)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _load_budget(self, user_id: str, month: str) -> Optional[Dict]:
+        """Budget de l'utilisateur (rechargé si le fichier a changé)."""
+        stamp = self._current_stamp()
+        if stamp is None or stamp != self._file_stamp:
+            self._budgets.clear()
+            self._file_stamp = stamp
+        if user_id not in self._budgets:
+            get_user_budget = getattr(self.repository, "get_user_budget", None)
+            if get_user_budget is not None:
+                self._budgets[user_id] = get_user_budget(user_id)
+            else:
+                self._budgets[user_id] = self.repository.get_budget(user_id, month)
+            self._reloads += 1
+        return self._budgets[user_id]
+
+    def _shared_reservations(self) -> ContextManager[Optional[Dict[str, Dict]]]:
+        """Réservations partagées entre workers (None : réservations en mémoire du processus)."""
+        reservations = getattr(self.repository, "reservations", None)
+        return reservations() if reservations is not None else nullcontext()
+
+    @staticmethod
+    def _shared_amount(entries: Dict[str, Dict], user_id: str, now: float) -> float:
+        """Purge les réservations expirées et retourne le total réservé pour l'utilisateur.
+
+        Les réservations libérées par ce processus ne sont pas comptées : leur coût réel
+        est déjà dans get_pending_budget_cost.
+        """
+        pid = os.getpid()
+        total = 0.0
+        for reservation_id, entry in list(entries.items()):
+            if entry.get("expires_at", 0.0) <= now:
+                del entries[reservation_id]
+            elif entry.get("user_id") == user_id and not (entry.get("released") and entry.get("pid") == pid):
+                total += entry.get("amount", 0.0)
+        return total
+
+    def reserve(self, user_id: str, estimated_cost: float) -> Tuple[Dict[str, Any], Optional[BudgetReservation]]:
+        """Vérifie le budget et, si la génération est autorisée, réserve son coût estimé.
+
+        Bloquant (verrou fcntl et réécriture des réservations partagées) : depuis du code
+        async, l'appeler via asyncio.to_thread.
+
+        Args:
+            user_id: ID de l'utilisateur.
+            estimated_cost: Coût estimé de la génération.
+
+        Returns:
+            (résultat de la vérification comme CostGovernanceService.check_budget,
+            réservation à libérer en fin de requête ou None si bloquée).
+        """
+        month = datetime.now().strftime("%Y-%m")
+        with self._lock, self._shared_reservations() as entries:
+            budget = self._load_budget(user_id, month) or {}
+            quota = budget.get("quota", 0.0)
+            # Budget d'un mois précédent : repart de 0 (quota conservé)
+            amount = budget.get("amount", 0.0) if budget.get("month") == month else 0.0
+            amount += get_pending_budget_cost(self.repository, user_id)
+            now = time.time()
+            if entries is None:
+                amount += self._reserved.get(user_id, 0.0)
+            else:
+                amount += self._shared_amount(entries, user_id, now)
+            result = evaluate_budget(amount, quota, estimated_cost)
+            if not result["allowed"]:
+                return result, None
+            reservation = BudgetReservation(user_id=user_id, amount=estimated_cost, reservation_id=uuid.uuid4().hex)
+            if entries is not None:
+                entries[reservation.reservation_id] = {
+                    "user_id": user_id,
+                    "amount": estimated_cost,
+                    "pid": os.getpid(),
+                    "expires_at": now + RESERVATION_TTL_SECONDS,
+                    "released": False,
+                }
+            self._reserved[user_id] = self._reserved.get(user_id, 0.0) + estimated_cost
+            return result, reservation
+
+    def release(self, reservation: BudgetReservation) -> None:
+        """Libère une réservation (fin de la requête ; le coût réel est compté par ailleurs).
+
+        Bloquant comme reserve() : depuis du code async, l'appeler via asyncio.to_thread.
+
+        Args:
+            reservation: Réservation retournée par reserve().
+        """
+        with self._lock, self._shared_reservations() as entries:
+            if reservation.released:
+                return
+            reservation.released = True
+            remaining = self._reserved.get(reservation.user_id, 0.0) - reservation.amount
+            if remaining > 1e-12:
+                self._reserved[reservation.user_id] = remaining
+            else:
+                self._reserved.pop(reservation.user_id, None)
+            if entries is None or reservation.reservation_id not in entries:
+                return
+            writer = get_usage_writer()
+            if writer is None:
+                # Coût réel déjà écrit dans le fichier de budgets
+                del entries[reservation.reservation_id]
+            else:
+                # Coût réel en attente dans le writer de ce processus : rester visible des
+                # autres workers jusqu'à son écriture
+                entries[reservation.reservation_id].update(
+                    released=True,
+                    expires_at=time.time() + writer.flush_interval + RELEASED_GRACE_SECONDS
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les réservations en cours du processus et le nombre de rechargements."""
+        with self._lock:
+            return {
+                "reserved": dict(self._reserved),
+                "reloads": self._reloads,
+                "shared": getattr(self.repository, "reservations", None) is not None,
+            }
+
+
+class GenerationBudgetGuard:
+    """Vérification du budget d'une génération à partir de son prompt construit."""
+
+    def __init__(
+        self,
+        ledger: BudgetLedger,
+        pricing_service: Optional[LLMPricingService] = None,
+        user_id: str = DEFAULT_USER_ID
+    ):
+        """
+        Args:
+            ledger: Registre des budgets (partagé par les requêtes du processus).
+            pricing_service: Service de tarifs LLM (chargé une fois si None).
+            user_id: ID de l'utilisateur dont le budget est vérifié.
+        """
+        self.ledger = ledger
+        self.pricing_service = pricing_service or LLMPricingService()
+        self.user_id = user_id
+
+    def estimate_cost(self, model_name: str, prompt_tokens: int, max_completion_tokens: int, k: int = 1) -> float:
+        """Estime le coût d'une génération (borne haute : chaque variante peut atteindre max_completion_tokens).
+
+        Args:
+            model_name: Modèle demandé.
+            prompt_tokens: Tokens du prompt construit (envoyé pour chaque variante).
+            max_completion_tokens: Limite de tokens de complétion d'une variante.
+            k: Nombre de variantes générées.
+
+        Returns:
+            Coût estimé (0.0 si le modèle n'a pas de tarif).
+        """
+        return self.pricing_service.calculate_cost(
+            model_name=model_name,
+            prompt_tokens=prompt_tokens * k,
+            completion_tokens=max_completion_tokens * k
+        )
+
+    def reserve(
+        self,
+        model_name: str,
+        prompt_tokens: int,
+        max_completion_tokens: int,
+        k: int = 1
+    ) -> Tuple[Dict[str, Any], Optional[BudgetReservation]]:
+        """Vérifie le budget pour la génération et, si elle est autorisée, réserve son coût estimé.
+
+        Args:
+            model_name: Modèle demandé.
+            prompt_tokens: Tokens du prompt construit.
+            max_completion_tokens: Limite de tokens de complétion d'une variante.
+            k: Nombre de variantes générées.
+
+        Returns:
+            (résultat de la vérification, avec le coût estimé dans "estimated_cost",
+            réservation à libérer en fin de génération ou None si bloquée).
+        """
+        estimated_cost = self.estimate_cost(model_name, prompt_tokens, max_completion_tokens, k)
+        result, reservation = self.ledger.reserve(self.user_id, estimated_cost)
+        return {**result, "estimated_cost": estimated_cost}, reservation
+
+    def release(self, reservation: BudgetReservation) -> None:
+        """Libère la réservation d'une génération terminée.
+
+        Args:
+            reservation: Réservation retournée par reserve().
+        """
+        self.ledger.release(reservation)
+
+
+# Registres par fichier de budgets (partagés par toutes les requêtes du processus)
+_budget_ledgers: Dict[str, BudgetLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_budget_ledger(repository: Any) -> BudgetLedger:
+    """Récupère le registre du stockage d'un repository de budgets (créé au premier appel).
+
+    Args:
+        repository: Repository de budgets (ICostBudgetRepository).
+    """
+    key = budget_storage_key(repository)
+    with _ledgers_lock:
+        ledger = _budget_ledgers.get(key)
+        if ledger is None:
+            ledger = BudgetLedger(repository)
+            _budget_ledgers[key] = ledger
+        return ledger
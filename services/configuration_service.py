@@ -22,6 +22,16 @@ CONFIG_DIR = DIALOGUE_GENERATOR_DIR / "config"
 # Chemin par défaut pour les dialogues Unity - toujours Assets/Dialogue depuis la racine du projet
 DEFAULT_UNITY_DIALOGUES_PATH = DIALOGUE_GENERATOR_DIR / "Assets" / "Dialogue"
 
+
+def _invalidate_data_version(source: str) -> None:
+    """Signale une écriture au registre des versions de données (cache HTTP), s'il est disponible."""
+    try:
+        from api.utils.data_versions import get_data_versions
+    except ImportError:
+        return
+    get_data_versions().invalidate(source)
+
+
 class ConfigurationService:
     def __init__(self):
         # Load app_config.json, with migration from ui_settings.json if needed
@@ -74,6 +84,7 @@ class ConfigurationService:
             file_path.parent.mkdir(parents=True, exist_ok=True) # Ensure directory exists
             with open(file_path, "w", encoding="utf-8") as f:
                 json.dump(data, f, indent=4)
+            _invalidate_data_version("config")
             return True
         except IOError:
             logger.error(f"Could not write to {file_path}.")
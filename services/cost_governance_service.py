@@ -4,15 +4,64 @@ from datetime import datetime
 from typing import Dict, Optional
 
 from services.repositories.cost_budget_repository import ICostBudgetRepository
+from services.usage_writer import get_pending_budget_cost
 
 logger = logging.getLogger(__name__)
 
 
+def evaluate_budget(amount: float, quota: float, estimated_cost: float) -> Dict[str, any]:
+    """Applique les seuils du budget (soft warning à 90%, hard block à 100%).
+    
+    Args:
+        amount: Montant déjà consommé (ou engagé).
+        quota: Quota mensuel (0 = pas de limite).
+        estimated_cost: Coût estimé de la génération.
+        
+    Returns:
+        Dictionnaire avec allowed, percentage et warning (voir CostGovernanceService.check_budget).
+    """
+    # Calculer le nouveau montant après génération
+    new_amount = amount + estimated_cost
+    
+    # Calculer le pourcentage
+    if quota == 0.0:
+        percentage = 0.0 if new_amount == 0.0 else 100.0
+    else:
+        percentage = (new_amount / quota) * 100.0
+    
+    # Hard block à 100%
+    if new_amount >= quota and quota > 0:
+        return {
+            "allowed": False,
+            "percentage": percentage,
+            "warning": f"Budget dépassé ({percentage:.1f}%) - Veuillez augmenter le budget ou attendre le prochain mois"
+        }
+    
+    # Soft warning à 90%
+    if percentage >= 90.0 and quota > 0:
+        remaining = quota - new_amount
+        return {
+            "allowed": True,
+            "percentage": percentage,
+            "warning": f"Budget atteint à {percentage:.1f}% - {remaining:.2f}€ restants"
+        }
+    
+    # Pas de warning
+    return {
+        "allowed": True,
+        "percentage": percentage,
+        "warning": None
+    }
+
+
 class CostGovernanceService:
     """Service pour gérer les budgets LLM et vérifier les limites.
     
     Gère les soft warnings (90%) et hard blocks (100%) pour protéger
     contre les dépassements de budget.
+    
+    Le montant consommé inclut les coûts soumis au UsageWriter mais pas encore
+    persistés (compteurs en mémoire) : les vérifications n'attendent pas le disque.
     """
     
     def __init__(self, repository: ICostBudgetRepository):
@@ -70,40 +119,9 @@ class CostGovernanceService:
             }
         
         quota = budget.get("quota", 0.0)
-        amount = budget.get("amount", 0.0)
-        
-        # Calculer le nouveau montant après génération
-        new_amount = amount + estimated_cost
+        amount = budget.get("amount", 0.0) + get_pending_budget_cost(self.repository, user_id)
         
-        # Calculer le pourcentage
-        if quota == 0.0:
-            percentage = 0.0 if new_amount == 0.0 else 100.0
-        else:
-            percentage = (new_amount / quota) * 100.0
-        
-        # Hard block à 100%
-        if new_amount >= quota and quota > 0:
-            return {
-                "allowed": False,
-                "percentage": percentage,
-                "warning": f"Budget dépassé ({percentage:.1f}%) - Veuillez augmenter le budget ou attendre le prochain mois"
-            }
-        
-        # Soft warning à 90%
-        if percentage >= 90.0 and quota > 0:
-            remaining = quota - new_amount
-            return {
-                "allowed": True,
-                "percentage": percentage,
-                "warning": f"Budget atteint à {percentage:.1f}% - {remaining:.2f}€ restants"
-            }
-        
-        # Pas de warning
-        return {
-            "allowed": True,
-            "percentage": percentage,
-            "warning": None
-        }
+        return evaluate_budget(amount, quota, estimated_cost)
     
     def get_budget_status(self, user_id: str) -> Dict[str, any]:
         """Récupère le statut du budget actuel.
@@ -117,11 +135,13 @@ class CostGovernanceService:
         current_month = datetime.now().strftime("%Y-%m")
         budget = self.repository.get_budget(user_id, current_month)
         
+        pending = get_pending_budget_cost(self.repository, user_id)
+        
         # Si pas de budget, retourner valeurs par défaut
         if budget is None:
             return {
                 "quota": 0.0,
-                "amount": 0.0,
+                "amount": pending,
                 "percentage": 0.0,
                 "remaining": 0.0
             }
@@ -140,7 +160,7 @@ class CostGovernanceService:
             }
         
         quota = budget.get("quota", 0.0)
-        amount = budget.get("amount", 0.0)
+        amount = budget.get("amount", 0.0) + pending
         
         if quota == 0.0:
             percentage = 0.0
@@ -164,6 +184,14 @@ class CostGovernanceService:
             cost: Coût réel de la génération.
         """
         current_month = datetime.now().strftime("%Y-%m")
+        
+        increment_budget = getattr(self.repository, "increment_budget", None)
+        if increment_budget is not None:
+            # Read-modify-write atomique (plusieurs workers peuvent mettre à jour le fichier)
+            budget = increment_budget(user_id, current_month, cost)
+            logger.debug(f"Budget mis à jour pour {user_id}: {budget['amount']:.2f}€ / {budget['quota']:.2f}€")
+            return
+        
         budget = self.repository.get_budget(user_id, current_month)
         
         # Si pas de budget, créer un budget par défaut
@@ -88,6 +88,14 @@ class GDDLoader:
             else:
                 # Par défaut, Vision.json est dans data/ du projet
                 self._import_path = context_builder_dir / "data"
+        
+        # Fichiers lus lors du dernier load_all (empreinte de la génération GDD)
+        self._loaded_files: List[Path] = []
+    
+    @property
+    def loaded_files(self) -> List[Path]:
+        """Fichiers GDD lus lors du dernier chargement complet."""
+        return list(self._loaded_files)
     
     def _get_gdd_cache(self):
         """Récupère l'instance du cache GDD si disponible.
@@ -164,6 +172,8 @@ class GDDLoader:
             logger.warning(f"Fichier Vision.json non trouvé dans {self._import_path}.")
             return None
         
+        self._loaded_files.append(vision_file_path)
+        
         # Vérifier le cache
         vision_cache_key = f"vision:{vision_file_path.resolve()}"
         cached_vision = gdd_cache.get(vision_cache_key, vision_file_path) if gdd_cache else None
@@ -227,6 +237,7 @@ class GDDLoader:
             logger.debug(f"Fichier {category_name}.json non trouvé dans {self._categories_path}. Utilisation de la valeur par défaut.")
             return [] if config["type"] == list else {}
         
+        self._loaded_files.append(file_path)
         json_main_key = config["key"]
         expected_type = config["type"]
         default_value = [] if expected_type == list else {}
@@ -303,6 +314,7 @@ class GDDLoader:
         )
         
         gdd_data = GDDData()
+        self._loaded_files = []
         
         # Charger Vision.json
         gdd_data.vision_data = self.load_vision()
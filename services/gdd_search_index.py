@@ -0,0 +1,353 @@
+"""Index de recherche plein texte sur les éléments du GDD.
+
+Index inversé construit une fois par génération du GDD sur les noms et une sélection
+de champs texte de chaque catégorie (personnages, lieux, objets, espèces...).
+
+- Normalisation : minuscules, suppression des accents (« Éloïse » -> « eloise »),
+  ligatures (œ, æ), apostrophes typographiques.
+- Tokenisation française : découpage sur les caractères non alphanumériques,
+  élisions retirées (l', d', qu'...), mots vides ignorés.
+- Recherche : chaque terme de la requête correspond exactement, par préfixe
+  (vocabulaire trié + bisect) ou approximativement (distance d'édition 1, via un
+  index des suppressions). Tous les termes doivent correspondre ; les éléments sont
+  classés par score (poids du champ x qualité de la correspondance), avec un bonus
+  lorsque le nom correspond à la requête.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Catégories indexées (attributs du ContextBuilder)
+SEARCHABLE_CATEGORIES: Tuple[str, ...] = (
+    "characters", "locations", "items", "species", "communities",
+    "quests", "dialogues_examples", "narrative_structures",
+)
+
+# Champs indexés (hors nom) et leur poids
+FIELD_WEIGHTS: Dict[str, float] = {
+    "Alias": 6.0,
+    "Titre": 6.0,
+    "Espèce": 3.0,
+    "Type": 3.0,
+    "Occupation": 3.0,
+    "Catégorie": 3.0,
+    "Règne": 3.0,
+    "Rôle": 2.0,
+    "Résumé": 2.0,
+    "Résumé IA": 2.0,
+    "Description": 2.0,
+    "Introduction": 1.0,
+}
+NAME_WEIGHT = 10.0
+# Longueur maximale indexée par champ texte (les introductions peuvent être très longues)
+MAX_FIELD_CHARS = 4000
+
+# Facteurs appliqués selon le type de correspondance d'un terme
+EXACT_FACTOR = 1.0
+PREFIX_FACTOR = 0.6
+FUZZY_FACTOR = 0.4
+# Bonus lorsque le nom normalisé est égal à la requête ou commence par elle
+NAME_EXACT_BONUS = 50.0
+NAME_PREFIX_BONUS = 20.0
+
+# Longueur minimale d'un terme pour la correspondance approximative
+FUZZY_MIN_LENGTH = 4
+# Nombre maximal de termes du vocabulaire couverts par un préfixe
+MAX_PREFIX_EXPANSIONS = 200
+
+FRENCH_STOPWORDS = frozenset((
+    "a", "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "elle", "en", "et",
+    "il", "ils", "la", "le", "les", "leur", "leurs", "lui", "mais", "ne", "ni", "ou", "par",
+    "pas", "pour", "qu", "que", "qui", "sa", "se", "ses", "son", "sur", "un", "une", "y",
+))
+# Élisions françaises (l'arbre, qu'il, d'Alteir...)
+_ELISION_RE = re.compile(r"\b(?:l|d|j|m|n|s|t|c|qu|jusqu|lorsqu|puisqu)'")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "OE", "æ": "ae", "Æ": "AE", "ß": "ss",
+                            "’": "'", "‘": "'", "`": "'"})
+
+
+def fold_text(text: str) -> str:
+    """Normalise un texte pour l'indexation (minuscules, sans accents ni ligatures).
+
+    Args:
+        text: Texte d'origine.
+
+    Returns:
+        Texte normalisé.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.translate(_LIGATURES))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Découpe un texte en termes normalisés (élisions et mots vides retirés).
+
+    Args:
+        text: Texte d'origine.
+
+    Returns:
+        Termes dans l'ordre du texte.
+    """
+    folded = _ELISION_RE.sub(" ", fold_text(text))
+    return [token for token in _TOKEN_RE.findall(folded) if token not in FRENCH_STOPWORDS]
+
+
+def _deletes(term: str) -> Set[str]:
+    """Variantes d'un terme obtenues en supprimant un caractère."""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Vrai si a et b diffèrent d'au plus une opération (insertion, suppression,
+    substitution ou transposition de deux caractères adjacents)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if la > lb:
+        a, b = b, a
+    # b a un caractère de plus que a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def _stringify(value: Any) -> str:
+    """Convertit une valeur de champ GDD (texte, liste, dict) en texte indexable."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return " ".join(_stringify(v) for v in value)
+    if isinstance(value, dict):
+        return " ".join(_stringify(v) for v in value.values())
+    if value is None:
+        return ""
+    return str(value)
+
+
+@dataclass
+class SearchHit:
+    """Élément trouvé par une recherche."""
+    category: str
+    name: str
+    score: float
+
+
+class GDDSearchIndex:
+    """Index inversé des éléments GDD (noms et champs texte sélectionnés)."""
+
+    def __init__(
+        self,
+        categories: Mapping[str, Sequence[Dict[str, Any]]],
+        generation: int = 0,
+        name_key: str = "Nom"
+    ):
+        """Construit l'index.
+
+        Args:
+            categories: Éléments par catégorie (ex: {"characters": [...], "locations": [...]}).
+            generation: Génération GDD à laquelle appartient l'index.
+            name_key: Clé du nom des éléments.
+        """
+        started = time.perf_counter()
+        self.generation = generation
+        self.sources = {category: elements for category, elements in categories.items()}
+        # doc_id -> (catégorie, nom, nom normalisé)
+        self._docs: List[Tuple[str, str, str]] = []
+        # terme -> {doc_id: poids}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        for category, elements in categories.items():
+            for element in elements or []:
+                if not isinstance(element, dict) or not element.get(name_key):
+                    continue
+                name = str(element[name_key])
+                doc_id = len(self._docs)
+                self._docs.append((category, name, " ".join(tokenize(name))))
+                self._add_text(doc_id, name, NAME_WEIGHT)
+                for field_name, weight in FIELD_WEIGHTS.items():
+                    if field_name in element:
+                        self._add_text(doc_id, _stringify(element[field_name])[:MAX_FIELD_CHARS], weight)
+        self._vocabulary: List[str] = sorted(self._postings)
+        # suppression -> termes (correspondance approximative à une opération près)
+        self._deletes: Dict[str, List[str]] = {}
+        for term in self._vocabulary:
+            if len(term) >= FUZZY_MIN_LENGTH:
+                for variant in _deletes(term):
+                    self._deletes.setdefault(variant, []).append(term)
+        logger.info(
+            f"Index de recherche GDD construit: {len(self._docs)} éléments, {len(self._vocabulary)} termes "
+            f"({(time.perf_counter() - started) * 1000:.0f} ms, génération {generation})"
+        )
+
+    def _add_text(self, doc_id: int, text: str, weight: float) -> None:
+        """Indexe les termes d'un texte pour un élément (poids maximal par terme)."""
+        for term in tokenize(text):
+            postings = self._postings.setdefault(term, {})
+            if postings.get(doc_id, 0.0) < weight:
+                postings[doc_id] = weight
+
+    @property
+    def size(self) -> int:
+        """Nombre d'éléments indexés."""
+        return len(self._docs)
+
+    @property
+    def vocabulary_size(self) -> int:
+        """Nombre de termes distincts."""
+        return len(self._vocabulary)
+
+    def _expand(self, token: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        """Retourne les termes du vocabulaire correspondant à un terme de la requête.
+
+        Returns:
+            Terme -> facteur de correspondance (exact > préfixe > approximatif).
+        """
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT_FACTOR
+        if prefix:
+            start = bisect.bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_FACTOR)
+        if fuzzy and len(token) >= FUZZY_MIN_LENGTH:
+            candidates = set(self._deletes.get(token, ()))
+            for variant in _deletes(token):
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(self._deletes.get(variant, ()))
+            for term in candidates:
+                if term not in matches and _within_one_edit(token, term):
+                    matches[term] = FUZZY_FACTOR
+        return matches
+
+    def search(
+        self,
+        query: str,
+        categories: Optional[Iterable[str]] = None,
+        prefix: bool = True,
+        fuzzy: bool = True
+    ) -> List[SearchHit]:
+        """Recherche les éléments correspondant à une requête.
+
+        Args:
+            query: Texte recherché.
+            categories: Catégories à inclure (toutes si None).
+            prefix: Si True, chaque terme correspond aussi aux termes qu'il préfixe.
+            fuzzy: Si True, tolère une faute de frappe par terme (termes de 4 caractères ou plus).
+
+        Returns:
+            Éléments trouvés, classés par score décroissant puis par nom.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        allowed = set(categories) if categories is not None else None
+
+        scores: Optional[Dict[int, float]] = None
+        for token in tokens:
+            token_scores: Dict[int, float] = {}
+            for term, factor in self._expand(token, prefix, fuzzy).items():
+                for doc_id, weight in self._postings[term].items():
+                    score = weight * factor
+                    if token_scores.get(doc_id, 0.0) < score:
+                        token_scores[doc_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                # Tous les termes de la requête doivent correspondre
+                scores = {doc_id: scores[doc_id] + s for doc_id, s in token_scores.items() if doc_id in scores}
+            if not scores:
+                return []
+
+        folded_query = " ".join(tokens)
+        hits = []
+        for doc_id, score in scores.items():
+            category, name, folded_name = self._docs[doc_id]
+            if allowed is not None and category not in allowed:
+                continue
+            if folded_name == folded_query:
+                score += NAME_EXACT_BONUS
+            elif folded_name.startswith(folded_query):
+                score += NAME_PREFIX_BONUS
+            hits.append(SearchHit(category=category, name=name, score=round(score, 3)))
+        hits.sort(key=lambda hit: (-hit.score, hit.name))
+        return hits
+
+
+class GDDSearchIndexCache:
+    """Index de recherche courant, reconstruit quand la génération GDD ou les listes changent."""
+
+    def __init__(self):
+        self._index: Optional[GDDSearchIndex] = None
+        # Évite que plusieurs threads construisent le même index en parallèle
+        self._build_lock = threading.Lock()
+
+    def peek(self, categories: Mapping[str, Sequence[Dict[str, Any]]], generation: int) -> Optional[GDDSearchIndex]:
+        """Retourne l'index courant s'il est à jour, sans jamais le construire.
+
+        Args:
+            categories: Éléments actuellement servis, par catégorie.
+            generation: Génération GDD courante.
+
+        Returns:
+            L'index, ou None s'il doit être (re)construit (voir get).
+        """
+        index = self._index
+        if (
+            index is None
+            or index.generation != generation
+            or index.sources.keys() != categories.keys()
+            or any(index.sources[category] is not elements for category, elements in categories.items())
+        ):
+            return None
+        return index
+
+    def get(self, categories: Mapping[str, Sequence[Dict[str, Any]]], generation: int) -> GDDSearchIndex:
+        """Retourne l'index de la génération courante (construit au premier appel).
+
+        La construction est synchrone (plusieurs secondes sur un GDD complet) : depuis une
+        route async, l'appeler via asyncio.to_thread lorsque peek retourne None.
+
+        Args:
+            categories: Éléments actuellement servis, par catégorie.
+            generation: Génération GDD courante.
+        """
+        index = self.peek(categories, generation)
+        if index is not None:
+            return index
+        with self._build_lock:
+            index = self.peek(categories, generation)
+            if index is None:
+                index = GDDSearchIndex(categories, generation)
+                self._index = index
+        return index
+
+
+# Instance globale (singleton)
+_gdd_search_index_cache: Optional[GDDSearchIndexCache] = None
+
+
+def get_gdd_search_index_cache() -> GDDSearchIndexCache:
+    """Récupère le cache singleton de l'index de recherche GDD."""
+    global _gdd_search_index_cache
+    if _gdd_search_index_cache is None:
+        _gdd_search_index_cache = GDDSearchIndexCache()
+    return _gdd_search_index_cache
@@ -5,6 +5,7 @@ from typing import List, Dict, Any, Optional, Callable
 
 from services.unity_dialogue_generation_service import UnityDialogueGenerationService
 from core.llm.llm_client import ILLMClient
+from constants import LLMPriority
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +17,20 @@ class GraphGenerationService:
     Gère automatiquement les IDs et les connexions.
     """
     
-    def __init__(self, generation_service: Optional[UnityDialogueGenerationService] = None):
+    def __init__(
+        self,
+        generation_service: Optional[UnityDialogueGenerationService] = None,
+        priority: str = LLMPriority.BATCH
+    ):
         """Initialise le service.
         
         Args:
             generation_service: Service de génération Unity (par défaut: nouvelle instance).
+            priority: Classe de priorité des appels LLM (batch par défaut : la génération
+                de tous les choix ne doit pas ralentir la génération interactive).
         """
         self.generation_service = generation_service or UnityDialogueGenerationService()
+        self.priority = priority
         logger.info("GraphGenerationService initialisé")
     
     async def generate_nodes_for_all_choices(
@@ -78,6 +86,9 @@ class GraphGenerationService:
             f"Génération batch parallèle: {len(choices_to_generate)} nœud(s) pour le parent {parent_id}"
         )
         
+        # Déclarer la classe de priorité auprès du scheduler LLM
+        llm_client.priority = self.priority
+        
         # Fonction pour générer un nœud pour un choix
         async def generate_single_node(choice_index: int, choice: Dict[str, Any]) -> tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
             """Génère un nœud pour un choix spécifique.
@@ -7,22 +7,35 @@ from typing import Dict, List, Optional
 from models.llm_usage import LLMUsageRecord
 from services.llm_pricing_service import LLMPricingService
 from services.repositories.llm_usage_repository import ILLMUsageRepository
+from services.repositories.llm_usage_rollup_repository import FileUsageRollupRepository
+from services.usage_writer import get_usage_writer
 
 logger = logging.getLogger(__name__)
 
+# User ID par défaut (V1.0: pas d'authentification)
+DEFAULT_USER_ID = "default_user"
+
 
 class LLMUsageService:
     """Service principal pour le tracking de l'utilisation LLM.
     
     Gère l'enregistrement des appels LLM et le calcul des statistiques.
     Met à jour automatiquement le budget si CostGovernanceService est fourni.
+    
+    Si un UsageWriter est installé (services.usage_writer), l'enregistrement et la mise
+    à jour du budget sont persistés en arrière-plan, par lots ; sinon, immédiatement.
+    
+    Si un repository d'agrégats est fourni, chaque enregistrement persisté y est ajouté
+    (totaux par jour, modèle et endpoint) : les statistiques et coûts quotidiens sont
+    calculés depuis ces agrégats, sans relire le journal brut.
     """
     
     def __init__(
         self,
         repository: ILLMUsageRepository,
         pricing_service: Optional[LLMPricingService] = None,
-        cost_governance_service: Optional[any] = None  # Type: CostGovernanceService (éviter import circulaire)
+        cost_governance_service: Optional[any] = None,  # Type: CostGovernanceService (éviter import circulaire)
+        rollup_repository: Optional[FileUsageRollupRepository] = None
     ):
         """Initialise le service de tracking.
         
@@ -31,10 +44,12 @@ class LLMUsageService:
             pricing_service: Service de calcul des prix. Si None, en crée un nouveau.
             cost_governance_service: Service de cost governance (optionnel). Si fourni,
                                     met à jour le budget après chaque track_usage.
+            rollup_repository: Agrégats d'usage maintenus à chaque enregistrement (optionnel).
         """
         self.repository = repository
         self.pricing_service = pricing_service or LLMPricingService()
         self.cost_governance_service = cost_governance_service
+        self.rollup_repository = rollup_repository
         logger.info("LLMUsageService initialisé")
     
     def track_usage(
@@ -48,7 +63,8 @@ class LLMUsageService:
         success: bool,
         endpoint: str,
         k_variants: int = 1,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        is_hedge: bool = False
     ) -> None:
         """Enregistre un appel LLM.
         
@@ -63,6 +79,7 @@ class LLMUsageService:
             endpoint: Endpoint appelé.
             k_variants: Nombre de variantes générées.
             error_message: Message d'erreur si success=False.
+            is_hedge: Appel dupliqué perdant d'une requête hedgée, comptabilisé à part.
         """
         try:
             # Calculer le coût estimé
@@ -85,30 +102,50 @@ class LLMUsageService:
                 success=success,
                 endpoint=endpoint,
                 k_variants=k_variants,
-                error_message=error_message
+                error_message=error_message,
+                is_hedge=is_hedge
             )
             
-            # Sauvegarder
-            self.repository.save(record)
+            # Un hedge annulé reste facturé : son coût est imputé au budget
+            update_budget = bool(self.cost_governance_service) and (success or is_hedge)
             
-            # Mettre à jour le budget si le service de cost governance est disponible
-            if self.cost_governance_service and success:
-                try:
-                    # User ID par défaut (V1.0: pas d'authentification)
-                    DEFAULT_USER_ID = "default_user"
-                    self.cost_governance_service.update_budget(
-                        user_id=DEFAULT_USER_ID,
-                        cost=estimated_cost
-                    )
-                    logger.debug(f"Budget mis à jour: +${estimated_cost:.6f}")
-                except Exception as budget_error:
-                    # Ne pas faire échouer le tracking si la mise à jour du budget échoue
-                    logger.warning(f"Erreur lors de la mise à jour du budget: {budget_error}", exc_info=True)
+            writer = get_usage_writer()
+            if writer is not None:
+                # Persistance par lots en arrière-plan (coût compté en mémoire d'ici là)
+                writer.submit(
+                    record,
+                    self.repository,
+                    cost_service=self.cost_governance_service if update_budget else None,
+                    user_id=DEFAULT_USER_ID if update_budget else None,
+                    rollups=self.rollup_repository
+                )
+            else:
+                # Sauvegarder
+                self.repository.save(record)
+                
+                if self.rollup_repository is not None:
+                    try:
+                        self.rollup_repository.add([record])
+                    except Exception as rollup_error:
+                        # Réparable depuis le journal brut (FileUsageRollupRepository.check)
+                        logger.warning(f"Erreur lors de la mise à jour des agrégats d'usage: {rollup_error}", exc_info=True)
+                
+                # Mettre à jour le budget si le service de cost governance est disponible
+                if update_budget:
+                    try:
+                        self.cost_governance_service.update_budget(
+                            user_id=DEFAULT_USER_ID,
+                            cost=estimated_cost
+                        )
+                        logger.debug(f"Budget mis à jour: +${estimated_cost:.6f}")
+                    except Exception as budget_error:
+                        # Ne pas faire échouer le tracking si la mise à jour du budget échoue
+                        logger.warning(f"Erreur lors de la mise à jour du budget: {budget_error}", exc_info=True)
             
             logger.debug(
                 f"Usage LLM enregistré: {model_name}, "
                 f"{total_tokens} tokens, ${estimated_cost:.6f}, "
-                f"{duration_ms}ms, success={success}"
+                f"{duration_ms}ms, success={success}, hedge={is_hedge}"
             )
         except Exception as e:
             # Ne pas faire échouer l'appel LLM si le tracking échoue
@@ -153,7 +190,7 @@ class LLMUsageService:
         end_date: Optional[date] = None,
         model_name: Optional[str] = None
     ) -> Dict:
-        """Calcule des statistiques agrégées.
+        """Calcule des statistiques agrégées (depuis les agrégats s'ils sont disponibles).
         
         Args:
             start_date: Date de début (optionnel).
@@ -163,9 +200,22 @@ class LLMUsageService:
         Returns:
             Dictionnaire avec les statistiques agrégées.
         """
-        return self.repository.get_statistics(
+        source = self.rollup_repository if self.rollup_repository is not None else self.repository
+        return source.get_statistics(
             start_date=start_date,
             end_date=end_date,
             model_name=model_name
         )
-
+    
+    def get_daily_costs(self, start_date: date, end_date: date) -> Dict[str, float]:
+        """Calcule le coût total par jour sur une période.
+        
+        Args:
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
+            
+        Returns:
+            Dictionnaire {YYYY-MM-DD: coût} (jours sans appel omis).
+        """
+        source = self.rollup_repository if self.rollup_repository is not None else self.repository
+        return source.get_daily_costs(start_date=start_date, end_date=end_date)
@@ -232,6 +232,7 @@ class PresetService:
             raise FileNotFoundError(f"Preset {preset_id} not found")
         
         preset_file.unlink()
+        self._invalidate_store_version()
         logger.info(f"Preset supprimé: {preset_id}")
     
     def validate_preset_references(self, preset: Preset) -> PresetValidationResult:
@@ -284,6 +285,14 @@ class PresetService:
         
         return result
     
+    def _invalidate_store_version(self) -> None:
+        """Signale une écriture au registre des versions de données (clés du cache HTTP)."""
+        try:
+            from api.utils.data_versions import SOURCE_PRESETS, get_data_versions
+        except ImportError:
+            return
+        get_data_versions().invalidate(SOURCE_PRESETS)
+    
     def _save_preset_to_disk(self, preset: Preset) -> None:
         """Sauvegarde un preset sur disque.
         
@@ -302,6 +311,7 @@ class PresetService:
         try:
             with open(preset_file, "w", encoding="utf-8") as f:
                 json.dump(preset_json, f, indent=2, ensure_ascii=False)
+            self._invalidate_store_version()
         except PermissionError as e:
             logger.error(f"Permission denied writing preset {preset.id}: {e}")
             raise
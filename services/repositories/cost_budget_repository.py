@@ -3,9 +3,17 @@ import json
 import logging
 import os
 import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Protocol
+from typing import Dict, Iterator, Optional, Protocol
+
+# Verrou inter-processus (workers uvicorn partageant le fichier) : POSIX uniquement
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
@@ -54,13 +62,20 @@ class FileCostBudgetRepository:
     Format: data/cost_budgets.json
     Structure: {user_id: {month: "2026-01", amount: 90.0, quota: 100.0, updated_at: timestamp}}
     
-    Protection contre les race conditions: utilise un verrou de fichier (threading.Lock)
-    pour garantir l'atomicité des opérations read-modify-write.
+    Protection contre les race conditions: utilise un verrou de fichier (threading.Lock,
+    plus un verrou `fcntl` sur `<fichier>.lock` entre processus si disponible) pour
+    garantir l'atomicité des opérations read-modify-write. Le fichier est remplacé
+    atomiquement (fichier temporaire + os.replace) : un lecteur concurrent ne voit
+    jamais un fichier partiellement écrit.
+    
+    Les réservations des générations en cours (services.budget_ledger) sont stockées à
+    côté, dans `<fichier>.reservations.json`, sous le même verrou.
     """
     
     # Verrou global partagé par toutes les instances pour le même fichier
-    # (Permet la protection même si plusieurs instances sont créées)
-    _file_locks: Dict[str, threading.Lock] = {}
+    # (Permet la protection même si plusieurs instances sont créées ; réentrant pour
+    # lire les budgets pendant une opération déjà verrouillée)
+    _file_locks: Dict[str, threading.RLock] = {}
     _locks_lock = threading.Lock()  # Verrou pour protéger _file_locks
     
     def __init__(self, storage_file: str):
@@ -70,6 +85,7 @@ class FileCostBudgetRepository:
             storage_file: Chemin vers le fichier JSON de stockage.
         """
         self.storage_file = Path(storage_file)
+        self.reservations_file = self.storage_file.with_name(self.storage_file.name + ".reservations.json")
         # Créer le dossier parent si nécessaire
         os.makedirs(self.storage_file.parent, exist_ok=True)
         
@@ -77,11 +93,52 @@ class FileCostBudgetRepository:
         file_key = str(self.storage_file.absolute())
         with self._locks_lock:
             if file_key not in self._file_locks:
-                self._file_locks[file_key] = threading.Lock()
+                self._file_locks[file_key] = threading.RLock()
             self._lock = self._file_locks[file_key]
         
         logger.info(f"FileCostBudgetRepository initialisé avec le fichier: {self.storage_file.absolute()}")
     
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Verrou d'écriture : threads du processus, puis autres processus (fcntl)."""
+        with self._lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            lock_path = self.storage_file.with_name(self.storage_file.name + ".lock")
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    @contextmanager
+    def reservations(self) -> Iterator[Dict[str, Dict]]:
+        """Réservations des générations en cours, partagées par les workers du fichier.
+        
+        Lues puis réécrites (si modifiées) sous le verrou exclusif du fichier : les budgets
+        lus dans le bloc et les réservations forment une vue cohérente entre processus.
+        
+        Yields:
+            Dictionnaire modifiable {reservation_id: {user_id, amount, pid, expires_at, released}}.
+        """
+        with self._exclusive():
+            entries: Dict[str, Dict] = {}
+            if self.reservations_file.exists():
+                try:
+                    with open(self.reservations_file, 'r', encoding='utf-8') as f:
+                        entries = json.load(f).get("reservations", {})
+                except (json.JSONDecodeError, AttributeError, IOError) as e:
+                    logger.error(f"Réservations illisibles ({self.reservations_file}), ignorées: {e}")
+            original = json.dumps(entries, sort_keys=True)
+            yield entries
+            if json.dumps(entries, sort_keys=True) != original:
+                tmp_path = self.reservations_file.with_name(f"{self.reservations_file.name}.{os.getpid()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"reservations": entries}, f)
+                os.replace(tmp_path, self.reservations_file)
+    
     def _load_all_budgets(self) -> Dict[str, Dict]:
         """Charge tous les budgets depuis le fichier.
         
@@ -106,18 +163,8 @@ class FileCostBudgetRepository:
         Args:
             budgets: Dictionnaire {user_id: {month, amount, quota, updated_at}}
         """
-        with self._lock:  # Protection contre les race conditions
-            data = {
-                "budgets": budgets
-            }
-            
-            try:
-                with open(self.storage_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-                logger.debug(f"Budgets sauvegardés dans {self.storage_file}")
-            except IOError as e:
-                logger.error(f"Erreur lors de la sauvegarde dans {self.storage_file}: {e}")
-                raise
+        with self._exclusive():  # Protection contre les race conditions
+            self._save_all_budgets_unlocked(budgets)
     
     def get_budget(self, user_id: str, month: str) -> Optional[Dict]:
         """Récupère le budget pour un utilisateur et un mois.
@@ -143,6 +190,45 @@ class FileCostBudgetRepository:
         # Si le mois ne correspond pas, retourner None (le service gérera le reset)
         return None
     
+    def get_user_budget(self, user_id: str) -> Optional[Dict]:
+        """Récupère le dernier budget enregistré d'un utilisateur, quel que soit son mois.
+        
+        Args:
+            user_id: ID de l'utilisateur.
+            
+        Returns:
+            Dictionnaire avec les clés: month, amount, quota, updated_at (None si absent).
+        """
+        return self._load_all_budgets().get(user_id)
+    
+    def increment_budget(self, user_id: str, month: str, cost: float) -> Dict:
+        """Ajoute un coût au budget du mois (read-modify-write atomique, y compris entre processus).
+        
+        Un budget d'un mois précédent repart de 0 en conservant son quota ; un budget
+        absent est créé avec un quota de 0.
+        
+        Args:
+            user_id: ID de l'utilisateur.
+            month: Mois au format "YYYY-MM".
+            cost: Coût à ajouter.
+            
+        Returns:
+            Le budget mis à jour.
+        """
+        with self._exclusive():
+            budgets = self._load_all_budgets_unlocked()
+            user_budget = budgets.get(user_id) or {}
+            amount = user_budget.get("amount", 0.0) if user_budget.get("month") == month else 0.0
+            budgets[user_id] = {
+                "month": month,
+                "amount": amount + cost,
+                "quota": user_budget.get("quota", 0.0),
+                "updated_at": datetime.now().isoformat()
+            }
+            self._save_all_budgets_unlocked(budgets)
+            logger.debug(f"Budget incrémenté pour {user_id} ({month}): +{cost:.6f}€")
+            return budgets[user_id]
+    
     def update_budget(self, user_id: str, month: str, amount: float, quota: float) -> None:
         """Met à jour le budget pour un utilisateur et un mois.
         
@@ -154,7 +240,7 @@ class FileCostBudgetRepository:
             amount: Montant dépensé.
             quota: Quota mensuel.
         """
-        with self._lock:  # Protection contre les race conditions (opération atomique)
+        with self._exclusive():  # Protection contre les race conditions (opération atomique)
             budgets = self._load_all_budgets_unlocked()
             
             budgets[user_id] = {
@@ -186,9 +272,11 @@ class FileCostBudgetRepository:
             "budgets": budgets
         }
         
+        tmp_path = self.storage_file.with_name(f"{self.storage_file.name}.{os.getpid()}.tmp")
         try:
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.storage_file)
             logger.debug(f"Budgets sauvegardés dans {self.storage_file}")
         except IOError as e:
             logger.error(f"Erreur lors de la sauvegarde dans {self.storage_file}: {e}")
@@ -203,7 +291,7 @@ class FileCostBudgetRepository:
             user_id: ID de l'utilisateur.
             new_month: Nouveau mois au format "YYYY-MM".
         """
-        with self._lock:  # Protection contre les race conditions (opération atomique)
+        with self._exclusive():  # Protection contre les race conditions (opération atomique)
             budgets = self._load_all_budgets_unlocked()
             user_budget = budgets.get(user_id)
             
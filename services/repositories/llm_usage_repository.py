@@ -1,15 +1,35 @@
 """Repository pour le stockage de l'historique d'utilisation LLM."""
+import argparse
 import json
 import logging
 import os
-from datetime import datetime, date
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Protocol
+from typing import Any, Dict, Iterator, List, Optional, Protocol
 
 from models.llm_usage import LLMUsageRecord
 
+# Verrou inter-processus (workers uvicorn partageant les journaux) : POSIX uniquement
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+USAGE_FILE_SUFFIX = ".jsonl"
+# Ancien format : un objet {"date", "records"} réécrit à chaque enregistrement
+LEGACY_USAGE_FILE_SUFFIX = ".json"
+
+# Politique de synchronisation disque après chaque enregistrement
+FSYNC_ALWAYS = "always"
+FSYNC_NEVER = "never"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_NEVER)
+
 
 class ILLMUsageRepository(Protocol):
     """Interface pour le repository d'utilisation LLM."""
@@ -22,6 +42,14 @@ class ILLMUsageRepository(Protocol):
         """
         ...
     
+    def save_many(self, records: List[LLMUsageRecord]) -> None:
+        """Sauvegarde un lot d'enregistrements (écriture groupée).
+        
+        Args:
+            records: Les enregistrements à sauvegarder.
+        """
+        ...
+    
     def get_by_date_range(
         self,
         start_date: date,
@@ -68,111 +96,315 @@ class ILLMUsageRepository(Protocol):
             Dictionnaire avec les statistiques (total_tokens, total_cost, etc.).
         """
         ...
+    
+    def get_daily_costs(self, start_date: date, end_date: date) -> Dict[str, float]:
+        """Calcule le coût total par jour.
+        
+        Args:
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
+            
+        Returns:
+            Dictionnaire {YYYY-MM-DD: coût} (jours sans appel omis).
+        """
+        ...
 
 
 class FileLLMUsageRepository:
-    """Repository d'utilisation LLM basé sur fichiers JSON.
+    """Repository d'utilisation LLM basé sur un journal JSONL en ajout seul.
+    
+    Un fichier par jour, un enregistrement par ligne : `save` ajoute une ligne sans
+    relire le fichier (coût constant). Format: data/llm_usage/usage_YYYY-MM-DD.jsonl
     
-    Stocke les enregistrements dans des fichiers JSON, un fichier par jour.
-    Format: data/llm_usage/usage_YYYY-MM-DD.json
+    Les fichiers de l'ancien format (`usage_YYYY-MM-DD.json`) restent lisibles ; ils
+    sont convertis par `migrate_legacy_files()` (ou `python -m
+    services.repositories.llm_usage_repository`), et au plus tard lors du premier
+    enregistrement de leur journée. La migration est faite sous un verrou fcntl sur le
+    fichier de l'ancien format : un ajout d'un autre worker qui voit encore ce fichier
+    attend la fin de la migration, puis écrit dans le nouveau journal.
     """
     
-    def __init__(self, storage_dir: str):
+    # Verrous par fichier partagés entre instances (le repository est recréé par requête)
+    _file_locks: Dict[str, threading.Lock] = {}
+    _locks_lock = threading.Lock()  # Verrou pour protéger _file_locks
+    
+    def __init__(self, storage_dir: str, fsync_policy: Optional[str] = None):
         """Initialise le repository avec un dossier de stockage.
         
         Args:
-            storage_dir: Chemin vers le dossier où stocker les fichiers JSON.
+            storage_dir: Chemin vers le dossier où stocker les fichiers.
+            fsync_policy: "always" (fsync après chaque enregistrement) ou "never" (écriture
+                laissée au cache du système). Par défaut: LLM_USAGE_FSYNC, sinon "always".
         """
         self.storage_dir = Path(storage_dir)
         os.makedirs(self.storage_dir, exist_ok=True)
+        policy = (fsync_policy or os.getenv("LLM_USAGE_FSYNC", FSYNC_ALWAYS)).strip().lower()
+        if policy not in FSYNC_POLICIES:
+            logger.warning(f"Politique fsync inconnue '{policy}', utilisation de '{FSYNC_ALWAYS}'")
+            policy = FSYNC_ALWAYS
+        self.fsync_policy = policy
         logger.info(f"FileLLMUsageRepository initialisé avec le dossier: {self.storage_dir.absolute()}")
     
     def _get_file_path(self, target_date: date) -> Path:
-        """Génère le chemin du fichier pour une date donnée.
+        """Génère le chemin du journal pour une date donnée.
         
         Args:
             target_date: Date pour laquelle générer le chemin.
             
         Returns:
-            Chemin du fichier JSON.
+            Chemin du fichier JSONL.
         """
-        filename = f"usage_{target_date.isoformat()}.json"
+        filename = f"usage_{target_date.isoformat()}{USAGE_FILE_SUFFIX}"
         return self.storage_dir / filename
     
-    def _load_records_for_date(self, target_date: date) -> List[LLMUsageRecord]:
-        """Charge les enregistrements pour une date donnée.
+    def _get_legacy_file_path(self, target_date: date) -> Path:
+        """Chemin du fichier de l'ancien format (JSON) pour une date donnée."""
+        return self.storage_dir / f"usage_{target_date.isoformat()}{LEGACY_USAGE_FILE_SUFFIX}"
+    
+    def _get_lock(self, file_path: Path) -> threading.Lock:
+        """Retourne le verrou associé à un fichier (partagé entre instances)."""
+        file_key = str(file_path.absolute())
+        with self._locks_lock:
+            if file_key not in self._file_locks:
+                self._file_locks[file_key] = threading.Lock()
+            return self._file_locks[file_key]
+    
+    @staticmethod
+    @contextmanager
+    def _migration_lock(legacy_path: Path) -> Iterator[bool]:
+        """Verrou de migration entre processus : flock exclusif sur le fichier de l'ancien format.
+        
+        Les threads du processus sont exclus par _get_lock.
+        
+        Yields:
+            True si le fichier de l'ancien format existe encore une fois le verrou obtenu
+            (False : migré entre-temps par un autre worker).
+        """
+        try:
+            legacy_file = open(legacy_path, "rb")
+        except FileNotFoundError:
+            yield False
+            return
+        with legacy_file:
+            if not FCNTL_AVAILABLE:
+                yield legacy_path.exists()
+                return
+            fcntl.flock(legacy_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield legacy_path.exists()
+            finally:
+                fcntl.flock(legacy_file.fileno(), fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _record_from_dict(record_data: Dict[str, Any]) -> LLMUsageRecord:
+        """Construit un enregistrement depuis sa forme JSON."""
+        # Convertir le timestamp string en datetime
+        if isinstance(record_data.get("timestamp"), str):
+            record_data["timestamp"] = datetime.fromisoformat(
+                record_data["timestamp"].replace('Z', '+00:00')
+            )
+        return LLMUsageRecord(**record_data)
+    
+    @staticmethod
+    def _serialize(record: LLMUsageRecord) -> bytes:
+        """Sérialise un enregistrement en une ligne JSON."""
+        line = json.dumps(record.model_dump(), ensure_ascii=False, default=str, separators=(",", ":"))
+        return (line + "\n").encode("utf-8")
+    
+    def _load_legacy_records(self, file_path: Path) -> List[LLMUsageRecord]:
+        """Charge les enregistrements d'un fichier de l'ancien format.
         
         Args:
-            target_date: Date pour laquelle charger les enregistrements.
+            file_path: Chemin du fichier JSON.
             
         Returns:
-            Liste des enregistrements pour cette date.
+            Liste des enregistrements (vide si le fichier est absent ou illisible).
         """
-        file_path = self._get_file_path(target_date)
-        
         if not file_path.exists():
             return []
         
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            
-            records = []
-            for record_data in data.get("records", []):
-                # Convertir le timestamp string en datetime
-                if isinstance(record_data.get("timestamp"), str):
-                    record_data["timestamp"] = datetime.fromisoformat(
-                        record_data["timestamp"].replace('Z', '+00:00')
-                    )
-                records.append(LLMUsageRecord(**record_data))
-            
-            return records
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            return [self._record_from_dict(record_data) for record_data in data.get("records", [])]
+        except (json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
             logger.error(f"Erreur lors du chargement de {file_path}: {e}")
             return []
     
-    def _save_records_for_date(self, target_date: date, records: List[LLMUsageRecord]) -> None:
-        """Sauvegarde les enregistrements pour une date donnée.
+    def _load_journal_records(self, file_path: Path) -> List[LLMUsageRecord]:
+        """Charge les enregistrements d'un journal JSONL.
+        
+        Les lignes illisibles (ex: ligne tronquée par un arrêt pendant une écriture)
+        sont ignorées.
         
         Args:
-            target_date: Date pour laquelle sauvegarder.
-            records: Liste des enregistrements à sauvegarder.
+            file_path: Chemin du fichier JSONL.
+            
+        Returns:
+            Liste des enregistrements, dans l'ordre d'écriture.
         """
-        file_path = self._get_file_path(target_date)
+        if not file_path.exists():
+            return []
         
-        # Convertir les enregistrements en dictionnaires pour JSON
-        records_data = [record.model_dump() for record in records]
+        records: List[LLMUsageRecord] = []
+        skipped = 0
+        try:
+            with open(file_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(self._record_from_dict(json.loads(line)))
+                    except (ValueError, TypeError, AttributeError):
+                        skipped += 1
+        except IOError as e:
+            logger.error(f"Erreur lors du chargement de {file_path}: {e}")
+        if skipped:
+            logger.warning(f"{skipped} ligne(s) illisible(s) ignorée(s) dans {file_path.name}")
+        return records
+    
+    def _load_records_for_date(self, target_date: date) -> List[LLMUsageRecord]:
+        """Charge les enregistrements pour une date donnée (journal et ancien format).
         
-        data = {
-            "date": target_date.isoformat(),
-            "records": records_data
-        }
+        Args:
+            target_date: Date pour laquelle charger les enregistrements.
+            
+        Returns:
+            Liste des enregistrements pour cette date.
+        """
+        return (
+            self._load_legacy_records(self._get_legacy_file_path(target_date))
+            + self._load_journal_records(self._get_file_path(target_date))
+        )
+    
+    def _migrate_date(self, target_date: date) -> bool:
+        """Convertit le fichier de l'ancien format d'une date en journal JSONL.
+        
+        Les enregistrements convertis sont placés avant ceux déjà présents dans le
+        journal. Le nouveau journal est écrit dans un fichier temporaire puis renommé ;
+        le fichier de l'ancien format n'est supprimé qu'ensuite (et conservé s'il est
+        illisible).
+        
+        À appeler sous le verrou du journal (_get_lock). Les autres workers n'ajoutent
+        au journal qu'après avoir vu le fichier de l'ancien format disparaître, ou sous
+        le verrou de migration : aucune ligne n'est écrite dans le journal remplacé.
         
+        Args:
+            target_date: Date à migrer.
+            
+        Returns:
+            True si un fichier a été migré.
+        """
+        legacy_path = self._get_legacy_file_path(target_date)
+        if not legacy_path.exists():
+            return False
+        with self._migration_lock(legacy_path) as pending:
+            # Migration éventuellement faite par un autre worker pendant l'attente
+            if not pending:
+                return False
+            return self._migrate_legacy_file(target_date, legacy_path)
+    
+    def _migrate_legacy_file(self, target_date: date, legacy_path: Path) -> bool:
+        """Réécrit le journal d'une date avec les enregistrements de l'ancien format (sous _migration_lock)."""
+        journal_path = self._get_file_path(target_date)
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-            logger.debug(f"Enregistrements sauvegardés dans {file_path} ({len(records)} enregistrements)")
-        except IOError as e:
-            logger.error(f"Erreur lors de la sauvegarde dans {file_path}: {e}")
-            raise
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            records = [self._record_from_dict(record_data) for record_data in data.get("records", [])]
+        except (json.JSONDecodeError, KeyError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Migration impossible de {legacy_path} (fichier conservé): {e}")
+            return False
+        
+        temp_path = journal_path.with_name(journal_path.name + ".tmp")
+        with open(temp_path, 'wb') as f:
+            for record in records:
+                f.write(self._serialize(record))
+            if journal_path.exists():
+                existing = journal_path.read_bytes()
+                if existing and not existing.endswith(b"\n"):
+                    existing += b"\n"
+                f.write(existing)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, journal_path)
+        legacy_path.unlink()
+        logger.info(f"Usage LLM migré vers {journal_path.name} ({len(records)} enregistrements)")
+        return True
+    
+    def migrate_legacy_files(self) -> int:
+        """Convertit tous les fichiers de l'ancien format en journaux JSONL.
+        
+        Returns:
+            Nombre de fichiers migrés.
+        """
+        migrated = 0
+        for file_path in sorted(self.storage_dir.glob(f"usage_*{LEGACY_USAGE_FILE_SUFFIX}")):
+            try:
+                file_date = date.fromisoformat(file_path.stem.replace("usage_", ""))
+            except ValueError:
+                logger.warning(f"Impossible de parser la date du fichier {file_path}")
+                continue
+            with self._get_lock(self._get_file_path(file_date)):
+                if self._migrate_date(file_date):
+                    migrated += 1
+        return migrated
     
     def save(self, record: LLMUsageRecord) -> None:
-        """Sauvegarde un enregistrement d'utilisation.
+        """Sauvegarde un enregistrement d'utilisation (ajout d'une ligne au journal du jour).
         
         Args:
             record: L'enregistrement à sauvegarder.
         """
-        # Extraire la date du timestamp
-        record_date = record.timestamp.date()
+        self._append(record.timestamp.date(), self._serialize(record))
+    
+    def save_many(self, records: List[LLMUsageRecord]) -> None:
+        """Sauvegarde un lot d'enregistrements : une écriture (et un fsync) par journal.
         
-        # Charger les enregistrements existants pour cette date
-        existing_records = self._load_records_for_date(record_date)
+        Args:
+            records: Les enregistrements à sauvegarder.
+        """
+        lines_by_date: Dict[date, bytes] = {}
+        for record in records:
+            record_date = record.timestamp.date()
+            lines_by_date[record_date] = lines_by_date.get(record_date, b"") + self._serialize(record)
+        for record_date, lines in lines_by_date.items():
+            self._append(record_date, lines)
+    
+    def _append(self, record_date: date, line: bytes) -> None:
+        """Ajoute des lignes au journal d'une date.
         
-        # Ajouter le nouvel enregistrement
-        existing_records.append(record)
+        Args:
+            record_date: Date du journal.
+            line: Lignes JSON sérialisées (terminées par un saut de ligne).
+        """
+        file_path = self._get_file_path(record_date)
         
-        # Sauvegarder
-        self._save_records_for_date(record_date, existing_records)
+        with self._get_lock(file_path):
+            # Journée encore à l'ancien format : migration avant le premier ajout
+            self._migrate_date(record_date)
+            try:
+                fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    size = os.fstat(fd).st_size
+                    if size and not self._ends_with_newline(file_path, size):
+                        # Dernière ligne tronquée (arrêt pendant une écriture) : l'isoler
+                        line = b"\n" + line
+                    os.write(fd, line)
+                    if self.fsync_policy == FSYNC_ALWAYS:
+                        os.fsync(fd)
+                finally:
+                    os.close(fd)
+                logger.debug(f"Enregistrement ajouté à {file_path}")
+            except IOError as e:
+                logger.error(f"Erreur lors de la sauvegarde dans {file_path}: {e}")
+                raise
+    
+    @staticmethod
+    def _ends_with_newline(file_path: Path, size: int) -> bool:
+        """Indique si le dernier octet d'un fichier est un saut de ligne."""
+        with open(file_path, 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) == b"\n"
     
     def get_by_date_range(
         self,
@@ -198,7 +430,6 @@ class FileLLMUsageRepository:
             records = self._load_records_for_date(current_date)
             all_records.extend(records)
             # Passer à la date suivante
-            from datetime import timedelta
             current_date += timedelta(days=1)
         
         # Filtrer par modèle si demandé
@@ -225,16 +456,20 @@ class FileLLMUsageRepository:
         if not self.storage_dir.exists():
             return []
         
-        for file_path in self.storage_dir.glob("usage_*.json"):
-            try:
-                # Extraire la date du nom de fichier
-                date_str = file_path.stem.replace("usage_", "")
-                file_date = datetime.fromisoformat(date_str).date()
-                records = self._load_records_for_date(file_date)
-                all_records.extend(records)
-            except (ValueError, AttributeError) as e:
-                logger.warning(f"Impossible de parser la date du fichier {file_path}: {e}")
-                continue
+        # Dates présentes (journal JSONL et/ou fichier de l'ancien format)
+        file_dates = set()
+        for pattern in (f"usage_*{USAGE_FILE_SUFFIX}", f"usage_*{LEGACY_USAGE_FILE_SUFFIX}"):
+            for file_path in self.storage_dir.glob(pattern):
+                try:
+                    # Extraire la date du nom de fichier
+                    date_str = file_path.stem.replace("usage_", "")
+                    file_dates.add(datetime.fromisoformat(date_str).date())
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f"Impossible de parser la date du fichier {file_path}: {e}")
+                    continue
+        
+        for file_date in sorted(file_dates):
+            all_records.extend(self._load_records_for_date(file_date))
         
         # Filtrer par modèle si demandé
         if model_name:
@@ -269,6 +504,11 @@ class FileLLMUsageRepository:
             - error_count: int
             - success_rate: float
             - avg_duration_ms: float
+            - hedge_calls_count: int
+            - hedge_cost: float
+            
+            Les appels dupliqués perdants (is_hedge) sont inclus dans les totaux de tokens
+            et de coût mais exclus des compteurs d'appels, de succès et de durée.
         """
         # Récupérer les enregistrements
         if start_date and end_date:
@@ -286,7 +526,9 @@ class FileLLMUsageRepository:
                 "success_count": 0,
                 "error_count": 0,
                 "success_rate": 0.0,
-                "avg_duration_ms": 0.0
+                "avg_duration_ms": 0.0,
+                "hedge_calls_count": 0,
+                "hedge_cost": 0.0
             }
         
         # Calculer les statistiques
@@ -294,11 +536,13 @@ class FileLLMUsageRepository:
         total_prompt_tokens = sum(r.prompt_tokens for r in records)
         total_completion_tokens = sum(r.completion_tokens for r in records)
         total_cost = sum(r.estimated_cost for r in records)
-        calls_count = len(records)
-        success_count = sum(1 for r in records if r.success)
+        hedge_records = [r for r in records if r.is_hedge]
+        primary_records = [r for r in records if not r.is_hedge]
+        calls_count = len(primary_records)
+        success_count = sum(1 for r in primary_records if r.success)
         error_count = calls_count - success_count
         success_rate = (success_count / calls_count * 100) if calls_count > 0 else 0.0
-        avg_duration_ms = sum(r.duration_ms for r in records) / calls_count if calls_count > 0 else 0.0
+        avg_duration_ms = sum(r.duration_ms for r in primary_records) / calls_count if calls_count > 0 else 0.0
         
         return {
             "total_tokens": total_tokens,
@@ -309,9 +553,409 @@ class FileLLMUsageRepository:
             "success_count": success_count,
             "error_count": error_count,
             "success_rate": success_rate,
-            "avg_duration_ms": avg_duration_ms
+            "avg_duration_ms": avg_duration_ms,
+            "hedge_calls_count": len(hedge_records),
+            "hedge_cost": sum(r.estimated_cost for r in hedge_records)
+        }
+
+    
+    def get_daily_costs(self, start_date: date, end_date: date) -> Dict[str, float]:
+        """Calcule le coût total par jour.
+        
+        Args:
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
+            
+        Returns:
+            Dictionnaire {YYYY-MM-DD: coût} (jours sans appel omis).
+        """
+        daily_costs: Dict[str, float] = {}
+        for record in self.get_by_date_range(start_date, end_date):
+            day = record.timestamp.date().isoformat()
+            daily_costs[day] = daily_costs.get(day, 0.0) + record.estimated_cost
+        return daily_costs
+
+
+class SQLiteLLMUsageRepository:
+    """Repository d'utilisation LLM sur SQLite (WAL).
+    
+    Les enregistrements sont indexés par jour, horodatage, modèle et endpoint ; les
+    statistiques et coûts quotidiens sont agrégés en SQL, sans charger les
+    enregistrements. La base est partagée par les workers uvicorn d'une même machine.
+    
+    Une connexion par instance, protégée par un verrou (appels depuis la boucle
+    asyncio et depuis le thread du UsageWriter).
+    """
+    
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            usage_date TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            total_tokens INTEGER NOT NULL,
+            estimated_cost REAL NOT NULL,
+            duration_ms INTEGER NOT NULL,
+            success INTEGER NOT NULL,
+            endpoint TEXT NOT NULL,
+            k_variants INTEGER NOT NULL DEFAULT 1,
+            error_message TEXT,
+            is_hedge INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_usage_date ON llm_usage(usage_date, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_llm_usage_timestamp ON llm_usage(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_llm_usage_model ON llm_usage(model_name, usage_date);
+        CREATE INDEX IF NOT EXISTS idx_llm_usage_endpoint ON llm_usage(endpoint, usage_date);
+        CREATE TABLE IF NOT EXISTS llm_usage_imports (
+            filename TEXT PRIMARY KEY,
+            size_bytes INTEGER NOT NULL,
+            records INTEGER NOT NULL,
+            imported_at TEXT NOT NULL
+        );
+    """
+    
+    _COLUMNS = (
+        "request_id", "timestamp", "usage_date", "model_name", "prompt_tokens", "completion_tokens",
+        "total_tokens", "estimated_cost", "duration_ms", "success", "endpoint", "k_variants",
+        "error_message", "is_hedge",
+    )
+    
+    def __init__(self, db_path: str):
+        """Initialise le repository et crée le schéma si nécessaire.
+        
+        Args:
+            db_path: Chemin du fichier SQLite.
+        """
+        self.db_path = Path(db_path)
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self._SCHEMA)
+        logger.info(f"SQLiteLLMUsageRepository initialisé avec la base: {self.db_path.absolute()}")
+    
+    def close(self) -> None:
+        """Ferme la connexion."""
+        with self._lock:
+            self._conn.close()
+    
+    @classmethod
+    def _to_row(cls, record: LLMUsageRecord) -> tuple:
+        return (
+            record.request_id, record.timestamp.isoformat(), record.timestamp.date().isoformat(),
+            record.model_name, record.prompt_tokens, record.completion_tokens, record.total_tokens,
+            record.estimated_cost, record.duration_ms, int(record.success), record.endpoint,
+            record.k_variants, record.error_message, int(record.is_hedge),
+        )
+    
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> LLMUsageRecord:
+        return LLMUsageRecord(
+            request_id=row["request_id"],
+            timestamp=datetime.fromisoformat(row["timestamp"]),
+            model_name=row["model_name"],
+            prompt_tokens=row["prompt_tokens"],
+            completion_tokens=row["completion_tokens"],
+            total_tokens=row["total_tokens"],
+            estimated_cost=row["estimated_cost"],
+            duration_ms=row["duration_ms"],
+            success=bool(row["success"]),
+            endpoint=row["endpoint"],
+            k_variants=row["k_variants"],
+            error_message=row["error_message"],
+            is_hedge=bool(row["is_hedge"]),
+        )
+    
+    @staticmethod
+    def _where(
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        model_name: Optional[str] = None
+    ) -> tuple:
+        """Construit la clause WHERE (et ses paramètres) des filtres courants."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        if start_date is not None:
+            clauses.append("usage_date >= ?")
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            clauses.append("usage_date <= ?")
+            params.append(end_date.isoformat())
+        if model_name:
+            clauses.append("model_name = ?")
+            params.append(model_name)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def save(self, record: LLMUsageRecord) -> None:
+        """Sauvegarde un enregistrement d'utilisation.
+        
+        Args:
+            record: L'enregistrement à sauvegarder.
+        """
+        self.save_many([record])
+    
+    def save_many(self, records: List[LLMUsageRecord]) -> None:
+        """Sauvegarde un lot d'enregistrements dans une seule transaction.
+        
+        Args:
+            records: Les enregistrements à sauvegarder.
+        """
+        placeholders = ", ".join("?" for _ in self._COLUMNS)
+        sql = f"INSERT INTO llm_usage ({', '.join(self._COLUMNS)}) VALUES ({placeholders})"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, [self._to_row(record) for record in records])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def get_by_date_range(
+        self,
+        start_date: date,
+        end_date: date,
+        model_name: Optional[str] = None
+    ) -> List[LLMUsageRecord]:
+        """Récupère les enregistrements dans une plage de dates (plus récents en premier, ordre d'insertion à égalité).
+        
+        Args:
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
+            model_name: Filtrer par modèle (optionnel).
+            
+        Returns:
+            Liste des enregistrements correspondants.
+        """
+        where, params = self._where(start_date, end_date, model_name)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM llm_usage{where} ORDER BY timestamp DESC, id", params
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+    
+    def get_all(self, model_name: Optional[str] = None) -> List[LLMUsageRecord]:
+        """Récupère tous les enregistrements (plus récents en premier).
+        
+        Args:
+            model_name: Filtrer par modèle (optionnel).
+            
+        Returns:
+            Liste de tous les enregistrements.
+        """
+        where, params = self._where(model_name=model_name)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM llm_usage{where} ORDER BY timestamp DESC, id", params
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+    
+    def get_statistics(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        model_name: Optional[str] = None
+    ) -> Dict:
+        """Calcule des statistiques agrégées (en SQL).
+        
+        Mêmes clés et mêmes règles que FileLLMUsageRepository.get_statistics : les appels
+        dupliqués perdants (is_hedge) comptent dans les tokens et le coût, pas dans les
+        compteurs d'appels, de succès et de durée.
+        
+        Args:
+            start_date: Date de début (optionnel).
+            end_date: Date de fin (optionnel).
+            model_name: Filtrer par modèle (optionnel).
+            
+        Returns:
+            Dictionnaire avec les statistiques agrégées.
+        """
+        if not (start_date and end_date):
+            # Même comportement que le repository fichier : plage ignorée si incomplète
+            start_date = end_date = None
+        where, params = self._where(start_date, end_date, model_name)
+        with self._lock:
+            row = self._conn.execute(
+                f"""
+                SELECT
+                    COALESCE(SUM(total_tokens), 0) AS total_tokens,
+                    COALESCE(SUM(prompt_tokens), 0) AS total_prompt_tokens,
+                    COALESCE(SUM(completion_tokens), 0) AS total_completion_tokens,
+                    COALESCE(SUM(estimated_cost), 0.0) AS total_cost,
+                    COALESCE(SUM(is_hedge = 0), 0) AS calls_count,
+                    COALESCE(SUM(is_hedge = 0 AND success = 1), 0) AS success_count,
+                    COALESCE(SUM(CASE WHEN is_hedge = 0 THEN duration_ms ELSE 0 END), 0) AS total_duration_ms,
+                    COALESCE(SUM(is_hedge), 0) AS hedge_calls_count,
+                    COALESCE(SUM(CASE WHEN is_hedge = 1 THEN estimated_cost ELSE 0.0 END), 0.0) AS hedge_cost
+                FROM llm_usage{where}
+                """,
+                params,
+            ).fetchone()
+        calls_count = row["calls_count"]
+        success_count = row["success_count"]
+        return {
+            "total_tokens": row["total_tokens"],
+            "total_prompt_tokens": row["total_prompt_tokens"],
+            "total_completion_tokens": row["total_completion_tokens"],
+            "total_cost": float(row["total_cost"]),
+            "calls_count": calls_count,
+            "success_count": success_count,
+            "error_count": calls_count - success_count,
+            "success_rate": (success_count / calls_count * 100) if calls_count > 0 else 0.0,
+            "avg_duration_ms": row["total_duration_ms"] / calls_count if calls_count > 0 else 0.0,
+            "hedge_calls_count": row["hedge_calls_count"],
+            "hedge_cost": float(row["hedge_cost"]),
         }
+    
+    def get_daily_costs(self, start_date: date, end_date: date) -> Dict[str, float]:
+        """Calcule le coût total par jour (en SQL).
+        
+        Args:
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
+            
+        Returns:
+            Dictionnaire {YYYY-MM-DD: coût} (jours sans appel omis).
+        """
+        where, params = self._where(start_date, end_date)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT usage_date, SUM(estimated_cost) AS cost FROM llm_usage{where} GROUP BY usage_date",
+                params,
+            ).fetchall()
+        return {row["usage_date"]: float(row["cost"]) for row in rows}
+    
+    def import_json_files(self, storage_dir: str) -> int:
+        """Importe les fichiers du repository fichier (JSONL et ancien format JSON).
+        
+        Chaque fichier n'est importé qu'une fois (table llm_usage_imports) : l'import
+        peut être relancé sans dupliquer les enregistrements. Les enregistrements déjà
+        présents (même request_id et timestamp) sont ignorés : un `usage_D.json` importé
+        puis migré en `usage_D.jsonl` n'est pas compté deux fois.
+        
+        Args:
+            storage_dir: Dossier des fichiers usage_YYYY-MM-DD.json[l].
+            
+        Returns:
+            Nombre d'enregistrements importés.
+        """
+        source = FileLLMUsageRepository(storage_dir=storage_dir)
+        imported = 0
+        files = sorted(
+            list(source.storage_dir.glob(f"usage_*{USAGE_FILE_SUFFIX}"))
+            + list(source.storage_dir.glob(f"usage_*{LEGACY_USAGE_FILE_SUFFIX}"))
+        )
+        for file_path in files:
+            with self._lock:
+                already = self._conn.execute(
+                    "SELECT size_bytes FROM llm_usage_imports WHERE filename = ?", (file_path.name,)
+                ).fetchone()
+            size = file_path.stat().st_size
+            if already is not None:
+                if already["size_bytes"] != size:
+                    logger.warning(f"{file_path.name} modifié depuis son import : nouvelles lignes ignorées")
+                continue
+            if file_path.suffix == LEGACY_USAGE_FILE_SUFFIX:
+                records = source._load_legacy_records(file_path)
+            else:
+                records = source._load_journal_records(file_path)
+            placeholders = ", ".join("?" for _ in self._COLUMNS)
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = self._new_rows(records)
+                    self._conn.executemany(
+                        f"INSERT INTO llm_usage ({', '.join(self._COLUMNS)}) VALUES ({placeholders})", rows
+                    )
+                    self._conn.execute(
+                        "INSERT INTO llm_usage_imports (filename, size_bytes, records, imported_at) VALUES (?, ?, ?, ?)",
+                        (file_path.name, size, len(records), datetime.now().isoformat()),
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            imported += len(rows)
+            skipped = f", {len(records) - len(rows)} déjà présents" if len(rows) < len(records) else ""
+            logger.info(f"Usage LLM importé depuis {file_path.name} ({len(rows)} enregistrements{skipped})")
+        return imported
+    
+    def _new_rows(self, records: List[LLMUsageRecord]) -> List[tuple]:
+        """Retourne les lignes des enregistrements absents de la table (clé : request_id, timestamp).
+        
+        À appeler sous le verrou, dans la transaction d'import.
+        """
+        rows = [self._to_row(record) for record in records]
+        dates = sorted({row[2] for row in rows})
+        if not dates:
+            return []
+        existing = {
+            (row["request_id"], row["timestamp"])
+            for row in self._conn.execute(
+                f"SELECT request_id, timestamp FROM llm_usage WHERE usage_date IN ({', '.join('?' for _ in dates)})",
+                dates,
+            )
+        }
+        new_rows = []
+        for row in rows:
+            if (row[0], row[1]) not in existing:
+                existing.add((row[0], row[1]))
+                new_rows.append(row)
+        return new_rows
+
+
+def create_llm_usage_repository(
+    backend: str,
+    storage_dir: str,
+    db_path: Optional[str] = None
+) -> ILLMUsageRepository:
+    """Crée le repository d'utilisation LLM configuré.
+    
+    Args:
+        backend: "file" (journaux JSONL par jour) ou "sqlite".
+        storage_dir: Dossier des journaux (backend "file", source de l'import SQLite).
+        db_path: Chemin du fichier SQLite (backend "sqlite"). Par défaut: <storage_dir>.db
+        
+    Returns:
+        Instance du repository. En SQLite, les fichiers existants sont importés.
+    """
+    backend = (backend or "file").strip().lower()
+    if backend == "sqlite":
+        path = db_path or str(Path(storage_dir).with_suffix(".db"))
+        logger.info(f"Repository d'usage LLM: SQLite ({path})")
+        repository = SQLiteLLMUsageRepository(path)
+        repository.import_json_files(storage_dir)
+        return repository
+    if backend != "file":
+        logger.warning(f"Repository d'usage LLM inconnu '{backend}', utilisation des fichiers")
+    return FileLLMUsageRepository(storage_dir=storage_dir)
+
 
 
+if __name__ == "__main__":
+    # Maintenance manuelle des données d'usage
+    # Usage: python -m services.repositories.llm_usage_repository migrate [--dir DIR]
+    #        python -m services.repositories.llm_usage_repository import-sqlite [--dir DIR] [--db PATH]
+    from constants import FilePaths
 
+    parser = argparse.ArgumentParser(description="Maintenance de l'historique d'usage LLM")
+    parser.add_argument("command", choices=("migrate", "import-sqlite"),
+                        help="migrate: fichiers JSON -> JSONL ; import-sqlite: fichiers -> base SQLite")
+    parser.add_argument("--dir", default=str(FilePaths.LLM_USAGE_DIR), help="Dossier des fichiers d'usage")
+    parser.add_argument("--db", default=None, help="Base SQLite (défaut: <dir>.db)")
+    args = parser.parse_args()
 
+    if args.command == "migrate":
+        count = FileLLMUsageRepository(storage_dir=args.dir).migrate_legacy_files()
+        print(f"{count} fichier(s) d'usage LLM migré(s) vers JSONL")
+    else:
+        repository = SQLiteLLMUsageRepository(args.db or str(Path(args.dir).with_suffix(".db")))
+        count = repository.import_json_files(args.dir)
+        repository.close()
+        print(f"{count} enregistrement(s) d'usage LLM importé(s) dans {repository.db_path}")
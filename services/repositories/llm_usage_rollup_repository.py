@@ -0,0 +1,570 @@
+"""Agrégats d'utilisation LLM maintenus incrémentalement (par jour, modèle et endpoint).
+
+Les tableaux de bord n'ont besoin que de totaux par jour, modèle et endpoint. Plutôt que
+de relire tous les enregistrements à chaque requête, LLMUsageService ajoute les compteurs
+de chaque lot d'enregistrements persisté à un journal d'agrégats par jour, à côté du
+journal brut : `<storage_dir>/rollups/rollup_YYYY-MM-DD.jsonl`. Chaque ligne est un
+incrément `{"model", "endpoint", compteurs...}` ; les ajouts (O_APPEND, une écriture par
+jour et par lot) restent corrects avec plusieurs workers.
+
+Les totaux d'une journée sont la somme de ses lignes ; ils sont gardés en mémoire et
+complétés par les seules lignes ajoutées depuis la dernière lecture. `check()` recalcule
+les agrégats depuis les enregistrements bruts et peut réécrire les journées divergentes.
+
+Si le dossier d'agrégats n'existe pas encore, il est construit depuis le journal brut
+(`source`) à la première lecture ou au premier ajout. La construction et les ajouts
+passent par le même verrou (threads, puis autres workers via fcntl sur
+`<storage_dir>/rollups.lock`) ; la construction laisse une marque des enregistrements
+récents qu'elle a comptés (`rollups/counted.json`) : un enregistrement déjà persisté
+dans le journal brut lors de la construction, mais ajouté ensuite, n'est pas compté
+deux fois.
+
+Usage (vérification / reconstruction) :
+    python -m services.repositories.llm_usage_rollup_repository check [--repair]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from models.llm_usage import LLMUsageRecord
+
+# Verrou inter-processus (workers uvicorn partageant les agrégats) : POSIX uniquement
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_DIR_NAME = "rollups"
+ROLLUP_LOCK_FILE_NAME = "rollups.lock"
+# Marque des enregistrements comptés par la dernière construction
+COUNTED_FILE_NAME = "counted.json"
+# Délai maximal entre la persistance d'un enregistrement et son ajout aux agrégats
+# (lot du UsageWriter et nouveaux essais) : fenêtre et durée de vie de la marque
+COUNTED_WINDOW_SECONDS = 60 * 60
+ROLLUP_FILE_PREFIX = "rollup_"
+ROLLUP_FILE_SUFFIX = ".jsonl"
+# Compteurs additifs (mêmes noms que les statistiques des repositories d'usage)
+ROLLUP_COUNTERS: Tuple[str, ...] = (
+    "total_tokens",
+    "total_prompt_tokens",
+    "total_completion_tokens",
+    "total_cost",
+    "calls_count",
+    "success_count",
+    "total_duration_ms",
+    "hedge_calls_count",
+    "hedge_cost",
+)
+# Écart toléré sur les coûts (sommes de flottants dans un ordre différent)
+COST_TOLERANCE = 1e-9
+
+# (modèle, endpoint) -> compteurs
+DayRollup = Dict[Tuple[str, str], Dict[str, float]]
+
+
+def record_counters(record: LLMUsageRecord) -> Dict[str, float]:
+    """Compteurs d'un enregistrement.
+
+    Les appels dupliqués perdants (is_hedge) comptent dans les tokens et le coût, pas dans
+    les compteurs d'appels, de succès et de durée (mêmes règles que get_statistics).
+
+    Args:
+        record: Enregistrement d'usage.
+    """
+    hedge = record.is_hedge
+    return {
+        "total_tokens": record.total_tokens,
+        "total_prompt_tokens": record.prompt_tokens,
+        "total_completion_tokens": record.completion_tokens,
+        "total_cost": record.estimated_cost,
+        "calls_count": 0 if hedge else 1,
+        "success_count": 1 if record.success and not hedge else 0,
+        "total_duration_ms": 0 if hedge else record.duration_ms,
+        "hedge_calls_count": 1 if hedge else 0,
+        "hedge_cost": record.estimated_cost if hedge else 0.0,
+    }
+
+
+def record_key(record: LLMUsageRecord) -> str:
+    """Identité d'un enregistrement (stable entre le journal brut et la mémoire)."""
+    return "|".join((
+        record.request_id, record.timestamp.isoformat(), record.model_name, record.endpoint,
+        "hedge" if record.is_hedge else "call",
+    ))
+
+
+def _add_counters(target: Dict[str, float], counters: Dict[str, Any]) -> None:
+    for name in ROLLUP_COUNTERS:
+        target[name] = target.get(name, 0) + (counters.get(name) or 0)
+
+
+def summarize_records(records: Iterable[LLMUsageRecord]) -> Dict[str, DayRollup]:
+    """Agrège des enregistrements par jour, modèle et endpoint.
+
+    Args:
+        records: Enregistrements d'usage.
+
+    Returns:
+        {YYYY-MM-DD: {(modèle, endpoint): compteurs}}.
+    """
+    days: Dict[str, DayRollup] = {}
+    for record in records:
+        day = days.setdefault(record.timestamp.date().isoformat(), {})
+        _add_counters(day.setdefault((record.model_name, record.endpoint), {}), record_counters(record))
+    return days
+
+
+def statistics_from_counters(counters: Dict[str, float]) -> Dict[str, Any]:
+    """Construit les statistiques (format des repositories d'usage) depuis des compteurs.
+
+    Args:
+        counters: Compteurs additionnés (ROLLUP_COUNTERS).
+    """
+    calls_count = int(counters.get("calls_count", 0))
+    success_count = int(counters.get("success_count", 0))
+    return {
+        "total_tokens": int(counters.get("total_tokens", 0)),
+        "total_prompt_tokens": int(counters.get("total_prompt_tokens", 0)),
+        "total_completion_tokens": int(counters.get("total_completion_tokens", 0)),
+        "total_cost": float(counters.get("total_cost", 0.0)),
+        "calls_count": calls_count,
+        "success_count": success_count,
+        "error_count": calls_count - success_count,
+        "success_rate": (success_count / calls_count * 100) if calls_count > 0 else 0.0,
+        "avg_duration_ms": counters.get("total_duration_ms", 0) / calls_count if calls_count > 0 else 0.0,
+        "hedge_calls_count": int(counters.get("hedge_calls_count", 0)),
+        "hedge_cost": float(counters.get("hedge_cost", 0.0)),
+    }
+
+
+def _same_rollup(left: DayRollup, right: DayRollup) -> bool:
+    """Compare deux agrégats d'une journée (coûts à COST_TOLERANCE près)."""
+    if set(left) != set(right):
+        return False
+    for key, counters in left.items():
+        for name in ROLLUP_COUNTERS:
+            if abs(counters.get(name, 0) - right[key].get(name, 0)) > COST_TOLERANCE:
+                return False
+    return True
+
+
+class _DayFile:
+    """Totaux en mémoire d'un journal d'agrégats, et position déjà lue."""
+
+    def __init__(self):
+        self.rollup: DayRollup = {}
+        self.offset = 0
+        self.file_id: Optional[Tuple[int, int]] = None
+
+
+class FileUsageRollupRepository:
+    """Journaux d'agrégats d'usage LLM par jour (à côté du journal brut)."""
+
+    # Verrous partagés par toutes les instances pour le même dossier
+    _dir_locks: Dict[str, threading.Lock] = {}
+    _exclusive_locks: Dict[str, threading.RLock] = {}
+    # Profondeur d'imbrication de _exclusive (le verrou fcntl n'est pris qu'une fois)
+    _exclusive_depths: Dict[str, int] = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, storage_dir: str, source: Any = None):
+        """Initialise le repository (sans accès disque).
+
+        Args:
+            storage_dir: Dossier du journal d'usage brut (les agrégats vont dans son
+                sous-dossier `rollups/`).
+            source: Repository d'usage (ILLMUsageRepository) depuis lequel construire les
+                agrégats s'ils n'existent pas encore (optionnel).
+        """
+        self.rollup_dir = Path(storage_dir) / ROLLUP_DIR_NAME
+        self.lock_file = Path(storage_dir) / ROLLUP_LOCK_FILE_NAME
+        self.counted_file = self.rollup_dir / COUNTED_FILE_NAME
+        self.source = source
+        key = str(self.rollup_dir.absolute())
+        self._key = key
+        with self._locks_lock:
+            self._lock = self._dir_locks.setdefault(key, threading.Lock())
+            self._exclusive_lock = self._exclusive_locks.setdefault(key, threading.RLock())
+        self._days: Dict[str, _DayFile] = {}
+
+    def _file_path(self, day: str) -> Path:
+        return self.rollup_dir / f"{ROLLUP_FILE_PREFIX}{day}{ROLLUP_FILE_SUFFIX}"
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Verrou de construction et d'ajout : threads du processus, puis autres processus (fcntl)."""
+        with self._exclusive_lock:
+            depth = self._exclusive_depths.get(self._key, 0)
+            if depth or not FCNTL_AVAILABLE:
+                self._exclusive_depths[self._key] = depth + 1
+                try:
+                    yield
+                finally:
+                    self._exclusive_depths[self._key] = depth
+                return
+            self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                self._exclusive_depths[self._key] = 1
+                try:
+                    yield
+                finally:
+                    self._exclusive_depths[self._key] = 0
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_counted(self, records: List[LLMUsageRecord]) -> None:
+        """Marque les enregistrements récents comptés par une construction (sous _exclusive)."""
+        now = datetime.now().astimezone()
+        horizon = now - timedelta(seconds=COUNTED_WINDOW_SECONDS)
+        keys = {
+            record_key(record) for record in records
+            if (record.timestamp if record.timestamp.tzinfo else record.timestamp.astimezone()) >= horizon
+        }
+        # Marque d'une construction précédente encore valide : conservée
+        keys.update(self._load_counted()[0])
+        self._save_counted(keys, time.time() + COUNTED_WINDOW_SECONDS)
+
+    def _save_counted(self, keys: Set[str], expires_at: float) -> None:
+        """Réécrit la marque (supprimée si plus aucun enregistrement n'y figure)."""
+        if not keys:
+            self.counted_file.unlink(missing_ok=True)
+            return
+        tmp_path = self.counted_file.with_name(f"{self.counted_file.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": expires_at, "records": sorted(keys)}, f)
+        os.replace(tmp_path, self.counted_file)
+
+    def _load_counted(self) -> Tuple[Set[str], float]:
+        """Enregistrements marqués par la dernière construction et expiration de la marque.
+
+        Returns:
+            (clés, expiration) ; clés vides si la marque est absente, illisible ou expirée.
+        """
+        if not self.counted_file.exists():
+            return set(), 0.0
+        try:
+            with open(self.counted_file, "r", encoding="utf-8") as f:
+                counted = json.load(f)
+            keys = set(counted["records"])
+            expires_at = float(counted["expires_at"])
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            logger.warning(f"Marque des agrégats illisible ({self.counted_file}), ignorée: {e}")
+            self.counted_file.unlink(missing_ok=True)
+            return set(), 0.0
+        if time.time() >= expires_at:
+            self.counted_file.unlink(missing_ok=True)
+            return set(), 0.0
+        return keys, expires_at
+
+    def _skip_counted(self, records: List[LLMUsageRecord]) -> List[LLMUsageRecord]:
+        """Retire les enregistrements déjà comptés par la construction (sous _exclusive).
+
+        Les enregistrements retirés sont effacés de la marque (un ajout par enregistrement).
+        """
+        keys, expires_at = self._load_counted()
+        if not keys:
+            return records
+        remaining = [record for record in records if record_key(record) not in keys]
+        if len(remaining) < len(records):
+            keys.difference_update(record_key(record) for record in records)
+            self._save_counted(keys, expires_at)
+        return remaining
+
+    def is_initialized(self) -> bool:
+        """Indique si les agrégats ont déjà été construits (dossier présent)."""
+        return self.rollup_dir.is_dir()
+
+    def ensure_initialized(self, repository: Any = None) -> bool:
+        """Construit les agrégats depuis le journal brut s'ils n'existent pas encore.
+
+        Les ajouts attendent la fin de la construction (même verrou) ; ceux des
+        enregistrements qu'elle a déjà comptés sont ignorés (voir _skip_counted).
+
+        Args:
+            repository: Repository d'usage (défaut: source).
+
+        Returns:
+            True si les agrégats viennent d'être construits.
+        """
+        repository = repository if repository is not None else self.source
+        if self.is_initialized() or repository is None:
+            return False
+        with self._exclusive():
+            if self.is_initialized():
+                return False
+            days = self.rebuild(repository)
+        logger.info(f"Agrégats d'usage LLM construits depuis le journal brut ({days} jour(s))")
+        return True
+
+    def add(self, records: List[LLMUsageRecord]) -> None:
+        """Ajoute les compteurs d'enregistrements persistés (une écriture par jour).
+
+        Args:
+            records: Enregistrements déjà sauvegardés dans le journal brut.
+        """
+        if not records:
+            return
+        self.ensure_initialized()
+        with self._exclusive():
+            # Enregistrements déjà persistés lors de la construction : comptés par celle-ci
+            records = self._skip_counted(records)
+            if not records:
+                return
+            os.makedirs(self.rollup_dir, exist_ok=True)
+            for day, rollup in summarize_records(records).items():
+                payload = "".join(
+                    json.dumps({"model": model, "endpoint": endpoint, **counters}, separators=(",", ":")) + "\n"
+                    for (model, endpoint), counters in rollup.items()
+                ).encode("utf-8")
+                with self._lock:
+                    fd = os.open(self._file_path(day), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    try:
+                        os.write(fd, payload)
+                    finally:
+                        os.close(fd)
+
+    def _load_day(self, day: str) -> DayRollup:
+        """Totaux d'une journée (lecture des seules lignes ajoutées depuis le dernier appel)."""
+        file_path = self._file_path(day)
+        with self._lock:
+            cached = self._days.setdefault(day, _DayFile())
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                self._days.pop(day, None)
+                return {}
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != cached.file_id or stat.st_size < cached.offset:
+                # Fichier réécrit (reconstruction) : relecture complète
+                cached.rollup, cached.offset, cached.file_id = {}, 0, file_id
+            if stat.st_size > cached.offset:
+                with open(file_path, "rb") as f:
+                    f.seek(cached.offset)
+                    data = f.read()
+                # Ligne incomplète (écriture en cours) : relue au prochain appel
+                end = data.rfind(b"\n") + 1
+                for line in data[:end].splitlines():
+                    try:
+                        entry = json.loads(line)
+                        key = (entry["model"], entry["endpoint"])
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning(f"Ligne d'agrégat illisible ignorée dans {file_path}")
+                        continue
+                    _add_counters(cached.rollup.setdefault(key, {}), entry)
+                cached.offset += end
+            return {key: dict(counters) for key, counters in cached.rollup.items()}
+
+    def _days_in_range(self, start_date: Optional[date], end_date: Optional[date]) -> List[str]:
+        """Jours ayant un journal d'agrégats (tous si la plage est incomplète)."""
+        if not self.rollup_dir.is_dir():
+            return []
+        days = sorted(
+            path.name[len(ROLLUP_FILE_PREFIX):-len(ROLLUP_FILE_SUFFIX)]
+            for path in self.rollup_dir.glob(f"{ROLLUP_FILE_PREFIX}*{ROLLUP_FILE_SUFFIX}")
+        )
+        if start_date and end_date:
+            start, end = start_date.isoformat(), end_date.isoformat()
+            days = [day for day in days if start <= day <= end]
+        return days
+
+    def get_rollups(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, DayRollup]:
+        """Agrégats par jour, modèle et endpoint.
+
+        Args:
+            start_date: Date de début (optionnel).
+            end_date: Date de fin (optionnel).
+
+        Returns:
+            {YYYY-MM-DD: {(modèle, endpoint): compteurs}}.
+        """
+        self.ensure_initialized()
+        rollups = {}
+        for day in self._days_in_range(start_date, end_date):
+            rollup = self._load_day(day)
+            if rollup:
+                rollups[day] = rollup
+        return rollups
+
+    def get_statistics(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        model_name: Optional[str] = None
+    ) -> Dict:
+        """Calcule les statistiques en additionnant les agrégats.
+
+        Mêmes clés et mêmes règles que ILLMUsageRepository.get_statistics (plage ignorée
+        si incomplète).
+
+        Args:
+            start_date: Date de début (optionnel).
+            end_date: Date de fin (optionnel).
+            model_name: Filtrer par modèle (optionnel).
+
+        Returns:
+            Dictionnaire avec les statistiques agrégées.
+        """
+        totals: Dict[str, float] = {}
+        for rollup in self.get_rollups(start_date, end_date).values():
+            for (model, _endpoint), counters in rollup.items():
+                if not model_name or model == model_name:
+                    _add_counters(totals, counters)
+        return statistics_from_counters(totals)
+
+    def get_daily_costs(self, start_date: date, end_date: date) -> Dict[str, float]:
+        """Calcule le coût total par jour depuis les agrégats.
+
+        Args:
+            start_date: Date de début (incluse).
+            end_date: Date de fin (incluse).
+
+        Returns:
+            Dictionnaire {YYYY-MM-DD: coût} (jours sans appel omis).
+        """
+        return {
+            day: sum(counters.get("total_cost", 0.0) for counters in rollup.values())
+            for day, rollup in self.get_rollups(start_date, end_date).items()
+        }
+
+    def _write_day(self, day: str, rollup: DayRollup) -> None:
+        """Réécrit le journal d'une journée (une ligne par modèle et endpoint)."""
+        file_path = self._file_path(day)
+        with self._lock:
+            if not rollup:
+                file_path.unlink(missing_ok=True)
+                self._days.pop(day, None)
+                return
+            tmp_path = file_path.with_name(file_path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for (model, endpoint), counters in sorted(rollup.items()):
+                    f.write(json.dumps({"model": model, "endpoint": endpoint, **counters}, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+
+    @staticmethod
+    def _raw_records(
+        repository: Any,
+        start_date: Optional[date],
+        end_date: Optional[date]
+    ) -> List[LLMUsageRecord]:
+        """Enregistrements du journal brut sur la plage (tous si la plage est incomplète)."""
+        if start_date and end_date:
+            return repository.get_by_date_range(start_date, end_date)
+        return repository.get_all()
+
+    def _raw_rollups(
+        self,
+        repository: Any,
+        start_date: Optional[date],
+        end_date: Optional[date]
+    ) -> Dict[str, DayRollup]:
+        """Agrégats recalculés depuis le journal brut."""
+        return summarize_records(self._raw_records(repository, start_date, end_date))
+
+    def rebuild(
+        self,
+        repository: Any,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> int:
+        """Reconstruit les agrégats depuis le journal brut.
+
+        Les ajouts sont bloqués pendant la reconstruction ; les enregistrements récents
+        comptés sont marqués pour que leur ajout ultérieur soit ignoré.
+
+        Args:
+            repository: Repository d'usage (ILLMUsageRepository).
+            start_date: Date de début (optionnel, toutes les journées si la plage est incomplète).
+            end_date: Date de fin (optionnel).
+
+        Returns:
+            Nombre de journées écrites.
+        """
+        with self._exclusive():
+            records = self._raw_records(repository, start_date, end_date)
+            expected = summarize_records(records)
+            os.makedirs(self.rollup_dir, exist_ok=True)
+            self._write_counted(records)
+            for day in set(self._days_in_range(start_date, end_date)) - set(expected):
+                self._write_day(day, {})
+            for day, rollup in expected.items():
+                self._write_day(day, rollup)
+        return len(expected)
+
+    def check(
+        self,
+        repository: Any,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        repair: bool = False
+    ) -> Dict[str, Any]:
+        """Vérifie les agrégats contre le journal brut (et réécrit les journées divergentes).
+
+        Args:
+            repository: Repository d'usage (ILLMUsageRepository).
+            start_date: Date de début (optionnel, toutes les journées si la plage est incomplète).
+            end_date: Date de fin (optionnel).
+            repair: Réécrire les journées divergentes depuis le journal brut.
+
+        Returns:
+            {"days_checked", "mismatched_days", "repaired"}.
+        """
+        with self._exclusive():
+            records = self._raw_records(repository, start_date, end_date)
+            expected = summarize_records(records)
+            actual = self.get_rollups(start_date, end_date)
+            days = sorted(set(expected) | set(actual))
+            mismatched = [day for day in days if not _same_rollup(expected.get(day, {}), actual.get(day, {}))]
+            if mismatched:
+                logger.warning(f"Agrégats d'usage LLM divergents: {', '.join(mismatched)}")
+                if repair:
+                    os.makedirs(self.rollup_dir, exist_ok=True)
+                    repaired = set(mismatched)
+                    self._write_counted([
+                        record for record in records if record.timestamp.date().isoformat() in repaired
+                    ])
+                    for day in mismatched:
+                        self._write_day(day, expected.get(day, {}))
+        return {"days_checked": len(days), "mismatched_days": mismatched, "repaired": bool(mismatched and repair)}
+
+
+if __name__ == "__main__":
+    # Vérification / reconstruction des agrégats
+    # Usage: python -m services.repositories.llm_usage_rollup_repository check [--repair] [--start D --end D]
+    from constants import FilePaths
+    from services.repositories.llm_usage_repository import create_llm_usage_repository
+
+    parser = argparse.ArgumentParser(description="Agrégats d'usage LLM")
+    parser.add_argument("command", choices=("check", "rebuild"),
+                        help="check: comparer au journal brut ; rebuild: tout reconstruire")
+    parser.add_argument("--dir", default=str(FilePaths.LLM_USAGE_DIR), help="Dossier des fichiers d'usage")
+    parser.add_argument("--store", default=os.getenv("LLM_USAGE_STORE", "file"), help="Backend du journal brut")
+    parser.add_argument("--db", default=os.getenv("LLM_USAGE_DB_PATH") or None, help="Base SQLite")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="Date de début (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Date de fin (YYYY-MM-DD)")
+    parser.add_argument("--repair", action="store_true", help="Réécrire les journées divergentes")
+    args = parser.parse_args()
+
+    usage_repository = create_llm_usage_repository(args.store, args.dir, args.db)
+    rollups = FileUsageRollupRepository(args.dir)
+    if args.command == "rebuild":
+        print(f"{rollups.rebuild(usage_repository, args.start, args.end)} jour(s) d'agrégats reconstruit(s)")
+    else:
+        result = rollups.check(usage_repository, args.start, args.end, repair=args.repair)
+        print(f"{result['days_checked']} jour(s) vérifié(s), divergents: {result['mismatched_days'] or 'aucun'}"
+              + (" (réparés)" if result["repaired"] else ""))
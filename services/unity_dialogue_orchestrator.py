@@ -14,12 +14,14 @@ from services.skill_catalog_service import SkillCatalogService
 from services.trait_catalog_service import TraitCatalogService
 from services.configuration_service import ConfigurationService
 from services.llm_usage_service import LLMUsageService
+from services.budget_ledger import BudgetReservation, GenerationBudgetGuard
 from services.unity_dialogue_generation_service import UnityDialogueGenerationService
 from services.json_renderer.unity_json_renderer import UnityJsonRenderer
 from api.schemas.dialogue import GenerateUnityDialogueRequest, GenerateUnityDialogueResponse
-from api.exceptions import InternalServerException, ValidationException
+from api.exceptions import InternalServerException, QuotaExceededException, ValidationException
 from factories.llm_factory import LLMClientFactory
 from models.dialogue_structure.unity_dialogue_node import UnityDialogueGenerationResponse
+from constants import Defaults, LLMPriority
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +29,7 @@ logger = logging.getLogger(__name__)
 @dataclass
 class GenerationEvent:
     """Événement de génération pour SSE streaming."""
-    type: str  # 'step', 'metadata', 'complete', 'error'
+    type: str  # 'step', 'chunk', 'partial', 'metadata', 'complete', 'error'
     data: Dict[str, Any]
 
 
@@ -46,7 +48,9 @@ class UnityDialogueOrchestrator:
         trait_service: TraitCatalogService,
         config_service: ConfigurationService,
         usage_service: LLMUsageService,
-        request_id: str
+        request_id: str,
+        priority: str = LLMPriority.INTERACTIVE,
+        budget_guard: Optional[GenerationBudgetGuard] = None
     ):
         """Initialise l'orchestrateur avec toutes les dépendances.
         
@@ -58,6 +62,9 @@ class UnityDialogueOrchestrator:
             config_service: Service de configuration.
             usage_service: Service de tracking usage LLM.
             request_id: ID de la requête pour logging.
+            priority: Classe de priorité des appels LLM (LLMPriority).
+            budget_guard: Vérification du budget LLM une fois le prompt construit
+                (None : pas de vérification).
         """
         self.dialogue_service = dialogue_service
         self.prompt_engine = prompt_engine
@@ -66,6 +73,59 @@ class UnityDialogueOrchestrator:
         self.config_service = config_service
         self.usage_service = usage_service
         self.request_id = request_id
+        self.priority = priority
+        self.budget_guard = budget_guard
+    
+    async def _reserve_budget(
+        self,
+        request_data: GenerateUnityDialogueRequest,
+        prompt_tokens: int,
+        max_completion_tokens: int,
+        k: int
+    ) -> Optional[BudgetReservation]:
+        """Vérifie le budget avec le coût réel du prompt construit et réserve ce coût.
+        
+        Args:
+            request_data: Paramètres de génération (modèle demandé).
+            prompt_tokens: Tokens du prompt construit (BuiltPrompt.token_count).
+            max_completion_tokens: Limite de tokens de complétion d'une variante.
+            k: Nombre de variantes générées.
+            
+        Returns:
+            Réservation à libérer en fin de génération (None sans garde de budget).
+            
+        Raises:
+            QuotaExceededException: Si la génération dépasserait le budget mensuel.
+        """
+        if self.budget_guard is None:
+            return None
+        # Verrou fcntl et écriture des réservations partagées : hors de la boucle d'événements
+        budget_check, reservation = await asyncio.to_thread(
+            self.budget_guard.reserve,
+            model_name=request_data.llm_model_identifier,
+            prompt_tokens=prompt_tokens,
+            max_completion_tokens=max_completion_tokens,
+            k=k
+        )
+        if not budget_check["allowed"]:
+            logger.warning(
+                f"Génération bloquée: budget dépassé ({budget_check['percentage']:.1f}%) "
+                f"(request_id: {self.request_id})"
+            )
+            raise QuotaExceededException(
+                message=budget_check.get("warning") or "Monthly quota reached",
+                details={
+                    "percentage": budget_check["percentage"],
+                    "estimated_cost": budget_check["estimated_cost"]
+                },
+                request_id=self.request_id
+            )
+        if budget_check.get("warning"):
+            logger.warning(
+                f"Budget warning: {budget_check['warning']} ({budget_check['percentage']:.1f}%) "
+                f"(request_id: {self.request_id})"
+            )
+        return reservation
     
     async def generate_with_events(
         self,
@@ -81,6 +141,8 @@ class UnityDialogueOrchestrator:
         Yields:
             GenerationEvent: Événements de progression (step, metadata, complete, error).
         """
+        # Coût estimé réservé dans le registre des budgets jusqu'à la fin de la génération
+        reservation = None
         try:
             # Étape 1: Prompting
             yield GenerationEvent(type='step', data={'step': 'Prompting'})
@@ -163,6 +225,15 @@ class UnityDialogueOrchestrator:
             prompt_hash = built.prompt_hash
             estimated_tokens = built.token_count
             
+            # Vérifier le budget avec le prompt construit (tokens réels, tarif du modèle, k)
+            k = 1
+            max_completion_tokens = (
+                request_data.max_completion_tokens
+                if request_data.max_completion_tokens is not None
+                else Defaults.DEFAULT_MAX_COMPLETION_TOKENS
+            )
+            reservation = await self._reserve_budget(request_data, estimated_tokens, max_completion_tokens, k)
+            
             # Étape 2: Generating
             yield GenerationEvent(type='step', data={'step': 'Generating'})
             
@@ -180,13 +251,8 @@ class UnityDialogueOrchestrator:
                 endpoint="generate/unity-dialogue"
             )
             
-            # Configurer max_tokens : utiliser la valeur fournie ou la valeur par défaut
-            from constants import Defaults
-            if request_data.max_completion_tokens is not None:
-                llm_client.max_tokens = request_data.max_completion_tokens
-            else:
-                # Utiliser la valeur par défaut si non spécifiée
-                llm_client.max_tokens = Defaults.DEFAULT_MAX_COMPLETION_TOKENS
+            # Configurer max_tokens : valeur fournie ou valeur par défaut
+            llm_client.max_tokens = max_completion_tokens
             
             # Configurer le reasoning effort si fourni (uniquement pour GPT-5.2)
             if request_data.reasoning_effort is not None:
@@ -200,6 +266,10 @@ class UnityDialogueOrchestrator:
             if request_data.top_p is not None:
                 llm_client.top_p = request_data.top_p
             
+            # Transmettre l'estimation de tokens et la priorité au scheduler LLM
+            llm_client.estimated_prompt_tokens = estimated_tokens
+            llm_client.priority = self.priority
+            
             # 7. Générer via Structured Output avec streaming natif
             unity_service = UnityDialogueGenerationService()
             
@@ -213,12 +283,12 @@ class UnityDialogueOrchestrator:
                 sequence_counter = 0
                 
                 # Importer StreamChunk pour le type checking
-                from core.llm.openai.stream_parser import StreamChunk
+                from core.llm.openai.stream_parser import StreamChunk, StreamEventType
                 
                 # Générer avec streaming - les chunks sont yieldés directement
                 async for item in llm_client.generate_variants_streaming(
                     prompt=prompt,
-                    k=1,
+                    k=k,
                     response_model=UnityDialogueGenerationResponse,
                     user_system_prompt_override=request_data.system_prompt_override,
                 ):
@@ -250,6 +320,21 @@ class UnityDialogueOrchestrator:
                                 )
                                 sequence_counter += 1
                         
+                        elif item.event_type == StreamEventType.STRUCTURED_OUTPUT_FIELD:
+                            # Champ du nœud complété et validé (title, node.line, node.choices[i]...)
+                            yield GenerationEvent(
+                                type='partial',
+                                data={'path': item.data.get("path"), 'value': item.data.get("value")}
+                            )
+                        
+                        elif item.event_type == StreamEventType.STRUCTURED_OUTPUT_INVALID:
+                            # Violation de schéma : le client a interrompu la génération
+                            yield GenerationEvent(
+                                type='error',
+                                data={'message': item.data.get("error", "Sortie structurée invalide"), 'code': 'schema_violation'}
+                            )
+                            return
+                        
                         elif item.event_type == "response.reasoning_text.delta":
                             # Chunk de reasoning - optionnel, peut être ignoré ou streamé séparément
                             delta = item.data.get("delta", "")
@@ -353,12 +438,16 @@ class UnityDialogueOrchestrator:
             
             yield GenerationEvent(type='complete', data={'result': result.model_dump(mode='json')})
             
-        except ValidationException:
-            # Re-raise ValidationException sans modification
+        except (ValidationException, QuotaExceededException):
+            # Re-raise sans modification (422 / 429)
             raise
         except Exception as e:
             logger.exception(f"Erreur génération Unity (request_id: {self.request_id}): {e}")
             yield GenerationEvent(type='error', data={'message': str(e)})
+        finally:
+            # Fin de la génération : le coût réel a été compté par LLMUsageService
+            if reservation is not None:
+                await asyncio.to_thread(self.budget_guard.release, reservation)
     
     async def generate(
         self,
@@ -374,6 +463,7 @@ class UnityDialogueOrchestrator:
             
         Raises:
             ValidationException: Si validation échoue.
+            QuotaExceededException: Si la génération dépasserait le budget mensuel.
             InternalServerException: Si génération échoue.
         """
         result = None
@@ -0,0 +1,340 @@
+"""Persistance en arrière-plan de l'usage LLM et des incréments de budget.
+
+LLMUsageService.track_usage ne touche plus au disque quand un writer est installé :
+l'enregistrement est déposé dans une file, et un thread d'écriture persiste tous les
+`flush_interval_ms` les enregistrements accumulés (un ajout par fichier du jour via
+`save_many`), les agrégats d'usage de ces enregistrements et les incréments de budget
+(une seule mise à jour de `cost_budgets.json` par utilisateur et par lot).
+
+Entre deux lots, les coûts non encore persistés sont comptés en mémoire
+(`get_pending_budget_cost`) : CostGovernanceService les ajoute au montant lu, si bien
+que les vérifications de budget n'attendent jamais le disque et ne sous-estiment pas
+la consommation.
+
+Une écriture en échec est retentée aux lots suivants, au plus `max_attempts` fois : au-delà,
+l'enregistrement est journalisé en erreur puis abandonné, et son coût en attente libéré.
+"""
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.llm_usage import LLMUsageRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_MS = 200
+# Délai (s) avant un nouvel essai des écritures en échec
+RETRY_DELAY = 1.0
+# Nombre maximal de tentatives d'une écriture avant abandon
+DEFAULT_MAX_ATTEMPTS = 5
+# Attente maximale de flush()/stop()
+DEFAULT_FLUSH_TIMEOUT = 5.0
+
+_STOP = object()
+
+
+def budget_storage_key(repository: Any) -> str:
+    """Identifie le stockage d'un repository de budgets (fichier, sinon instance)."""
+    storage_file = getattr(repository, "storage_file", None)
+    if storage_file is not None:
+        return str(Path(storage_file).absolute())
+    return f"id:{id(repository)}"
+
+
+@dataclass
+class _UsageItem:
+    """Enregistrement en attente de persistance."""
+    record: LLMUsageRecord
+    # Repository d'usage où l'écrire (None : enregistrement déjà persisté)
+    repository: Any = None
+    # Service de cost governance à mettre à jour (None : pas d'incrément de budget)
+    cost_service: Any = None
+    user_id: Optional[str] = None
+    # Agrégats à compléter une fois l'enregistrement persisté (None : pas d'agrégats)
+    rollups: Any = None
+    # Tentatives d'écriture déjà en échec
+    attempts: int = 0
+
+
+class UsageWriter:
+    """Thread d'écriture par lots des enregistrements d'usage et des budgets."""
+
+    def __init__(self, flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """Initialise le writer et démarre le thread d'écriture.
+
+        Args:
+            flush_interval_ms: Délai maximal (ms) entre la réception d'un enregistrement
+                et sa persistance.
+            max_attempts: Nombre maximal de tentatives d'une écriture avant abandon.
+        """
+        self.flush_interval = max(0, flush_interval_ms) / 1000.0
+        self.max_attempts = max(1, max_attempts)
+        # File non bornée : les enregistrements d'usage (facturation) ne sont jamais abandonnés
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._pending_lock = threading.Lock()
+        # (stockage du budget, user_id) -> coût soumis mais pas encore persisté
+        self._pending_budget: Dict[Tuple[str, str], float] = {}
+        self._retry: List[_UsageItem] = []
+        self._submitted = 0
+        self._written = 0
+        self._batches = 0
+        self._errors = 0
+        self._dropped = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        record: LLMUsageRecord,
+        repository: Any,
+        cost_service: Any = None,
+        user_id: Optional[str] = None,
+        rollups: Any = None
+    ) -> None:
+        """Dépose un enregistrement (et l'incrément de budget associé) dans la file.
+
+        Args:
+            record: Enregistrement d'usage.
+            repository: Repository d'usage où l'écrire.
+            cost_service: Service de cost governance à mettre à jour (None : pas de budget).
+            user_id: Utilisateur dont le budget est incrémenté du coût de l'enregistrement.
+            rollups: Repository d'agrégats à compléter (None : pas d'agrégats).
+        """
+        item = _UsageItem(record, repository, cost_service if user_id else None, user_id, rollups)
+        if item.cost_service is not None:
+            key = (budget_storage_key(item.cost_service.repository), user_id)
+            with self._pending_lock:
+                self._pending_budget[key] = self._pending_budget.get(key, 0.0) + record.estimated_cost
+        if self._stopped:
+            # Writer arrêté (arrêt du processus) : écriture directe
+            self._persist([item])
+            return
+        self._submitted += 1
+        self._queue.put(item)
+
+    def pending_cost(self, budget_repository: Any, user_id: str) -> float:
+        """Coût soumis mais pas encore persisté dans le budget d'un utilisateur.
+
+        Args:
+            budget_repository: Repository de budgets consulté.
+            user_id: ID de l'utilisateur.
+        """
+        with self._pending_lock:
+            return self._pending_budget.get((budget_storage_key(budget_repository), user_id), 0.0)
+
+    def _run(self) -> None:
+        """Boucle du thread d'écriture : accumule pendant flush_interval puis persiste."""
+        stopping = False
+        while not stopping:
+            try:
+                # Écritures en échec : nouvel essai après RETRY_DELAY même sans nouvel enregistrement
+                first = self._queue.get(timeout=RETRY_DELAY) if self._retry else self._queue.get()
+            except queue.Empty:
+                first = None
+            batch: List[Any] = [] if first is None else [first]
+            deadline = time.monotonic() + self.flush_interval
+            # Accumuler jusqu'à l'échéance (un flush ou un arrêt persiste immédiatement)
+            while batch and not (batch[-1] is _STOP or isinstance(batch[-1], threading.Event)):
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            items = self._retry
+            self._retry = []
+            markers: List[threading.Event] = []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    items.append(item)
+            if items:
+                self._persist(items)
+                self._batches += 1
+            for marker in markers:
+                marker.set()
+
+    def _persist(self, items: List[_UsageItem]) -> None:
+        """Persiste un lot : enregistrements par repository, puis agrégats, budgets par utilisateur.
+
+        Les écritures en échec sont conservées pour le lot suivant (séparément pour
+        l'enregistrement, les agrégats et le budget, afin de ne rien compter deux fois),
+        puis abandonnées après max_attempts tentatives.
+        """
+        by_repository: Dict[int, Tuple[Any, List[_UsageItem]]] = {}
+        by_budget: Dict[Tuple[str, str], Tuple[Any, List[_UsageItem]]] = {}
+        for item in items:
+            if item.repository is not None:
+                by_repository.setdefault(id(item.repository), (item.repository, []))[1].append(item)
+            if item.cost_service is not None:
+                key = (budget_storage_key(item.cost_service.repository), item.user_id)
+                by_budget.setdefault(key, (item.cost_service, []))[1].append(item)
+
+        retry: List[_UsageItem] = []
+        # Agrégats à compléter : enregistrements persistés dans ce lot ou lors d'un lot précédent
+        saved = [item for item in items if item.repository is None and item.rollups is not None]
+        for repository, repo_items in by_repository.values():
+            records = [item.record for item in repo_items]
+            try:
+                save_many = getattr(repository, "save_many", None)
+                if save_many is not None:
+                    save_many(records)
+                else:
+                    for record in records:
+                        repository.save(record)
+                self._written += len(records)
+                saved.extend(item for item in repo_items if item.rollups is not None)
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Erreur lors de l'enregistrement de {len(records)} usage(s) LLM (nouvel essai au prochain lot): {e}")
+                retry.extend(
+                    replace(item, cost_service=None, user_id=None, attempts=item.attempts + 1) for item in repo_items
+                )
+
+        by_rollups: Dict[int, Tuple[Any, List[_UsageItem]]] = {}
+        for item in saved:
+            by_rollups.setdefault(id(item.rollups), (item.rollups, []))[1].append(item)
+        for rollups, rollup_items in by_rollups.values():
+            try:
+                rollups.add([item.record for item in rollup_items])
+            except Exception as e:
+                self._errors += 1
+                logger.warning(f"Erreur lors de la mise à jour des agrégats d'usage (nouvel essai au prochain lot): {e}")
+                retry.extend(
+                    replace(item, repository=None, cost_service=None, user_id=None, attempts=item.attempts + 1)
+                    for item in rollup_items
+                )
+
+        for (storage_key, user_id), (cost_service, budget_items) in by_budget.items():
+            cost = sum(item.record.estimated_cost for item in budget_items)
+            try:
+                cost_service.update_budget(user_id=user_id, cost=cost)
+            except Exception as e:
+                self._errors += 1
+                logger.warning(f"Erreur lors de la mise à jour du budget (nouvel essai au prochain lot): {e}")
+                retry.extend(
+                    replace(item, repository=None, rollups=None, attempts=item.attempts + 1) for item in budget_items
+                )
+                continue
+            self._release_pending(storage_key, user_id, cost)
+            logger.debug(f"Budget mis à jour: +${cost:.6f} ({len(budget_items)} appel(s))")
+
+        for item in retry:
+            if item.attempts < self.max_attempts:
+                self._retry.append(item)
+            else:
+                self._drop(item)
+
+    def _release_pending(self, storage_key: str, user_id: str, cost: float) -> None:
+        """Retire un coût des coûts en attente d'un budget."""
+        with self._pending_lock:
+            remaining = self._pending_budget.get((storage_key, user_id), 0.0) - cost
+            if remaining > 1e-12:
+                self._pending_budget[(storage_key, user_id)] = remaining
+            else:
+                self._pending_budget.pop((storage_key, user_id), None)
+
+    def _drop(self, item: _UsageItem) -> None:
+        """Abandonne une écriture après max_attempts échecs (journalisée en erreur)."""
+        self._dropped += 1
+        if item.repository is not None:
+            part = "enregistrement"
+        elif item.rollups is not None:
+            part = "agrégats"
+        else:
+            part = "budget"
+        logger.error(
+            f"Usage LLM abandonné après {item.attempts} tentative(s) ({part}): "
+            f"request_id={item.record.request_id}, timestamp={item.record.timestamp.isoformat()}, "
+            f"modèle={item.record.model_name}, coût=${item.record.estimated_cost:.6f}, user_id={item.user_id}"
+        )
+        if item.cost_service is not None:
+            self._release_pending(budget_storage_key(item.cost_service.repository), item.user_id, item.record.estimated_cost)
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+        """Attend la persistance des enregistrements déjà soumis.
+
+        Args:
+            timeout: Attente maximale (s).
+        """
+        if self._stopped or not self._thread.is_alive() or threading.current_thread() is self._thread:
+            return
+        marker = threading.Event()
+        self._queue.put(marker)
+        marker.wait(timeout)
+
+    def stop(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+        """Persiste les enregistrements en attente puis arrête le thread d'écriture.
+
+        Args:
+            timeout: Attente maximale (s).
+        """
+        if self._stopped:
+            return
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._stopped = True
+        if self._retry:
+            # Dernier essai pour les écritures en échec
+            retry, self._retry = self._retry, []
+            self._persist(retry)
+            if self._retry:
+                logger.error(f"{len(self._retry)} usage(s) LLM non persisté(s) à l'arrêt")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du writer (en attente, écrits, lots, erreurs)."""
+        with self._pending_lock:
+            pending_cost = sum(self._pending_budget.values())
+        return {
+            "running": not self._stopped and self._thread.is_alive(),
+            "queued": self._queue.qsize(),
+            "retrying": len(self._retry),
+            "submitted": self._submitted,
+            "written": self._written,
+            "batches": self._batches,
+            "errors": self._errors,
+            "dropped": self._dropped,
+            "pending_budget_cost": pending_cost,
+        }
+
+
+# Writer installé par l'application (None : persistance synchrone)
+_usage_writer: Optional[UsageWriter] = None
+
+
+def get_usage_writer() -> Optional[UsageWriter]:
+    """Récupère le writer d'usage installé (None si persistance synchrone)."""
+    return _usage_writer
+
+
+def set_usage_writer(writer: Optional[UsageWriter]) -> None:
+    """Remplace le writer d'usage (l'ancien est vidé puis arrêté).
+
+    Args:
+        writer: Nouveau writer (None pour revenir à la persistance synchrone).
+    """
+    global _usage_writer
+    previous = _usage_writer
+    _usage_writer = writer
+    if previous is not None and previous is not writer:
+        previous.stop()
+
+
+def get_pending_budget_cost(budget_repository: Any, user_id: str) -> float:
+    """Coût soumis au writer mais pas encore persisté dans un budget (0 sans writer).
+
+    Args:
+        budget_repository: Repository de budgets consulté.
+        user_id: ID de l'utilisateur.
+    """
+    writer = _usage_writer
+    return writer.pending_cost(budget_repository, user_id) if writer is not None else 0.0
@@ -386,3 +386,98 @@ class TestPagination:
             assert data["page"] == 1
             assert data["page_size"] == 1
 
+
+
+class TestListProjection:
+    """Tests pour la projection (fields) et le mode résumé des listes."""
+    
+    def test_list_characters_with_fields(self, client):
+        """Test que fields= restreint data aux clés demandées."""
+        response = client.get("/api/v1/context/characters?fields=Inconnu&page=1&page_size=1")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert data["characters"] == [{"name": "Alice", "data": {"Nom": "Alice"}}]
+    
+    def test_list_items_summary(self, client):
+        """Test que le mode résumé ne garde que les champs résumés."""
+        response = client.get("/api/v1/context/items?summary=true")
+        
+        assert response.status_code == 200
+        assert [item["data"] for item in response.json()["items"]] == [{"Nom": "Sword"}, {"Nom": "Shield"}]
+    
+    def test_fields_and_summary_rejected(self, client):
+        """Test que fields et summary ne peuvent pas être combinés."""
+        response = client.get("/api/v1/context/species?fields=Description&summary=true")
+        
+        assert response.status_code == 422
+    
+    def test_first_render_and_compression_run_off_event_loop(self, client, monkeypatch):
+        """Test que le rendu initial et la compression d'une page sont exécutés hors de la boucle."""
+        import asyncio
+        import api.utils.prerendered_lists as prerendered_lists
+        
+        calls = []
+        compress = prerendered_lists.compress
+        
+        def recording_compress(content, encoding):
+            try:
+                asyncio.get_running_loop()
+                calls.append(True)
+            except RuntimeError:
+                calls.append(False)
+            return compress(content, encoding)
+        
+        monkeypatch.setattr(prerendered_lists, "_prerendered_lists", None)
+        monkeypatch.setattr(prerendered_lists, "compress", recording_compress)
+        
+        for _ in range(2):
+            response = client.get("/api/v1/context/items", headers={"Accept-Encoding": "gzip"})
+            assert response.status_code == 200
+            assert [item["name"] for item in response.json()["items"]] == ["Sword", "Shield"]
+        assert calls == [False]
+
+
+class TestSearch:
+    """Tests pour la recherche plein texte."""
+    
+    def test_search_pages_ranked_results(self, client):
+        """Test que la recherche retourne les éléments classés et paginés."""
+        response = client.get("/api/v1/context/search?q=guilde&page_size=1")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert (data["page"], data["total_pages"]) == (1, 2)
+        assert data["results"][0]["category"] == "communities"
+    
+    def test_search_unknown_category(self, client):
+        """Test qu'une catégorie inconnue est refusée."""
+        response = client.get("/api/v1/context/search?q=elf&categories=planets")
+        
+        assert response.status_code == 422
+    
+    def test_first_search_builds_index_off_event_loop(self, client, monkeypatch):
+        """Test que l'index est construit dans un thread, hors de la boucle d'événements."""
+        import asyncio
+        import services.gdd_search_index as gdd_search_index
+        
+        built_on_loop = []
+        build = gdd_search_index.GDDSearchIndex.__init__
+        
+        def recording_build(index, *args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                built_on_loop.append(True)
+            except RuntimeError:
+                built_on_loop.append(False)
+            build(index, *args, **kwargs)
+        
+        monkeypatch.setattr(gdd_search_index, "_gdd_search_index_cache", None)
+        monkeypatch.setattr(gdd_search_index.GDDSearchIndex, "__init__", recording_build)
+        
+        assert client.get("/api/v1/context/search?q=guilde").status_code == 200
+        assert client.get("/api/v1/context/search?q=elf").status_code == 200
+        assert built_on_loop == [False]
+
@@ -3,7 +3,7 @@ import pytest
 import asyncio
 from datetime import datetime, timezone, timedelta
 from unittest.mock import patch, MagicMock
-from api.services.generation_job_manager import GenerationJobManager
+from api.services.generation_job_manager import GenerationJobManager, JobEventBuffer, encode_sse_frame
 
 
 @pytest.fixture
@@ -131,3 +131,126 @@ def test_cancel_job_returns_false_for_already_finished_job(job_manager, job_id):
     
     # Vérifier que l'annulation a échoué
     assert result is False
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_bounds_running_jobs():
+    """Test que le pool n'exécute pas plus de max_workers jobs à la fois (les autres restent en file)."""
+    manager = GenerationJobManager(max_workers=2)
+    release = asyncio.Event()
+    
+    async def runner(job_id, params):
+        yield {"type": "step", "step": "Generating"}
+        await release.wait()
+        manager.update_status(job_id, "completed", result={})
+        yield {"type": "complete", "result": {}}
+    
+    job_ids = [manager.create_job({}, runner=runner) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    
+    assert [manager.get_job(job_id)['status'] for job_id in job_ids] == ["running", "running", "queued"]
+    assert manager.get_pool_state() == {'max_workers': 2, 'running': 2, 'queued': 1}
+    
+    release.set()
+    for job_id in job_ids:
+        assert await manager.wait_for_completion(job_id, timeout_seconds=1.0)
+    assert manager._tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_subscribers_replay_buffer_then_follow_live_events():
+    """Test que chaque abonné rejoue les événements déjà publiés puis suit le flux en direct."""
+    manager = GenerationJobManager(coalesce_interval_ms=0)
+    step = asyncio.Event()
+    
+    async def runner(job_id, params):
+        yield {"type": "chunk", "content": "A"}
+        await step.wait()
+        yield {"type": "chunk", "content": "B"}
+        manager.update_status(job_id, "completed", result={})
+    
+    job_id = manager.create_job({}, runner=runner)
+    await asyncio.sleep(0.01)
+    
+    async def collect():
+        return [payload["content"] async for _, payload in manager.subscribe(job_id)]
+    
+    subscribers = [asyncio.create_task(collect()) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    step.set()
+    
+    assert await asyncio.gather(*subscribers) == [["A", "B"], ["A", "B"]]
+
+
+@pytest.mark.asyncio
+async def test_event_buffer_drops_oldest_events_when_full():
+    """Test que le buffer circulaire conserve les derniers événements et la numérotation."""
+    buffer = JobEventBuffer(maxlen=3)
+    for i in range(5):
+        buffer.publish({"i": i})
+    buffer.close()
+    
+    assert [(sequence, payload["i"]) async for sequence, payload in buffer.subscribe()] == [(2, 2), (3, 3), (4, 4)]
+
+
+@pytest.mark.asyncio
+async def test_event_frames_are_encoded_once_and_shared_by_subscribers():
+    """Test que la frame SSE est encodée à la publication et réutilisée par chaque abonné."""
+    buffer = JobEventBuffer()
+    buffer.publish({"type": "chunk", "content": "Éloïse"})
+    buffer.publish({"type": "complete", "result": {}})
+    buffer.close()
+    
+    first = [event async for event in buffer.subscribe_frames()]
+    second = [event async for event in buffer.subscribe_frames()]
+    
+    assert first[0] == (0, 'id: 0\ndata: {"type": "chunk", "content": "Éloïse"}\n\n'.encode("utf-8"))
+    assert all(a[1] is b[1] for a, b in zip(first, second))
+    assert buffer.backlog(0) == (2, sum(len(frame) for _, frame in first))
+    assert first[1][1] == encode_sse_frame(1, {"type": "complete", "result": {}})
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_job_publishes_cancellation():
+    """Test qu'un job annulé avant d'obtenir un worker publie l'annulation à ses abonnés."""
+    manager = GenerationJobManager(max_workers=1)
+    blocker = asyncio.Event()
+    
+    async def runner(job_id, params):
+        await blocker.wait()
+        yield {"type": "complete", "result": {}}
+    
+    manager.create_job({}, runner=runner)
+    queued_id = manager.create_job({}, runner=runner)
+    await asyncio.sleep(0.01)
+    
+    assert manager.cancel_job(queued_id) is True
+    assert await manager.wait_for_completion(queued_id, timeout_seconds=1.0)
+    events = [payload async for _, payload in manager.subscribe(queued_id)]
+    assert events == [{"type": "error", "message": "Génération annulée", "code": "cancelled"}]
+    
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_expired_job_frees_buffer_and_ends_subscribers():
+    """Test qu'à l'expiration du TTL le buffer de rejeu est libéré et les abonnés terminés."""
+    manager = GenerationJobManager(ttl_seconds=3600)
+    job_id = manager.create_job({})
+    buffer = manager.get_job(job_id)['events']
+    buffer.publish({"type": "step", "step": "Generating"})
+    
+    subscriber = asyncio.create_task(
+        asyncio.wait_for(_collect(manager.subscribe(job_id)), timeout=1.0)
+    )
+    await asyncio.sleep(0.01)
+    
+    await manager._cleanup_expired_jobs(now=datetime.now(timezone.utc) + timedelta(hours=2))
+    
+    assert await subscriber == [{"type": "step", "step": "Generating"}]
+    assert buffer.closed
+    assert manager.get_job(job_id) is None
+
+
+async def _collect(events):
+    return [payload async for _, payload in events]
@@ -0,0 +1,119 @@
+"""Tests pour les stores de jobs de génération (mémoire et SQLite partagé)."""
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.services.generation_job_manager import GenerationJobManager
+from api.services.generation_job_store import InMemoryJobStore, SQLiteJobStore
+
+
+def _job(job_id, expires_in=3600, status="queued"):
+    now = datetime.now(timezone.utc)
+    return {
+        'job_id': job_id,
+        'status': status,
+        'params': {"user_instructions": "Rencontre à l'auberge"},
+        'result': None,
+        'error': None,
+        'cancelled': False,
+        'owner': None,
+        'created_at': now.isoformat(),
+        'updated_at': now.isoformat(),
+        'expires_at': (now + timedelta(seconds=expires_in)).isoformat(),
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryJobStore()
+    else:
+        sqlite_store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        yield sqlite_store
+        sqlite_store.close()
+
+
+def test_store_round_trip_and_atomic_cancel(store):
+    """Test de la création, mise à jour et annulation (refusée une fois le job terminé)."""
+    store.create(_job("a"))
+    store.create(_job("b"))
+
+    assert store.update("a", status="completed", result={"title": "Fin"}, updated_at="x")
+    assert not store.update("inconnu", status="error")
+    assert store.get("a")['result'] == {"title": "Fin"}
+    assert store.get("a")['params'] == {"user_instructions": "Rencontre à l'auberge"}
+
+    assert store.mark_cancelled("a", "now") is False
+    assert store.mark_cancelled("b", "now") is True
+    assert store.get("b")['status'] == "cancelled" and store.get("b")['cancelled'] is True
+    assert store.cancelled_among(["a", "b", "inconnu"]) == ["b"]
+    assert store.list_active() == []
+
+
+def test_store_deletes_only_expired_jobs(store):
+    """Test que seuls les jobs expirés sont supprimés."""
+    store.create(_job("old", expires_in=-10))
+    store.create(_job("new", expires_in=3600))
+
+    assert store.delete_expired(datetime.now(timezone.utc).isoformat()) == ["old"]
+    assert store.get("old") is None
+    assert store.get("new") is not None
+
+
+def test_sqlite_expiry_uses_index(tmp_path):
+    """Test que l'expiration est une suppression indexée (pas de parcours complet)."""
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    plan = store._conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM generation_jobs WHERE expires_at < ?", ("2026-01-01",)
+    ).fetchall()
+    assert "idx_generation_jobs_expires_at" in " ".join(str(tuple(row)) for row in plan)
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_job_can_be_inspected_and_cancelled_from_another_worker(tmp_path):
+    """Test qu'un job exécuté par un worker est visible et annulable depuis un autre."""
+    db_path = str(tmp_path / "jobs.db")
+    worker_a = GenerationJobManager(store=SQLiteJobStore(db_path), remote_poll_interval=0.01)
+    worker_b = GenerationJobManager(store=SQLiteJobStore(db_path), remote_poll_interval=0.01)
+
+    async def runner(job_id, params):
+        yield {"type": "step", "step": "Generating"}
+        await asyncio.sleep(30)
+
+    job_id = worker_a.create_job({"user_instructions": "Test"}, runner=runner)
+    await asyncio.sleep(0.01)
+
+    assert worker_b.get_job(job_id)['status'] == "running"
+    assert 'events' not in worker_b.get_job(job_id)
+
+    assert worker_b.cancel_job(job_id) is True
+    assert worker_b.is_cancelled(job_id) is True
+    worker_a._apply_remote_cancellations()
+    assert await worker_a.wait_for_completion(job_id, timeout_seconds=1.0)
+    assert await worker_b.wait_for_completion(job_id, timeout_seconds=1.0)
+
+    events = [payload async for _, payload in worker_b.subscribe(job_id)]
+    assert events == [{"type": "error", "message": "Génération annulée", "code": "cancelled"}]
+    assert worker_a.get_job(job_id)['status'] == "cancelled"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Vérification de processus non disponible sous Windows")
+def test_orphaned_jobs_of_dead_process_are_marked_as_error(tmp_path):
+    """Test que les jobs laissés en cours par un processus arrêté passent en erreur au démarrage."""
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    orphan = _job("orphan", status="running")
+    orphan['owner'] = f"{socket.gethostname()}:99999999"
+    foreign = _job("foreign", status="running")
+    foreign['owner'] = "autre-machine:1"
+    store.create(orphan)
+    store.create(foreign)
+
+    GenerationJobManager(store=store)._recover_orphaned_jobs()
+
+    assert store.get("orphan")['status'] == "error"
+    assert store.get("foreign")['status'] == "running"
@@ -131,17 +131,21 @@ def test_perform_health_checks_detailed():
     with patch("api.utils.health_check.check_config") as mock_check_config, \
          patch("api.utils.health_check.check_storage") as mock_check_storage, \
          patch("api.utils.health_check.check_gdd_files") as mock_check_gdd, \
-         patch("api.utils.health_check.check_llm_connectivity") as mock_check_llm:
+         patch("api.utils.health_check.check_llm_connectivity") as mock_check_llm, \
+         patch("api.utils.health_check.check_llm_scheduler") as mock_check_scheduler, \
+         patch("api.utils.health_check.check_log_queue") as mock_check_log_queue:
         
         mock_check_config.return_value = HealthCheckResult("config", "healthy")
         mock_check_storage.return_value = HealthCheckResult("storage", "healthy")
         mock_check_gdd.return_value = HealthCheckResult("gdd_files", "healthy")
         mock_check_llm.return_value = HealthCheckResult("llm_connectivity", "healthy")
+        mock_check_scheduler.return_value = HealthCheckResult("llm_scheduler", "healthy")
+        mock_check_log_queue.return_value = HealthCheckResult("log_queue", "healthy")
         
         result = perform_health_checks(detailed=True)
         
         assert result["status"] == "healthy"
-        assert len(result["checks"]) == 4
+        assert len(result["checks"]) == 6
 
 
 def test_perform_health_checks_unhealthy():
@@ -232,3 +232,132 @@ def test_search_logs_pagination(client, sample_logs, monkeypatch):
         logs.get_log_service = original_get
 
 
+
+
+def test_log_service_reads_jsonl_and_legacy_files(sample_logs):
+    """Teste que le service lit les fichiers JSONL (y compris rotation intra-jour) avec l'ancien format."""
+    today = date.today()
+    rotated_file = sample_logs / f"logs_{today.isoformat()}_120000.jsonl"
+    rotated_file.write_text(
+        json.dumps({"timestamp": datetime.now(timezone.utc).isoformat() + "Z", "level": "INFO",
+                    "logger": "api.services", "message": "JSONL", "request_id": "req4"}) + "\n"
+        + '{"timestamp": "tronq\n',
+        encoding='utf-8'
+    )
+    service = LogService(log_dir=str(sample_logs))
+    
+    logs, total = service.search_logs(start_date=today, end_date=today)
+    
+    assert total == 3
+    assert {log["request_id"] for log in logs} == {"req1", "req2", "req4"}
+    files = {info["filename"]: info["entry_count"] for info in service.list_log_files()}
+    assert files[rotated_file.name] == 1
+    assert files[f"logs_{today.isoformat()}.json"] == 2
+
+
+def _jsonl_line(**fields):
+    log = {"timestamp": datetime.now(timezone.utc).isoformat() + "Z", "level": "INFO", "logger": "api.test",
+           "message": "test"}
+    log.update(fields)
+    return json.dumps(log) + "\n"
+
+
+def test_search_walks_hours_newest_first_and_cuts_the_date_range(tmp_path):
+    """Teste l'ordre et le total de la recherche paginée, bornée aux jours de la plage."""
+    today = date.today()
+    midnight = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+    
+    def line(minutes, **fields):
+        stamp = (midnight + timedelta(minutes=minutes)).isoformat() + "Z"
+        return _jsonl_line(timestamp=stamp, message=f"m{minutes}", **fields)
+    
+    (tmp_path / f"logs_{today.isoformat()}.jsonl").write_text(
+        line(-5) + line(10) + line(70, level="ERROR") + line(65) + line(600) + line(1445), encoding="utf-8"
+    )
+    (tmp_path / f"logs_{today.isoformat()}_120000.jsonl").write_text(
+        line(68) + line(599, level="ERROR"), encoding="utf-8"
+    )
+    service = LogService(log_dir=str(tmp_path))
+    
+    pages = [service.search_logs(start_date=today, end_date=today, limit=2, offset=offset) for offset in (0, 2, 4, 6)]
+    
+    assert [total for _, total in pages] == [6, 6, 6, 6]
+    assert [log["message"] for logs, _ in pages for log in logs] == ["m600", "m599", "m70", "m68", "m65", "m10"]
+    errors, total = service.search_logs(start_date=today, end_date=today, level="ERROR", limit=1)
+    assert (total, [log["message"] for log in errors]) == (2, ["m599"])
+
+
+def test_tail_cursor_streams_new_filtered_logs_and_resumes(tmp_path):
+    """Teste que le suivi ne renvoie que les nouveaux logs complets filtrés, et reprend après un id."""
+    today = date.today()
+    log_file = tmp_path / f"logs_{today.isoformat()}.jsonl"
+    log_file.write_text(_jsonl_line(message="ancien", job_id="job1"), encoding="utf-8")
+    service = LogService(log_dir=str(tmp_path))
+    cursor = service.open_tail(job_id="job1")
+    
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(_jsonl_line(message="premier", job_id="job1"))
+        f.write(_jsonl_line(message="autre job", job_id="job2"))
+        f.write(_jsonl_line(message="second", job_id="job1", level="ERROR"))
+        f.write('{"message": "en cours", "job_id": "job1"')
+    events = cursor.poll()
+    
+    assert [log["message"] for _, log in events] == ["premier", "second"]
+    assert cursor.poll() == []
+    # Fin de la ligne en cours, puis rotation par taille
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write('}\n')
+    rotated_file = tmp_path / f"logs_{today.isoformat()}_120000.jsonl"
+    rotated_file.write_text(_jsonl_line(message="après rotation", job_id="job1"), encoding="utf-8")
+    assert [log["message"] for _, log in cursor.poll()] == ["en cours", "après rotation"]
+    
+    # Reprise après le premier log reçu (header Last-Event-ID)
+    resumed = service.open_tail(job_id="job1", level="ERROR", last_event_id=events[0][0])
+    assert [log["message"] for _, log in resumed.poll()] == ["second"]
+
+
+def test_tail_stream_formats_sse_frames(tmp_path):
+    """Teste le format des frames SSE du suivi en direct (id = fichier:offset)."""
+    import asyncio
+    from api.routers.logs import tail_logs_stream
+    
+    log_file = tmp_path / f"logs_{date.today().isoformat()}.jsonl"
+    log_file.write_text("", encoding="utf-8")
+    cursor = LogService(log_dir=str(tmp_path)).open_tail(request_id="req1")
+    line = _jsonl_line(message="nouveau", request_id="req1")
+    log_file.write_text(line, encoding="utf-8")
+    
+    async def collect():
+        return [frame async for frame in tail_logs_stream(cursor, "sse", poll_interval=0.01, max_events=1)]
+    
+    frames = asyncio.run(collect())
+    
+    assert frames == [f"id: {log_file.name}:{len(line.encode('utf-8'))}\ndata: {json.dumps(json.loads(line))}\n\n"]
+
+
+def test_export_logs_streams_ndjson(client, sample_logs):
+    """Teste l'export NDJSON (fichiers JSONL et ancien format, filtres, blocs)."""
+    from api.routers import logs
+    
+    today = date.today()
+    (sample_logs / f"logs_{today.isoformat()}_120000.jsonl").write_text(
+        _jsonl_line(message="job", level="ERROR", job_id="job1") + _jsonl_line(message="autre") + '{"tronq',
+        encoding="utf-8"
+    )
+    service = LogService(log_dir=str(sample_logs))
+    app.dependency_overrides[logs.get_log_service] = lambda: service
+    try:
+        response = client.get(f"/api/v1/logs/export?start_date={(today - timedelta(days=1)).isoformat()}")
+        filtered = client.get("/api/v1/logs/export?level=ERROR")
+    finally:
+        app.dependency_overrides.pop(logs.get_log_service, None)
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "attachment" in response.headers["content-disposition"]
+    messages = [json.loads(line)["message"] for line in response.text.splitlines()]
+    assert messages == ["Slow request", "Request: GET /api/test", "Error in endpoint", "job", "autre"]
+    assert [json.loads(line)["message"] for line in filtered.text.splitlines()] == ["Error in endpoint", "job"]
+    # Blocs de taille bornée
+    chunks = list(service.iter_export(start_date=today, end_date=today, chunk_bytes=1))
+    assert len(chunks) == 4
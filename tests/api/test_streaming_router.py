@@ -12,6 +12,49 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture(scope="module")
+def job_client():
+    """Client de test avec boucle asyncio persistante.
+    
+    Les jobs sont exécutés en tâche de fond dès leur création : la boucle doit survivre
+    entre la requête de création et l'abonnement SSE.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _job_request():
+    context_selection = ContextSelection(
+        characters_full=["character_1"],
+        characters_excerpt=[],
+        locations_full=[],
+        locations_excerpt=[],
+        items_full=[],
+        items_excerpt=[],
+        species_full=[],
+        species_excerpt=[],
+        communities_full=[],
+        communities_excerpt=[],
+        dialogues_examples=[],
+        scene_location=None
+    )
+    return {
+        "user_instructions": "Test dialogue",
+        "context_selections": context_selection.model_dump(mode='json'),
+        "llm_model_identifier": "gpt-4o"
+    }
+
+
+def _parse_sse(text):
+    events = []
+    for line in text.split('\n'):
+        if line.startswith('data:'):
+            data_str = line[5:].strip()
+            if data_str:
+                events.append(json.loads(data_str))
+    return events
+
+
 def test_streaming_endpoint_returns_sse_format(client):
     """Test que l'endpoint SSE retourne le format SSE correct.
     
@@ -138,41 +181,11 @@ def test_streaming_endpoint_respects_cancellation_flag(client):
         assert response.text.count('"type": "chunk"') == 2
 
 
-@pytest.mark.asyncio
-async def test_create_job_and_stream_real_generation(client: TestClient, monkeypatch):
+def test_create_job_and_stream_real_generation(job_client: TestClient):
     """Test que le streaming utilise la vraie génération Unity via orchestrateur."""
+    client = job_client
     
-    # Créer un job
-    context_selection = ContextSelection(
-        characters_full=["character_1"],
-        characters_excerpt=[],
-        locations_full=[],
-        locations_excerpt=[],
-        items_full=[],
-        items_excerpt=[],
-        species_full=[],
-        species_excerpt=[],
-        communities_full=[],
-        communities_excerpt=[],
-        dialogues_examples=[],
-        scene_location=None
-    )
-    
-    job_request = {
-        "user_instructions": "Test dialogue",
-        "context_selections": context_selection.model_dump(mode='json'),
-        "llm_model_identifier": "gpt-4o"
-    }
-    
-    response = client.post("/api/v1/dialogues/generate/jobs", json=job_request)
-    assert response.status_code == 200
-    
-    job_data = response.json()
-    assert "job_id" in job_data
-    assert "stream_url" in job_data
-    job_id = job_data["job_id"]
-    
-    # Streamer le job (avec mock de l'orchestrateur pour éviter vrai appel LLM)
+    # Le job démarre dès sa création : mocker l'orchestrateur avant (évite un vrai appel LLM)
     with patch('services.unity_dialogue_orchestrator.UnityDialogueOrchestrator') as mock_orchestrator_class:
         # Mock de l'orchestrateur
         mock_orchestrator = MagicMock()
@@ -201,18 +214,21 @@ async def test_create_job_and_stream_real_generation(client: TestClient, monkeyp
         
         mock_orchestrator.generate_with_events = mock_events
         
+        response = client.post("/api/v1/dialogues/generate/jobs", json=_job_request())
+        assert response.status_code == 200
+        
+        job_data = response.json()
+        assert "job_id" in job_data
+        assert "stream_url" in job_data
+        job_id = job_data["job_id"]
+        
         # Streamer le job
         stream_response = client.get(f"/api/v1/dialogues/generate/jobs/{job_id}/stream")
         assert stream_response.status_code == 200
         assert stream_response.headers['content-type'] == 'text/event-stream; charset=utf-8'
         
         # Parser les événements SSE
-        events = []
-        for line in stream_response.text.split('\n'):
-            if line.startswith('data:'):
-                data_str = line[5:].strip()
-                if data_str:
-                    events.append(json.loads(data_str))
+        events = _parse_sse(stream_response.text)
         
         # Vérifier séquence événements
         assert len(events) >= 4
@@ -234,71 +250,99 @@ async def test_create_job_and_stream_real_generation(client: TestClient, monkeyp
         assert result['title'] == 'Test Dialogue'
 
 
-def test_cancel_job(client: TestClient):
+def test_cancel_job(job_client: TestClient):
     """Test que l'annulation d'un job fonctionne."""
+    import asyncio
+    from services.unity_dialogue_orchestrator import GenerationEvent
     
-    # Créer un job
-    context_selection = ContextSelection(
-        characters_full=["character_1"],
-        characters_excerpt=[],
-        locations_full=[],
-        locations_excerpt=[],
-        items_full=[],
-        items_excerpt=[],
-        species_full=[],
-        species_excerpt=[],
-        communities_full=[],
-        communities_excerpt=[],
-        dialogues_examples=[],
-        scene_location=None
-    )
-    
-    job_request = {
-        "user_instructions": "Test dialogue",
-        "context_selections": context_selection.model_dump(mode='json'),
-        "llm_model_identifier": "gpt-4o"
-    }
+    with patch('services.unity_dialogue_orchestrator.UnityDialogueOrchestrator') as mock_orchestrator_class:
+        async def mock_events(request_data, check_cancelled):
+            yield GenerationEvent(type='step', data={'step': 'Generating'})
+            await asyncio.sleep(30)
+        
+        mock_orchestrator_class.return_value.generate_with_events = mock_events
+        
+        response = job_client.post("/api/v1/dialogues/generate/jobs", json=_job_request())
+        job_id = response.json()["job_id"]
+        
+        # Annuler le job
+        cancel_response = job_client.post(f"/api/v1/dialogues/generate/jobs/{job_id}/cancel")
+        assert cancel_response.status_code == 200
+        
+        cancel_data = cancel_response.json()
+        assert cancel_data["success"] is True
+        assert cancel_data["job_id"] == job_id
+        
+        # Un abonné tardif reçoit l'événement d'annulation
+        events = _parse_sse(job_client.get(f"/api/v1/dialogues/generate/jobs/{job_id}/stream").text)
+        assert events[-1]["type"] == "error"
+        assert events[-1]["code"] == "cancelled"
+
+
+def test_job_runs_without_subscriber_and_replays_to_each_client(job_client: TestClient):
+    """Test que le job s'exécute dès sa création et que plusieurs clients reçoivent tous les événements."""
+    from api.services.generation_job_manager import get_job_manager
+    from services.unity_dialogue_orchestrator import GenerationEvent
     
-    response = client.post("/api/v1/dialogues/generate/jobs", json=job_request)
-    job_id = response.json()["job_id"]
+    with patch('services.unity_dialogue_orchestrator.UnityDialogueOrchestrator') as mock_orchestrator_class:
+        async def mock_events(request_data, check_cancelled):
+            yield GenerationEvent(type='step', data={'step': 'Generating'})
+            yield GenerationEvent(type='chunk', data={'content': 'Bonjour', 'sequence': 0})
+            yield GenerationEvent(type='complete', data={'result': {'title': 'Test Dialogue'}})
+        
+        mock_orchestrator_class.return_value.generate_with_events = mock_events
+        
+        response = job_client.post("/api/v1/dialogues/generate/jobs", json=_job_request())
+        job_id = response.json()["job_id"]
+        
+        # Aucun client connecté : la génération se termine quand même
+        import time
+        for _ in range(100):
+            status = job_client.get(f"/api/v1/dialogues/generate/jobs/{job_id}").json()
+            if status["status"] == "completed":
+                break
+            time.sleep(0.02)
+        assert status["status"] == "completed"
+        assert status["result"] == {"title": "Test Dialogue"}
+        
+        first = _parse_sse(job_client.get(f"/api/v1/dialogues/generate/jobs/{job_id}/stream").text)
+        second = _parse_sse(job_client.get(f"/api/v1/dialogues/generate/jobs/{job_id}/stream").text)
+        assert first == second
+        assert [event["type"] for event in first] == ["step", "chunk", "complete"]
+        assert job_id not in get_job_manager()._tasks
+
+
+def test_job_error_event_forwards_code_and_details(job_client: TestClient):
+    """Test que le code et les détails d'une erreur de génération parviennent aux clients SSE."""
+    from services.unity_dialogue_orchestrator import GenerationEvent
     
-    # Annuler le job
-    cancel_response = client.post(f"/api/v1/dialogues/generate/jobs/{job_id}/cancel")
-    assert cancel_response.status_code == 200
+    with patch('services.unity_dialogue_orchestrator.UnityDialogueOrchestrator') as mock_orchestrator_class:
+        async def mock_events(request_data, check_cancelled):
+            yield GenerationEvent(type='step', data={'step': 'Generating'})
+            yield GenerationEvent(
+                type='error',
+                data={'message': 'Sortie structurée invalide', 'code': 'schema_violation', 'details': {'path': 'node.line'}}
+            )
+        
+        mock_orchestrator_class.return_value.generate_with_events = mock_events
+        
+        job_id = job_client.post("/api/v1/dialogues/generate/jobs", json=_job_request()).json()["job_id"]
+        events = _parse_sse(job_client.get(f"/api/v1/dialogues/generate/jobs/{job_id}/stream").text)
     
-    cancel_data = cancel_response.json()
-    assert cancel_data["success"] is True
-    assert cancel_data["job_id"] == job_id
+    assert events[-1] == {
+        "type": "error",
+        "message": "Sortie structurée invalide",
+        "code": "schema_violation",
+        "details": {"path": "node.line"},
+    }
+    assert job_client.get(f"/api/v1/dialogues/generate/jobs/{job_id}").json()["status"] == "error"
 
 
-@pytest.mark.asyncio
-async def test_cleanup_automatic_after_completion(client: TestClient, monkeypatch, caplog):
+def test_cleanup_automatic_after_completion(job_client: TestClient, caplog):
     """Test que le cleanup automatique fonctionne après génération normale (Task 5 - Story 0.8)."""
     from api.services.generation_job_manager import get_job_manager
     
-    # Créer un job
-    context_selection = ContextSelection(
-        characters_full=["character_1"],
-        characters_excerpt=[],
-        locations_full=[],
-        items_excerpt=[],
-        species_full=[],
-        species_excerpt=[],
-        communities_full=[],
-        communities_excerpt=[],
-        dialogues_examples=[],
-        scene_location=None
-    )
-    
-    job_request = {
-        "user_instructions": "Test dialogue",
-        "context_selections": context_selection.model_dump(mode='json'),
-        "llm_model_identifier": "gpt-4o"
-    }
-    
-    response = client.post("/api/v1/dialogues/generate/jobs", json=job_request)
-    job_id = response.json()["job_id"]
-    
+    client = job_client
     job_manager = get_job_manager()
     
     # Mock de l'orchestrateur pour retourner un événement complete
@@ -327,6 +371,9 @@ async def test_cleanup_automatic_after_completion(client: TestClient, monkeypatc
         
         mock_orchestrator.generate_with_events = mock_events
         
+        response = client.post("/api/v1/dialogues/generate/jobs", json=_job_request())
+        job_id = response.json()["job_id"]
+        
         # Streamer le job jusqu'à completion
         stream_response = client.get(f"/api/v1/dialogues/generate/jobs/{job_id}/stream")
         assert stream_response.status_code == 200
@@ -335,12 +382,8 @@ async def test_cleanup_automatic_after_completion(client: TestClient, monkeypatc
         content = stream_response.text
         assert '"type": "complete"' in content
         
-        # Attendre un peu pour que le cleanup se termine
-        import asyncio
-        await asyncio.sleep(0.2)
-        
         # Vérifier que la tâche a été désenregistrée (cleanup automatique dans finally)
-        # Note: La tâche est désenregistrée dans le finally block de stream_generation
+        # Note: La tâche est désenregistrée par le worker à la fin du job
         # On vérifie que le job est dans l'état completed
         job = job_manager.get_job(job_id)
         assert job is not None
@@ -355,3 +398,34 @@ async def test_cleanup_automatic_after_completion(client: TestClient, monkeypatc
         assert f"job_id: {job_id}" in log_message
         assert "durée:" in log_message
         assert "timestamp:" in log_message
+
+
+def test_stream_resumes_after_last_event_id(job_client: TestClient):
+    """Test que chaque événement porte un id et que Last-Event-ID reprend au suivant sans relancer le LLM."""
+    from services.unity_dialogue_orchestrator import GenerationEvent
+    
+    calls = []
+    
+    with patch('services.unity_dialogue_orchestrator.UnityDialogueOrchestrator') as mock_orchestrator_class:
+        async def mock_events(request_data, check_cancelled):
+            calls.append(request_data)
+            yield GenerationEvent(type='step', data={'step': 'Generating'})
+            yield GenerationEvent(type='chunk', data={'content': 'Bonjour'})
+            yield GenerationEvent(type='metadata', data={'tokens': 10, 'cost': 0.001})
+            yield GenerationEvent(type='complete', data={'result': {'title': 'Test Dialogue'}})
+        
+        mock_orchestrator_class.return_value.generate_with_events = mock_events
+        
+        job_id = job_client.post("/api/v1/dialogues/generate/jobs", json=_job_request()).json()["job_id"]
+        stream_url = f"/api/v1/dialogues/generate/jobs/{job_id}/stream"
+        
+        full = job_client.get(stream_url).text
+        ids = [line[4:] for line in full.split('\n') if line.startswith('id: ')]
+        assert ids == ["0", "1", "2", "3"]
+        
+        resumed = _parse_sse(job_client.get(stream_url, headers={"Last-Event-ID": "1"}).text)
+        assert [event["type"] for event in resumed] == ["metadata", "complete"]
+        
+        invalid = _parse_sse(job_client.get(stream_url, headers={"Last-Event-ID": "abc"}).text)
+        assert len(invalid) == 4
+        assert len(calls) == 1
@@ -1,11 +1,14 @@
 """Configuration globale des tests pytest."""
 import os
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
 
 # IMPORTANT: certains singletons (SecurityConfig / rate limiter) sont initialisés à l'import de `api.main`.
 # On fixe donc l'env AVANT l'import pour éviter des 429 en tests.
 os.environ.setdefault("AUTH_RATE_LIMIT_ENABLED", "false")
+# Budgets LLM (et réservations partagées) dans un dossier temporaire, pas dans data/
+os.environ.setdefault("COST_BUDGETS_FILE", os.path.join(tempfile.mkdtemp(prefix="cost_budgets_"), "cost_budgets.json"))
 
 from api.main import app
 
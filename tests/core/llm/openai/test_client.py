@@ -349,4 +349,194 @@ class TestOpenAIClient:
             # Vérifier qu'une erreur est retournée
             assert len(results) == 1
             assert isinstance(results[0], str)
-            assert "Erreur" in results[0] or "error" in results[0].lower()
\ No newline at end of file
+            assert "Erreur" in results[0] or "error" in results[0].lower()
+    @pytest.mark.asyncio
+    async def test_generate_variants_goes_through_scheduler(self, mock_api_key, client_config):
+        """Test que l'appel non streaming prend un slot du scheduler et réconcilie les tokens."""
+        from api.utils.llm_scheduler import LLMScheduler
+        
+        client = OpenAIClient(api_key=mock_api_key, config=client_config)
+        client._scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+        client.estimated_prompt_tokens = 42
+        
+        mock_response = MagicMock()
+        mock_item = MagicMock()
+        mock_item.type = "text"
+        mock_item.text = "Test response"
+        mock_response.output = [mock_item]
+        mock_response.usage = MagicMock(input_tokens=10, output_tokens=5, total_tokens=15)
+        mock_response.reasoning = None
+        
+        with patch.object(client.client.responses, 'create', new_callable=AsyncMock) as mock_create:
+            mock_create.return_value = mock_response
+            await client.generate_variants("Test prompt", k=1)
+        
+        assert client._scheduler_tokens({"max_output_tokens": 1500}) == 42 + 1500
+        state = client._scheduler.get_state()["models"]["gpt-5.2"]
+        assert state["total_calls"] == 1
+        assert state["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_generate_variants_streaming_releases_scheduler_slot(self, mock_api_key, client_config):
+        """Test que le slot est conservé pendant le stream puis libéré, y compris sur rate limit."""
+        from api.utils.llm_scheduler import LLMScheduler
+        from core.llm.openai.stream_parser import StreamChunk
+        
+        client = OpenAIClient(api_key=mock_api_key, config=client_config)
+        scheduler = LLMScheduler(initial_concurrency=4, max_concurrency=4)
+        client._scheduler = scheduler
+        
+        mock_failed = MagicMock()
+        mock_failed.type = "response.failed"
+        mock_failed.error = {"code": "rate_limit_exceeded", "message": "Rate limit"}
+        mock_failed.sequence_number = 1
+        
+        in_flight_during_stream = []
+        
+        async def mock_stream():
+            in_flight_during_stream.append(scheduler.get_state()["models"]["gpt-5.2"]["in_flight"])
+            yield mock_failed
+        
+        with patch.object(client, '_make_api_call_streaming', new_callable=AsyncMock) as mock_stream_call:
+            mock_stream_call.return_value = mock_stream()
+            async for item in client.generate_variants_streaming("Test prompt", k=1):
+                assert isinstance(item, (StreamChunk, str))
+        
+        state = scheduler.get_state()["models"]["gpt-5.2"]
+        assert in_flight_during_stream == [1]
+        assert state["in_flight"] == 0
+        assert state["rate_limited"] == 1
+        assert state["concurrency_limit"] == 2.0
+
+    @pytest.mark.asyncio
+    async def test_generate_variants_streaming_hedges_slow_first_token(self, mock_api_key, client_config):
+        """Test qu'un stream sans premier token est dupliqué, le perdant fermé et son coût tracké à part."""
+        import asyncio
+        from api.utils.llm_hedging import HedgingPolicy, LATENCY_FIRST_TOKEN
+        from api.utils.llm_scheduler import LLMScheduler
+        from core.llm.openai.stream_parser import StreamChunk
+        
+        usage_service = MagicMock()
+        client = OpenAIClient(api_key=mock_api_key, config=client_config, usage_service=usage_service)
+        scheduler = LLMScheduler(initial_concurrency=4, max_concurrency=4)
+        client._scheduler = scheduler
+        client._hedging = HedgingPolicy(max_hedge_ratio=1.0, min_samples=5, min_delay=0.0)
+        for _ in range(5):
+            client._hedging.record_latency("gpt-5.2", LATENCY_FIRST_TOKEN, 0.01)
+        client.estimated_prompt_tokens = 120
+        
+        def _event(event_type, **fields):
+            event = MagicMock(spec=["type", "sequence_number", *fields])
+            event.type = event_type
+            event.sequence_number = 0
+            for name, value in fields.items():
+                setattr(event, name, value)
+            return event
+        
+        completed = MagicMock()
+        completed.output = [MagicMock(type="text", text="Réponse du hedge")]
+        completed.usage = MagicMock(input_tokens=120, output_tokens=5, total_tokens=125)
+        completed.reasoning = None
+        
+        class SlowStream:
+            closed = False
+            
+            def __aiter__(self):
+                return self
+            
+            async def __anext__(self):
+                await asyncio.sleep(10)
+            
+            async def close(self):
+                SlowStream.closed = True
+        
+        async def fast_stream():
+            yield _event("response.output_text.delta", delta="Réponse")
+            yield _event("response.completed", response=completed)
+        
+        streams = iter([SlowStream(), fast_stream()])
+        
+        with patch.object(client, '_make_api_call_streaming', new_callable=AsyncMock) as mock_stream_call:
+            mock_stream_call.side_effect = lambda params: next(streams)
+            items = [item async for item in client.generate_variants_streaming("Test prompt", k=1)]
+        
+        assert mock_stream_call.await_count == 2
+        assert SlowStream.closed
+        assert any(isinstance(item, StreamChunk) and item.event_type == "response.completed" for item in items)
+        hedge_calls = [c.kwargs for c in usage_service.track_usage.call_args_list if c.kwargs.get("is_hedge")]
+        assert len(hedge_calls) == 1
+        assert hedge_calls[0]["prompt_tokens"] == 120
+        assert hedge_calls[0]["completion_tokens"] == 0
+        state = scheduler.get_state()["models"]["gpt-5.2"]
+        assert state["in_flight"] == 0
+        assert state["total_calls"] == 2
+
+    @pytest.mark.asyncio
+    async def test_generate_variants_streaming_emits_partial_fields_and_aborts_on_violation(
+        self, mock_api_key, client_config
+    ):
+        """Test que les champs complétés sont émis et qu'une violation de schéma interrompt le stream."""
+        from core.llm.openai.stream_parser import StreamChunk, StreamEventType
+        from models.dialogue_structure.unity_dialogue_node import UnityDialogueGenerationResponse
+        
+        client = OpenAIClient(api_key=mock_api_key, config=client_config)
+        client._scheduler = None
+        client._hedging = None
+        
+        def _delta(text):
+            event = MagicMock(spec=["type", "sequence_number", "item_id", "delta"])
+            event.type = "response.function_call_arguments.delta"
+            event.sequence_number = 0
+            event.item_id = "fc_1"
+            event.delta = text
+            return event
+        
+        consumed = []
+        
+        class FakeStream:
+            closed = False
+            
+            def __init__(self, events):
+                self._events = iter(events)
+            
+            def __aiter__(self):
+                return self
+            
+            async def __anext__(self):
+                try:
+                    event = next(self._events)
+                except StopIteration:
+                    raise StopAsyncIteration
+                consumed.append(event)
+                return event
+            
+            async def close(self):
+                FakeStream.closed = True
+        
+        events = [
+            _delta('{"title": "Rencontre", "node": {"line": "Bonjour.", '),
+            _delta('"choices": [{"influenceDelta": 2}'),
+            _delta(', {"text": "Jamais consommé"}]}}'),
+        ]
+        
+        with patch.object(client, '_make_api_call_streaming', new_callable=AsyncMock) as mock_stream_call:
+            mock_stream_call.return_value = FakeStream(events)
+            items = [
+                item async for item in client.generate_variants_streaming(
+                    "Test prompt", k=1, response_model=UnityDialogueGenerationResponse
+                )
+            ]
+        
+        fields = [
+            item.data["path"] for item in items
+            if isinstance(item, StreamChunk) and item.event_type == StreamEventType.STRUCTURED_OUTPUT_FIELD
+        ]
+        invalid = [
+            item for item in items
+            if isinstance(item, StreamChunk) and item.event_type == StreamEventType.STRUCTURED_OUTPUT_INVALID
+        ]
+        assert fields == ["title", "node.line"]
+        assert len(invalid) == 1 and invalid[0].data["path"] == "node.choices[0]"
+        assert isinstance(items[-1], str) and "Sortie structurée invalide" in items[-1]
+        assert len(consumed) == 2
+        assert FakeStream.closed
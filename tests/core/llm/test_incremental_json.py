@@ -0,0 +1,110 @@
+"""Tests pour le parsing JSON incrémental des sorties structurées."""
+import json
+
+import pytest
+
+from core.llm.incremental_json import (
+    IncrementalJSONParser,
+    JSONStreamError,
+    PartialResponseParser,
+    StructuredOutputViolation,
+    format_path,
+)
+from models.dialogue_structure.unity_dialogue_node import UnityDialogueGenerationResponse
+
+
+SAMPLE_RESPONSE = {
+    "title": "Rencontre au port",
+    "node": {
+        "speaker": "NPC_TAVERNIER",
+        "line": "Bienvenue, \"voyageur\".\nQue cherches-tu ? éè",
+        "consequences": {"flag": "MET_TAVERNIER"},
+        "choices": [
+            {"text": "Une chambre.", "influenceDelta": -2, "traitRequirements": [{"trait": "Courageux", "minValue": 5}]},
+            {"text": "Rien.", "test": "Raison+Rhétorique:8"},
+        ],
+    },
+}
+
+
+def _feed_in_fragments(parser, text: str, size: int):
+    results = []
+    for start in range(0, len(text), size):
+        results.extend(parser.feed(text[start:start + size]))
+    return results
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, 10_000])
+def test_parser_rebuilds_document_whatever_the_fragmentation(size):
+    """Test que le document est reconstruit à l'identique quel que soit le découpage des deltas."""
+    text = json.dumps(SAMPLE_RESPONSE, ensure_ascii=False, indent=2)
+    parser = IncrementalJSONParser()
+
+    completed = _feed_in_fragments(parser, text, size)
+
+    assert parser.done
+    assert parser.root == SAMPLE_RESPONSE
+    paths = [format_path(path) for path, _ in completed]
+    assert paths.index("node.line") < paths.index("node.choices[0]") < paths.index("node") < paths.index("")
+
+
+def test_parser_handles_scalars_and_empty_containers():
+    """Test des nombres, littéraux, échappements unicode et conteneurs vides."""
+    parser = IncrementalJSONParser()
+    completed = parser.feed('{"a": [], "b": {}, "c": -1.5e2, "d": [true, false, null], "e": "\\u00e9"}')
+
+    values = {format_path(path): value for path, value in completed}
+    assert values["a"] == [] and values["b"] == {}
+    assert values["c"] == -150.0
+    assert values["d[2]"] is None
+    assert values["e"] == "é"
+
+
+@pytest.mark.parametrize("text", ['{"a" 1}', '{"a": 1,,', '[1,]', '{"a": tru}', '{} {'])
+def test_parser_rejects_invalid_json(text):
+    """Test que le JSON invalide est détecté dès le caractère fautif."""
+    with pytest.raises(JSONStreamError):
+        IncrementalJSONParser().feed(text)
+
+
+def test_partial_response_emits_unity_fields_as_they_complete():
+    """Test que speaker, line et chaque choix sont émis dès leur complétion."""
+    text = json.dumps(SAMPLE_RESPONSE, ensure_ascii=False)
+    parser = PartialResponseParser(UnityDialogueGenerationResponse)
+
+    before_choices = parser.feed(text[: text.index('"choices"')])
+    rest = parser.feed(text[text.index('"choices"'):])
+
+    assert [field.path for field in before_choices] == [
+        "title", "node.speaker", "node.line", "node.consequences.flag",
+    ]
+    assert [field.path for field in rest] == ["node.choices[0]", "node.choices[1]"]
+    assert rest[0].value == SAMPLE_RESPONSE["node"]["choices"][0]
+
+
+def test_partial_response_ignores_unknown_fields():
+    """Test que les champs hors schéma sont ignorés (comme par le modèle Pydantic)."""
+    parser = PartialResponseParser(UnityDialogueGenerationResponse)
+
+    fields = parser.feed('{"commentaire": {"x": [1, 2]}, "title": "T"}')
+
+    assert [field.path for field in fields] == ["title"]
+
+
+@pytest.mark.parametrize(
+    "text, path",
+    [
+        ('{"title": 42,', "title"),
+        ('{"node": {"choices": [{"influenceDelta": 1}', "node.choices[0]"),
+        ('{"node": {"consequences": [{"flag": "X"}', "node.consequences"),
+        ('{"node": {"isLongRest": "souvent"', "node.isLongRest"),
+    ],
+)
+def test_partial_response_raises_on_schema_violation(text, path):
+    """Test qu'une valeur hors schéma est signalée dès sa complétion, avec son chemin."""
+    parser = PartialResponseParser(UnityDialogueGenerationResponse)
+
+    with pytest.raises(StructuredOutputViolation) as exc_info:
+        parser.feed(text + "}")
+
+    assert exc_info.value.path == path
@@ -0,0 +1,93 @@
+"""Tests de la pile de middlewares ASGI (request ID, logging, cost governance, cache HTTP)."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from api.middleware import LoggingMiddleware, RequestIDMiddleware
+from api.middleware.cost_governance import CostGovernanceMiddleware
+from api.middleware.http_cache import HTTPCacheMiddleware
+from api.utils.data_versions import DataVersionRegistry
+
+
+def _build_app(release: asyncio.Event = None) -> FastAPI:
+    """Application avec la pile de middlewares de l'API (cache HTTP activé)."""
+    app = FastAPI()
+
+    @app.get("/whoami")
+    def whoami(request: Request):
+        return {"request_id": request.state.request_id}
+
+    async def frames():
+        yield "id: 1\ndata: premier\n\n"
+        # Le second frame n'est produit qu'une fois le premier reçu par le client
+        await release.wait()
+        yield "id: 2\ndata: second\n\n"
+
+    @app.get("/api/v1/context/events")
+    def versioned_stream():
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    @app.get("/events")
+    def static_stream():
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    app.add_middleware(RequestIDMiddleware)
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(CostGovernanceMiddleware)
+    app.add_middleware(HTTPCacheMiddleware, enabled=True, versions=DataVersionRegistry())
+    return app
+
+
+def test_request_id_shared_with_route_and_header():
+    """Test que le request_id de request.state est celui du header X-Request-ID."""
+    client = TestClient(_build_app())
+
+    response = client.get("/whoami")
+
+    assert response.headers["X-Request-ID"] == response.json()["request_id"]
+    assert "X-Process-Time" in response.headers
+    # Réponse servie depuis le cache : nouvel ID, pas celui de la réponse mise en cache
+    cached = client.get("/whoami")
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.headers.get("X-Request-ID") != response.headers["X-Request-ID"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/api/v1/context/events", "/events"])
+async def test_sse_frames_are_not_buffered(path):
+    """Test que chaque frame SSE traverse la pile dès son émission (cache versionné ou à TTL)."""
+    release = asyncio.Event()
+    app = _build_app(release)
+    received = []
+    requested = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        received.append(message)
+        if message["type"] == "http.response.body" and b"premier" in message.get("body", b""):
+            release.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    # Un frame retenu par un middleware bloquerait le générateur : timeout
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    disconnected.set()
+
+    bodies = [m.get("body", b"") for m in received if m["type"] == "http.response.body" and m.get("body")]
+    assert bodies[:2] == [b"id: 1\ndata: premier\n\n", b"id: 2\ndata: second\n\n"]
+    start = received[0]
+    assert (b"x-cache", b"HIT") not in start["headers"]
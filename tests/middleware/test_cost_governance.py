@@ -36,7 +36,7 @@ def test_middleware_allows_under_budget(temp_budget_file):
     test_app = FastAPI()
     test_app.add_middleware(CostGovernanceMiddleware)
     
-    @test_app.post("/api/v1/dialogues/generate/unity-dialogue")
+    @test_app.post("/api/v1/graph/generate-node")
     async def test_generate():
         return JSONResponse(content={"status": "generated"})
     
@@ -46,7 +46,7 @@ def test_middleware_allows_under_budget(temp_budget_file):
         
         # Budget: 0€ dépensés sur 100€ (0%)
         response = client.post(
-            "/api/v1/dialogues/generate/unity-dialogue",
+            "/api/v1/graph/generate-node",
             json={"test": "data"}
         )
         
@@ -68,7 +68,7 @@ def test_middleware_blocks_at_100_percent(temp_budget_file):
     test_app = FastAPI()
     test_app.add_middleware(CostGovernanceMiddleware)
     
-    @test_app.post("/api/v1/dialogues/generate/unity-dialogue")
+    @test_app.post("/api/v1/graph/generate-node")
     async def test_generate():
         return JSONResponse(content={"status": "generated"})
     
@@ -78,7 +78,7 @@ def test_middleware_blocks_at_100_percent(temp_budget_file):
         
         # Tenter une génération
         response = client.post(
-            "/api/v1/dialogues/generate/unity-dialogue",
+            "/api/v1/graph/generate-node",
             json={"test": "data"}
         )
         
@@ -101,7 +101,7 @@ def test_middleware_warns_at_90_percent(temp_budget_file):
     test_app = FastAPI()
     test_app.add_middleware(CostGovernanceMiddleware)
     
-    @test_app.post("/api/v1/dialogues/generate/unity-dialogue")
+    @test_app.post("/api/v1/graph/generate-node")
     async def test_generate():
         return JSONResponse(content={"status": "generated"})
     
@@ -111,7 +111,7 @@ def test_middleware_warns_at_90_percent(temp_budget_file):
         
         # Tenter une génération
         response = client.post(
-            "/api/v1/dialogues/generate/unity-dialogue",
+            "/api/v1/graph/generate-node",
             json={"test": "data"}
         )
         
@@ -151,7 +151,7 @@ def test_middleware_concurrent_requests_under_budget(temp_budget_file):
     test_app = FastAPI()
     test_app.add_middleware(CostGovernanceMiddleware)
     
-    @test_app.post("/api/v1/dialogues/generate/unity-dialogue")
+    @test_app.post("/api/v1/graph/generate-node")
     async def test_generate():
         return JSONResponse(content={"status": "generated"})
     
@@ -166,7 +166,7 @@ def test_middleware_concurrent_requests_under_budget(temp_budget_file):
             """Faire une requête POST."""
             try:
                 response = client.post(
-                    "/api/v1/dialogues/generate/unity-dialogue",
+                    "/api/v1/graph/generate-node",
                     json={"test": f"data_{thread_id}"}
                 )
                 responses.append((thread_id, response.status_code))
@@ -206,7 +206,7 @@ def test_middleware_concurrent_requests_at_90_percent(temp_budget_file):
     test_app = FastAPI()
     test_app.add_middleware(CostGovernanceMiddleware)
     
-    @test_app.post("/api/v1/dialogues/generate/unity-dialogue")
+    @test_app.post("/api/v1/graph/generate-node")
     async def test_generate():
         return JSONResponse(content={"status": "generated"})
     
@@ -219,7 +219,7 @@ def test_middleware_concurrent_requests_at_90_percent(temp_budget_file):
         def make_request(thread_id: int):
             """Faire une requête POST."""
             response = client.post(
-                "/api/v1/dialogues/generate/unity-dialogue",
+                "/api/v1/graph/generate-node",
                 json={"test": f"data_{thread_id}"}
             )
             responses.append((thread_id, response.status_code))
@@ -239,3 +239,89 @@ def test_middleware_concurrent_requests_at_90_percent(temp_budget_file):
         assert len(responses) == 3
         for thread_id, status_code in responses:
             assert status_code == 200, f"Thread {thread_id} devrait être autorisé avec warning"
+
+
+def test_middleware_reserves_estimated_cost_until_request_ends(temp_budget_file):
+    """Teste que le coût estimé est réservé pendant la génération puis libéré."""
+    from services.budget_ledger import get_budget_ledger
+    
+    repository = FileCostBudgetRepository(storage_file=str(temp_budget_file))
+    CostGovernanceService(repository=repository).update_quota("default_user", 100.0)
+    ledger = get_budget_ledger(repository)
+    reserved_during_request = []
+    
+    test_app = FastAPI()
+    test_app.add_middleware(CostGovernanceMiddleware)
+    
+    @test_app.post("/api/v1/graph/generate-node")
+    async def test_generate():
+        reserved_during_request.append(ledger.get_stats()["reserved"].get("default_user", 0.0))
+        return JSONResponse(content={"status": "generated"})
+    
+    with patch("api.middleware.cost_governance.get_cost_budget_repository", return_value=repository):
+        client = TestClient(test_app)
+        for _ in range(2):
+            assert client.post("/api/v1/graph/generate-node", json={}).status_code == 200
+    
+    # Réservation visible pendant la requête, libérée ensuite ; fichier lu une seule fois
+    assert reserved_during_request[0] > 0
+    assert reserved_during_request[1] == pytest.approx(reserved_during_request[0])
+    assert ledger.get_stats()["reserved"] == {}
+    assert ledger.get_stats()["reloads"] == 1
+
+
+def test_middleware_reserves_and_releases_off_the_event_loop(temp_budget_file):
+    """Teste que la réservation et sa libération (verrou fcntl, fichier partagé) ne bloquent pas la boucle."""
+    from services.budget_ledger import get_budget_ledger
+    
+    repository = FileCostBudgetRepository(storage_file=str(temp_budget_file))
+    CostGovernanceService(repository=repository).update_quota("default_user", 100.0)
+    ledger = get_budget_ledger(repository)
+    threads = {}
+    original_reserve, original_release = ledger.reserve, ledger.release
+    
+    test_app = FastAPI()
+    test_app.add_middleware(CostGovernanceMiddleware)
+    
+    @test_app.post("/api/v1/graph/generate-node")
+    async def test_generate():
+        threads["loop"] = threading.current_thread()
+        return JSONResponse(content={"status": "generated"})
+    
+    def reserve(*args, **kwargs):
+        threads["reserve"] = threading.current_thread()
+        return original_reserve(*args, **kwargs)
+    
+    def release(*args, **kwargs):
+        threads["release"] = threading.current_thread()
+        return original_release(*args, **kwargs)
+    
+    with patch("api.middleware.cost_governance.get_cost_budget_repository", return_value=repository), \
+            patch.object(ledger, "reserve", reserve), patch.object(ledger, "release", release):
+        client = TestClient(test_app)
+        assert client.post("/api/v1/graph/generate-node", json={}).status_code == 200
+    
+    assert threads["reserve"] is not threads["loop"]
+    assert threads["release"] is not threads["loop"]
+    assert ledger.get_stats()["reserved"] == {}
+
+
+def test_middleware_leaves_orchestrated_generations_to_budget_guard(temp_budget_file):
+    """Teste que unity-dialogue et jobs ne sont plus estimés par le middleware (vérifiés après construction du prompt)."""
+    from datetime import datetime
+    
+    repository = FileCostBudgetRepository(storage_file=str(temp_budget_file))
+    repository.update_budget("default_user", datetime.now().strftime("%Y-%m"), 100.0, 100.0)
+    
+    test_app = FastAPI()
+    test_app.add_middleware(CostGovernanceMiddleware)
+    
+    @test_app.post("/api/v1/dialogues/generate/unity-dialogue")
+    async def test_generate():
+        return JSONResponse(content={"status": "generated"})
+    
+    with patch("api.middleware.cost_governance.get_cost_budget_repository", return_value=repository):
+        client = TestClient(test_app)
+        response = client.post("/api/v1/dialogues/generate/unity-dialogue", json={})
+    
+    assert response.status_code == 200
@@ -5,11 +5,26 @@ import time
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from api.middleware.http_cache import HTTPCacheMiddleware, setup_http_cache
+from api.utils.data_versions import DataVersionRegistry
 from unittest.mock import patch
 
 
 @pytest.fixture
-def app_with_cache():
+def versions(tmp_path):
+    """Registre de versions isolé (GDD et presets dans un dossier temporaire)."""
+    registry = DataVersionRegistry(check_interval=0)
+    registry.watch("presets", [tmp_path])
+    return registry
+
+
+@pytest.fixture
+def gdd_calls():
+    """Compteur d'exécutions de la route GDD."""
+    return []
+
+
+@pytest.fixture
+def app_with_cache(versions, gdd_calls):
     """Application FastAPI avec cache HTTP."""
     app = FastAPI()
     
@@ -19,6 +34,7 @@ def app_with_cache():
     
     @app.get("/api/v1/context/characters")
     def test_gdd_endpoint():
+        gdd_calls.append(1)
         return {"characters": [{"name": "Test"}]}
     
     @app.get("/api/v1/interactions")
@@ -28,9 +44,9 @@ def app_with_cache():
     app.add_middleware(
         HTTPCacheMiddleware,
         enabled=True,
-        ttl_gdd=1,  # 1 seconde pour les tests
         ttl_static=2,  # 2 secondes pour les tests
-        max_size=100
+        max_size=100,
+        versions=versions
     )
     
     return app
@@ -73,26 +89,67 @@ def test_cache_ttl_expiration(app_with_cache):
     assert response3.headers.get("X-Cache") == "MISS"
 
 
-def test_cache_gdd_ttl(app_with_cache):
-    """Test que les endpoints GDD utilisent le TTL GDD."""
+def test_gdd_cache_invalidated_on_new_generation(app_with_cache, versions, gdd_calls, tmp_path):
+    """Test que les endpoints GDD restent en cache jusqu'au changement de génération GDD."""
     client = TestClient(app_with_cache)
+    gdd_file = tmp_path / "personnages.json"
+    gdd_file.write_text("[]", encoding="utf-8")
+    versions.bump_gdd_generation([gdd_file])
     
-    # Première requête
     response1 = client.get("/api/v1/context/characters")
-    assert response1.status_code == 200
     assert response1.headers.get("X-Cache") == "MISS"
-    assert "Cache-Control" in response1.headers
+    assert response1.headers.get("Cache-Control") == "no-cache"
     
-    # Deuxième requête immédiatement (cache hit)
     response2 = client.get("/api/v1/context/characters")
     assert response2.headers.get("X-Cache") == "HIT"
+    assert response2.headers["ETag"] == response1.headers["ETag"]
     
-    # Attendre que le TTL GDD expire (1 seconde)
-    time.sleep(1.1)
-    
-    # Troisième requête (cache miss car expiré)
+    # Rechargement d'un fichier modifié : nouvelle génération, nouvel ETag
+    gdd_file.write_text('[{"Nom": "Nouveau"}]', encoding="utf-8")
+    versions.bump_gdd_generation([gdd_file])
     response3 = client.get("/api/v1/context/characters")
     assert response3.headers.get("X-Cache") == "MISS"
+    assert response3.headers["ETag"] != response1.headers["ETag"]
+    assert len(gdd_calls) == 2
+
+
+def test_if_none_match_answered_before_route(app_with_cache, gdd_calls):
+    """Test qu'un ETag à jour reçoit un 304 sans exécuter la route, même hors cache."""
+    client = TestClient(app_with_cache)
+    etag = client.get("/api/v1/context/characters").headers["ETag"]
+    app_with_cache.middleware_stack = None  # Reconstruit la pile : cache local vide
+    
+    response = client.get("/api/v1/context/characters", headers={"If-None-Match": f'"other", {etag}'})
+    
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert len(gdd_calls) == 1
+
+
+def test_untracked_config_routes_keep_ttl(versions):
+    """Test que les routes de config non suivies par le registre restent sur le cache à TTL."""
+    app = FastAPI()
+    
+    @app.get("/api/v1/config/unity-dialogues-path")
+    def unity_path_endpoint():
+        return {"path": ""}
+    
+    @app.get("/api/v1/config/llm")
+    def llm_config_endpoint():
+        return {"model": "test"}
+    
+    app.add_middleware(HTTPCacheMiddleware, enabled=True, ttl_static=2, max_size=100, versions=versions)
+    client = TestClient(app)
+    
+    client.get("/api/v1/config/unity-dialogues-path")
+    response = client.get("/api/v1/config/unity-dialogues-path")
+    assert response.headers.get("X-Cache") == "HIT"
+    assert response.headers.get("Cache-Control") == "public, max-age=2"
+    
+    client.get("/api/v1/config/llm")
+    response = client.get("/api/v1/config/llm")
+    assert response.headers.get("X-Cache") == "HIT"
+    assert response.headers.get("Cache-Control") == "no-cache"
 
 
 def test_cache_not_applied_to_dynamic_endpoints(app_with_cache):
@@ -153,7 +210,6 @@ def test_cache_disabled():
     app.add_middleware(
         HTTPCacheMiddleware,
         enabled=False,
-        ttl_gdd=1,
         ttl_static=2,
         max_size=100
     )
@@ -177,7 +233,6 @@ def test_setup_http_cache():
     
     with patch.dict(os.environ, {
         "HTTP_CACHE_ENABLED": "true",
-        "HTTP_CACHE_TTL_GDD": "30",
         "HTTP_CACHE_TTL_STATIC": "300",
         "HTTP_CACHE_MAX_SIZE": "1000"
     }, clear=True):
@@ -191,4 +246,12 @@ def test_setup_http_cache():
         assert response.status_code == 404
 
 
-
+def test_setup_http_cache_warns_on_obsolete_ttl_gdd(caplog):
+    """Test que HTTP_CACHE_TTL_GDD, supprimée, est signalée au démarrage."""
+    app = FastAPI()
+    
+    with patch.dict(os.environ, {"HTTP_CACHE_ENABLED": "true", "HTTP_CACHE_TTL_GDD": "30"}, clear=True):
+        with caplog.at_level("WARNING", logger="api.middleware.http_cache"):
+            setup_http_cache(app)
+    
+    assert any("HTTP_CACHE_TTL_GDD" in record.getMessage() for record in caplog.records)
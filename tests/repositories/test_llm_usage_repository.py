@@ -1,9 +1,12 @@
 """Tests pour le repository d'utilisation LLM."""
+import json
+import multiprocessing
+import time
 import pytest
 from pathlib import Path
 from datetime import date, datetime, timedelta, UTC
 from models.llm_usage import LLMUsageRecord
-from services.repositories.llm_usage_repository import FileLLMUsageRepository
+from services.repositories.llm_usage_repository import FCNTL_AVAILABLE, FileLLMUsageRepository
 
 
 @pytest.fixture
@@ -86,6 +89,29 @@ def test_get_statistics(repository, sample_record):
     assert stats["total_cost"] > 0
 
 
+def test_get_statistics_accounts_hedges_separately(repository, sample_record):
+    """Teste que le coût des appels dupliqués (hedging) est visible sans fausser les compteurs d'appels."""
+    repository.save(sample_record)
+    hedge = sample_record.model_copy(update={
+        "request_id": "req_hedge",
+        "completion_tokens": 0,
+        "total_tokens": 1000,
+        "estimated_cost": 0.002,
+        "success": False,
+        "error_message": "Appel annulé (hedge perdant)",
+        "is_hedge": True,
+    })
+    repository.save(hedge)
+    
+    stats = repository.get_statistics()
+    assert stats["calls_count"] == 1
+    assert stats["error_count"] == 0
+    assert stats["hedge_calls_count"] == 1
+    assert stats["hedge_cost"] == pytest.approx(0.002)
+    assert stats["total_cost"] == pytest.approx(0.007)
+    assert repository.get_all()[1].is_hedge is True
+
+
 def test_filter_by_model(repository, sample_record):
     """Teste le filtrage par modèle."""
     record_gpt4 = sample_record.model_copy()
@@ -101,3 +127,81 @@ def test_filter_by_model(repository, sample_record):
     assert len(records) == 1
     assert records[0].model_name == "gpt-4o"
 
+
+def test_save_appends_to_daily_journal(repository, sample_record, tmp_path):
+    """Teste que chaque enregistrement ajoute une ligne au journal JSONL, même après une ligne tronquée."""
+    journal = tmp_path / f"usage_{sample_record.timestamp.date().isoformat()}.jsonl"
+    repository.save(sample_record)
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"request_id": "tronq')
+    repository.save(sample_record.model_copy(update={"request_id": "req_456"}))
+    
+    lines = journal.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[2])["request_id"] == "req_456"
+    assert {r.request_id for r in repository.get_all()} == {"req_123", "req_456"}
+
+
+def test_legacy_files_are_read_and_migrated(tmp_path, sample_record):
+    """Teste la lecture et la migration des fichiers de l'ancien format (JSON par jour)."""
+    today = sample_record.timestamp.date()
+    yesterday = today - timedelta(days=1)
+    for day, request_id in ((yesterday, "ancien_1"), (today, "ancien_2")):
+        legacy = sample_record.model_copy(update={
+            "request_id": request_id, "timestamp": datetime.combine(day, datetime.min.time(), UTC)
+        })
+        (tmp_path / f"usage_{day.isoformat()}.json").write_text(
+            json.dumps({"date": day.isoformat(), "records": [legacy.model_dump()]}, default=str),
+            encoding="utf-8"
+        )
+    repository = FileLLMUsageRepository(storage_dir=str(tmp_path), fsync_policy="never")
+    assert {r.request_id for r in repository.get_all()} == {"ancien_1", "ancien_2"}
+    
+    # Premier enregistrement du jour : migration de la journée avant l'ajout
+    repository.save(sample_record)
+    assert not (tmp_path / f"usage_{today.isoformat()}.json").exists()
+    assert [r.request_id for r in repository.get_by_date_range(today, today)][::-1] == ["ancien_2", "req_123"]
+    
+    assert repository.migrate_legacy_files() == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        f"usage_{yesterday.isoformat()}.jsonl", f"usage_{today.isoformat()}.jsonl"
+    ]
+    assert len(repository.get_all()) == 3
+
+
+def _migrate_slowly(storage_dir: str, day: date, locked, delay: float) -> None:
+    repository = FileLLMUsageRepository(storage_dir=storage_dir, fsync_policy="never")
+    legacy_path = repository._get_legacy_file_path(day)
+    with repository._migration_lock(legacy_path) as pending:
+        locked.set()
+        time.sleep(delay)
+        assert pending and repository._migrate_legacy_file(day, legacy_path)
+
+
+@pytest.mark.skipif(
+    not FCNTL_AVAILABLE or "fork" not in multiprocessing.get_all_start_methods(),
+    reason="verrou inter-processus fcntl indisponible"
+)
+def test_append_waits_for_migration_by_another_worker(tmp_path, sample_record):
+    """Teste qu'un ajout pendant la migration d'un autre worker n'est pas écrit dans le journal remplacé."""
+    day = sample_record.timestamp.date()
+    legacy = sample_record.model_copy(update={"request_id": "ancien"})
+    (tmp_path / f"usage_{day.isoformat()}.json").write_text(
+        json.dumps({"date": day.isoformat(), "records": [legacy.model_dump()]}, default=str), encoding="utf-8"
+    )
+    (tmp_path / f"usage_{day.isoformat()}.jsonl").write_bytes(
+        FileLLMUsageRepository._serialize(sample_record.model_copy(update={"request_id": "journal"}))
+    )
+    context = multiprocessing.get_context("fork")
+    locked = context.Event()
+    process = context.Process(target=_migrate_slowly, args=(str(tmp_path), day, locked, 0.3))
+    process.start()
+    try:
+        assert locked.wait(30)
+        repository = FileLLMUsageRepository(storage_dir=str(tmp_path), fsync_policy="never")
+        repository.save(sample_record)
+    finally:
+        process.join(30)
+    
+    assert process.exitcode == 0
+    assert [r.request_id for r in repository.get_by_date_range(day, day)] == ["ancien", "journal", "req_123"]
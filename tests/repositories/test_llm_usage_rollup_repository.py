@@ -0,0 +1,145 @@
+"""Tests pour les agrégats d'utilisation LLM."""
+import multiprocessing
+import pytest
+from datetime import UTC, date, datetime, timedelta
+from models.llm_usage import LLMUsageRecord
+from services.llm_usage_service import LLMUsageService
+from services.repositories.llm_usage_repository import FileLLMUsageRepository
+from services.repositories.llm_usage_rollup_repository import FCNTL_AVAILABLE, FileUsageRollupRepository
+from services.usage_writer import UsageWriter, set_usage_writer
+
+
+@pytest.fixture
+def usage_repository(tmp_path):
+    """Crée un journal d'usage temporaire."""
+    return FileLLMUsageRepository(storage_dir=str(tmp_path), fsync_policy="never")
+
+
+def _track(service, request_id, model="gpt-5.2", success=True, is_hedge=False, endpoint="generate/variants"):
+    service.track_usage(
+        request_id=request_id, model_name=model, prompt_tokens=1000, completion_tokens=500,
+        total_tokens=1500, duration_ms=1200, success=success, endpoint=endpoint, is_hedge=is_hedge
+    )
+
+
+def _record(request_id, timestamp, cost):
+    return LLMUsageRecord(
+        request_id=request_id, timestamp=timestamp, model_name="gpt-5-mini", prompt_tokens=100,
+        completion_tokens=50, total_tokens=150, estimated_cost=cost, duration_ms=300, success=True,
+        endpoint="generate/variants"
+    )
+
+
+@pytest.mark.parametrize("with_writer", [False, True])
+def test_statistics_from_rollups_match_raw_records(usage_repository, tmp_path, with_writer):
+    """Teste que les statistiques calculées depuis les agrégats égalent celles du journal brut."""
+    rollups = FileUsageRollupRepository(storage_dir=str(tmp_path))
+    service = LLMUsageService(repository=usage_repository, rollup_repository=rollups)
+    writer = UsageWriter(flush_interval_ms=60000) if with_writer else None
+    set_usage_writer(writer)
+    try:
+        _track(service, "req_1")
+        _track(service, "req_2", model="gpt-5-mini", success=False, endpoint="generate/jobs")
+        _track(service, "req_2_hedge", model="gpt-5-mini", is_hedge=True, endpoint="generate/jobs")
+        if writer is not None:
+            writer.flush()
+    finally:
+        set_usage_writer(None)
+    today = date.today()
+
+    for kwargs in [{}, {"start_date": today, "end_date": today}, {"model_name": "gpt-5-mini"}]:
+        assert service.get_statistics(**kwargs) == pytest.approx(usage_repository.get_statistics(**kwargs))
+    assert service.get_statistics()["hedge_calls_count"] == 1
+    assert service.get_daily_costs(today, today) == pytest.approx(usage_repository.get_daily_costs(today, today))
+    by_key = rollups.get_rollups(today, today)[today.isoformat()]
+    assert set(by_key) == {("gpt-5.2", "generate/variants"), ("gpt-5-mini", "generate/jobs")}
+    assert rollups.check(usage_repository) == {"days_checked": 1, "mismatched_days": [], "repaired": False}
+
+
+def test_rollups_are_built_then_checked_and_repaired(usage_repository, tmp_path):
+    """Teste la construction initiale depuis le journal brut, puis la détection et la réparation d'écarts."""
+    yesterday = datetime.combine(date.today() - timedelta(days=1), datetime.min.time())
+    usage_repository.save_many([_record("req_1", yesterday, 0.01), _record("req_2", yesterday, 0.02)])
+    rollups = FileUsageRollupRepository(storage_dir=str(tmp_path), source=usage_repository)
+
+    # Construction à la première lecture
+    assert not rollups.is_initialized()
+    assert rollups.get_statistics()["total_cost"] == pytest.approx(0.03)
+    assert rollups.is_initialized()
+
+    # Enregistrement écrit sans agrégats (ex: arrêt entre les deux écritures)
+    usage_repository.save(_record("req_3", yesterday, 0.04))
+    result = rollups.check(usage_repository)
+    assert result["mismatched_days"] == [yesterday.date().isoformat()]
+    assert result["repaired"] is False
+
+    assert rollups.check(usage_repository, repair=True)["repaired"] is True
+    assert rollups.get_statistics()["total_cost"] == pytest.approx(0.07)
+    assert rollups.get_statistics()["calls_count"] == 3
+    assert rollups.check(usage_repository)["mismatched_days"] == []
+
+
+def test_records_persisted_before_initial_build_are_counted_once(usage_repository, tmp_path):
+    """Teste qu'un enregistrement persisté avant la construction puis ajouté n'est compté qu'une fois."""
+    now = datetime.now(UTC)
+    in_flight = _record("req_1", now, 0.01)
+    usage_repository.save(in_flight)  # Persisté, ajout aux agrégats pas encore fait
+    rollups = FileUsageRollupRepository(storage_dir=str(tmp_path), source=usage_repository)
+    assert rollups.get_statistics()["total_cost"] == pytest.approx(0.01)
+
+    writer_rollups = FileUsageRollupRepository(storage_dir=str(tmp_path), source=usage_repository)
+    writer_rollups.add([in_flight])
+    later = _record("req_2", now, 0.02)
+    usage_repository.save(later)
+    writer_rollups.add([later])
+
+    assert rollups.get_statistics()["total_cost"] == pytest.approx(0.03)
+    assert rollups.check(usage_repository)["mismatched_days"] == []
+    assert not rollups.counted_file.exists()
+
+
+class _SlowSource:
+    """Journal brut dont la lecture se termine sur signal (construction en cours dans un autre worker)."""
+
+    def __init__(self, repository, read, finish):
+        self.repository, self.read, self.finish = repository, read, finish
+
+    def get_all(self, model_name=None):
+        records = self.repository.get_all(model_name)
+        self.read.set()
+        self.finish.wait(30)
+        return records
+
+
+def _build_slowly(storage_dir: str, read, finish) -> None:
+    repository = FileLLMUsageRepository(storage_dir=storage_dir, fsync_policy="never")
+    FileUsageRollupRepository(storage_dir, source=_SlowSource(repository, read, finish)).ensure_initialized()
+
+
+@pytest.mark.skipif(
+    not FCNTL_AVAILABLE or "fork" not in multiprocessing.get_all_start_methods(),
+    reason="verrou inter-processus fcntl indisponible"
+)
+def test_adds_from_another_worker_during_build_are_counted_once(usage_repository, tmp_path):
+    """Teste les ajouts d'un autre worker pendant la construction : ni double comptage, ni perte."""
+    now = datetime.now(UTC)
+    in_flight = _record("req_1", now, 0.01)
+    usage_repository.save(in_flight)
+    context = multiprocessing.get_context("fork")
+    read, finish = context.Event(), context.Event()
+    process = context.Process(target=_build_slowly, args=(str(tmp_path), read, finish))
+    process.start()
+    try:
+        assert read.wait(30)
+        later = _record("req_2", now, 0.02)
+        usage_repository.save(later)  # Persisté après la lecture de la construction
+        rollups = FileUsageRollupRepository(storage_dir=str(tmp_path), source=usage_repository)
+        finish.set()
+        rollups.add([in_flight, later])  # Attend la fin de la construction
+    finally:
+        finish.set()
+        process.join(30)
+
+    assert rollups.get_statistics()["total_cost"] == pytest.approx(0.03)
+    assert rollups.get_statistics()["calls_count"] == 2
+
@@ -0,0 +1,106 @@
+"""Tests pour le repository d'utilisation LLM sur SQLite."""
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from models.llm_usage import LLMUsageRecord
+from services.repositories.llm_usage_repository import (
+    FileLLMUsageRepository,
+    SQLiteLLMUsageRepository,
+    create_llm_usage_repository,
+)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """Crée un repository SQLite temporaire."""
+    repository = SQLiteLLMUsageRepository(str(tmp_path / "llm_usage.db"))
+    yield repository
+    repository.close()
+
+
+def _records():
+    """Enregistrements sur deux jours et deux modèles, dont un échec et un appel dupliqué perdant."""
+    today = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=12)
+    specs = [
+        ("req_1", today, "gpt-5.2", 0.01, True, False),
+        ("req_2", today + timedelta(minutes=1), "gpt-5-mini", 0.002, False, False),
+        ("req_2_hedge", today + timedelta(minutes=1), "gpt-5-mini", 0.003, False, True),
+        ("req_3", today - timedelta(days=1), "gpt-5.2", 0.02, True, False),
+    ]
+    return [
+        LLMUsageRecord(
+            request_id=request_id, timestamp=timestamp, model_name=model, prompt_tokens=1000,
+            completion_tokens=500, total_tokens=1500, estimated_cost=cost, duration_ms=1000 * (i + 1),
+            success=success, endpoint="generate/variants", k_variants=2, is_hedge=is_hedge,
+            error_message=None if success else "timeout",
+        )
+        for i, (request_id, timestamp, model, cost, success, is_hedge) in enumerate(specs)
+    ]
+
+
+def test_sqlite_matches_file_repository(repository, tmp_path):
+    """Teste que les agrégations SQL donnent les mêmes résultats que le repository fichier."""
+    file_repository = FileLLMUsageRepository(storage_dir=str(tmp_path / "files"), fsync_policy="never")
+    records = _records()
+    repository.save_many(records[:3])
+    repository.save(records[3])
+    file_repository.save_many(records)
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+
+    assert repository.get_all() == file_repository.get_all()
+    assert repository.get_by_date_range(today, today, model_name="gpt-5.2") == [records[0]]
+    for start, end, model in [(None, None, None), (yesterday, today, None), (today, today, "gpt-5-mini")]:
+        sql_stats = repository.get_statistics(start_date=start, end_date=end, model_name=model)
+        file_stats = file_repository.get_statistics(start_date=start, end_date=end, model_name=model)
+        assert sql_stats == pytest.approx(file_stats)
+    assert repository.get_statistics()["hedge_calls_count"] == 1
+    assert repository.get_daily_costs(yesterday, today) == pytest.approx(
+        file_repository.get_daily_costs(yesterday, today)
+    )
+    assert repository.get_daily_costs(yesterday, today) == pytest.approx(
+        {today.isoformat(): 0.015, yesterday.isoformat(): 0.02}
+    )
+
+
+def test_import_json_files_is_idempotent(tmp_path):
+    """Teste l'import des fichiers JSONL et de l'ancien format JSON, sans doublon à la relance."""
+    storage_dir = tmp_path / "llm_usage"
+    records = _records()
+    FileLLMUsageRepository(storage_dir=str(storage_dir), fsync_policy="never").save_many(records[:3])
+    legacy_day = records[3].timestamp.date().isoformat()
+    (storage_dir / f"usage_{legacy_day}.json").write_text(
+        json.dumps({"records": [records[3].model_dump(mode="json")]}), encoding="utf-8"
+    )
+    db_path = str(tmp_path / "llm_usage.db")
+
+    repository = create_llm_usage_repository("sqlite", str(storage_dir), db_path)
+    assert isinstance(repository, SQLiteLLMUsageRepository)
+    assert len(repository.get_all()) == 4
+    assert repository.import_json_files(str(storage_dir)) == 0
+    repository.close()
+
+    reopened = SQLiteLLMUsageRepository(db_path)
+    assert reopened.get_all() == sorted(records, key=lambda r: r.timestamp, reverse=True)
+    reopened.close()
+    assert isinstance(create_llm_usage_repository("inconnu", str(storage_dir)), FileLLMUsageRepository)
+
+
+def test_import_skips_records_of_a_migrated_legacy_file(tmp_path):
+    """Teste qu'un usage_D.json importé puis migré en usage_D.jsonl n'est pas importé deux fois."""
+    storage_dir = tmp_path / "llm_usage"
+    storage_dir.mkdir()
+    legacy, new = _records()[3], _records()[3].model_copy(update={"request_id": "req_4"})
+    legacy_day = legacy.timestamp.date().isoformat()
+    (storage_dir / f"usage_{legacy_day}.json").write_text(
+        json.dumps({"records": [legacy.model_dump(mode="json")]}), encoding="utf-8"
+    )
+    repository = create_llm_usage_repository("sqlite", str(storage_dir), str(tmp_path / "llm_usage.db"))
+
+    # Le repository fichier migre l'ancien fichier en JSONL avant d'y ajouter un enregistrement
+    FileLLMUsageRepository(storage_dir=str(storage_dir), fsync_policy="never").save_many([new])
+    assert (storage_dir / f"usage_{legacy_day}.jsonl").exists()
+
+    assert repository.import_json_files(str(storage_dir)) == 1
+    assert sorted(r.request_id for r in repository.get_all()) == ["req_3", "req_4"]
+    repository.close()
@@ -0,0 +1,142 @@
+"""Tests pour le serveur mock OpenAI et le harness de charge SSE."""
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from scripts.load_test_streaming import JobResult, LoadTestReport, percentile, summarize
+from scripts.mock_openai_server import LatencyDistribution, MockServerConfig, create_mock_app
+
+
+def _fast_config(**overrides) -> MockServerConfig:
+    config = MockServerConfig(
+        ttft_ms=LatencyDistribution("fixed", 0.0),
+        tokens_per_sec=LatencyDistribution("fixed", 0.0),
+        seed=42,
+    )
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+
+def _structured_body(stream: bool) -> dict:
+    return {
+        "model": "gpt-5-mini",
+        "input": [{"role": "user", "content": "Bonjour"}],
+        "stream": stream,
+        "tools": [{"type": "function", "name": "generate_interaction", "parameters": {}}],
+        "tool_choice": {"type": "function", "name": "generate_interaction"},
+    }
+
+
+def _parse_sse(text: str) -> list:
+    return [json.loads(line[len("data: "):]) for line in text.splitlines() if line.startswith("data: ")]
+
+
+@pytest.mark.parametrize("spec,expected", [
+    ("250", LatencyDistribution("fixed", 250.0)),
+    ("fixed:10", LatencyDistribution("fixed", 10.0)),
+    ("uniform:100:300", LatencyDistribution("uniform", 100.0, 300.0)),
+    ("lognormal:400:1200", LatencyDistribution("lognormal", 400.0, 1200.0)),
+])
+def test_latency_distribution_parse(spec, expected):
+    """Test le parsing des spécifications de distribution."""
+    assert LatencyDistribution.parse(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["", "gauss:1:2", "uniform:300:100", "lognormal:0:10", "fixed:abc"])
+def test_latency_distribution_parse_invalid(spec):
+    """Test que les spécifications invalides lèvent ValueError."""
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse(spec)
+
+
+def test_latency_distribution_sample_bounds():
+    """Test que les tirages uniform restent dans les bornes."""
+    rng = random.Random(0)
+    dist = LatencyDistribution.parse("uniform:100:300")
+    assert all(100.0 <= dist.sample(rng) <= 300.0 for _ in range(200))
+
+
+def test_mock_streaming_structured_output():
+    """Test que le stream mock suit la séquence d'événements de la Responses API."""
+    client = TestClient(create_mock_app(_fast_config()))
+    response = client.post("/v1/responses", json=_structured_body(stream=True))
+
+    assert response.status_code == 200
+    events = _parse_sse(response.text)
+    types = [e["type"] for e in events]
+    assert types[0] == "response.created"
+    assert types[-1] == "response.completed"
+    assert "response.function_call_arguments.delta" in types
+
+    arguments = "".join(e["delta"] for e in events if e["type"] == "response.function_call_arguments.delta")
+    done = next(e for e in events if e["type"] == "response.function_call_arguments.done")
+    assert arguments == done["arguments"]
+    json.loads(arguments)
+    assert events[-1]["response"]["usage"]["output_tokens"] > 0
+
+    stats = client.get("/mock/stats").json()
+    assert stats["streamed"] == 1
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_mock_non_streaming_structured_output():
+    """Test la réponse non streamée avec function_call."""
+    client = TestClient(create_mock_app(_fast_config()))
+    response = client.post("/v1/responses", json=_structured_body(stream=False))
+
+    assert response.status_code == 200
+    output = response.json()["output"]
+    function_call = next(item for item in output if item["type"] == "function_call")
+    json.loads(function_call["arguments"])
+
+
+def test_mock_rate_limit_injection():
+    """Test qu'un rate_limit_rate de 1 renvoie systématiquement 429 avec Retry-After."""
+    client = TestClient(create_mock_app(_fast_config(rate_limit_rate=1.0, retry_after_seconds=2.0)))
+    response = client.post("/v1/responses", json=_structured_body(stream=True))
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2.0"
+    assert client.get("/mock/stats").json()["rate_limited"] == 1
+
+
+def test_mock_error_injection_streaming():
+    """Test qu'une erreur injectée en streaming se termine par response.failed."""
+    client = TestClient(create_mock_app(_fast_config(error_rate=1.0)))
+    response = client.post("/v1/responses", json=_structured_body(stream=True))
+
+    events = _parse_sse(response.text)
+    assert events[-1]["type"] == "response.failed"
+    assert client.get("/mock/stats").json()["failed"] == 1
+
+
+def test_percentile_interpolation():
+    """Test le calcul de percentile par interpolation linéaire."""
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 100) == 5.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile(values, 95) == pytest.approx(4.8)
+
+
+def test_load_test_report_aggregation():
+    """Test l'agrégation des résultats de jobs dans le rapport."""
+    results = [
+        JobResult(status="complete", create_latency=0.01, first_chunk_latency=0.1, total_latency=0.5, frames=10),
+        JobResult(status="complete", create_latency=0.02, first_chunk_latency=0.2, total_latency=1.0, frames=10),
+        JobResult(status="error", create_latency=0.01, frames=2, error="boom"),
+    ]
+    report = LoadTestReport(jobs=3, concurrency=2, wall_time=2.0, results=results).to_dict()
+
+    assert report["statuses"] == {"complete": 2, "error": 1}
+    assert report["throughput_jobs_per_s"] == 1.0
+    assert report["frames_per_s"] == 11.0
+    assert report["total_latency_ms"]["count"] == 2
+    assert report["total_latency_ms"]["p50"] == 750.0
+    assert report["errors"] == ["boom"]
+    assert summarize([None]) == {"count": 0}
@@ -0,0 +1,155 @@
+"""Tests pour le registre des budgets en mémoire."""
+import multiprocessing
+import threading
+from datetime import datetime
+
+import pytest
+
+from services.budget_ledger import BudgetLedger, get_budget_ledger
+from services.cost_governance_service import CostGovernanceService
+from services.repositories.cost_budget_repository import FCNTL_AVAILABLE, FileCostBudgetRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """Crée un repository de budgets temporaire (quota 1€)."""
+    repository = FileCostBudgetRepository(storage_file=str(tmp_path / "cost_budgets.json"))
+    repository.update_budget("default_user", datetime.now().strftime("%Y-%m"), 0.0, 1.0)
+    return repository
+
+
+def test_concurrent_reservations_cannot_exceed_quota(repository):
+    """Teste que les réservations concurrentes ne dépassent pas ensemble le quota."""
+    ledger = BudgetLedger(repository)
+    results = []
+    barrier = threading.Barrier(20)
+
+    def reserve():
+        barrier.wait()
+        results.append(ledger.reserve("default_user", 0.125))
+
+    threads = [threading.Thread(target=reserve) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reservations = [reservation for _, reservation in results if reservation is not None]
+    # 7 x 0.125€ < 1€ ; la huitième atteindrait 100%
+    assert len(reservations) == 7
+    assert ledger.reserve("default_user", 0.125)[1] is None
+
+    for reservation in reservations:
+        ledger.release(reservation)
+        ledger.release(reservation)
+    assert ledger.get_stats()["reserved"] == {}
+    assert ledger.reserve("default_user", 0.125)[1] is not None
+
+
+def test_ledger_reads_file_only_when_it_changes(repository):
+    """Teste que le registre répond depuis la mémoire et recharge après l'écriture d'un autre worker."""
+    ledger = get_budget_ledger(repository)
+    assert get_budget_ledger(FileCostBudgetRepository(storage_file=str(repository.storage_file))) is ledger
+    for _ in range(5):
+        ledger.release(ledger.reserve("default_user", 0.01)[1])
+    assert ledger.get_stats()["reloads"] == 1
+
+    # Écriture par un autre processus (autre instance du repository)
+    CostGovernanceService(FileCostBudgetRepository(storage_file=str(repository.storage_file))).update_budget(
+        "default_user", 0.95
+    )
+    result, reservation = ledger.reserve("default_user", 0.01)
+    assert ledger.get_stats()["reloads"] == 2
+    assert result["percentage"] == pytest.approx(96.0)
+    assert result["warning"] is not None
+    ledger.release(reservation)
+
+
+def test_check_does_not_write_for_a_new_month(repository):
+    """Teste qu'un budget d'un mois précédent repart de 0 en mémoire, sans écriture."""
+    repository.update_budget("default_user", "2000-01", 0.9, 1.0)
+    content = repository.storage_file.read_bytes()
+
+    result, reservation = BudgetLedger(repository).reserve("default_user", 0.5)
+
+    assert reservation is not None
+    assert result["percentage"] == pytest.approx(50.0)
+    assert repository.storage_file.read_bytes() == content
+
+
+def _increment_many(storage_file: str, count: int) -> None:
+    service = CostGovernanceService(FileCostBudgetRepository(storage_file=storage_file))
+    for _ in range(count):
+        service.update_budget("default_user", 0.01)
+
+
+@pytest.mark.skipif(
+    not FCNTL_AVAILABLE or "fork" not in multiprocessing.get_all_start_methods(),
+    reason="verrou inter-processus fcntl indisponible"
+)
+def test_budget_increments_from_several_processes_are_not_lost(repository):
+    """Teste que les incréments de budget de plusieurs workers partageant le fichier sont tous comptés."""
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_increment_many, args=(str(repository.storage_file), 25)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    month = datetime.now().strftime("%Y-%m")
+    assert repository.get_budget("default_user", month)["amount"] == pytest.approx(1.0)
+
+
+def _hold_reservation(storage_file: str, amount: float, reserved, release) -> None:
+    ledger = BudgetLedger(FileCostBudgetRepository(storage_file=storage_file))
+    _, reservation = ledger.reserve("default_user", amount)
+    reserved.set()
+    release.wait(30)
+    ledger.release(reservation)
+
+
+@pytest.mark.skipif(
+    not FCNTL_AVAILABLE or "fork" not in multiprocessing.get_all_start_methods(),
+    reason="verrou inter-processus fcntl indisponible"
+)
+def test_reservations_are_shared_between_processes(repository):
+    """Teste qu'une réservation d'un autre worker compte dans la vérification jusqu'à sa libération."""
+    context = multiprocessing.get_context("fork")
+    reserved, release = context.Event(), context.Event()
+    process = context.Process(target=_hold_reservation, args=(str(repository.storage_file), 0.6, reserved, release))
+    process.start()
+    try:
+        assert reserved.wait(30)
+        ledger = BudgetLedger(repository)
+        result, reservation = ledger.reserve("default_user", 0.6)
+        assert reservation is None
+        assert result["percentage"] == pytest.approx(120.0)
+    finally:
+        release.set()
+        process.join(30)
+
+    result, reservation = ledger.reserve("default_user", 0.6)
+    assert reservation is not None
+    ledger.release(reservation)
+    assert not repository.reservations_file.exists() or '"reservations": {}' in repository.reservations_file.read_text()
+
+
+def _reserve_and_release_with_writer(storage_file: str, amount: float) -> None:
+    from services.usage_writer import UsageWriter, set_usage_writer
+    set_usage_writer(UsageWriter(flush_interval_ms=60000))
+    ledger = BudgetLedger(FileCostBudgetRepository(storage_file=storage_file))
+    ledger.release(ledger.reserve("default_user", amount)[1])
+
+
+@pytest.mark.skipif(
+    not FCNTL_AVAILABLE or "fork" not in multiprocessing.get_all_start_methods(),
+    reason="verrou inter-processus fcntl indisponible"
+)
+def test_released_reservation_stays_visible_until_other_writer_flushes(repository):
+    """Teste qu'une réservation libérée par un worker dont le coût attend son writer reste comptée par les autres."""
+    context = multiprocessing.get_context("fork")
+    process = context.Process(target=_reserve_and_release_with_writer, args=(str(repository.storage_file), 0.6))
+    process.start()
+    process.join(30)
+
+    assert BudgetLedger(repository).reserve("default_user", 0.6)[1] is None
@@ -0,0 +1,60 @@
+"""Tests pour l'index de recherche plein texte du GDD."""
+from services.gdd_search_index import GDDSearchIndex, GDDSearchIndexCache, tokenize
+
+CATEGORIES = {
+    "characters": [
+        {"Nom": "Éloïse Vernier", "Alias": "La Tisseuse", "Occupation": "Archiviste"},
+        {"Nom": "Duq'Sha, L'Archiviste Boiteux", "Résumé": "Gardien des œuvres de la forêt"},
+        {"Nom": "Bran"},
+    ],
+    "locations": [
+        {"Nom": "Forêt d'Élarion", "Résumé": "Une forêt ancienne"},
+        {"Nom": "Archives de Cendre", "Type": "Bibliothèque"},
+    ],
+}
+
+
+def test_tokenize_folds_accents_elisions_and_stopwords():
+    """Test que la tokenisation gère accents, ligatures, élisions et mots vides."""
+    assert tokenize("L'Œuvre d’Éloïse et la Forêt") == ["oeuvre", "eloise", "foret"]
+
+
+def test_search_is_accent_insensitive_and_ranks_names_first():
+    """Test qu'un nom correspondant est classé avant les mentions dans les champs texte."""
+    hits = GDDSearchIndex(CATEGORIES).search("foret")
+
+    assert [(hit.category, hit.name) for hit in hits] == [
+        ("locations", "Forêt d'Élarion"),
+        ("characters", "Duq'Sha, L'Archiviste Boiteux"),
+    ]
+
+
+def test_prefix_fuzzy_and_category_filter():
+    """Test la correspondance par préfixe, approximative et le filtre par catégorie."""
+    index = GDDSearchIndex(CATEGORIES)
+
+    assert [hit.name for hit in index.search("archiv", categories=["locations"])] == ["Archives de Cendre"]
+    assert [hit.name for hit in index.search("eloies")] == ["Éloïse Vernier"]  # transposition
+    assert index.search("eloies", fuzzy=False) == []
+    # Tous les termes doivent correspondre
+    assert [hit.name for hit in index.search("tisseuse archiviste")] == ["Éloïse Vernier"]
+    assert index.search("de la") == []
+
+
+def test_cache_rebuilds_on_new_generation():
+    """Test que l'index est réutilisé pour une génération puis reconstruit."""
+    cache = GDDSearchIndexCache()
+    first = cache.get(CATEGORIES, 1)
+
+    assert cache.get(CATEGORIES, 1) is first
+    assert cache.get(CATEGORIES, 2) is not first
+
+
+def test_peek_never_builds():
+    """Test que peek ne retourne que l'index déjà construit pour la génération."""
+    cache = GDDSearchIndexCache()
+
+    assert cache.peek(CATEGORIES, 1) is None
+    index = cache.get(CATEGORIES, 1)
+    assert cache.peek(CATEGORIES, 1) is index
+    assert cache.peek(CATEGORIES, 2) is None
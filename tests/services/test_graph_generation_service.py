@@ -299,3 +299,21 @@ async def test_generate_nodes_for_all_choices_empty_choices(mock_llm_client, moc
     
     # Vérifier que generate_dialogue_node n'a pas été appelé
     mock_generation_service.generate_dialogue_node.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_generate_nodes_for_all_choices_declares_batch_priority(mock_llm_client, mock_generation_service, sample_parent_node_with_choices):
+    """Test que la génération de tous les choix est déclarée en priorité batch auprès du scheduler."""
+    from constants import LLMPriority
+    
+    mock_generation_service.generate_dialogue_node = AsyncMock(side_effect=RuntimeError("LLM indisponible"))
+    service = GraphGenerationService(generation_service=mock_generation_service)
+    
+    await service.generate_nodes_for_all_choices(
+        parent_node=sample_parent_node_with_choices,
+        instructions="Suite",
+        context={},
+        llm_client=mock_llm_client,
+    )
+    
+    assert mock_llm_client.priority == LLMPriority.BATCH
@@ -80,6 +80,33 @@ def test_track_usage_with_error(usage_service, mock_repository):
     assert saved_record.error_message == "API Error"
 
 
+def test_track_usage_hedge_is_charged_to_budget(mock_repository, mock_pricing_service):
+    """Teste qu'un appel dupliqué annulé est marqué is_hedge et imputé au budget."""
+    cost_governance_service = Mock()
+    service = LLMUsageService(
+        repository=mock_repository,
+        pricing_service=mock_pricing_service,
+        cost_governance_service=cost_governance_service
+    )
+    
+    service.track_usage(
+        request_id="req_789",
+        model_name="gpt-5.2",
+        prompt_tokens=1000,
+        completion_tokens=0,
+        total_tokens=1000,
+        duration_ms=800,
+        success=False,
+        endpoint="generate/variants",
+        error_message="Appel annulé (hedge perdant)",
+        is_hedge=True
+    )
+    
+    saved_record = mock_repository.save.call_args[0][0]
+    assert saved_record.is_hedge is True
+    cost_governance_service.update_budget.assert_called_once_with(user_id="default_user", cost=0.005)
+
+
 def test_get_usage_history(usage_service, mock_repository):
     """Teste la récupération de l'historique."""
     # Mock des enregistrements
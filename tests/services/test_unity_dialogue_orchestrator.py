@@ -345,3 +345,86 @@ async def test_orchestrator_validation_error(orchestrator, mock_services):
     with pytest.raises(ValidationException):
         async for _ in orchestrator.generate_with_events(request_data, lambda: False):
             pass
+
+
+
+def _prepare_generation(orchestrator, mock_services, token_count):
+    """Configure les mocks jusqu'à la construction du prompt (prompt de token_count tokens)."""
+    mock_context_builder = Mock()
+    mock_context_builder.build_context_json.return_value = {"test": "context"}
+    mock_context_builder._context_serializer.serialize_to_text.return_value = "Context summary"
+    orchestrator.dialogue_service.context_builder = mock_context_builder
+    mock_built = Mock()
+    mock_built.raw_prompt = "Test prompt"
+    mock_built.prompt_hash = "hash123"
+    mock_built.token_count = token_count
+    mock_built.structured_prompt = None
+    mock_services['prompt_engine'].build_prompt.return_value = mock_built
+    mock_services['skill_service'].load_skills.return_value = []
+    mock_services['trait_service'].get_trait_labels.return_value = []
+    mock_services['config_service'].get_llm_config.return_value = {}
+    mock_services['config_service'].get_available_llm_models.return_value = [{"model_identifier": "gpt-4o"}]
+
+
+@pytest.fixture
+def budget_guard(tmp_path):
+    """Crée une garde de budget sur un fichier de budgets temporaire (quota 1€)."""
+    from datetime import datetime
+    from services.budget_ledger import BudgetLedger, GenerationBudgetGuard
+    from services.repositories.cost_budget_repository import FileCostBudgetRepository
+    
+    repository = FileCostBudgetRepository(storage_file=str(tmp_path / "cost_budgets.json"))
+    repository.update_budget("default_user", datetime.now().strftime("%Y-%m"), 0.5, 1.0)
+    return GenerationBudgetGuard(BudgetLedger(repository))
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_blocks_over_budget_before_llm_call(orchestrator, sample_request_data, mock_services, budget_guard):
+    """Test que le budget est vérifié avec les tokens du prompt construit, avant tout appel LLM."""
+    from api.exceptions import QuotaExceededException
+    
+    orchestrator.budget_guard = budget_guard
+    # gpt-4o : 300k tokens de prompt (0.75€) + 5000 tokens de complétion par défaut (0.05€)
+    _prepare_generation(orchestrator, mock_services, token_count=300_000)
+    
+    with patch('services.unity_dialogue_orchestrator.LLMClientFactory') as mock_factory:
+        with pytest.raises(QuotaExceededException) as exc_info:
+            await orchestrator.generate(sample_request_data)
+    
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.details["estimated_cost"] == pytest.approx(0.8)
+    mock_factory.create_client.assert_not_called()
+    assert budget_guard.ledger.get_stats()["reserved"] == {}
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_reserves_prompt_cost_until_generation_ends(orchestrator, sample_request_data, mock_services, budget_guard):
+    """Test que le coût estimé (prompt réel, tarif du modèle, max_completion_tokens) est réservé pendant l'appel LLM."""
+    orchestrator.budget_guard = budget_guard
+    _prepare_generation(orchestrator, mock_services, token_count=1000)
+    sample_request_data.max_completion_tokens = 2000
+    reserved_during_call = []
+    
+    async def generate_dialogue_node(**kwargs):
+        reserved_during_call.append(budget_guard.ledger.get_stats()["reserved"].get("default_user", 0.0))
+        response = Mock()
+        response.title = "Test Dialogue"
+        return response
+    
+    mock_llm_client = Mock(spec=["max_tokens", "estimated_prompt_tokens", "priority"])
+    with patch('services.unity_dialogue_orchestrator.LLMClientFactory') as mock_factory, \
+         patch('services.unity_dialogue_orchestrator.UnityDialogueGenerationService') as mock_unity_service_class, \
+         patch('services.unity_dialogue_orchestrator.UnityJsonRenderer') as mock_renderer_class:
+        mock_factory.create_client.return_value = mock_llm_client
+        mock_unity_service_class.return_value.generate_dialogue_node = generate_dialogue_node
+        mock_unity_service_class.return_value.enrich_with_ids.return_value = []
+        mock_renderer_class.return_value.render_unity_nodes.return_value = '{"nodes": []}'
+        
+        result = await orchestrator.generate(sample_request_data)
+    
+    assert result.estimated_tokens == 1000
+    # gpt-4o : 1000 x 2.50$/1M + 2000 x 10$/1M
+    assert reserved_during_call == [pytest.approx(0.0225)]
+    assert mock_llm_client.max_tokens == 2000
+    assert budget_guard.ledger.get_stats()["reserved"] == {}
+    mock_services['prompt_engine'].build_prompt.assert_called_once()
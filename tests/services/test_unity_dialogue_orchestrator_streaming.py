@@ -441,3 +441,64 @@ async def test_orchestrator_streaming_cancellation(orchestrator, sample_request_
                 error_events = [e for e in events if e.type == 'error' and 'annulée' in e.data.get('message', '')]
                 # Note: L'annulation peut être détectée à différents moments selon l'implémentation
                 assert len(events) > 0
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_streams_partial_fields_and_aborts_on_schema_violation(orchestrator, sample_request_data, mock_services):
+    """Test que les champs partiels sont relayés et qu'une violation de schéma interrompt la génération."""
+    from core.llm.openai.stream_parser import StreamEventType
+    
+    mock_services['dialogue_service'].context_builder = Mock()
+    mock_services['dialogue_service'].context_builder.build_context.return_value = "Test context"
+    
+    class BuiltPrompt:
+        def __init__(self):
+            self.prompt = "Test prompt"
+            self.raw_prompt = "Test prompt"
+            self.structured_prompt = None
+            self.estimated_tokens = 100
+            self.token_count = 100
+            self.prompt_hash = "hash123"
+    
+    mock_services['prompt_engine'].build_prompt = Mock(return_value=BuiltPrompt())
+    
+    mock_llm_client = Mock()
+    mock_llm_client.model_name = "gpt-5.2"
+    mock_llm_client.max_tokens = 32000
+    mock_llm_client.temperature = 0.7
+    mock_llm_client.reasoning_effort = None
+    mock_llm_client.reasoning_summary = None
+    mock_llm_client.top_p = None
+    mock_llm_client.reasoning_trace = None
+    mock_llm_client.warning = None
+    
+    async def mock_streaming(prompt, k=1, response_model=None, **kwargs):
+        yield StreamChunk(
+            event_type=StreamEventType.STRUCTURED_OUTPUT_FIELD,
+            data={"path": "node.line", "value": "Bonjour."},
+            sequence=0
+        )
+        yield StreamChunk(
+            event_type=StreamEventType.STRUCTURED_OUTPUT_INVALID,
+            data={"path": "node.choices[0]", "error": "text: Field required"},
+            sequence=1
+        )
+        yield "Erreur: Sortie structurée invalide (node.choices[0]: text: Field required)"
+    
+    mock_llm_client.generate_variants_streaming = mock_streaming
+    
+    with patch('services.unity_dialogue_orchestrator.LLMClientFactory') as mock_factory:
+        mock_factory.create_client.return_value = mock_llm_client
+        with patch('services.unity_dialogue_orchestrator.UnityDialogueGenerationService'):
+            with patch('services.unity_dialogue_orchestrator.UnityJsonRenderer'):
+                events = [
+                    event async for event in orchestrator.generate_with_events(sample_request_data, lambda: False)
+                ]
+    
+    partial_events = [e for e in events if e.type == 'partial']
+    assert [e.data for e in partial_events] == [{"path": "node.line", "value": "Bonjour."}]
+    
+    error_events = [e for e in events if e.type == 'error']
+    assert len(error_events) == 1
+    assert error_events[0].data["code"] == "schema_violation"
+    assert not [e for e in events if e.type == 'complete']
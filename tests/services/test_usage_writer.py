@@ -0,0 +1,116 @@
+"""Tests pour la persistance en arrière-plan de l'usage LLM et des budgets."""
+import json
+import time
+
+import pytest
+
+import services.usage_writer as usage_writer_module
+from services.cost_governance_service import CostGovernanceService
+from services.llm_usage_service import LLMUsageService
+from services.repositories.cost_budget_repository import FileCostBudgetRepository
+from services.repositories.llm_usage_repository import FileLLMUsageRepository
+from services.usage_writer import UsageWriter, get_usage_writer, set_usage_writer
+
+
+@pytest.fixture
+def services(tmp_path):
+    """Crée les services d'usage et de budget sur des fichiers temporaires."""
+    usage_repository = FileLLMUsageRepository(storage_dir=str(tmp_path / "llm_usage"), fsync_policy="never")
+    cost_service = CostGovernanceService(FileCostBudgetRepository(storage_file=str(tmp_path / "cost_budgets.json")))
+    cost_service.update_quota("default_user", 100.0)
+    return LLMUsageService(repository=usage_repository, cost_governance_service=cost_service), cost_service
+
+
+def _track(usage_service, request_id="req"):
+    usage_service.track_usage(
+        request_id=request_id, model_name="gpt-4o", prompt_tokens=1000, completion_tokens=500,
+        total_tokens=1500, duration_ms=100, success=True, endpoint="generate"
+    )
+
+
+def test_track_usage_is_batched_and_budget_counted_in_memory(services, monkeypatch):
+    """Teste que l'usage est persisté par lots et que le budget en attente est compté en mémoire."""
+    usage_service, cost_service = services
+    budget_updates = []
+    original_update = cost_service.update_budget
+    monkeypatch.setattr(cost_service, "update_budget", lambda **kw: budget_updates.append(kw) or original_update(**kw))
+    writer = UsageWriter(flush_interval_ms=60000)
+    set_usage_writer(writer)
+    try:
+        for i in range(3):
+            _track(usage_service, f"req_{i}")
+        cost = usage_service.repository.get_all()[0].estimated_cost if usage_service.repository.get_all() else None
+
+        # Rien sur disque, mais le budget tient compte des coûts en attente
+        assert cost is None
+        pending = writer.get_stats()["pending_budget_cost"]
+        assert pending > 0
+        assert cost_service.get_budget_status("default_user")["amount"] == pytest.approx(pending)
+
+        writer.flush()
+        assert len(usage_service.repository.get_all()) == 3
+        assert len(budget_updates) == 1
+        assert writer.get_stats()["pending_budget_cost"] == 0
+        assert cost_service.get_budget_status("default_user")["amount"] == pytest.approx(pending)
+    finally:
+        set_usage_writer(None)
+    assert get_usage_writer() is None
+
+
+def test_writer_retries_failed_writes_and_flushes_on_stop(services, monkeypatch):
+    """Teste qu'une écriture en échec est retentée sans compter deux fois le budget, et l'arrêt vide la file."""
+    usage_service, cost_service = services
+    repository = usage_service.repository
+    original_save_many = repository.save_many
+    failures = []
+
+    def failing_once(records):
+        if not failures:
+            failures.append(len(records))
+            raise OSError("disque plein")
+        original_save_many(records)
+
+    monkeypatch.setattr(repository, "save_many", failing_once)
+    writer = UsageWriter(flush_interval_ms=0)
+    set_usage_writer(writer)
+    try:
+        _track(usage_service)
+        writer.flush()
+        assert failures == [1]
+        assert repository.get_all() == []
+        amount = cost_service.get_budget_status("default_user")["amount"]
+        _track(usage_service, "req_2")
+    finally:
+        # Arrêt : persistance de l'enregistrement en échec et du nouveau
+        set_usage_writer(None)
+
+    assert sorted(r.request_id for r in repository.get_all()) == ["req", "req_2"]
+    assert cost_service.get_budget_status("default_user")["amount"] == pytest.approx(2 * amount)
+    budgets = json.loads(cost_service.repository.storage_file.read_text(encoding="utf-8"))["budgets"]
+    assert budgets["default_user"]["amount"] == pytest.approx(2 * amount)
+
+
+def test_writer_drops_writes_failing_after_max_attempts(services, monkeypatch, caplog):
+    """Teste qu'une écriture toujours en échec est abandonnée après max_attempts et son coût libéré."""
+    usage_service, cost_service = services
+    monkeypatch.setattr(usage_writer_module, "RETRY_DELAY", 0.01)
+
+    def failing(*args, **kwargs):
+        raise OSError("disque plein")
+
+    monkeypatch.setattr(usage_service.repository, "save_many", failing)
+    monkeypatch.setattr(cost_service, "update_budget", failing)
+    writer = UsageWriter(flush_interval_ms=0, max_attempts=2)
+    set_usage_writer(writer)
+    try:
+        _track(usage_service, "req_poison")
+        deadline = time.monotonic() + 5
+        while writer.get_stats()["dropped"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        stats = writer.get_stats()
+        assert (stats["dropped"], stats["retrying"], stats["errors"]) == (2, 0, 4)
+        assert stats["pending_budget_cost"] == 0
+        assert "req_poison" in caplog.text
+    finally:
+        set_usage_writer(None)
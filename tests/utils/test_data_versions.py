@@ -0,0 +1,37 @@
+"""Tests pour le registre des versions de données (clés du cache HTTP)."""
+import os
+
+from api.utils.data_versions import DataVersionRegistry, fingerprint_paths
+
+
+def test_watched_source_version_changes_on_write(tmp_path):
+    """Test que la version d'une source suit les écritures (après invalidate ou intervalle)."""
+    config_file = tmp_path / "llm_config.json"
+    config_file.write_text("{}", encoding="utf-8")
+    registry = DataVersionRegistry(check_interval=3600)
+    registry.watch("config", [tmp_path])
+    before = registry.version("config")
+
+    config_file.write_text('{"model": "gpt"}', encoding="utf-8")
+    assert registry.version("config") == before  # Vérification throttlée
+
+    registry.invalidate("config")
+    assert registry.version("config") != before
+
+
+def test_gdd_generation_token_depends_on_loaded_files(tmp_path):
+    """Test que le jeton GDD est l'empreinte des fichiers chargés, stable entre rechargements identiques."""
+    gdd_file = tmp_path / "personnages.json"
+    gdd_file.write_text("[]", encoding="utf-8")
+    registry = DataVersionRegistry()
+
+    registry.bump_gdd_generation([gdd_file])
+    first = registry.version("gdd")
+    registry.bump_gdd_generation([gdd_file])
+
+    assert registry.gdd_generation == 2
+    assert registry.version("gdd") == first == fingerprint_paths([gdd_file])
+
+    os.utime(gdd_file, ns=(0, 0))
+    registry.bump_gdd_generation([gdd_file])
+    assert registry.version("gdd") != first
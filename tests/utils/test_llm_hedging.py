@@ -0,0 +1,166 @@
+"""Tests pour la politique de requêtes hedgées des appels LLM."""
+import asyncio
+import os
+from unittest.mock import patch
+
+import pytest
+
+import api.utils.llm_hedging as llm_hedging_module
+from constants import LLMPriority
+from api.utils.llm_hedging import (
+    LATENCY_FIRST_TOKEN,
+    LATENCY_RESPONSE,
+    HedgingPolicy,
+    get_llm_hedging_policy,
+    peek_first_token,
+)
+from api.utils.llm_scheduler import LLMScheduler
+
+
+def _warm_policy(policy: HedgingPolicy, model: str = "gpt-test", kind: str = LATENCY_RESPONSE, seconds: float = 0.01):
+    for _ in range(policy.min_samples):
+        policy.record_latency(model, kind, seconds)
+
+
+def test_hedge_delay_uses_tracked_percentile():
+    """Test que le délai suit le percentile observé, avec plancher et historique minimal."""
+    policy = HedgingPolicy(percentile=0.9, min_samples=10, min_delay=0.05)
+    assert policy.hedge_delay("gpt-test", LATENCY_FIRST_TOKEN) is None
+
+    for i in range(1, 11):
+        policy.record_latency("gpt-test", LATENCY_FIRST_TOKEN, i * 0.1)
+
+    assert policy.hedge_delay("gpt-test", LATENCY_FIRST_TOKEN) == pytest.approx(1.0)
+    assert policy.hedge_delay("gpt-test", LATENCY_RESPONSE) is None
+    assert policy.hedge_delay("gpt-test", LATENCY_FIRST_TOKEN, LLMPriority.BATCH) is None
+
+    policy.record_latency("fast", LATENCY_FIRST_TOKEN, 0.0)
+    policy.min_samples = 1
+    assert policy.hedge_delay("fast", LATENCY_FIRST_TOKEN) == 0.05
+
+
+def test_hedge_budget_is_capped_by_share_of_traffic():
+    """Test qu'un hedge n'est autorisé qu'une fois par 1/max_hedge_ratio appels éligibles."""
+    policy = HedgingPolicy(max_hedge_ratio=0.25, max_burst=1.0)
+
+    granted = 0
+    for _ in range(20):
+        policy._credit("gpt-test")
+        if policy.try_start_hedge("gpt-test"):
+            granted += 1
+
+    assert granted == 5
+    assert policy.get_state()["models"]["gpt-test"]["eligible_calls"] == 20
+
+
+def test_hedge_requires_free_scheduler_slot():
+    """Test qu'un hedge n'attend jamais un slot : sans capacité libre il est refusé sans coût."""
+    policy = HedgingPolicy(max_hedge_ratio=1.0)
+    scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+    policy._credit("gpt-test")
+
+    ticket = policy.try_start_hedge("gpt-test", scheduler)
+    assert ticket is not None and ticket.permit is not None
+    policy._credit("gpt-test")
+    assert policy.try_start_hedge("gpt-test", scheduler) is None
+    assert policy._credits["gpt-test"] == 1.0
+
+    ticket.permit.release()
+    assert scheduler.get_state()["models"]["gpt-test"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_hedges_slow_call_and_cancels_loser():
+    """Test que l'appel dupliqué gagne quand le primaire tarde, et que le primaire est annulé."""
+    policy = HedgingPolicy(max_hedge_ratio=1.0, min_samples=5, min_delay=0.0)
+    _warm_policy(policy)
+    primary_cancelled = asyncio.Event()
+
+    async def call(ticket):
+        if ticket is None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+        return "hedge"
+
+    result, outcome = await policy.run("gpt-test", LATENCY_RESPONSE, call)
+
+    assert result == "hedge"
+    assert outcome.hedged and outcome.hedge_won
+    assert outcome.loser_result is None
+    assert outcome.loser_seconds >= 0.01
+    assert primary_cancelled.is_set()
+    assert policy.get_state()["models"]["gpt-test"]["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_without_budget_waits_for_primary():
+    """Test qu'aucun hedge n'est lancé sans crédit, même si le primaire dépasse le délai."""
+    policy = HedgingPolicy(max_hedge_ratio=0.1, min_samples=5, min_delay=0.0)
+    _warm_policy(policy)
+    calls = []
+
+    async def call(ticket):
+        calls.append(ticket)
+        await asyncio.sleep(0.03)
+        return "primary"
+
+    result, outcome = await policy.run("gpt-test", LATENCY_RESPONSE, call)
+
+    assert result == "primary"
+    assert not outcome.hedged
+    assert calls == [None]
+    assert policy.get_state()["models"]["gpt-test"]["skipped_budget"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_falls_back_to_other_call_on_error():
+    """Test qu'une erreur du primaire laisse le hedge aboutir, et que deux erreurs sont propagées."""
+    policy = HedgingPolicy(max_hedge_ratio=1.0, max_burst=2.0, min_samples=5, min_delay=0.0)
+    _warm_policy(policy)
+
+    async def primary_fails(ticket):
+        if ticket is None:
+            await asyncio.sleep(0.03)
+            raise RuntimeError("primary")
+        await asyncio.sleep(0.06)
+        return "hedge"
+
+    result, outcome = await policy.run("gpt-test", LATENCY_RESPONSE, primary_fails)
+    assert result == "hedge" and outcome.hedge_won
+
+    async def both_fail(ticket):
+        await asyncio.sleep(0.03)
+        raise RuntimeError("hedge" if ticket else "primary")
+
+    with pytest.raises(RuntimeError):
+        await policy.run("gpt-test", LATENCY_RESPONSE, both_fail)
+
+
+@pytest.mark.asyncio
+async def test_peek_first_token_replays_buffered_events():
+    """Test que le stream lu jusqu'au premier token rejoue tous les événements."""
+
+    async def events():
+        for event in ("created", "in_progress", "delta-1", "delta-2", "completed"):
+            yield event
+
+    peeked = await peek_first_token(events(), lambda event: event.startswith("delta"))
+
+    assert [event async for event in peeked] == ["created", "in_progress", "delta-1", "delta-2", "completed"]
+
+
+def test_get_llm_hedging_policy_is_opt_in():
+    """Test que le hedging est désactivé par défaut et configurable par variables d'environnement."""
+    with patch.object(llm_hedging_module, "_llm_hedging_policy", None):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("LLM_HEDGING_ENABLED", None)
+            assert get_llm_hedging_policy() is None
+
+        with patch.dict(os.environ, {"LLM_HEDGING_ENABLED": "true", "LLM_HEDGING_MAX_RATIO": "0.1"}):
+            policy = get_llm_hedging_policy()
+            assert policy is not None
+            assert policy.max_hedge_ratio == 0.1
+            assert get_llm_hedging_policy() is policy
@@ -0,0 +1,304 @@
+"""Tests pour le scheduler des appels LLM."""
+import asyncio
+import os
+from unittest.mock import patch
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+import api.utils.llm_scheduler as llm_scheduler_module
+from constants import LLMPriority
+from api.utils.llm_scheduler import (
+    LLMScheduler,
+    ModelRateLimits,
+    estimate_request_tokens,
+    get_llm_scheduler,
+    is_rate_limit_error,
+    rate_limits_from_config,
+)
+
+
+def _rate_limit_error(retry_after: str = "0.5") -> RateLimitError:
+    req = httpx.Request("POST", "https://example.com")
+    resp = httpx.Response(429, request=req, headers={"retry-after": retry_after})
+    return RateLimitError("Rate limit exceeded", response=resp, body=None)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_bounds_concurrency_fifo():
+    """Test que la concurrence est bornée et que les appels sont servis dans l'ordre d'arrivée."""
+    scheduler = LLMScheduler(initial_concurrency=2, max_concurrency=2)
+    started = []
+    active = 0
+    max_active = 0
+
+    async def call(index: int):
+        nonlocal active, max_active
+        async with scheduler.slot("gpt-test"):
+            started.append(index)
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call(i) for i in range(6)))
+
+    assert max_active == 2
+    assert started == list(range(6))
+    state = scheduler.get_state()["models"]["gpt-test"]
+    assert state["total_calls"] == 6
+    assert state["in_flight"] == 0
+    assert state["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_queue_depth_visible_while_waiting():
+    """Test que la profondeur de file reflète les appels en attente."""
+    scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+    permit = await scheduler.acquire("gpt-test")
+    waiter = asyncio.create_task(scheduler.acquire("gpt-test"))
+    await asyncio.sleep(0)
+
+    assert scheduler.get_state()["models"]["gpt-test"]["queue_depth"] == 1
+
+    permit.release()
+    second = await waiter
+    assert second.wait_seconds >= 0
+    second.release()
+    assert scheduler.get_state()["models"]["gpt-test"]["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancelled_waiter_leaves_queue():
+    """Test qu'un appel annulé pendant l'attente ne consomme pas de slot."""
+    scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+    permit = await scheduler.acquire("gpt-test")
+    waiter = asyncio.create_task(scheduler.acquire("gpt-test"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    permit.release()
+    state = scheduler.get_state()["models"]["gpt-test"]
+    assert state["in_flight"] == 0
+    assert state["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_enforces_rpm_budget():
+    """Test qu'un budget RPM épuisé retarde l'appel suivant."""
+    scheduler = LLMScheduler(initial_concurrency=4)
+    # 120 rpm = capacité 120, recharge 2/s : on vide le bucket puis on mesure l'attente
+    scheduler.configure_model("gpt-test", ModelRateLimits(rpm=120))
+    for _ in range(120):
+        (await scheduler.acquire("gpt-test")).release()
+
+    permit = await scheduler.acquire("gpt-test")
+    permit.release()
+
+    assert permit.wait_seconds >= 0.3
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reconciles_tpm_with_actual_usage():
+    """Test que les tokens réservés non consommés sont rendus au budget TPM."""
+    scheduler = LLMScheduler(initial_concurrency=4)
+    scheduler.configure_model("gpt-test", ModelRateLimits(tpm=6000))
+
+    async with scheduler.slot("gpt-test", estimated_tokens=5000) as permit:
+        permit.set_actual_tokens(1000)
+
+    # 5000 réservés - 4000 rendus : un nouvel appel de 4000 tokens passe sans attendre
+    second = await scheduler.acquire("gpt-test", estimated_tokens=4000)
+    second.release()
+    assert second.wait_seconds < 0.1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rate_limit_halves_limit_and_pauses():
+    """Test qu'un 429 divise la limite, pause le modèle selon Retry-After et n'est compté qu'une fois par rafale."""
+    scheduler = LLMScheduler(initial_concurrency=8, max_concurrency=8)
+    permits = [await scheduler.acquire("gpt-test") for _ in range(3)]
+
+    for permit in permits:
+        permit.release(_rate_limit_error(retry_after="0.2"))
+
+    state = scheduler.get_state()["models"]["gpt-test"]
+    assert state["concurrency_limit"] == 4.0
+    assert state["rate_limited"] == 3
+    assert state["paused_for_seconds"] > 0
+
+    permit = await scheduler.acquire("gpt-test")
+    permit.release()
+    assert permit.wait_seconds >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_scheduler_additive_increase_on_success():
+    """Test l'augmentation additive de la limite après des succès."""
+    scheduler = LLMScheduler(initial_concurrency=2, max_concurrency=3, latency_tolerance=0)
+    for _ in range(4):
+        async with scheduler.slot("gpt-test"):
+            pass
+
+    assert scheduler.get_state()["models"]["gpt-test"]["concurrency_limit"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_decreases_on_latency_degradation():
+    """Test que la limite diminue quand la latence du premier token dépasse la médiane x tolérance."""
+    scheduler = LLMScheduler(initial_concurrency=10, max_concurrency=10, latency_tolerance=2.0)
+    lane = scheduler._lane("gpt-test")
+    lane.classes[LLMPriority.INTERACTIVE].latency_samples.extend([0.1] * 9 + [0.01])
+
+    permit = await scheduler.acquire("gpt-test")
+    permit.first_token_latency = 0.5
+    permit.release()
+
+    assert scheduler.get_state()["models"]["gpt-test"]["concurrency_limit"] == pytest.approx(9.0)
+
+
+@pytest.mark.asyncio
+async def test_mixed_length_successes_leave_limit_unchanged():
+    """Test que des appels de durées très différentes, sans dégradation du premier token, ne réduisent pas la limite."""
+    scheduler = LLMScheduler(initial_concurrency=4, max_concurrency=4, latency_tolerance=2.0, decrease_cooldown=0)
+    lane = scheduler._lane("gpt-test")
+    # Batch : premier token plus lent que l'interactif, sans congestion pour autant
+    lane.classes[LLMPriority.BATCH].latency_samples.extend([0.3] * 10)
+    lane.classes[LLMPriority.INTERACTIVE].latency_samples.extend([0.05] * 10)
+
+    for duration in [0.001, 0.05, 0.001, 0.08, 0.002, 0.05]:
+        # Appel non streamé : nœud court puis dialogue long (durée ~ longueur de complétion)
+        async with scheduler.slot("gpt-test"):
+            await asyncio.sleep(duration)
+        # Appel streamé batch : premier token à sa latence habituelle, complétion longue
+        permit = await scheduler.acquire("gpt-test", priority=LLMPriority.BATCH)
+        permit.first_token_latency = 0.35
+        await asyncio.sleep(duration)
+        permit.release()
+
+    assert scheduler.get_state()["models"]["gpt-test"]["concurrency_limit"] == 4.0
+    assert lane.last_decrease == float("-inf")
+
+
+@pytest.mark.asyncio
+async def test_interactive_preempts_queued_batch():
+    """Test qu'un appel interactif passe devant les appels batch déjà en file."""
+    scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+    order = []
+
+    async def call(name: str, priority: str):
+        async with scheduler.slot("gpt-test", priority=priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    blocker = asyncio.create_task(call("batch-0", LLMPriority.BATCH))
+    await asyncio.sleep(0)
+    batch = [asyncio.create_task(call(f"batch-{i}", LLMPriority.BATCH)) for i in range(1, 4)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("interactive", LLMPriority.INTERACTIVE))
+    await asyncio.gather(blocker, *batch, interactive)
+
+    assert order[0] == "batch-0"
+    assert order[1] == "interactive"
+
+
+@pytest.mark.asyncio
+async def test_weighted_fair_queuing_shares_slots():
+    """Test que le batch reste servi (pas de famine) selon les poids."""
+    scheduler = LLMScheduler(
+        initial_concurrency=1,
+        max_concurrency=1,
+        priority_weights={LLMPriority.INTERACTIVE: 3.0, LLMPriority.BATCH: 1.0},
+    )
+    order = []
+
+    async def call(priority: str):
+        async with scheduler.slot("gpt-test", priority=priority):
+            order.append(priority)
+            await asyncio.sleep(0)
+
+    blocker = await scheduler.acquire("gpt-test", priority=LLMPriority.BATCH)
+    tasks = [asyncio.create_task(call(LLMPriority.BATCH)) for _ in range(4)]
+    tasks += [asyncio.create_task(call(LLMPriority.INTERACTIVE)) for _ in range(8)]
+    await asyncio.sleep(0)
+    blocker.release()
+    await asyncio.gather(*tasks)
+
+    # L'interactif est favorisé, mais le batch est servi avant la fin de la file interactive
+    assert order[:4] == [LLMPriority.INTERACTIVE] * 4
+    assert LLMPriority.BATCH in order[:8]
+    assert order[-1] == LLMPriority.BATCH
+
+
+@pytest.mark.asyncio
+async def test_batch_cannot_take_all_slots():
+    """Test que la classe batch laisse des slots libres pour l'interactif."""
+    scheduler = LLMScheduler(
+        initial_concurrency=4,
+        max_concurrency=4,
+        priority_max_share={LLMPriority.BATCH: 0.5},
+    )
+    batch_permits = [await scheduler.acquire("gpt-test", priority=LLMPriority.BATCH) for _ in range(2)]
+    third_batch = asyncio.create_task(scheduler.acquire("gpt-test", priority=LLMPriority.BATCH))
+    await asyncio.sleep(0)
+
+    assert not third_batch.done()
+    interactive = await asyncio.wait_for(
+        scheduler.acquire("gpt-test", priority=LLMPriority.INTERACTIVE), timeout=1.0
+    )
+    assert interactive.wait_seconds < 0.1
+
+    batch_permits[0].release()
+    (await third_batch).release()
+    batch_permits[1].release()
+    interactive.release()
+
+    priorities = scheduler.get_state()["models"]["gpt-test"]["priorities"]
+    assert priorities[LLMPriority.BATCH]["total_calls"] == 3
+    assert priorities[LLMPriority.INTERACTIVE]["total_calls"] == 1
+    assert priorities[LLMPriority.BATCH]["call_ms_p50"] is not None
+
+
+@pytest.mark.asyncio
+async def test_unknown_priority_rejected():
+    """Test qu'une classe de priorité inconnue lève ValueError."""
+    scheduler = LLMScheduler()
+    with pytest.raises(ValueError, match="Priorité LLM inconnue"):
+        await scheduler.acquire("gpt-test", priority="urgent")
+
+
+def test_is_rate_limit_error():
+    """Test la détection des erreurs 429."""
+    assert is_rate_limit_error(_rate_limit_error()) is True
+    assert is_rate_limit_error(ValueError("boom")) is False
+    assert is_rate_limit_error(None) is False
+
+
+def test_estimate_request_tokens_prefers_known_prompt_tokens():
+    """Test que l'estimation existante (BuiltPrompt.token_count) est prioritaire."""
+    assert estimate_request_tokens("x" * 400, max_output_tokens=100) == 200
+    assert estimate_request_tokens("x" * 400, max_output_tokens=100, prompt_tokens=50) == 150
+
+
+def test_rate_limits_from_config():
+    """Test la lecture de l'entrée rate_limits de llm_config.json."""
+    assert rate_limits_from_config(None) is None
+    assert rate_limits_from_config({"rpm": 500, "tpm": 200000}) == ModelRateLimits(rpm=500, tpm=200000)
+
+
+def test_get_llm_scheduler_disabled():
+    """Test que le scheduler peut être désactivé par variable d'environnement."""
+    with patch.dict(os.environ, {"LLM_SCHEDULER_ENABLED": "false"}):
+        assert get_llm_scheduler() is None
+
+
+def test_get_llm_scheduler_from_env():
+    """Test la configuration du scheduler global depuis l'environnement."""
+    with patch.object(llm_scheduler_module, "_llm_scheduler", None), \
+         patch.dict(os.environ, {"LLM_SCHEDULER_MAX_CONCURRENCY": "7", "LLM_SCHEDULER_DEFAULT_RPM": "60"}):
+        scheduler = get_llm_scheduler()
+        assert scheduler.max_concurrency == 7
+        assert scheduler.default_limits.rpm == 60
@@ -7,6 +7,12 @@ from pathlib import Path
 from api.utils.log_file_handler import DateRotatingFileHandler
 
 
+def _read_jsonl(path):
+    """Lit un fichier de logs JSONL."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
 @pytest.fixture
 def tmp_log_dir(tmp_path):
     """Crée un dossier temporaire pour les logs."""
@@ -38,15 +44,14 @@ def test_handler_creates_file(handler, tmp_log_dir):
     
     # Vérifier qu'un fichier a été créé
     today = date.today()
-    expected_file = tmp_log_dir / f"logs_{today.isoformat()}.json"
+    expected_file = tmp_log_dir / f"logs_{today.isoformat()}.jsonl"
     assert expected_file.exists()
     
     # Vérifier le contenu
-    with open(expected_file, 'r', encoding='utf-8') as f:
-        logs = json.load(f)
-        assert len(logs) == 1
-        assert logs[0]["message"] == "Test message"
-        assert logs[0]["level"] == "INFO"
+    logs = _read_jsonl(expected_file)
+    assert len(logs) == 1
+    assert logs[0]["message"] == "Test message"
+    assert logs[0]["level"] == "INFO"
 
 
 def test_handler_rotates_by_date(handler, tmp_log_dir):
@@ -61,7 +66,7 @@ def test_handler_rotates_by_date(handler, tmp_log_dir):
     
     # Vérifier qu'un fichier a été créé pour aujourd'hui
     today = date.today()
-    today_file = tmp_log_dir / f"logs_{today.isoformat()}.json"
+    today_file = tmp_log_dir / f"logs_{today.isoformat()}.jsonl"
     assert today_file.exists()
     
     # Simuler le jour suivant en modifiant directement current_date du handler
@@ -81,27 +86,54 @@ def test_handler_rotates_by_date(handler, tmp_log_dir):
     # En pratique, la rotation se fait automatiquement au changement réel de jour
 
 
-def test_handler_handles_corrupted_file(handler, tmp_log_dir):
-    """Teste que le handler gère les fichiers corrompus."""
+def test_handler_handles_truncated_line(tmp_log_dir):
+    """Teste qu'une ligne tronquée (arrêt pendant une écriture) n'altère pas les logs suivants."""
     today = date.today()
-    log_file = tmp_log_dir / f"logs_{today.isoformat()}.json"
+    log_file = tmp_log_dir / f"logs_{today.isoformat()}.jsonl"
     
-    # Créer un fichier corrompu
+    # Créer un fichier dont la dernière ligne est incomplète
     with open(log_file, 'w', encoding='utf-8') as f:
-        f.write("invalid json{")
+        f.write('{"message": "avant"}\n{"message": "tronq')
     
-    logger = logging.getLogger("test")
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
-    
-    # Le handler devrait recréer le fichier
-    logger.info("Test message")
-    handler.flush()
+    handler = DateRotatingFileHandler(log_dir=str(tmp_log_dir))
+    handler.emit(logging.LogRecord("test", logging.INFO, "test.py", 1, "Test message", (), None))
+    handler.close()
     
-    # Vérifier que le fichier est valide maintenant
-    with open(log_file, 'r', encoding='utf-8') as f:
-        logs = json.load(f)
-        assert len(logs) == 1
+    # Les logs existants sont conservés, la ligne tronquée est isolée
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == '{"message": "avant"}'
+    assert lines[1] == '{"message": "tronq'
+    assert json.loads(lines[2])["message"] == "Test message"
+
+
+def test_handler_buffers_until_flush(tmp_log_dir):
+    """Teste que les logs INFO sont bufferisés et qu'un WARNING force l'écriture."""
+    handler = DateRotatingFileHandler(log_dir=str(tmp_log_dir), flush_records=100, flush_interval=3600)
+    log_file = tmp_log_dir / f"logs_{date.today().isoformat()}.jsonl"
+    try:
+        for i in range(3):
+            handler.emit(logging.LogRecord("test", logging.INFO, "test.py", 1, f"info {i}", (), None))
+        assert _read_jsonl(log_file) == []
+        
+        handler.emit(logging.LogRecord("test", logging.WARNING, "test.py", 1, "attention", (), None))
+        assert [log["message"] for log in _read_jsonl(log_file)] == ["info 0", "info 1", "info 2", "attention"]
+    finally:
+        handler.close()
+
+
+def test_handler_rotates_by_size(tmp_log_dir):
+    """Teste la rotation intra-jour quand le fichier dépasse la taille maximale."""
+    handler = DateRotatingFileHandler(log_dir=str(tmp_log_dir), max_file_size_mb=1)
+    handler.max_file_size_bytes = 200
+    try:
+        for i in range(10):
+            handler.emit(logging.LogRecord("test", logging.INFO, "test.py", 1, f"message {i}", (), None))
+    finally:
+        handler.close()
+    
+    files = sorted(tmp_log_dir.glob("logs_*.jsonl"))
+    assert len(files) == 2
+    assert sum(len(_read_jsonl(path)) for path in files) == 10
 
 
 def test_handler_cleanup_old_files(handler, tmp_log_dir):
@@ -111,9 +143,11 @@ def test_handler_cleanup_old_files(handler, tmp_log_dir):
     recent_date = date.today() - timedelta(days=5)
     
     old_file = tmp_log_dir / f"logs_{old_date.isoformat()}.json"
+    old_jsonl_file = tmp_log_dir / f"logs_{old_date.isoformat()}_120000.jsonl"
     recent_file = tmp_log_dir / f"logs_{recent_date.isoformat()}.json"
     
-    # Créer les fichiers
+    # Créer les fichiers (ancien format JSON et JSONL)
+    old_jsonl_file.write_text('{"message": "old"}\n', encoding='utf-8')
     with open(old_file, 'w', encoding='utf-8') as f:
         json.dump([{"message": "old"}], f)
     with open(recent_file, 'w', encoding='utf-8') as f:
@@ -123,8 +157,9 @@ def test_handler_cleanup_old_files(handler, tmp_log_dir):
     deleted_count = handler.cleanup_old_files()
     
     # Vérifier que seul le fichier ancien a été supprimé
-    assert deleted_count == 1
+    assert deleted_count == 2
     assert not old_file.exists()
+    assert not old_jsonl_file.exists()
     assert recent_file.exists()
 
 
@@ -153,11 +188,10 @@ def test_handler_enriches_log_context(handler, tmp_log_dir):
     
     # Vérifier le contenu
     today = date.today()
-    log_file = tmp_log_dir / f"logs_{today.isoformat()}.json"
-    with open(log_file, 'r', encoding='utf-8') as f:
-        logs = json.load(f)
-        assert logs[0]["request_id"] == "req123"
-        assert logs[0]["endpoint"] == "/api/test"
-        assert logs[0]["method"] == "GET"
+    log_file = tmp_log_dir / f"logs_{today.isoformat()}.jsonl"
+    logs = _read_jsonl(log_file)
+    assert logs[0]["request_id"] == "req123"
+    assert logs[0]["endpoint"] == "/api/test"
+    assert logs[0]["method"] == "GET"
 
 
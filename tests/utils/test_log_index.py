@@ -0,0 +1,101 @@
+"""Tests pour l'index des fichiers de logs JSONL."""
+import json
+import logging
+from datetime import date
+
+from api.services.log_service import LogService
+from api.utils.log_file_handler import DateRotatingFileHandler
+from api.utils.log_index import LogFileIndex, index_path
+
+
+def _emit(handler, msg, level=logging.INFO, **context):
+    record = logging.LogRecord("api.test", level, "test.py", 1, msg, (), None)
+    for key, value in context.items():
+        setattr(record, key, value)
+    handler.emit(record)
+
+
+def test_handler_writes_index_and_index_seeks_to_records(tmp_path):
+    """Test que l'index écrit par le handler pointe sur les bonnes lignes du fichier de logs."""
+    handler = DateRotatingFileHandler(log_dir=str(tmp_path))
+    _emit(handler, "premier", request_id="req1", endpoint="/api/v1/dialogues/generate")
+    _emit(handler, "erreur", level=logging.ERROR, request_id="req2")
+    _emit(handler, "second", request_id="req1")
+    handler.close()
+    log_file = tmp_path / f"logs_{date.today().isoformat()}.jsonl"
+
+    index = LogFileIndex(log_file)
+    index.refresh()
+
+    assert len(index_path(log_file).read_text(encoding="utf-8").splitlines()) == 3
+    assert [log["message"] for log in index.read(index.match(request_id="req1"))] == ["premier", "second"]
+    assert index.match(level="error") == [1]
+    assert index.match(endpoint="dialogues", request_id="req1") == [0]
+    assert index.count_by("level") == {"INFO": 2, "ERROR": 1}
+    assert index.count_by_day() == {date.today().isoformat(): 3}
+
+
+def test_index_offsets_are_exact_with_several_writers(tmp_path):
+    """Test que deux handlers (workers) écrivant dans le même fichier produisent un index exact."""
+    handlers = [DateRotatingFileHandler(log_dir=str(tmp_path), flush_records=2) for _ in range(2)]
+    for i in range(6):
+        _emit(handlers[i % 2], f"worker{i % 2}-{i}", request_id=f"req{i}")
+    for handler in handlers:
+        handler.close()
+    log_file = tmp_path / f"logs_{date.today().isoformat()}.jsonl"
+    entries = [json.loads(line) for line in index_path(log_file).read_text(encoding="utf-8").splitlines()]
+
+    with open(log_file, "rb") as f:
+        for offset, length, *_ in entries:
+            f.seek(offset)
+            assert f.read(length).endswith(b"}\n")
+    index = LogFileIndex(log_file)
+    index.refresh()
+    assert len(index) == 6
+    assert sorted(log["message"] for log in index.read(range(6))) == sorted(f"worker{i % 2}-{i}" for i in range(6))
+
+
+def test_index_refresh_is_incremental_and_covers_unindexed_lines(tmp_path):
+    """Test que l'index lit les nouvelles entrées et indexe les lignes absentes de l'index annexe."""
+    log_file = tmp_path / "logs_2025-01-01.jsonl"
+    lines = [json.dumps({"timestamp": f"2025-01-01T10:0{i}:00Z", "level": "INFO", "logger": "api", "message": str(i)})
+             for i in range(3)]
+    log_file.write_text("\n".join(lines[:2]) + "\n", encoding="utf-8")
+    index = LogFileIndex(log_file)
+
+    index.refresh()
+    assert len(index) == 2
+    # Ligne ajoutée sans entrée d'index (fichier écrit avant l'index, écriture en cours)
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(lines[2] + "\n" + '{"partiel": ')
+    index.refresh()
+
+    assert len(index) == 3
+    assert index.read([2]) == [json.loads(lines[2])]
+    assert index.count_by_day() == {"2025-01-01": 3}
+
+
+def test_search_reads_only_the_page(tmp_path, monkeypatch):
+    """Test que la recherche trie et pagine depuis l'index, puis ne lit que la page."""
+    handler = DateRotatingFileHandler(log_dir=str(tmp_path))
+    for i in range(20):
+        _emit(handler, f"log {i}", level=logging.WARNING if i % 2 else logging.INFO, request_id=f"req{i % 3}")
+    handler.close()
+    service = LogService(log_dir=str(tmp_path))
+    read_sizes = []
+    original_read = LogFileIndex.read
+
+    def counting_read(self, entry_ids):
+        read_sizes.append(len(entry_ids))
+        return original_read(self, entry_ids)
+
+    monkeypatch.setattr(LogFileIndex, "read", counting_read)
+    logs, total = service.search_logs(level="WARNING", limit=3, offset=2)
+
+    assert total == 10
+    assert read_sizes == [3]
+    assert all(log["level"] == "WARNING" for log in logs)
+    stats = service.get_statistics()
+    assert stats["total_logs"] == 20
+    assert stats["by_level"] == {"INFO": 10, "WARNING": 10}
+    assert stats["by_logger"] == {"api.test": 20}
@@ -0,0 +1,138 @@
+"""Tests pour la file de logs non bloquante et le stockage annexe des payloads."""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from api.utils.log_file_handler import DateRotatingFileHandler
+from api.utils.log_payloads import PAYLOAD_DIR_NAME, configure_payload_store
+from api.utils.log_queue import QueuedLogHandler
+from api.utils.logging_config import JSONFormatter
+
+
+class _CollectingHandler(logging.Handler):
+    """Handler de test : conserve les messages formatés et le thread d'écriture."""
+
+    def __init__(self, gate: threading.Event = None):
+        super().__init__()
+        self.messages = []
+        self.threads = set()
+        self.flushes = 0
+        self.gate = gate
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.threads.add(threading.current_thread().name)
+        self.messages.append(record.getMessage())
+
+    def flush(self):
+        self.flushes += 1
+
+
+def _record(msg, level=logging.INFO, args=None):
+    return logging.LogRecord("test", level, "test.py", 1, msg, args, None)
+
+
+def test_records_are_written_by_background_thread():
+    """Test que les records sont écrits dans l'ordre par le thread d'écriture, par lots."""
+    target = _CollectingHandler()
+    handler = QueuedLogHandler([target], batch_size=100)
+    try:
+        items = ["a"]
+        # Argument mutable : message figé à l'émission ; immuable : formatage différé
+        handler.handle(_record("liste %s", args=(items,)))
+        items.append("b")
+        handler.handle(_record("nombre %d", args=(3,)))
+        handler.flush()
+    finally:
+        handler.close()
+
+    assert target.messages == ["liste ['a']", "nombre 3"]
+    assert target.threads == {"log-writer-logs"}
+    stats = handler.get_stats()
+    assert (stats["enqueued"], stats["written"], stats["dropped"]) == (2, 2, 0)
+    assert target.flushes <= stats["batches"]
+
+
+def test_full_queue_drops_info_and_reports():
+    """Test qu'une file pleine abandonne les INFO, compte les débordements et le signale."""
+    release = threading.Event()
+    target = _CollectingHandler(release)
+    handler = QueuedLogHandler([target], queue_size=2, block_timeout=0.01)
+    try:
+        # Le premier record occupe le thread d'écriture, les deux suivants remplissent la file
+        for i in range(3):
+            handler.handle(_record(f"info {i}"))
+        while handler.get_stats()["queued"] < 2:
+            handler.handle(_record("remplissage"))
+        handler.handle(_record("perdu"))
+        handler.handle(_record("alerte perdue", level=logging.WARNING))
+        stats = handler.get_stats()
+        release.set()
+        handler.flush()
+    finally:
+        handler.close()
+
+    assert stats["dropped"] >= 2
+    assert stats["overflows"] >= stats["dropped"]
+    assert "perdu" not in target.messages
+    assert any("abandonné(s)" in message for message in target.messages)
+
+
+def test_timestamps_are_emission_times_when_writing_is_delayed(tmp_path):
+    """Test que l'horodatage des logs est celui de l'émission, même si le thread d'écriture est en retard."""
+    release = threading.Event()
+    gate = _CollectingHandler(release)
+    file_handler = DateRotatingFileHandler(log_dir=str(tmp_path))
+    json_lines = []
+    json_handler = _CollectingHandler()
+    json_handler.emit = lambda record: json_lines.append(JSONFormatter().format(record))
+    handler = QueuedLogHandler([gate, file_handler, json_handler])
+    try:
+        record = _record("émis avant l'écriture")
+        handler.handle(record)
+        time.sleep(0.3)
+        release.set()
+        handler.flush()
+    finally:
+        handler.close()
+        file_handler.close()
+
+    expected = datetime.fromtimestamp(record.created, timezone.utc)
+    file_lines = [
+        json.loads(line)
+        for path in tmp_path.glob("*.jsonl")
+        for line in path.read_text(encoding="utf-8").splitlines()
+    ]
+    for entry in [file_lines[-1], json.loads(json_lines[-1])]:
+        logged = datetime.fromisoformat(entry["timestamp"].removesuffix("Z"))
+        assert abs((logged - expected).total_seconds()) < 0.01
+
+
+def test_payload_store_samples_and_truncates(tmp_path):
+    """Test que les payloads vont dans le stockage annexe, tronqués, sans rejoindre les logs."""
+    handler = configure_payload_store(str(tmp_path), sample_rate=1.0, max_payload_bytes=20)
+    root_records = []
+    root_handler = _CollectingHandler()
+    logging.getLogger().addHandler(root_handler)
+    try:
+        logging.getLogger("payloads.llm").info(
+            "Réponse brute", extra={"payload": {"texte": "x" * 100}, "extra_fields": {"kind": "test"}}
+        )
+        handler.flush()
+        root_records = root_handler.messages
+    finally:
+        logging.getLogger().removeHandler(root_handler)
+        configure_payload_store(str(tmp_path), sample_rate=0)
+
+    files = list((tmp_path / PAYLOAD_DIR_NAME).glob("logs_*.jsonl"))
+    entries = [json.loads(line) for line in files[0].read_text(encoding="utf-8").splitlines()]
+    assert root_records == []
+    assert entries[0]["kind"] == "test"
+    assert entries[0]["truncated"] is True
+    assert entries[0]["payload"] == '{"texte": "xxxxxxxxx'
+    assert entries[0]["payload_bytes"] > 100
+    # Stockage désactivé : le logger des payloads n'émet plus rien
+    assert not logging.getLogger("payloads.llm").isEnabledFor(logging.INFO)
@@ -201,7 +201,26 @@ def test_setup_logging():
             root_logger.handlers = original_handlers
 
 
-
-
-
-
+def test_setup_logging_without_queue_writes_each_log(tmp_path):
+    """Test que sans file de logs, chaque log INFO est écrit sur disque sans attendre."""
+    from datetime import date
+    env = {"LOG_FORMAT": "text", "LOG_LEVEL": "INFO", "LOG_DIR": str(tmp_path),
+           "LOG_QUEUE_ENABLED": "false", "LOG_PAYLOAD_SAMPLE_RATE": "0"}
+    with patch.dict(os.environ, env, clear=True):
+        root_logger = logging.getLogger()
+        original_handlers = root_logger.handlers[:]
+        original_level = root_logger.level
+        root_logger.handlers = []
+        
+        try:
+            setup_logging()
+            logging.getLogger("api.test").info("sans file")
+            
+            log_file = tmp_path / f"logs_{date.today().isoformat()}.jsonl"
+            messages = [json.loads(line)["message"] for line in log_file.read_text(encoding="utf-8").splitlines()]
+            assert "sans file" in messages
+        finally:
+            for handler in root_logger.handlers:
+                handler.close()
+            root_logger.handlers = original_handlers
+            root_logger.setLevel(original_level)
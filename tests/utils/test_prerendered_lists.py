@@ -0,0 +1,166 @@
+"""Tests pour les listes GDD pré-rendues."""
+import gzip
+import json
+
+from api.schemas.context import CharacterListResponse, CharacterResponse, CommunityListResponse
+from api.utils.prerendered_lists import (
+    ENCODING_GZIP,
+    ENCODING_IDENTITY,
+    SUMMARY_TEXT_MAX_CHARS,
+    PrerenderedList,
+    PrerenderedListCache,
+    parse_fields,
+    select_encoding,
+)
+
+CHARACTERS = [
+    {"Nom": "Éloïse", "Rôle": "Guide"},
+    {"Nom": "Bran", "Tags": ["forge", "nord"]},
+    {"Description": "Sans nom"},
+]
+
+
+def _envelope(model, field_name, **fields):
+    return model(**{field_name: [], **fields})
+
+
+def test_render_matches_pydantic_serialization():
+    """Test que la liste pré-rendue est identique à la sérialisation Pydantic de la réponse."""
+    prerendered = PrerenderedList(CHARACTERS, generation=1)
+    expected = CharacterListResponse(
+        characters=[CharacterResponse(name=c.get("Nom", "Unknown"), data=c) for c in CHARACTERS],
+        total=3,
+    )
+
+    content = prerendered.render(
+        _envelope(CharacterListResponse, "characters", total=3), "characters", 0, 3, ENCODING_IDENTITY
+    )
+
+    assert json.loads(content) == json.loads(expected.model_dump_json())
+
+
+def test_pages_are_slices_of_precomputed_offsets():
+    """Test que les pages (y compris vides) reprennent les bons éléments et l'enveloppe du modèle."""
+    prerendered = PrerenderedList(CHARACTERS, generation=1)
+    envelope = _envelope(CharacterListResponse, "characters", total=3, page=2, page_size=2, total_pages=2)
+
+    page = json.loads(prerendered.render(envelope, "characters", 2, 4, ENCODING_IDENTITY))
+
+    assert page["characters"] == [{"name": "Unknown", "data": {"Description": "Sans nom"}}]
+    assert (page["page"], page["total_pages"]) == (2, 2)
+    assert prerendered.slice(5, 7) == b""
+    # Champs absents du modèle (pas de pagination pour les communautés) ignorés
+    communities = json.loads(PrerenderedList([], 1).render(
+        _envelope(CommunityListResponse, "communities", total=0, page=1), "communities", 0, 0, ENCODING_IDENTITY
+    ))
+    assert communities == {"communities": [], "total": 0}
+
+
+def test_gzip_variant_is_cached():
+    """Test que la variante gzip décompresse vers la réponse et n'est compressée qu'une fois."""
+    prerendered = PrerenderedList(CHARACTERS, generation=1)
+    envelope = _envelope(CharacterListResponse, "characters", total=3)
+
+    first = prerendered.render(envelope, "characters", 0, 3, ENCODING_GZIP)
+
+    assert prerendered.render(envelope, "characters", 0, 3, ENCODING_GZIP) is first
+    assert gzip.decompress(first) == prerendered.render(envelope, "characters", 0, 3, ENCODING_IDENTITY)
+
+
+def test_cache_rebuilds_on_new_generation_or_source():
+    """Test que la liste pré-rendue est reconstruite au changement de génération GDD ou de liste source."""
+    cache = PrerenderedListCache()
+    first = cache.get("characters", CHARACTERS, 1)
+
+    assert cache.get("characters", CHARACTERS, 1) is first
+    assert cache.get("characters", CHARACTERS, 2) is not first
+    assert cache.get("characters", list(CHARACTERS), 2).total == 3
+
+
+def test_peek_and_render_cached_never_render():
+    """Test que peek et render_cached ne servent que ce qui est déjà rendu ou compressé."""
+    cache = PrerenderedListCache()
+    envelope = _envelope(CharacterListResponse, "characters", total=3)
+
+    assert cache.peek("characters", CHARACTERS, 1) is None
+    prerendered = cache.get("characters", CHARACTERS, 1)
+    assert cache.peek("characters", CHARACTERS, 1) is prerendered
+    assert cache.peek("characters", CHARACTERS, 1, summary=True) is None
+    assert cache.peek("characters", CHARACTERS, 2) is None
+
+    assert prerendered.render_cached(envelope, "characters", 0, 3, ENCODING_GZIP) is None
+    compressed = prerendered.render(envelope, "characters", 0, 3, ENCODING_GZIP)
+    assert prerendered.render_cached(envelope, "characters", 0, 3, ENCODING_GZIP) is compressed
+    assert prerendered.render_cached(envelope, "characters", 0, 3, ENCODING_IDENTITY) == gzip.decompress(compressed)
+
+
+def test_select_encoding():
+    """Test la négociation de l'encodage (q=0 exclut un encodage)."""
+    assert select_encoding(None) == ENCODING_IDENTITY
+    assert select_encoding("gzip, deflate") == ENCODING_GZIP
+    assert select_encoding("gzip;q=0, identity") == ENCODING_IDENTITY
+
+
+def test_fields_projection_keeps_name_and_requested_keys():
+    """Test que la projection ne garde que les clés demandées (plus le nom) dans l'ordre d'origine."""
+    fields = parse_fields(" Tags, Rôle ,Rôle,")
+    prerendered = PrerenderedListCache().get("characters", CHARACTERS, 1, fields=fields)
+
+    page = json.loads(prerendered.render(
+        _envelope(CharacterListResponse, "characters", total=3), "characters", 0, 3, ENCODING_IDENTITY
+    ))
+
+    assert fields == ("Rôle", "Tags")
+    assert parse_fields(" , ") is None
+    assert [c["data"] for c in page["characters"]] == [
+        {"Nom": "Éloïse", "Rôle": "Guide"},
+        {"Nom": "Bran", "Tags": ["forge", "nord"]},
+        {},
+    ]
+
+
+def test_summary_table_is_built_once_per_generation_and_truncates_text():
+    """Test que la table résumée est une variante distincte, tronquée et réutilisée pour la génération."""
+    long_summary = "x" * (SUMMARY_TEXT_MAX_CHARS + 50)
+    source = [{"Nom": "Bran", "Résumé": long_summary, "Background": "Très long historique"}]
+    cache = PrerenderedListCache()
+
+    summary = cache.get("characters", source, 1, summary=True)
+    full = cache.get("characters", source, 1)
+
+    assert cache.get("characters", source, 1, summary=True) is summary
+    assert summary is not full and full.size > summary.size
+    data = json.loads(b"[" + summary.slice(0, 1) + b"]")[0]["data"]
+    assert set(data) == {"Nom", "Résumé"}
+    assert data["Résumé"] == "x" * SUMMARY_TEXT_MAX_CHARS + "…"
+    assert set(cache.get_state()) == {"characters", "characters:summary"}
+
+
+def test_unknown_fields_are_ignored_and_share_one_variant():
+    """Test que les clés inconnues sont ignorées : une seule variante par projection effective."""
+    cache = PrerenderedListCache()
+
+    fields = cache.normalize_fields("characters", CHARACTERS, 1, parse_fields("Tags,Inconnu,Rôle"))
+    projected = cache.get("characters", CHARACTERS, 1, fields=fields)
+
+    assert fields == ("Rôle", "Tags")
+    assert cache.get("characters", CHARACTERS, 1, fields=cache.normalize_fields(
+        "characters", CHARACTERS, 1, parse_fields("Rôle,Tags,Autre")
+    )) is projected
+    assert cache.normalize_fields("characters", CHARACTERS, 1, ("Inconnu",)) == ()
+    assert cache.normalize_fields("characters", CHARACTERS, 1, None) is None
+
+
+def test_projections_never_evict_full_and_summary_variants():
+    """Test que les projections `fields=` n'évincent pas les variantes complète et résumé."""
+    source = [{"Nom": "Bran", **{f"Clé {i}": i for i in range(5)}}]
+    cache = PrerenderedListCache(max_variants=2)
+    full = cache.get("characters", source, 1)
+    summary = cache.get("characters", source, 1, summary=True)
+
+    for i in range(5):
+        cache.get("characters", source, 1, fields=(f"Clé {i}",))
+
+    assert cache.peek("characters", source, 1) is full
+    assert cache.peek("characters", source, 1, summary=True) is summary
+    assert len(cache.get_state()) == 4
@@ -0,0 +1,160 @@
+"""Tests pour la gestion des abonnés SSE lents."""
+import asyncio
+
+import pytest
+
+from api.services.generation_job_manager import JobEventBuffer
+from api.utils.sse_backpressure import (
+    SlowConsumerError,
+    SlowConsumerPolicy,
+    SSESubscriberRegistry,
+    coalesce_chunks,
+    drop_chunks,
+)
+
+
+def _chunk(content, sequence):
+    return {"type": "chunk", "content": content, "sequence": sequence}
+
+
+BACKLOG = [
+    (4, _chunk("Bon", 2)),
+    (5, _chunk("jour", 3)),
+    (6, {"type": "metadata", "tokens": 12, "cost": 0.0}),
+    (7, _chunk(" !", 4)),
+    (8, {"type": "complete", "result": {}}),
+]
+
+
+def test_coalesce_merges_pending_chunks_and_keeps_other_events():
+    """Test que la fusion garde la séquence SSE du dernier chunk et la plage des séquences de chunks."""
+    assert coalesce_chunks(BACKLOG) == [
+        (5, {"type": "chunk", "content": "Bonjour", "sequence": 2, "sequence_end": 3}),
+        (6, {"type": "metadata", "tokens": 12, "cost": 0.0}),
+        (7, _chunk(" !", 4)),
+        (8, {"type": "complete", "result": {}}),
+    ]
+
+
+def test_drop_chunks_keeps_final_event():
+    """Test que le contenu des chunks est abandonné et les autres événements conservés."""
+    assert drop_chunks(BACKLOG) == [
+        (5, {"type": "chunk", "content": "", "sequence": 2, "sequence_end": 3}),
+        (6, {"type": "metadata", "tokens": 12, "cost": 0.0}),
+        (7, {"type": "chunk", "content": "", "sequence": 4, "sequence_end": 4}),
+        (8, {"type": "complete", "result": {}}),
+    ]
+
+
+def test_drop_chunks_keeps_chunk_sequences_contiguous():
+    """Test que les séquences de chunks restent contiguës après abandon (pas de trou côté client)."""
+    backlog = [(i + 10, _chunk(str(i), i)) for i in range(3, 8)] + [(20, {"type": "complete", "result": {}})]
+    received = [_chunk("0", 0), _chunk("1", 1), _chunk("2", 2)] + [payload for _, payload in drop_chunks(backlog)]
+
+    covered = []
+    for payload in received:
+        if payload["type"] == "chunk":
+            covered.extend(range(payload["sequence"], payload.get("sequence_end", payload["sequence"]) + 1))
+    assert covered == list(range(8))
+    assert "".join(p["content"] for p in received if p["type"] == "chunk") == "012"
+
+
+def test_drop_chunks_without_sequence_sends_nothing():
+    """Test que des chunks non numérotés sont simplement abandonnés."""
+    backlog = [(1, {"type": "chunk", "content": "a"}), (2, {"type": "complete", "result": {}})]
+    assert drop_chunks(backlog) == [(2, {"type": "complete", "result": {}})]
+
+
+async def _subscribe_while_lagging(buffer, policy, stats=None):
+    """Abonné qui lit un événement puis prend du retard pendant que le job publie."""
+    subscriber = buffer.subscribe(slow_consumer=policy, stats=stats)
+    received = [await subscriber.__anext__()]
+    for i in range(1, 6):
+        buffer.publish(_chunk(str(i), i))
+    buffer.publish({"type": "complete", "result": {}})
+    buffer.close()
+    received.extend([event async for event in subscriber])
+    return received
+
+
+@pytest.mark.asyncio
+async def test_lagging_subscriber_receives_coalesced_backlog():
+    """Test qu'au-delà du plafond le retard est envoyé en une frame fusionnée."""
+    buffer = JobEventBuffer()
+    task = asyncio.create_task(_subscribe_while_lagging(buffer, SlowConsumerPolicy("coalesce", max_pending_events=3)))
+    await asyncio.sleep(0)
+    buffer.publish(_chunk("0", 0))
+
+    received = await task
+
+    assert received == [
+        (0, _chunk("0", 0)),
+        (5, {"type": "chunk", "content": "12345", "sequence": 1, "sequence_end": 5}),
+        (6, {"type": "complete", "result": {}}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lagging_subscriber_frames_reuse_published_encoding():
+    """Test que seule la frame fusionnée est encodée pour l'abonné en retard."""
+    buffer = JobEventBuffer()
+    subscriber = buffer.subscribe_frames(slow_consumer=SlowConsumerPolicy("coalesce", max_pending_events=3))
+    buffer.publish(_chunk("0", 0))
+    received = [await subscriber.__anext__()]
+    for i in range(1, 6):
+        buffer.publish(_chunk(str(i), i))
+    buffer.publish({"type": "complete", "result": {}})
+    buffer.close()
+    received.extend([event async for event in subscriber])
+    published = {sequence: frame async for sequence, frame in buffer.subscribe_frames()}
+
+    assert [sequence for sequence, _ in received] == [0, 5, 6]
+    assert received[0][1] is published[0]
+    assert received[2][1] is published[6]
+    assert b'"content": "12345"' in received[1][1]
+
+
+@pytest.mark.asyncio
+async def test_lagging_subscriber_disconnected_with_disconnect_policy():
+    """Test que la politique disconnect interrompt l'abonné trop lent."""
+    buffer = JobEventBuffer()
+    task = asyncio.create_task(
+        _subscribe_while_lagging(buffer, SlowConsumerPolicy("disconnect", max_pending_events=0, max_pending_bytes=50))
+    )
+    await asyncio.sleep(0)
+    buffer.publish(_chunk("0", 0))
+
+    with pytest.raises(SlowConsumerError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_replay_is_not_counted_as_lag():
+    """Test qu'un abonné tardif rejoue tout le buffer sans déclencher la politique."""
+    buffer = JobEventBuffer()
+    for i in range(10):
+        buffer.publish(_chunk(str(i), i))
+    buffer.close()
+    policy = SlowConsumerPolicy("drop_chunks", max_pending_events=2)
+
+    assert len([event async for event in buffer.subscribe(slow_consumer=policy)]) == 10
+
+
+@pytest.mark.asyncio
+async def test_registry_tracks_pending_bytes_per_connection():
+    """Test que le registre suit le retard en octets par connexion et le libère à la fermeture."""
+    registry = SSESubscriberRegistry()
+    policy = SlowConsumerPolicy("drop_chunks", max_pending_events=3, registry=registry)
+    stats = registry.register("job-1")
+    buffer = JobEventBuffer()
+    task = asyncio.create_task(_subscribe_while_lagging(buffer, policy, stats))
+    await asyncio.sleep(0)
+    buffer.publish(_chunk("0", 0))
+
+    assert [sequence for sequence, _ in await task] == [0, 5, 6]
+    assert stats.max_pending_bytes > 0
+    assert (stats.policy_actions, stats.dropped_events) == (1, 4)
+    assert registry.get_state()["subscribers"] == 1
+
+    registry.unregister(stats)
+    assert registry.get_state() == {"subscribers": 0, "pending_bytes": 0, "connections": []}
@@ -0,0 +1,74 @@
+"""Tests pour le regroupement adaptatif des chunks SSE."""
+import asyncio
+
+import pytest
+
+from api.utils.sse_coalescing import SSEChunkCoalescer
+
+
+def _chunk(content, sequence):
+    return {"type": "chunk", "content": content, "sequence": sequence}
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_merged_until_interval_elapses():
+    """Test que les deltas rapprochés sont publiés en une seule frame après le délai."""
+    published = []
+    coalescer = SSEChunkCoalescer(published.append, interval_ms=10, max_bytes=512)
+
+    for i, token in enumerate(["Bon", "jour", " !"]):
+        coalescer.push(_chunk(token, i))
+    assert published == []
+
+    await asyncio.sleep(0.03)
+    assert published == [{"type": "chunk", "content": "Bonjour !", "sequence": 0}]
+
+    coalescer.push(_chunk("Suite", 3))
+    await asyncio.sleep(0.03)
+    assert published[-1] == {"type": "chunk", "content": "Suite", "sequence": 1}
+    assert (coalescer.received_chunks, coalescer.published_frames) == (4, 2)
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_flushes_immediately():
+    """Test que le seuil de taille (octets UTF-8) déclenche l'envoi sans attendre le délai."""
+    published = []
+    coalescer = SSEChunkCoalescer(published.append, interval_ms=1000, max_bytes=4)
+
+    coalescer.push(_chunk("é", 0))
+    coalescer.push(_chunk("é", 1))
+
+    assert published == [{"type": "chunk", "content": "éé", "sequence": 0}]
+
+
+@pytest.mark.asyncio
+async def test_other_events_flush_pending_chunks_first():
+    """Test que step/metadata/complete vident le tampon et sont publiés immédiatement, dans l'ordre."""
+    published = []
+    coalescer = SSEChunkCoalescer(published.append, interval_ms=1000)
+
+    coalescer.push({"type": "step", "step": "Generating"})
+    coalescer.push(_chunk("a", 0))
+    coalescer.push(_chunk("b", 1))
+    coalescer.push({"type": "metadata", "tokens": 2, "cost": 0.0})
+    coalescer.push(_chunk("c", 2))
+    coalescer.push({"type": "complete", "result": {}})
+
+    assert published == [
+        {"type": "step", "step": "Generating"},
+        {"type": "chunk", "content": "ab", "sequence": 0},
+        {"type": "metadata", "tokens": 2, "cost": 0.0},
+        {"type": "chunk", "content": "c", "sequence": 1},
+        {"type": "complete", "result": {}},
+    ]
+
+
+def test_zero_interval_disables_coalescing():
+    """Test qu'un délai nul publie chaque delta tel quel."""
+    published = []
+    coalescer = SSEChunkCoalescer(published.append, interval_ms=0)
+
+    coalescer.push(_chunk("a", 0))
+    coalescer.push(_chunk("b", 1))
+
+    assert published == [_chunk("a", 0), _chunk("b", 1)]